@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BikeshopConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bikeshop'
+
+    def ready(self):
+        """Import signals when app is ready."""
+        import bikeshop.signals  # noqa
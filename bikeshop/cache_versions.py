@@ -0,0 +1,98 @@
+"""
+Cache-Versionen einer Session in der Datenbank.
+
+Several per-session structures (compatibility index, production cost model,
+dashboard snapshot, research estimates) are cached under a key that contains a
+version, and a change bumps the version instead of deleting entries. The
+version used to be a counter in the cache itself. With the default
+LocMemCache every gunicorn worker has its own cache, so a bump in the worker
+that saved the change never reached the others and they kept serving stale
+data. The counter now lives in SessionCacheVersion: reading it is one indexed
+query, and every worker sees a bump at once. The cached payloads may stay
+process-local.
+
+Every bump also stores a new random token, and the version handed out for
+cache keys contains it. A bump inside a transaction that is rolled back
+resets the counter, but payloads cached under the bumped version stay in the
+cache; with the counter alone the next committed bump would reuse that number
+and serve them. The token of the next bump is new, so it never does.
+
+Bulk work (setting up a session, deleting rows with cascades) saves many rows
+and each of them sends a signal. Wrapped in ``batched_cache_bumps()`` every
+version is bumped once at the end. While a session itself is being deleted
+its versions are not bumped at all, the rows go with the session.
+"""
+import threading
+import uuid
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import SessionCacheVersion
+
+_state = threading.local()
+
+
+def _deleted_sessions():
+    if not hasattr(_state, 'deleted_sessions'):
+        _state.deleted_sessions = set()
+    return _state.deleted_sessions
+
+
+def session_delete_started(session_id):
+    """Ab jetzt keine Versionserhöhungen mehr für die Session (vor dem Löschen)"""
+    _deleted_sessions().add(session_id)
+
+
+def session_delete_finished(session_id):
+    _deleted_sessions().discard(session_id)
+
+
+@contextmanager
+def batched_cache_bumps():
+    """Sammelt Versionserhöhungen und erhöht jede (Session, Name) am Ende nur einmal"""
+    if getattr(_state, 'pending', None) is not None:
+        # Nested: the outermost block bumps
+        yield
+        return
+
+    _state.pending = set()
+    try:
+        yield
+    finally:
+        pending, _state.pending = _state.pending, None
+        for session_id, name in pending:
+            bump_cache_version(session_id, name)
+
+
+def get_cache_version(session_id, name):
+    """Aktuelle Version von ``name`` für eine Session als Teil eines Cache-Keys ('0', solange nie erhöht)"""
+    row = SessionCacheVersion.objects.filter(
+        session_id=session_id, name=name
+    ).values_list('version', 'token').first()
+    if row is None:
+        return '0'
+    return f'{row[0]}-{row[1]}'
+
+
+def bump_cache_version(session_id, name):
+    """Erhöht die Version von ``name``; gecachte Daten der alten Version werden nicht mehr gelesen"""
+    if session_id in _deleted_sessions():
+        return
+    pending = getattr(_state, 'pending', None)
+    if pending is not None:
+        pending.add((session_id, name))
+        return
+
+    versions = SessionCacheVersion.objects.filter(session_id=session_id, name=name)
+    if versions.update(version=F('version') + 1, token=uuid.uuid4().hex):
+        return
+    try:
+        with transaction.atomic():
+            SessionCacheVersion.objects.create(
+                session_id=session_id, name=name, version=1, token=uuid.uuid4().hex
+            )
+    except IntegrityError:
+        # Created concurrently by another worker
+        versions.update(version=F('version') + 1, token=uuid.uuid4().hex)
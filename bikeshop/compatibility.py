@@ -0,0 +1,181 @@
+"""
+Session-weiter Kompatibilitätsindex für Komponenten und Qualitäten.
+
+Builds, once per session, the data that production, procurement and the
+component quality helpers otherwise query per call: the quality of every
+component (from its first supplier price) and, for every bike type, price
+segment and component type, the ranked list of compatible components.
+
+The index is cached and only rebuilt after suppliers, components, component
+types, supplier prices or bike types of the session change (see signals.py).
+"""
+from django.core.cache import cache
+
+from .cache_versions import bump_cache_version, get_cache_version
+
+QUALITY_SEGMENT_MAPPING = {
+    'basic': ['cheap', 'standard'],  # Basic quality can be used for cheap and standard bikes
+    'standard': ['cheap', 'standard'],  # Standard quality can be used for cheap and standard bikes
+    'premium': ['cheap', 'standard', 'premium']  # Premium can be used for all segments
+}
+
+EXACT_QUALITY_MAPPING = {
+    'cheap': 'basic',
+    'standard': 'standard',
+    'premium': 'premium'
+}
+
+QUALITY_RANK = {'basic': 1, 'standard': 2, 'premium': 3}
+SEGMENT_RANK = {'cheap': 1, 'standard': 2, 'premium': 3}
+PRICE_SEGMENTS = ['cheap', 'standard', 'premium']
+
+
+CACHE_NAME = 'compatibility'
+
+
+def _index_key(session_id, version):
+    return f'bikeshop:compatibility:index:{session_id}:{version}'
+
+
+def invalidate_compatibility_index(session_id):
+    """Markiert den Index einer Session als veraltet (für alle Worker)"""
+    bump_cache_version(session_id, CACHE_NAME)
+
+
+def get_compatibility_index(session):
+    """Liefert den (gecachten) Kompatibilitätsindex einer Session"""
+    session_id = getattr(session, 'id', session)
+    version = get_cache_version(session_id, CACHE_NAME)
+
+    index = cache.get(_index_key(session_id, version))
+    if index is None:
+        index = CompatibilityIndex.build(session_id)
+        cache.set(_index_key(session_id, version), index, None)
+    return index
+
+
+def quality_priority(quality, price_segment):
+    """0 für exakte Qualitätstreffer, sonst Abstand der Qualitätsstufen"""
+    if quality == EXACT_QUALITY_MAPPING.get(price_segment):
+        return 0
+    return abs(QUALITY_RANK.get(quality, 2) - SEGMENT_RANK.get(price_segment, 2))
+
+
+def is_quality_compatible(quality, price_segment):
+    """Components without quality are compatible with all segments (legacy behavior)"""
+    if not quality:
+        return True
+    return price_segment in QUALITY_SEGMENT_MAPPING.get(quality, [])
+
+
+class CompatibilityIndex:
+    """Vorberechnete Qualitäts- und Kompatibilitätsdaten einer Session"""
+
+    def __init__(self):
+        self.component_types = {}  # name -> id of the first component type with that name
+        self.components = {}  # component id -> (name, component type id)
+        self.components_by_type = {}  # component type id -> [component id, ...]
+        self.qualities = {}  # component id -> supplier quality
+        self.requirements = {}  # bike type id -> get_required_components()
+        self.legacy_components = {}  # bike type id -> [component id, ...]
+        self.ranked = {}  # (bike type id, segment, component type name) -> [(component id, quality), ...]
+
+    @classmethod
+    def build(cls, session_id):
+        from .models import BikeType, Component, ComponentType, SupplierPrice
+
+        index = cls()
+
+        for component_type in ComponentType.objects.filter(session_id=session_id).order_by('id'):
+            index.component_types.setdefault(component_type.name, component_type.id)
+
+        for component in Component.objects.filter(session_id=session_id).order_by('id'):
+            index.components[component.id] = (component.name, component.component_type_id)
+            index.components_by_type.setdefault(component.component_type_id, []).append(component.id)
+
+        # Quality comes from the first supplier price of a component
+        for component_id, quality in SupplierPrice.objects.filter(
+            session_id=session_id
+        ).order_by('id').values_list('component_id', 'supplier__quality'):
+            index.qualities.setdefault(component_id, quality)
+
+        for bike_type in BikeType.objects.filter(session_id=session_id).select_related(
+            'wheel_set__component_type', 'frame__component_type', 'handlebar__component_type',
+            'saddle__component_type', 'gearshift__component_type', 'motor__component_type'
+        ):
+            requirements = bike_type.get_required_components()
+            index.requirements[bike_type.id] = requirements
+            index.legacy_components[bike_type.id] = [
+                component_id for component_id in (
+                    bike_type.wheel_set_id, bike_type.frame_id, bike_type.handlebar_id,
+                    bike_type.saddle_id, bike_type.gearshift_id, bike_type.motor_id
+                ) if component_id
+            ]
+
+            for component_type_name, compatible_names in requirements.items():
+                candidates = index.get_components(component_type_name, compatible_names)
+                for price_segment in PRICE_SEGMENTS:
+                    ranked = [
+                        (component_id, index.qualities.get(component_id))
+                        for component_id in candidates
+                        if is_quality_compatible(index.qualities.get(component_id), price_segment)
+                    ]
+                    # Stable sort keeps id order among components with equal priority
+                    ranked.sort(key=lambda entry: quality_priority(entry[1], price_segment))
+                    index.ranked[(bike_type.id, price_segment, component_type_name)] = ranked
+
+        return index
+
+    def get_quality(self, component_id):
+        return self.qualities.get(component_id)
+
+    def is_compatible(self, component_id, price_segment):
+        return is_quality_compatible(self.get_quality(component_id), price_segment)
+
+    def is_exact_match(self, component_id, price_segment):
+        quality = self.get_quality(component_id)
+        if not quality:
+            # Backward compatibility: components without quality are considered exact matches
+            return True
+        return quality == EXACT_QUALITY_MAPPING.get(price_segment)
+
+    def get_component_type_id(self, component_type_name):
+        return self.component_types.get(component_type_name)
+
+    def get_components(self, component_type_name, compatible_names):
+        """IDs der Komponenten eines Typs mit passendem Namen (in ID-Reihenfolge)"""
+        component_type_id = self.component_types.get(component_type_name)
+        if component_type_id is None:
+            return []
+        return [
+            component_id for component_id in self.components_by_type.get(component_type_id, [])
+            if self.components[component_id][0] in compatible_names
+        ]
+
+    def get_required_components(self, bike_type):
+        bike_type_id = getattr(bike_type, 'id', bike_type)
+        if bike_type_id in self.requirements:
+            return self.requirements[bike_type_id]
+        return bike_type.get_required_components()
+
+    def get_ranked_components(self, bike_type, price_segment, component_type_name):
+        """Qualitätskompatible Komponenten als [(component_id, quality)], exakte Treffer zuerst"""
+        bike_type_id = getattr(bike_type, 'id', bike_type)
+        return self.ranked.get((bike_type_id, price_segment, component_type_name), [])
+
+    def get_compatible_component_ids(self, bike_type):
+        """Alle Komponenten, die für einen Fahrradtyp eingekauft werden können"""
+        bike_type_id = getattr(bike_type, 'id', bike_type)
+        requirements = self.requirements.get(bike_type_id, {})
+
+        if not requirements:
+            # Fallback: legacy component fields, otherwise all components (let user decide)
+            legacy_components = self.legacy_components.get(bike_type_id)
+            if legacy_components:
+                return list(legacy_components)
+            return list(self.components.keys())
+
+        compatible_component_ids = []
+        for component_type_name, compatible_names in requirements.items():
+            compatible_component_ids.extend(self.get_components(component_type_name, compatible_names))
+        return compatible_component_ids
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bikeshop', '0007_make_parameters_dynamic'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bikeprice',
+            name='effective_price',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Price with segment multiplier applied (materialized, see multiplayer.effective_values)', max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='biketype',
+            name='effective_storage_space_per_unit',
+            field=models.FloatField(blank=True, help_text='Storage space with bike_storage_space_multiplier applied (materialized, see multiplayer.effective_values)', null=True),
+        ),
+        migrations.AddField(
+            model_name='supplierprice',
+            name='effective_price',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Price with component_cost_multiplier applied (materialized, see multiplayer.effective_values)', max_digits=8, null=True),
+        ),
+    ]
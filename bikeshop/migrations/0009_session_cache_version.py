@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bikeshop', '0008_effective_values'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionCacheVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cache_versions', to='bikeshop.gamesession')),
+            ],
+            options={
+                'unique_together': {('session', 'name')},
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-16 21:20
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Case, ExpressionWrapper, F, Value, When
+
+PRICE_FIELD = models.DecimalField(max_digits=8, decimal_places=2)
+
+
+def backfill_effective_values(apps, schema_editor):
+    """Effektivwerte aller Sessions (single player ohne Multiplikator), see multiplayer.effective_values"""
+    GameSession = apps.get_model('bikeshop', 'GameSession')
+    SupplierPrice = apps.get_model('bikeshop', 'SupplierPrice')
+    BikeType = apps.get_model('bikeshop', 'BikeType')
+    BikePrice = apps.get_model('bikeshop', 'BikePrice')
+    GameParameters = apps.get_model('multiplayer', 'GameParameters')
+
+    session_ids_by_game = defaultdict(list)
+    for session_id, multiplayer_game_id in GameSession.objects.values_list('id', 'multiplayer_game_id'):
+        session_ids_by_game[multiplayer_game_id].append(session_id)
+
+    for multiplayer_game_id, session_ids in session_ids_by_game.items():
+        params = None
+        if multiplayer_game_id is not None:
+            params = GameParameters.objects.filter(multiplayer_game_id=multiplayer_game_id).first()
+
+        component_cost = Decimal(str(params.component_cost_multiplier)) if params else Decimal('1')
+        storage_space = float(params.bike_storage_space_multiplier) if params else 1.0
+        bike_price = {
+            'cheap': Decimal(str(params.bike_price_cheap_multiplier)) if params else Decimal('1'),
+            'standard': Decimal(str(params.bike_price_standard_multiplier)) if params else Decimal('1'),
+            'premium': Decimal(str(params.bike_price_premium_multiplier)) if params else Decimal('1'),
+        }
+
+        SupplierPrice.objects.filter(session_id__in=session_ids).update(
+            effective_price=ExpressionWrapper(F('base_price') * Value(component_cost), output_field=PRICE_FIELD)
+        )
+        BikeType.objects.filter(session_id__in=session_ids).update(
+            effective_storage_space_per_unit=F('base_storage_space_per_unit') * Value(storage_space)
+        )
+        BikePrice.objects.filter(session_id__in=session_ids).update(
+            effective_price=Case(
+                *[When(price_segment=segment, then=F('base_price') * Value(multiplier))
+                  for segment, multiplier in bike_price.items()],
+                default=F('base_price'),
+                output_field=PRICE_FIELD
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bikeshop', '0009_session_cache_version'),
+        ('multiplayer', '0008_multiplayergame_enable_performance_tracking'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_effective_values, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bikeshop', '0010_backfill_effective_values'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessioncacheversion',
+            name='token',
+            field=models.CharField(blank=True, help_text='Random value set on every bump', max_length=32),
+        ),
+    ]
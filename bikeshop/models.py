@@ -71,55 +71,34 @@ class Component(models.Model):
     def __str__(self):
         return f"{self.component_type.name} - {self.name}"
     
-    def get_quality_for_session(self, session):
+    def get_quality_for_session(self, session, index=None):
         """Get the quality of this component based on its supplier for a given session"""
-        supplier_price = SupplierPrice.objects.filter(
-            session=session,
-            component=self
-        ).select_related('supplier').first()
-        
-        if supplier_price:
-            return supplier_price.supplier.quality
-        return None
+        return self._compatibility_index(session, index).get_quality(self.id)
     
-    def is_compatible_with_segment(self, session, price_segment):
+    def is_compatible_with_segment(self, session, price_segment, index=None):
         """Check if this component's quality is compatible with the bike price segment"""
-        quality = self.get_quality_for_session(session)
-        if not quality:
-            # Backward compatibility: if no supplier relationship exists, 
-            # component is compatible with all segments (legacy behavior)
-            return True
-        
-        # Define quality-to-segment mapping
-        quality_mapping = {
-            'basic': ['cheap', 'standard'],  # Basic quality can be used for cheap and standard bikes
-            'standard': ['cheap', 'standard'],  # Standard quality can be used for cheap and standard bikes
-            'premium': ['cheap', 'standard', 'premium']  # Premium can be used for all segments
-        }
-        
-        return price_segment in quality_mapping.get(quality, [])
+        # Components without supplier relationship are compatible with all segments (legacy behavior)
+        return self._compatibility_index(session, index).is_compatible(self.id, price_segment)
     
-    def is_exact_quality_match(self, session, price_segment):
+    def is_exact_quality_match(self, session, price_segment, index=None):
         """Check if this component's quality exactly matches the bike price segment"""
-        quality = self.get_quality_for_session(session)
-        if not quality:
-            # Backward compatibility: components without quality are considered exact matches
-            return True
-        
-        exact_mapping = {
-            'cheap': 'basic',
-            'standard': 'standard',
-            'premium': 'premium'
-        }
-        
-        return quality == exact_mapping.get(price_segment)
+        return self._compatibility_index(session, index).is_exact_match(self.id, price_segment)
+
+    @staticmethod
+    def _compatibility_index(session, index):
+        """Callers looping over components pass the index they fetched once"""
+        if index is not None:
+            return index
+        from .compatibility import get_compatibility_index
+        return get_compatibility_index(session)
     
-    def is_quality_upgrade(self, session, price_segment):
+    def is_quality_upgrade(self, session, price_segment, index=None):
         """Check if using this component would be a quality upgrade for the target segment"""
-        if not self.is_compatible_with_segment(session, price_segment):
+        index = self._compatibility_index(session, index)
+        if not self.is_compatible_with_segment(session, price_segment, index):
             return False
         
-        component_quality = self.get_quality_for_session(session)
+        component_quality = self.get_quality_for_session(session, index)
         if not component_quality:
             return False
         
@@ -142,9 +121,10 @@ class Component(models.Model):
         # Only consider it an upgrade if component quality is HIGHER than expected
         return component_level > expected_level
     
-    def get_quality_upgrade_info(self, session, price_segment):
+    def get_quality_upgrade_info(self, session, price_segment, index=None):
         """Get information about the quality upgrade"""
-        component_quality = self.get_quality_for_session(session)
+        index = self._compatibility_index(session, index)
+        component_quality = self.get_quality_for_session(session, index)
         if not component_quality:
             return None
         
@@ -160,7 +140,7 @@ class Component(models.Model):
             'premium': 'Premium'
         }
         
-        if self.is_quality_upgrade(session, price_segment):
+        if self.is_quality_upgrade(session, price_segment, index):
             return {
                 'component_quality': quality_names.get(component_quality, component_quality),
                 'target_segment': segment_names.get(price_segment, price_segment),
@@ -180,15 +160,18 @@ class SupplierPrice(models.Model):
     supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE)
     component = models.ForeignKey(Component, on_delete=models.CASCADE)
     base_price = models.DecimalField(max_digits=8, decimal_places=2, default=0, help_text="Base price without multipliers")
+    effective_price = models.DecimalField(
+        max_digits=8, decimal_places=2, null=True, blank=True,
+        help_text="Price with component_cost_multiplier applied (materialized, see multiplayer.effective_values)"
+    )
 
     class Meta:
         unique_together = ['session', 'supplier', 'component']
 
     @property
     def price(self):
-        """Calculate price with component_cost_multiplier applied (Fix for Issue #2)"""
-        from multiplayer.parameter_utils import apply_component_cost_multiplier
-        return apply_component_cost_multiplier(self.base_price, self.session)
+        """Price with component_cost_multiplier applied (Fix for Issue #2, base price until materialized)"""
+        return self.base_price if self.effective_price is None else self.effective_price
 
 
 class BikeType(models.Model):
@@ -200,6 +183,10 @@ class BikeType(models.Model):
     base_skilled_worker_hours = models.FloatField(default=0, help_text="Base skilled worker hours without multipliers")
     base_unskilled_worker_hours = models.FloatField(default=0, help_text="Base unskilled worker hours without multipliers")
     base_storage_space_per_unit = models.FloatField(default=0, help_text="Base storage space without multipliers")
+    effective_storage_space_per_unit = models.FloatField(
+        null=True, blank=True,
+        help_text="Storage space with bike_storage_space_multiplier applied (materialized, see multiplayer.effective_values)"
+    )
 
     # Calculated properties (for backward compatibility and display)
     @property
@@ -224,9 +211,10 @@ class BikeType(models.Model):
 
     @property
     def storage_space_per_unit(self):
-        """Calculate with multiplier applied"""
-        from multiplayer.parameter_utils import apply_bike_storage_space_multiplier
-        return apply_bike_storage_space_multiplier(self.base_storage_space_per_unit, self.session)
+        """Storage space with multiplier applied (base value until materialized)"""
+        if self.effective_storage_space_per_unit is None:
+            return self.base_storage_space_per_unit
+        return self.effective_storage_space_per_unit
 
     # Benötigte Komponenten (Legacy - will be replaced by component requirements)
     wheel_set = models.ForeignKey(Component, on_delete=models.CASCADE, related_name='bikes_wheel', null=True, blank=True)
@@ -302,7 +290,7 @@ class BikeType(models.Model):
         
         return requirements
     
-    def find_best_components_for_segment(self, session, price_segment):
+    def find_best_components_for_segment(self, session, price_segment, index=None):
         """Find the best available components for this bike type and segment.
 
         Returns a dict with:
@@ -311,6 +299,7 @@ class BikeType(models.Model):
         - 'missing': list of component types that have no available components
         """
         from warehouse.models import ComponentStock
+        from .compatibility import get_compatibility_index
 
         result = {
             'components': {},
@@ -318,7 +307,9 @@ class BikeType(models.Model):
             'missing': []
         }
 
-        required_components = self.get_required_components()
+        if index is None:
+            index = get_compatibility_index(session)
+        required_components = index.get_required_components(self)
 
         # Define quality expectations for each segment
         exact_quality_mapping = {
@@ -336,38 +327,35 @@ class BikeType(models.Model):
 
         for component_type_name, compatible_names in required_components.items():
             # Find components that match the requirements
-            component_type = ComponentType.objects.filter(
-                session=session,
-                name=component_type_name
-            ).first()
-
-            if not component_type:
+            if index.get_component_type_id(component_type_name) is None:
                 result['missing'].append(component_type_name)
                 continue
 
             # Get all compatible components for this bike type
-            compatible_components = Component.objects.filter(
-                session=session,
-                component_type=component_type,
-                name__in=compatible_names
-            )
+            compatible_component_ids = index.get_components(component_type_name, compatible_names)
 
             # Get stocks for these components (with supplier info!)
-            stocks_with_component = ComponentStock.objects.filter(
+            stocks_with_component = list(ComponentStock.objects.filter(
                 session=session,
-                component__in=compatible_components,
+                component_id__in=compatible_component_ids,
                 quantity__gt=0
-            ).select_related('component', 'supplier')
+            ).select_related('component', 'supplier'))
 
             if not stocks_with_component:
                 result['missing'].append(component_type_name)
                 continue
 
+            # Stock quality is the supplier's quality, falling back to the component's quality
+            stock_qualities = {
+                stock.id: stock.supplier.quality if stock.supplier else index.get_quality(stock.component_id)
+                for stock in stocks_with_component
+            }
+
             # Try to find exact quality match first
             expected_quality = exact_quality_mapping.get(price_segment)
             exact_matches = []
             for stock in stocks_with_component:
-                stock_quality = stock.get_quality()
+                stock_quality = stock_qualities[stock.id]
                 if stock_quality == expected_quality:
                     exact_matches.append(stock)
 
@@ -380,7 +368,7 @@ class BikeType(models.Model):
                 acceptable_qualities = quality_compatibility.get(price_segment, [])
                 compatible_stocks = []
                 for stock in stocks_with_component:
-                    stock_quality = stock.get_quality()
+                    stock_quality = stock_qualities[stock.id]
                     if stock_quality in acceptable_qualities:
                         compatible_stocks.append(stock)
 
@@ -390,7 +378,7 @@ class BikeType(models.Model):
                     result['components'][component_type_name] = chosen_stock.component
 
                     # Add upgrade information if it's actually an upgrade
-                    stock_quality = chosen_stock.get_quality()
+                    stock_quality = stock_qualities[chosen_stock.id]
                     quality_levels = {'basic': 1, 'standard': 2, 'premium': 3}
                     expected_level = quality_levels.get(expected_quality, 1)
                     actual_level = quality_levels.get(stock_quality, 1)
@@ -421,15 +409,18 @@ class BikePrice(models.Model):
         ('premium', 'Premium')
     ])
     base_price = models.DecimalField(max_digits=8, decimal_places=2, default=0, help_text="Base price without multipliers")
+    effective_price = models.DecimalField(
+        max_digits=8, decimal_places=2, null=True, blank=True,
+        help_text="Price with segment multiplier applied (materialized, see multiplayer.effective_values)"
+    )
 
     class Meta:
         unique_together = ['session', 'bike_type', 'price_segment']
 
     @property
     def price(self):
-        """Calculate price with segment-specific multiplier applied (Fix for Issue #2)"""
-        from multiplayer.parameter_utils import apply_bike_price_multiplier
-        return apply_bike_price_multiplier(self.base_price, self.price_segment, self.session)
+        """Price with segment-specific multiplier applied (Fix for Issue #2, base price until materialized)"""
+        return self.base_price if self.effective_price is None else self.effective_price
 
 
 class Worker(models.Model):
@@ -530,3 +521,17 @@ class TransportCost(models.Model):
 
     def __str__(self):
         return f"{self.transport_type} - {self.cost_per_km}€/km"
+
+
+class SessionCacheVersion(models.Model):
+    """Versionszähler für gecachte Session-Daten (siehe bikeshop.cache_versions)"""
+    session = models.ForeignKey(GameSession, on_delete=models.CASCADE, related_name='cache_versions')
+    name = models.CharField(max_length=50)
+    version = models.PositiveIntegerField(default=0)
+    token = models.CharField(max_length=32, blank=True, help_text="Random value set on every bump")
+
+    class Meta:
+        unique_together = ['session', 'name']
+
+    def __str__(self):
+        return f"{self.name} v{self.version} ({self.session_id})"
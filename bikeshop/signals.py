@@ -0,0 +1,34 @@
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from .models import GameSession, Supplier, ComponentType, Component, SupplierPrice, BikeType
+from .cache_versions import session_delete_finished, session_delete_started
+from .compatibility import invalidate_compatibility_index
+
+
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+@receiver(post_save, sender=ComponentType)
+@receiver(post_delete, sender=ComponentType)
+@receiver(post_save, sender=Component)
+@receiver(post_delete, sender=Component)
+@receiver(post_save, sender=SupplierPrice)
+@receiver(post_delete, sender=SupplierPrice)
+@receiver(post_save, sender=BikeType)
+@receiver(post_delete, sender=BikeType)
+def invalidate_compatibility_index_on_change(sender, instance, **kwargs):
+    """
+    Supplier qualities, components, prices and bike requirements feed the
+    session's compatibility index, so any change to them invalidates it.
+    """
+    invalidate_compatibility_index(instance.session_id)
+
+
+@receiver(pre_delete, sender=GameSession)
+def skip_cache_bumps_of_deleted_session(sender, instance, **kwargs):
+    """The cascade deletes the cache versions anyway, its rows need not bump them"""
+    session_delete_started(instance.pk)
+
+
+@receiver(post_delete, sender=GameSession)
+def resume_cache_bumps_after_session_delete(sender, instance, **kwargs):
+    session_delete_finished(instance.pk)
@@ -1,3 +1,140 @@
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from decimal import Decimal
 
-# Create your tests here.
+from .models import GameSession, BikeType, Component, ComponentType, Supplier, SupplierPrice, SessionCacheVersion
+from .cache_versions import batched_cache_bumps, bump_cache_version, get_cache_version
+from .compatibility import get_compatibility_index
+
+
+class CompatibilityIndexTest(TestCase):
+    """Tests für den session-weiten Kompatibilitätsindex"""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='indexuser', password='testpass123')
+        self.session = GameSession.objects.create(user=user, name='Index Session')
+        self.basic_supplier = Supplier.objects.create(
+            session=self.session, name='Basic', quality='basic',
+            complaint_probability=0, complaint_quantity=0
+        )
+        self.premium_supplier = Supplier.objects.create(
+            session=self.session, name='Premium', quality='premium',
+            complaint_probability=0, complaint_quantity=0
+        )
+        self.frame_type = ComponentType.objects.create(
+            session=self.session, name='Rahmen', storage_space_per_unit=1.0
+        )
+        self.premium_frame = Component.objects.create(
+            session=self.session, component_type=self.frame_type, name='Premium Frame'
+        )
+        self.basic_frame = Component.objects.create(
+            session=self.session, component_type=self.frame_type, name='Basic Frame'
+        )
+        self.legacy_frame = Component.objects.create(
+            session=self.session, component_type=self.frame_type, name='Legacy Frame'
+        )
+        SupplierPrice.objects.create(
+            session=self.session, supplier=self.premium_supplier,
+            component=self.premium_frame, base_price=Decimal('50.00')
+        )
+        SupplierPrice.objects.create(
+            session=self.session, supplier=self.basic_supplier,
+            component=self.basic_frame, base_price=Decimal('20.00')
+        )
+        self.bike_type = BikeType.objects.create(
+            session=self.session, name='City Bike',
+            required_frame_names=['Premium Frame', 'Basic Frame', 'Legacy Frame']
+        )
+
+    def test_ranked_components_prefer_exact_quality(self):
+        index = get_compatibility_index(self.session)
+
+        cheap = index.get_ranked_components(self.bike_type, 'cheap', 'Rahmen')
+        self.assertEqual(cheap[0], (self.basic_frame.id, 'basic'))
+        self.assertIn((self.premium_frame.id, 'premium'), cheap)
+
+        premium = [component_id for component_id, _ in
+                   index.get_ranked_components(self.bike_type, 'premium', 'Rahmen')]
+        self.assertEqual(premium[0], self.premium_frame.id)
+        self.assertNotIn(self.basic_frame.id, premium)
+        # Components without supplier price stay compatible with every segment
+        self.assertIn(self.legacy_frame.id, premium)
+
+    def test_component_helpers_use_passed_index(self):
+        index = get_compatibility_index(self.session)
+
+        # Loops fetch the index once and pass it in, the helpers then need no query
+        with self.assertNumQueries(0):
+            self.assertEqual(self.basic_frame.get_quality_for_session(self.session, index), 'basic')
+            self.assertFalse(self.basic_frame.is_compatible_with_segment(self.session, 'premium', index))
+            self.assertTrue(self.premium_frame.is_exact_quality_match(self.session, 'premium', index))
+            self.assertFalse(self.basic_frame.is_quality_upgrade(self.session, 'cheap', index))
+
+    def test_invalidation_reaches_other_workers(self):
+        self.assertEqual(self.basic_frame.get_quality_for_session(self.session), 'basic')
+
+        # Another worker changes the supplier: its signal bumps the version in the
+        # database, this process only keeps its (now outdated) cache entry
+        SupplierPrice.objects.filter(component=self.basic_frame).update(supplier=self.premium_supplier)
+        bump_cache_version(self.session.id, 'compatibility')
+
+        self.assertEqual(self.basic_frame.get_quality_for_session(self.session), 'premium')
+
+    def test_index_rebuilt_after_supplier_change(self):
+        self.assertEqual(self.basic_frame.get_quality_for_session(self.session), 'basic')
+
+        self.basic_supplier.quality = 'premium'
+        self.basic_supplier.save()
+
+        self.assertEqual(self.basic_frame.get_quality_for_session(self.session), 'premium')
+        self.assertTrue(self.basic_frame.is_compatible_with_segment(self.session, 'premium'))
+
+    def test_compatible_component_ids_for_procurement(self):
+        index = get_compatibility_index(self.session)
+        self.assertEqual(
+            index.get_compatible_component_ids(self.bike_type),
+            [self.premium_frame.id, self.basic_frame.id, self.legacy_frame.id]
+        )
+
+    def test_batched_changes_bump_once(self):
+        version = get_cache_version(self.session.id, 'compatibility')
+
+        with batched_cache_bumps():
+            for name in ['Frame A', 'Frame B', 'Frame C']:
+                Component.objects.create(session=self.session, component_type=self.frame_type, name=name)
+            self.assertEqual(get_cache_version(self.session.id, 'compatibility'), version)
+
+        self.assertNotEqual(get_cache_version(self.session.id, 'compatibility'), version)
+        self.assertEqual(SessionCacheVersion.objects.get(session=self.session, name='compatibility').version,
+                         int(version.split('-')[0]) + 1)
+
+    def test_rolled_back_bump_is_never_reused(self):
+        self.assertEqual(self.basic_frame.get_quality_for_session(self.session), 'basic')
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.basic_supplier.quality = 'premium'
+                self.basic_supplier.save()
+                # Cached under the bumped version, which the rollback undoes
+                self.assertEqual(self.basic_frame.get_quality_for_session(self.session), 'premium')
+                raise RuntimeError('rolled back')
+
+        self.assertEqual(self.basic_frame.get_quality_for_session(self.session), 'basic')
+        # The next committed bump reaches the same counter value but not the rolled back key
+        Component.objects.create(session=self.session, component_type=self.frame_type, name='Frame X')
+        self.assertEqual(self.basic_frame.get_quality_for_session(self.session), 'basic')
+
+    def test_session_delete_does_not_write_cache_versions(self):
+        self.assertTrue(SessionCacheVersion.objects.filter(session=self.session).exists())
+
+        with CaptureQueriesContext(connection) as queries:
+            self.session.delete()
+
+        writes = [
+            query['sql'] for query in queries.captured_queries
+            if 'sessioncacheversion' in query['sql'] and not query['sql'].startswith(('SELECT', 'DELETE'))
+        ]
+        self.assertEqual(writes, [])
+        self.assertFalse(SessionCacheVersion.objects.exists())
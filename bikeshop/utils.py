@@ -3,6 +3,8 @@ import pandas as pd
 from io import BytesIO
 from django.core.exceptions import ValidationError
 
+from .cache_versions import batched_cache_bumps
+
 
 def process_parameter_zip(zip_file):
     """Verarbeitet die hochgeladene ZIP-Datei mit Parametern"""
@@ -138,6 +140,7 @@ def read_competitors_excel(file_content):
     }
 
 
+@batched_cache_bumps()
 def initialize_session_data(session, parameters):
     """Initialisiert eine neue Spielsession mit den geladenen Parametern"""
     from .models import Supplier, ComponentType, Component, SupplierPrice, BikeType, BikePrice, Worker, TransportCost
@@ -405,3 +408,7 @@ def initialize_session_data(session, parameters):
     # Konkurrenten initialisieren
     from competitors.ai_engine import initialize_competitors_for_session
     initialize_competitors_for_session(session)
+
+    # Nachfrage des ersten Monats auswürfeln
+    from sales.demand_calculator import DemandCalculator
+    DemandCalculator(session).generate_monthly_demand(session.current_month, session.current_year)
@@ -1,10 +1,12 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, Http404
+from django.views.decorators.http import condition
 from .models import GameSession
 from .forms import ParameterUploadForm, SessionCreateForm
 from .utils import process_parameter_zip
+from simulation.dashboard import get_dashboard_snapshot
 import json
 import zipfile
 import os
@@ -79,15 +81,42 @@ def create_session(request):
     return render(request, 'bikeshop/create_session.html', {'form': form})
 
 
+def _session_detail_data(request, session_id):
+    """Session und Dashboard-Snapshot, einmal pro Anfrage geladen (ETag, Last-Modified und View lesen denselben Stand)"""
+    if not hasattr(request, '_session_detail_data'):
+        session = GameSession.objects.filter(id=session_id, user=request.user).first()
+        snapshot = get_dashboard_snapshot(session) if session is not None else None
+        request._session_detail_data = (session, snapshot)
+    return request._session_detail_data
+
+
+def _session_detail_snapshot(request, session_id):
+    """Snapshot für die bedingte Anfrage (None ohne Zugriff oder bei offenen Meldungen)"""
+    # Pending flash messages must be rendered, so never answer with 304 then
+    if len(messages.get_messages(request)):
+        return None
+    return _session_detail_data(request, session_id)[1]
+
+
+def _session_detail_etag(request, session_id):
+    snapshot = _session_detail_snapshot(request, session_id)
+    if snapshot is None:
+        return None
+    return f"{session_id}-{snapshot['version']}-{snapshot['generated_at'].timestamp()}-{request.user.pk}"
+
+
+def _session_detail_last_modified(request, session_id):
+    snapshot = _session_detail_snapshot(request, session_id)
+    return snapshot['generated_at'] if snapshot else None
+
+
 @login_required
+@condition(etag_func=_session_detail_etag, last_modified_func=_session_detail_last_modified)
 def session_detail(request, session_id):
     """Spielsession Details"""
-    session = get_object_or_404(GameSession, id=session_id, user=request.user)
-
-    # Hole aktuelle Daten für Dashboard
-    from simulation.engine import SimulationEngine
-    engine = SimulationEngine(session)
-    dashboard_data = engine.get_dashboard_data()
+    session, dashboard_data = _session_detail_data(request, session_id)
+    if session is None:
+        raise Http404
 
     return render(request, 'bikeshop/session_detail.html', {
         'session': session,
@@ -9,14 +9,15 @@ from .models import (
     SustainabilityProfile, SustainabilityInitiative, BusinessStrategy,
     CompetitiveAnalysis
 )
-from finance.models import Transaction
+from finance.ledger import SessionLedger
 
 
 class BusinessStrategyEngine:
     """Engine to process all business strategy systems"""
     
-    def __init__(self, session):
+    def __init__(self, session, ledger=None):
         self.session = session
+        self.ledger = ledger or SessionLedger(session, buffered=False)
     
     def process_monthly_business_strategy(self):
         """Process all business strategy activities for the month"""
@@ -103,8 +104,7 @@ class BusinessStrategyEngine:
         
         # Deduct from session balance
         if total_rd_spending > 0:
-            self.session.balance -= total_rd_spending
-            self.session.save()
+            self.ledger.adjust_balance(-total_rd_spending)
     
     def _process_marketing_monthly(self):
         """Process marketing campaigns monthly"""
@@ -142,8 +142,7 @@ class BusinessStrategyEngine:
         
         # Deduct from session balance
         if total_marketing_spending > 0:
-            self.session.balance -= total_marketing_spending
-            self.session.save()
+            self.ledger.adjust_balance(-total_marketing_spending)
     
     def _process_sustainability_monthly(self):
         """Process sustainability initiatives monthly"""
@@ -203,18 +202,11 @@ class BusinessStrategyEngine:
         
         # Deduct from session balance
         if total_sustainability_spending > 0:
-            self.session.balance -= total_sustainability_spending
-            self.session.save()
+            self.ledger.adjust_balance(-total_sustainability_spending)
             
             if ongoing_costs > 0:
-                Transaction.objects.create(
-                    session=self.session,
-                    transaction_type='expense',
-                    category='Nachhaltigkeit',
-                    amount=ongoing_costs,
-                    description='Laufende Nachhaltigkeitskosten',
-                    month=self.session.current_month,
-                    year=self.session.current_year
+                self.ledger.add_transaction(
+                    'expense', 'Nachhaltigkeit', ongoing_costs, 'Laufende Nachhaltigkeitskosten'
                 )
     
     def _update_competitive_analysis(self):
@@ -287,62 +279,47 @@ class BusinessStrategyEngine:
     
     def _create_rd_investment_transaction(self, project, amount):
         """Create transaction record for R&D investment"""
-        Transaction.objects.create(
-            session=self.session,
-            transaction_type='expense',
-            category='Forschung & Entwicklung',
-            amount=amount,
-            description=f'F&E Investment: {project.name}',
-            month=self.session.current_month,
-            year=self.session.current_year
+        self.ledger.add_transaction(
+            'expense',
+            'Forschung & Entwicklung',
+            amount,
+            f'F&E Investment: {project.name}'
         )
     
     def _create_project_completion_transaction(self, project, amount):
         """Create transaction record for completed R&D project"""
-        Transaction.objects.create(
-            session=self.session,
-            transaction_type='expense',
-            category='Forschung & Entwicklung',
-            amount=amount,
-            description=f'F&E Projekt abgeschlossen: {project.name}',
-            month=self.session.current_month,
-            year=self.session.current_year
+        self.ledger.add_transaction(
+            'expense',
+            'Forschung & Entwicklung',
+            amount,
+            f'F&E Projekt abgeschlossen: {project.name}'
         )
     
     def _create_marketing_transaction(self, campaign, amount):
         """Create transaction record for marketing spend"""
-        Transaction.objects.create(
-            session=self.session,
-            transaction_type='expense',
-            category='Marketing',
-            amount=amount,
-            description=f'Marketing Kampagne: {campaign.name}',
-            month=self.session.current_month,
-            year=self.session.current_year
+        self.ledger.add_transaction(
+            'expense',
+            'Marketing',
+            amount,
+            f'Marketing Kampagne: {campaign.name}'
         )
     
     def _create_sustainability_investment_transaction(self, initiative, amount):
         """Create transaction record for sustainability investment"""
-        Transaction.objects.create(
-            session=self.session,
-            transaction_type='expense',
-            category='Nachhaltigkeit',
-            amount=amount,
-            description=f'Nachhaltigkeits-Initiative: {initiative.name}',
-            month=self.session.current_month,
-            year=self.session.current_year
+        self.ledger.add_transaction(
+            'expense',
+            'Nachhaltigkeit',
+            amount,
+            f'Nachhaltigkeits-Initiative: {initiative.name}'
         )
     
     def _create_sustainability_completion_transaction(self, initiative, amount):
         """Create transaction record for completed sustainability initiative"""
-        Transaction.objects.create(
-            session=self.session,
-            transaction_type='expense',
-            category='Nachhaltigkeit',
-            amount=amount,
-            description=f'Nachhaltigkeits-Initiative abgeschlossen: {initiative.name}',
-            month=self.session.current_month,
-            year=self.session.current_year
+        self.ledger.add_transaction(
+            'expense',
+            'Nachhaltigkeit',
+            amount,
+            f'Nachhaltigkeits-Initiative abgeschlossen: {initiative.name}'
         )
     
     def get_rd_production_bonuses(self):
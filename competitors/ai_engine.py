@@ -1,10 +1,15 @@
 from django.db import transaction, models
-from bikeshop.models import GameSession, BikeType, BikePrice
+from bikeshop.models import GameSession
 from sales.models import Market, MarketDemand, MarketPriceSensitivity
 from .models import (
     AICompetitor, CompetitorProduction, CompetitorSale, 
     MarketCompetition, CompetitorStrategy
 )
+from .month_state import CompetitorMonthState
+from .sales_kernel import (
+    AGED_INVENTORY_MONTHS, AGED_QUANTITY_BOOST, DEFAULT_QUANTITY_FACTOR, MARKET_PRESENCE_CHANCE,
+    PREMIUM_PRICE_VARIATION, PRICE_VARIATION, QUANTITY_FACTORS, CompetitorSalesKernel
+)
 from decimal import Decimal
 import random
 import math
@@ -13,8 +18,20 @@ import math
 class CompetitorAIEngine:
     """AI-Engine für Konkurrentenverhalten"""
     
-    def __init__(self, session):
+    # Ab so vielen Konkurrenten werden die Verkäufe vektorisiert berechnet (sales_kernel)
+    VECTORIZED_SALES_MIN_COMPETITORS = 10
+    
+    def __init__(self, session, state=None, vectorized=None, rng=None):
+        from simulation.session_state import SessionState
+
         self.session = session
+        self.state = state or SessionState(session)
+        # True/False forces the sales kernel on/off, None decides by competitor count
+        self.vectorized = vectorized
+        # NumPy generator for the sales kernel (default: seeded from ``random``)
+        self.rng = rng
+        # Loaded productions/competitions and buffered writes of the running month
+        self.month_state = None
     
     def process_competitor_month(self):
         """Verarbeitet einen Monat für alle Konkurrenten"""
@@ -22,6 +39,9 @@ class CompetitorAIEngine:
             # 1. Update inventory ages
             self._update_competitor_inventory_ages()
             
+            # Productions and competition data are read once; changes are written in step 5
+            self.month_state = CompetitorMonthState(self.session, self.state, self._get_last_three_months())
+            
             # 2. Alle Konkurrenten planen Produktion
             self._plan_competitor_production()
             
@@ -29,30 +49,29 @@ class CompetitorAIEngine:
             self._handle_excess_inventory()
             
             # 4. Alle 3 Monate: Verkäufe verarbeiten
-            if self.session.current_month % 3 == 0:
+            is_sales_month = self.session.current_month % 3 == 0
+            if is_sales_month:
                 self._process_competitor_sales()
+            
+            # 5. Gepufferte Produktionen, Verkäufe und Konkurrenten schreiben
+            self.month_state.flush()
+            
+            if is_sales_month:
                 self._update_market_competition()
     
     def _update_competitor_inventory_ages(self):
         """Update inventory ages for all competitor productions"""
-        productions = CompetitorProduction.objects.filter(
-            competitor__session=self.session,
-            quantity_in_inventory__gt=0
+        CompetitorProduction.update_inventory_ages(
+            self.session, self.session.current_month, self.session.current_year
         )
-        
-        for production in productions:
-            production.update_inventory_age(self.session.current_month, self.session.current_year)
     
     def _handle_excess_inventory(self):
         """Handle aged inventory with clearance strategies"""
-        old_productions = CompetitorProduction.objects.filter(
-            competitor__session=self.session,
-            quantity_in_inventory__gt=0,
-            months_in_inventory__gte=6  # 6+ months old
-        )
+        old_productions = self.month_state.stocked_productions(min_months_in_inventory=6)  # 6+ months old
         
         for production in old_productions:
-            competitor = production.competitor
+            # Shared instance, so the liquidation cost ends up in the buffered competitor update
+            competitor = self.state.get_competitor(production.competitor_id) or production.competitor
             
             # Aggressive competitors liquidate old inventory
             if competitor.aggressiveness > 0.6:
@@ -61,11 +80,11 @@ class CompetitorAIEngine:
                 
                 if liquidated_quantity > 0:
                     production.quantity_in_inventory -= liquidated_quantity
-                    production.save()
+                    self.month_state.production_changed(production)
                     
                     # Record as lost inventory (no revenue, just clear it)
                     competitor.financial_resources -= production.production_cost_per_unit * liquidated_quantity * Decimal('0.3')
-                    competitor.save()
+                    self.month_state.competitor_changed(competitor)
             
             # Conservative competitors keep inventory longer but mark down prices more
             elif competitor.aggressiveness < 0.4:
@@ -74,10 +93,9 @@ class CompetitorAIEngine:
     
     def _plan_competitor_production(self):
         """Plant Produktion für alle Konkurrenten"""
-        competitors = AICompetitor.objects.filter(session=self.session)
-        bike_types = BikeType.objects.filter(session=self.session)
+        bike_types = list(self.state.bike_types.values())
         
-        for competitor in competitors:
+        for competitor in self.state.competitors.values():
             self._plan_production_for_competitor(competitor, bike_types)
     
     def _plan_production_for_competitor(self, competitor, bike_types):
@@ -147,21 +165,19 @@ class CompetitorAIEngine:
             )
             
             # Erstelle Produktionsplan
-            production, created = CompetitorProduction.objects.get_or_create(
-                competitor=competitor,
-                bike_type=bike_type,
-                price_segment=segment,
-                month=self.session.current_month,
-                year=self.session.current_year,
-                defaults={
-                    'quantity_planned': segment_capacity,
-                    'production_cost_per_unit': production_cost
-                }
-            )
-            
-            if not created:
+            production = self.month_state.get_current_production(competitor, bike_type, segment)
+            if production is None:
+                production = self.month_state.add_production(CompetitorProduction(
+                    competitor=competitor,
+                    bike_type=bike_type,
+                    price_segment=segment,
+                    month=self.session.current_month,
+                    year=self.session.current_year,
+                    quantity_planned=segment_capacity,
+                    production_cost_per_unit=production_cost
+                ))
+            else:
                 production.quantity_planned += segment_capacity
-                production.save()
             
             # Simuliere erfolgreiche Produktion
             success_rate = competitor.efficiency * random.uniform(0.8, 1.0)
@@ -171,43 +187,58 @@ class CompetitorAIEngine:
             # Initialize inventory with produced quantity
             production.quantity_in_inventory = actual_production
             production.months_in_inventory = 0
-            production.save()
+            self.month_state.production_changed(production)
             
             # Update Competitor Stats
             competitor.total_bikes_produced += actual_production
-            competitor.save()
+            self.month_state.competitor_changed(competitor)
     
     def _process_competitor_sales(self):
         """Verarbeitet Verkäufe aller Konkurrenten"""
-        competitors = AICompetitor.objects.filter(session=self.session)
-        markets = Market.objects.filter(session=self.session)
+        markets = list(self.state.markets.values())
         
         # Bereite Marktdaten vor
         self._prepare_market_demand_data(markets)
         
-        for competitor in competitors:
+        if self._use_sales_kernel():
+            self._process_sales_vectorized(markets)
+            return
+        
+        for competitor in self.state.competitors.values():
             self._process_sales_for_competitor(competitor, markets)
     
+    def _use_sales_kernel(self):
+        if self.vectorized is not None:
+            return self.vectorized
+        return len(self.state.competitors) >= self.VECTORIZED_SALES_MIN_COMPETITORS
+    
+    def _process_sales_vectorized(self, markets):
+        """Verkaufsversuche aller Konkurrenten in einem Durchgang (CompetitorSalesKernel)"""
+        productions = [
+            production for production in self.month_state.sale_productions()
+            if production.competitor_id in self.state.competitors
+        ]
+        kernel = CompetitorSalesKernel(productions, markets, rng=self.rng)
+        sales = kernel.run(
+            self._get_base_price, self._get_market_competition_factor, self.month_state.get_competition
+        )
+        
+        for sale in sales:
+            self.month_state.add_sale(
+                sale.production.competitor, sale.production, sale.market,
+                sale.quantity_offered, sale.quantity_sold, sale.sale_price
+            )
+    
     def _prepare_market_demand_data(self, markets):
         """Berechnet geschätzte Nachfrage für alle Märkte"""
-        bike_types = BikeType.objects.filter(session=self.session)
+        bike_types = self.state.bike_types.values()
         segments = ['cheap', 'standard', 'premium']
         
-        for market in markets:
-            for bike_type in bike_types:
-                for segment in segments:
-                    # Basis-Nachfrage (vereinfacht)
-                    base_demand = self._calculate_base_demand(market, bike_type, segment)
-                    
-                    competition, created = MarketCompetition.objects.get_or_create(
-                        session=self.session,
-                        market=market,
-                        bike_type=bike_type,
-                        price_segment=segment,
-                        month=self.session.current_month,
-                        year=self.session.current_year,
-                        defaults={'estimated_demand': base_demand}
-                    )
+        # Fehlende Wettbewerbsdaten mit Basis-Nachfrage (vereinfacht) anlegen
+        self.month_state.ensure_competitions(
+            [(market, bike_type, segment) for market in markets for bike_type in bike_types for segment in segments],
+            self._calculate_base_demand
+        )
     
     def _calculate_base_demand(self, market, bike_type, segment):
         """Berechnet Basis-Nachfrage für Markt/Bike/Segment"""
@@ -248,17 +279,12 @@ class CompetitorAIEngine:
     
     def _process_sales_for_competitor(self, competitor, markets):
         """Verarbeitet Verkäufe für einen Konkurrenten"""
-        # Hole alle Produktionen der letzten 3 Monate
-        productions = CompetitorProduction.objects.filter(
-            competitor=competitor,
-            month__in=self._get_last_three_months(),
-            year=self.session.current_year,
-            quantity_produced__gt=0
-        )
+        # Alle Produktionen der letzten 3 Monate
+        productions = self.month_state.sale_productions(competitor)
         
         for production in productions:
             for market in markets:
-                if random.random() < 0.7:  # 70% Chance auf Marktpräsenz
+                if random.random() < MARKET_PRESENCE_CHANCE:  # 70% Chance auf Marktpräsenz
                     self._attempt_sale(competitor, production, market)
     
     def _get_last_three_months(self):
@@ -301,29 +327,22 @@ class CompetitorAIEngine:
         
         # Add random variation (smaller for premium strategies)
         if competitor.strategy == 'premium_focus':
-            variation_range = (0.98, 1.02)  # Less price variation for premium
+            variation_range = PREMIUM_PRICE_VARIATION  # Less price variation for premium
         else:
-            variation_range = (0.92, 1.08)  # More variation for other strategies
+            variation_range = PRICE_VARIATION  # More variation for other strategies
         
         sale_price = sale_price * Decimal(str(random.uniform(*variation_range)))
         
         # Bestimme Angebotsmenge based on inventory and strategy
         max_inventory_offer = production.quantity_in_inventory
         
-        # Strategy-based quantity decisions
-        if competitor.strategy == 'cheap_only':
-            # Cheap strategy: offer more to move inventory quickly
-            quantity_factor = random.uniform(0.6, 1.0)
-        elif competitor.strategy == 'premium_focus':
-            # Premium strategy: offer less to maintain exclusivity
-            quantity_factor = random.uniform(0.3, 0.7)
-        else:
-            # Balanced strategies
-            quantity_factor = random.uniform(0.4, 0.8)
+        # Strategy-based quantity decisions: cheap offers more to move inventory
+        # quickly, premium offers less to maintain exclusivity
+        quantity_factor = random.uniform(*QUANTITY_FACTORS.get(competitor.strategy, DEFAULT_QUANTITY_FACTOR))
         
         # Increase offer if inventory is aging
-        if production.months_in_inventory > 3:
-            quantity_factor = min(1.0, quantity_factor * 1.5)  # More aggressive with old inventory
+        if production.months_in_inventory > AGED_INVENTORY_MONTHS:
+            quantity_factor = min(1.0, quantity_factor * AGED_QUANTITY_BOOST)  # More aggressive with old inventory
         
         max_offer = max(1, int(max_inventory_offer * quantity_factor))
         max_offer = min(max_offer, max_inventory_offer)
@@ -331,15 +350,8 @@ class CompetitorAIEngine:
         if max_offer < 1:
             return
         
-        # Hole oder erstelle Market Competition
-        competition = MarketCompetition.objects.filter(
-            session=self.session,
-            market=market,
-            bike_type=production.bike_type,
-            price_segment=production.price_segment,
-            month=self.session.current_month,
-            year=self.session.current_year
-        ).first()
+        # Market Competition des Monats
+        competition = self.month_state.get_competition(market, production.bike_type, production.price_segment)
         
         if not competition:
             return
@@ -353,39 +365,15 @@ class CompetitorAIEngine:
         actual_sold = min(actual_sold, competition.estimated_demand)
         
         if actual_sold > 0:
-            # Erstelle Verkauf
-            CompetitorSale.objects.create(
-                competitor=competitor,
-                market=market,
-                bike_type=production.bike_type,
-                price_segment=production.price_segment,
-                month=self.session.current_month,
-                year=self.session.current_year,
-                quantity_offered=max_offer,
-                quantity_sold=actual_sold,
-                sale_price=sale_price,
-                total_revenue=sale_price * actual_sold
-            )
-            
-            # Update Competitor Stats
-            competitor.total_bikes_sold += actual_sold
-            competitor.total_revenue += sale_price * actual_sold
-            competitor.save()
-            
-            # Update Production inventory
-            production.quantity_in_inventory -= actual_sold
-            production.save()
+            # Verkauf vormerken; bucht Umsatz und Lagerabgang
+            self.month_state.add_sale(competitor, production, market, max_offer, actual_sold, sale_price)
     
     def _get_base_price(self, bike_type, price_segment):
         """Holt Basis-Verkaufspreis"""
-        try:
-            bike_price = BikePrice.objects.get(
-                session=self.session,
-                bike_type=bike_type,
-                price_segment=price_segment
-            )
+        bike_price = self.state.get_bike_price(bike_type, price_segment)
+        if bike_price:
             return bike_price.price
-        except BikePrice.DoesNotExist:
+        else:
             # Fallback: Schätze Preis basierend auf Produktionskosten
             base_cost = CompetitorStrategy.calculate_production_cost(
                 bike_type, 'balanced', 0.7
@@ -420,52 +408,44 @@ class CompetitorAIEngine:
     
     def _get_market_competition_factor(self, market, bike_type, price_segment):
         """Calculate pricing adjustment based on market competition"""
-        try:
-            competition = MarketCompetition.objects.get(
-                session=self.session,
-                market=market,
-                bike_type=bike_type,
-                price_segment=price_segment,
-                month=self.session.current_month,
-                year=self.session.current_year
-            )
-            
-            # If market is oversaturated, reduce prices
-            if competition.saturation_level > 1.0:
-                # More competition = lower prices
-                saturation_penalty = min(0.25, (competition.saturation_level - 1.0) * 0.2)
-                return 1.0 - saturation_penalty
-            
-            # If market is undersaturated, can charge premium
-            elif competition.saturation_level < 0.8:
-                undersaturation_bonus = min(0.15, (0.8 - competition.saturation_level) * 0.3)
-                return 1.0 + undersaturation_bonus
-            
-            return 1.0  # Normal market conditions
-            
-        except MarketCompetition.DoesNotExist:
+        competition = self.month_state.get_competition(market, bike_type, price_segment)
+        if competition is None:
             return 1.0  # No competition data available
+        
+        # If market is oversaturated, reduce prices
+        if competition.saturation_level > 1.0:
+            # More competition = lower prices
+            saturation_penalty = min(0.25, (competition.saturation_level - 1.0) * 0.2)
+            return 1.0 - saturation_penalty
+        
+        # If market is undersaturated, can charge premium
+        elif competition.saturation_level < 0.8:
+            undersaturation_bonus = min(0.15, (0.8 - competition.saturation_level) * 0.3)
+            return 1.0 + undersaturation_bonus
+        
+        return 1.0  # Normal market conditions
     
     def _update_market_competition(self):
         """Aktualisiert Markt-Wettbewerbsdaten"""
-        competitions = MarketCompetition.objects.filter(
-            session=self.session,
-            month=self.session.current_month,
-            year=self.session.current_year
-        )
+        competitions = self.month_state.competitions.values()
         
-        for competition in competitions:
-            # Berechne Gesamtangebot (Konkurrenten + Spieler)
-            competitor_supply = CompetitorSale.objects.filter(
+        # Angebot der Konkurrenten je Markt/Fahrradtyp/Segment (eine Abfrage)
+        supply = {
+            (row['market_id'], row['bike_type_id'], row['price_segment']): row['total']
+            for row in CompetitorSale.objects.filter(
                 competitor__session=self.session,
-                market=competition.market,
-                bike_type=competition.bike_type,
-                price_segment=competition.price_segment,
                 month=self.session.current_month,
                 year=self.session.current_year
-            ).aggregate(
+            ).values('market_id', 'bike_type_id', 'price_segment').annotate(
                 total=models.Sum('quantity_offered')
-            )['total'] or 0
+            )
+        }
+        
+        for competition in competitions:
+            # Berechne Gesamtangebot (Konkurrenten + Spieler)
+            competitor_supply = supply.get(
+                (competition.market_id, competition.bike_type_id, competition.price_segment)
+            ) or 0
             
             # Player supply würde hier auch addiert werden
             # TODO: Integration mit Player Sales
@@ -483,8 +463,10 @@ class CompetitorAIEngine:
                 competition.price_pressure = -min(0.5, (competition.saturation_level - 1.0))
             else:
                 competition.price_pressure = (1.0 - competition.saturation_level) * 0.3
-            
-            competition.save()
+        
+        MarketCompetition.objects.bulk_update(
+            list(competitions), ['total_supply', 'saturation_level', 'price_pressure']
+        )
 
 
 def initialize_competitors_for_session(session):
@@ -80,6 +80,16 @@ class CompetitorProduction(models.Model):
         months_diff = (current_year - self.year) * 12 + (current_month - self.month)
         self.months_in_inventory = max(0, months_diff)
         self.save()
+
+    @classmethod
+    def update_inventory_ages(cls, session, current_month, current_year):
+        """Set-based variant of update_inventory_age for a session's competitor inventory (one UPDATE)"""
+        from production.models import months_since_production_expression
+        return cls.objects.filter(competitor__session=session, quantity_in_inventory__gt=0).update(
+            months_in_inventory=months_since_production_expression(
+                current_month, current_year, month_field='month', year_field='year'
+            )
+        )
     
     class Meta:
         unique_together = ['competitor', 'bike_type', 'price_segment', 'month', 'year']
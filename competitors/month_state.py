@@ -0,0 +1,185 @@
+"""
+Vorgeladene Daten und gepufferte Schreibvorgänge eines Konkurrenten-Monats.
+
+CompetitorAIEngine used to ask the database for every step of every
+competitor: a get_or_create per planned production, a MarketCompetition filter
+per (competitor, production, market) sale attempt plus a second lookup for the
+price factor, and a CompetitorSale insert with two saves per successful sale.
+The round trips grew with competitors x productions x markets.
+
+CompetitorMonthState loads the session's relevant CompetitorProduction rows and
+the month's MarketCompetition rows once into dictionaries (bike prices come
+from the SessionState). The engine changes the loaded objects in memory and
+records new productions and sales here; ``flush`` writes everything with a
+few bulk_create/bulk_update statements.
+"""
+from django.db.models import Q
+
+from .models import AICompetitor, CompetitorProduction, CompetitorSale, MarketCompetition
+
+PRODUCTION_FIELDS = ['quantity_planned', 'quantity_produced', 'quantity_in_inventory', 'months_in_inventory']
+COMPETITOR_FIELDS = ['financial_resources', 'total_bikes_produced', 'total_bikes_sold', 'total_revenue']
+
+
+class CompetitorMonthState:
+    """Produktionen, Wettbewerbsdaten und Schreibpuffer eines Monats"""
+
+    def __init__(self, session, state, sales_months):
+        self.session = session
+        self.state = state
+        self.month = session.current_month
+        self.year = session.current_year
+        # Months whose productions are offered for sale (see CompetitorAIEngine._get_last_three_months)
+        self.sales_months = list(sales_months)
+
+        self._new_productions = []
+        self._changed_productions = {}
+        self._changed_competitors = {}
+        self.sales = []
+
+        self.productions = self._load_productions()
+        # (competitor_id, bike_type_id, price_segment) -> production of the current month
+        self._current_productions = {
+            (production.competitor_id, production.bike_type_id, production.price_segment): production
+            for production in self.productions
+            if production.month == self.month and production.year == self.year
+        }
+        # (market_id, bike_type_id, price_segment) -> MarketCompetition of the current month
+        self.competitions = self._load_competitions()
+
+    def _load_productions(self):
+        """Produktionen mit Lagerbestand oder aus den Verkaufsmonaten (eine Abfrage)"""
+        productions = list(
+            CompetitorProduction.objects.filter(competitor__session=self.session).filter(
+                Q(quantity_in_inventory__gt=0) | Q(year=self.year, month__in=set(self.sales_months) | {self.month})
+            ).order_by('id')
+        )
+        for production in productions:
+            # Shared instances, so no lazy loads per production
+            competitor = self.state.get_competitor(production.competitor_id)
+            if competitor is not None:
+                production.competitor = competitor
+            bike_type = self.state.get_bike_type(production.bike_type_id)
+            if bike_type is not None:
+                production.bike_type = bike_type
+        return productions
+
+    def _load_competitions(self):
+        return {
+            (competition.market_id, competition.bike_type_id, competition.price_segment): competition
+            for competition in MarketCompetition.objects.filter(
+                session=self.session, month=self.month, year=self.year
+            )
+        }
+
+    # Produktionen
+
+    def get_current_production(self, competitor, bike_type, price_segment):
+        """Produktion des laufenden Monats oder None"""
+        return self._current_productions.get((competitor.id, bike_type.id, price_segment))
+
+    def add_production(self, production):
+        """Merkt eine neue Produktion des laufenden Monats vor"""
+        key = (production.competitor.id, production.bike_type.id, production.price_segment)
+        self._current_productions[key] = production
+        self.productions.append(production)
+        self._new_productions.append(production)
+        return production
+
+    def production_changed(self, production):
+        if production.pk is not None:
+            self._changed_productions[production.pk] = production
+
+    def competitor_changed(self, competitor):
+        self._changed_competitors[competitor.pk] = competitor
+
+    def stocked_productions(self, min_months_in_inventory=0):
+        """Produktionen mit Restbestand, mindestens ``min_months_in_inventory`` Monate alt"""
+        return [
+            production for production in self.productions
+            if production.quantity_in_inventory > 0 and production.months_in_inventory >= min_months_in_inventory
+        ]
+
+    def sale_productions(self, competitor=None):
+        """Produzierte Ware eines (ohne Angabe: aller) Konkurrenten aus den Verkaufsmonaten"""
+        return [
+            production for production in self.productions
+            if (competitor is None or production.competitor_id == competitor.id)
+            and production.year == self.year
+            and production.month in self.sales_months
+            and production.quantity_produced > 0
+        ]
+
+    # Wettbewerbsdaten
+
+    def get_competition(self, market, bike_type, price_segment):
+        return self.competitions.get((market.id, bike_type.id, price_segment))
+
+    def ensure_competitions(self, keys, estimated_demand):
+        """
+        Legt fehlende MarketCompetition-Zeilen des Monats an.
+
+        ``keys`` are (market, bike_type, price_segment) triples,
+        ``estimated_demand(market, bike_type, price_segment)`` gives the
+        starting demand of a new row.
+        """
+        missing = [
+            MarketCompetition(
+                session=self.session,
+                market=market,
+                bike_type=bike_type,
+                price_segment=price_segment,
+                month=self.month,
+                year=self.year,
+                estimated_demand=estimated_demand(market, bike_type, price_segment)
+            )
+            for market, bike_type, price_segment in keys
+            if (market.id, bike_type.id, price_segment) not in self.competitions
+        ]
+        if missing:
+            MarketCompetition.objects.bulk_create(missing, ignore_conflicts=True)
+            # Re-read so every row has its primary key (not returned on all backends)
+            self.competitions = self._load_competitions()
+        return len(missing)
+
+    # Verkäufe
+
+    def add_sale(self, competitor, production, market, quantity_offered, quantity_sold, sale_price):
+        """Merkt einen Verkauf vor und bucht ihn auf Konkurrent und Lagerbestand"""
+        # Plain ids, setting related instances costs more than the rest of the sale
+        sale = CompetitorSale(
+            competitor_id=competitor.id,
+            market_id=market.id,
+            bike_type_id=production.bike_type_id,
+            price_segment=production.price_segment,
+            month=self.month,
+            year=self.year,
+            quantity_offered=quantity_offered,
+            quantity_sold=quantity_sold,
+            sale_price=sale_price,
+            total_revenue=sale_price * quantity_sold
+        )
+        self.sales.append(sale)
+
+        competitor.total_bikes_sold += quantity_sold
+        competitor.total_revenue += sale.total_revenue
+        self.competitor_changed(competitor)
+
+        production.quantity_in_inventory -= quantity_sold
+        self.production_changed(production)
+        return sale
+
+    def flush(self):
+        """Schreibt alle vorgemerkten Änderungen"""
+        if self._new_productions:
+            CompetitorProduction.objects.bulk_create(self._new_productions)
+            self._new_productions = []
+        if self._changed_productions:
+            CompetitorProduction.objects.bulk_update(list(self._changed_productions.values()), PRODUCTION_FIELDS)
+            self._changed_productions = {}
+        if self.sales:
+            CompetitorSale.objects.bulk_create(self.sales)
+            self.sales = []
+        if self._changed_competitors:
+            AICompetitor.objects.bulk_update(list(self._changed_competitors.values()), COMPETITOR_FIELDS)
+            self._changed_competitors = {}
@@ -0,0 +1,179 @@
+"""
+Vektorisierte Verkaufsversuche der KI-Konkurrenten.
+
+CompetitorAIEngine._attempt_sale prices and sells one (production, market)
+pair at a time: Decimal arithmetic, three ``random`` calls and a handful of
+method calls per pair. With 30+ competitors that loop dominates the month.
+
+CompetitorSalesKernel computes the same model for all (competitor, production,
+market) triples at once. Prices, quantity factors and success rates are NumPy
+arrays of shape (productions, markets); all random variates are drawn in one
+call from a NumPy generator (seeded from ``random`` unless one is passed in).
+Only the inventory has to be walked market by market, because an offer in one
+market reduces what the production can offer in the next, exactly as in the
+loop. Every step of that walk is a vector operation over all productions.
+
+Results are distributed like those of the loop, which reads the same module
+constants; sale prices are rounded to cents before the revenue is computed.
+"""
+from decimal import Decimal
+
+import numpy as np
+
+from sales.offer_book import default_rng
+
+# Chance that a production is offered in a market
+MARKET_PRESENCE_CHANCE = 0.7
+# Price variation ranges (premium strategy varies less)
+PRICE_VARIATION = (0.92, 1.08)
+PREMIUM_PRICE_VARIATION = (0.98, 1.02)
+# Share of the inventory offered per strategy
+QUANTITY_FACTORS = {
+    'cheap_only': (0.6, 1.0),
+    'premium_focus': (0.3, 0.7),
+}
+DEFAULT_QUANTITY_FACTOR = (0.4, 0.8)
+# Inventory older than this is offered more aggressively
+AGED_INVENTORY_MONTHS = 3
+AGED_QUANTITY_BOOST = 1.5
+
+
+class SaleResult:
+    """Ergebnis eines Verkaufsversuchs (noch nicht gespeichert)"""
+
+    __slots__ = ('production', 'market', 'quantity_offered', 'quantity_sold', 'sale_price')
+
+    def __init__(self, production, market, quantity_offered, quantity_sold, sale_price):
+        self.production = production
+        self.market = market
+        self.quantity_offered = quantity_offered
+        self.quantity_sold = quantity_sold
+        self.sale_price = sale_price
+
+
+class CompetitorSalesKernel:
+    """Verkaufsversuche aller Produktionen in allen Märkten eines Monats"""
+
+    def __init__(self, productions, markets, rng=None):
+        # Productions need ``competitor`` and ``bike_type`` loaded
+        self.productions = list(productions)
+        self.markets = list(markets)
+        self.rng = rng if rng is not None else default_rng()
+
+    def _production_arrays(self, base_price):
+        """Faktoren je Produktion (Länge P)"""
+        base_prices = {}
+        columns = []
+        for production in self.productions:
+            competitor = production.competitor
+            key = (production.bike_type_id, production.price_segment)
+            if key not in base_prices:
+                base_prices[key] = float(base_price(production.bike_type, production.price_segment))
+            variation = PREMIUM_PRICE_VARIATION if competitor.strategy == 'premium_focus' else PRICE_VARIATION
+            quantity_factor = QUANTITY_FACTORS.get(competitor.strategy, DEFAULT_QUANTITY_FACTOR)
+            columns.append((
+                production.quantity_in_inventory,
+                production.months_in_inventory,
+                base_prices[key],
+                competitor.get_price_adjustment_factor() * production.get_inventory_age_penalty()
+                * (1.0 - competitor.aggressiveness * 0.1),
+                0.6 + competitor.market_presence / 100 * 0.3 + competitor.aggressiveness * 0.2,
+                variation[0], variation[1],
+                quantity_factor[0], quantity_factor[1],
+            ))
+        (inventory, months, base, price_factor, base_rate,
+         variation_low, variation_high, quantity_low, quantity_high) = np.array(columns, dtype=np.float64).T
+        return {
+            'inventory': inventory.astype(np.int64),
+            'months': months,
+            'base_price': base,
+            'price_factor': price_factor,
+            'base_rate': base_rate,
+            'variation': (variation_low, variation_high),
+            'quantity': (quantity_low, quantity_high),
+        }
+
+    def _market_arrays(self, market_factor, competition):
+        """Wettbewerbsdaten je (Produktion, Markt) über die Fahrradtyp/Segment-Gruppen"""
+        groups = {}
+        group_ids = np.empty(len(self.productions), dtype=np.int64)
+        for index, production in enumerate(self.productions):
+            key = (production.bike_type_id, production.price_segment)
+            if key not in groups:
+                groups[key] = (len(groups), production.bike_type)
+            group_ids[index] = groups[key][0]
+
+        shape = (len(groups), len(self.markets))
+        factors = np.ones(shape)
+        saturation = np.zeros(shape)
+        demand = np.zeros(shape, dtype=np.int64)
+        available = np.zeros(shape, dtype=bool)
+        for (_, price_segment), (group, bike_type) in groups.items():
+            for column, market in enumerate(self.markets):
+                market_competition = competition(market, bike_type, price_segment)
+                if market_competition is None:
+                    continue
+                available[group, column] = True
+                factors[group, column] = market_factor(market, bike_type, price_segment)
+                saturation[group, column] = market_competition.saturation_level
+                demand[group, column] = market_competition.estimated_demand
+
+        return factors[group_ids], saturation[group_ids], demand[group_ids], available[group_ids]
+
+    def run(self, base_price, market_factor, competition):
+        """
+        Berechnet alle Verkäufe.
+
+        ``base_price(bike_type, segment)``, ``market_factor(market, bike_type,
+        segment)`` and ``competition(market, bike_type, segment)`` are the
+        engine's lookups. Nothing is written; returns the sales with sold
+        units in production/market order.
+        """
+        if not self.productions or not self.markets:
+            return []
+
+        values = self._production_arrays(base_price)
+        factors, saturation, demand, available = self._market_arrays(market_factor, competition)
+
+        # All random variates of the month at once: presence, price variation, quantity factor
+        presence_draw, variation_draw, quantity_draw = self.rng.random((3, len(self.productions), len(self.markets)))
+        present = (presence_draw < MARKET_PRESENCE_CHANCE) & available
+
+        variation_low, variation_high = values['variation']
+        variation = variation_low[:, None] + variation_draw * (variation_high - variation_low)[:, None]
+        sale_prices = values['base_price'][:, None] * values['price_factor'][:, None] * factors * variation
+
+        quantity_low, quantity_high = values['quantity']
+        quantity_factors = quantity_low[:, None] + quantity_draw * (quantity_high - quantity_low)[:, None]
+        # More aggressive with old inventory
+        aged = values['months'] > AGED_INVENTORY_MONTHS
+        quantity_factors[aged] = np.minimum(1.0, quantity_factors[aged] * AGED_QUANTITY_BOOST)
+
+        base = values['base_price'][:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price_effect = np.where(base > 0, np.clip(base / sale_prices - 1.0, -0.3, 0.3), 0.0)
+        success_rates = np.clip(values['base_rate'][:, None] + price_effect - saturation * 0.4, 0.1, 0.9)
+
+        # Walk the markets in order; each offer reduces the inventory for the next market
+        inventory = values['inventory'].copy()
+        offered = np.zeros(factors.shape, dtype=np.int64)
+        sold = np.zeros(factors.shape, dtype=np.int64)
+        for column in range(len(self.markets)):
+            active = present[:, column] & (inventory > 0)
+            offer = np.minimum(
+                inventory, np.maximum(1, np.floor(inventory * quantity_factors[:, column]).astype(np.int64))
+            )
+            units = np.minimum(np.floor(offer * success_rates[:, column]).astype(np.int64), demand[:, column])
+            units = np.where(active, units, 0)
+            offered[:, column] = offer
+            sold[:, column] = units
+            inventory -= units
+
+        rows, columns = np.nonzero(sold > 0)
+        return [
+            SaleResult(
+                self.productions[row], self.markets[column], int(offered[row, column]), int(sold[row, column]),
+                Decimal(f'{sale_prices[row, column]:.2f}')
+            )
+            for row, column in zip(rows.tolist(), columns.tolist())
+        ]
@@ -1,3 +1,202 @@
+import random
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Sum
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from bikeshop.models import BikeType, GameSession
+from sales.models import Market
+from .ai_engine import CompetitorAIEngine
+from .models import AICompetitor, CompetitorProduction, CompetitorSale, MarketCompetition
+from .month_state import CompetitorMonthState
+from .sales_kernel import CompetitorSalesKernel
+
+
+class CompetitorMonthQueryTest(TestCase):
+    """Der Konkurrenten-Monat liest einmal und schreibt gesammelt"""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='rivaluser', password='testpass123')
+        self.session = GameSession.objects.create(
+            user=user, name='Rival Session', current_month=3, current_year=2024, balance=Decimal('80000.00')
+        )
+        self.bike_types = [
+            BikeType.objects.create(session=self.session, name=name, base_storage_space_per_unit=1.0)
+            for name in ('City Bike', 'Mountainbike')
+        ]
+        self.markets = []
+        self.competitors = []
+
+    def _add_markets(self, count):
+        for _ in range(count):
+            index = len(self.markets)
+            self.markets.append(Market.objects.create(
+                session=self.session, name=f'Market {index}', location=f'Town {index}',
+                transport_cost_home=Decimal('10.00'), transport_cost_foreign=Decimal('20.00'),
+                monthly_volume_capacity=1000
+            ))
+
+    def _add_competitors(self, count):
+        strategies = ['cheap_only', 'balanced', 'premium_focus', 'e_bike_specialist']
+        for _ in range(count):
+            index = len(self.competitors)
+            competitor = AICompetitor.objects.create(
+                session=self.session, name=f'Rival {index}', strategy=strategies[index % 4],
+                aggressiveness=0.7, financial_resources=Decimal('50000.00')
+            )
+            self.competitors.append(competitor)
+            # Stock from earlier months: aged and sellable inventory
+            for month, quantity in ((1, 40), (2, 30)):
+                CompetitorProduction.objects.create(
+                    competitor=competitor, bike_type=self.bike_types[index % 2], price_segment='standard',
+                    month=month, year=2023 if month == 1 else 2024, quantity_planned=quantity,
+                    quantity_produced=quantity, quantity_in_inventory=quantity,
+                    production_cost_per_unit=Decimal('300.00')
+                )
+
+    def _run_month(self):
+        random.seed(11)
+        with CaptureQueriesContext(connection) as queries:
+            CompetitorAIEngine(self.session).process_competitor_month()
+        return len(queries)
+
+    def test_query_count_independent_of_competitors_and_markets(self):
+        self._add_markets(2)
+        self._add_competitors(2)
+        few = self._run_month()
+
+        CompetitorSale.objects.all().delete()
+        MarketCompetition.objects.all().delete()
+        CompetitorProduction.objects.filter(month=3, year=2024).delete()
+        self._add_markets(4)
+        self._add_competitors(8)
+        many = self._run_month()
+
+        self.assertTrue(CompetitorSale.objects.filter(competitor__session=self.session).exists())
+        self.assertLessEqual(many, few + 2)
+        self.assertLess(many, 25)
+
+    def test_buffered_writes_are_consistent(self):
+        self._add_markets(3)
+        self._add_competitors(4)
+        before = {competitor.id: competitor.total_bikes_sold for competitor in self.competitors}
+
+        self._run_month()
+
+        self.assertEqual(
+            MarketCompetition.objects.filter(session=self.session, month=3, year=2024).count(), 3 * 2 * 3
+        )
+        for competitor in AICompetitor.objects.filter(session=self.session):
+            sold = CompetitorSale.objects.filter(competitor=competitor).aggregate(total=Sum('quantity_sold'))['total'] or 0
+            self.assertEqual(competitor.total_bikes_sold - before[competitor.id], sold)
+
+            productions = CompetitorProduction.objects.filter(competitor=competitor)
+            produced = productions.filter(month=3, year=2024).aggregate(total=Sum('quantity_produced'))['total'] or 0
+            self.assertEqual(competitor.total_bikes_produced, produced)
+            for production in productions:
+                self.assertGreaterEqual(production.quantity_in_inventory, 0)
+                self.assertLessEqual(production.quantity_in_inventory, production.quantity_produced)
+
+        # Supply of the competition rows matches the written sales
+        for competition in MarketCompetition.objects.filter(session=self.session, month=3, year=2024):
+            offered = CompetitorSale.objects.filter(
+                market=competition.market, bike_type=competition.bike_type, price_segment=competition.price_segment
+            ).aggregate(total=Sum('quantity_offered'))['total'] or 0
+            self.assertEqual(competition.total_supply, offered)
+
+
+class CompetitorSalesKernelTest(TestCase):
+    """Vektorisierte Verkaufsversuche entsprechen der Schleife"""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='kerneluser', password='testpass123')
+        self.session = GameSession.objects.create(
+            user=user, name='Kernel Session', current_month=3, current_year=2024, balance=Decimal('80000.00')
+        )
+        bike_type = BikeType.objects.create(session=self.session, name='City Bike', base_storage_space_per_unit=1.0)
+        for index in range(2):
+            Market.objects.create(
+                session=self.session, name=f'Market {index}', location=f'Town {index}',
+                transport_cost_home=Decimal('10.00'), transport_cost_foreign=Decimal('20.00'),
+                monthly_volume_capacity=1000
+            )
+        for index, (strategy, months_old) in enumerate((('cheap_only', 1), ('premium_focus', 2), ('balanced', 0))):
+            competitor = AICompetitor.objects.create(
+                session=self.session, name=f'Rival {index}', strategy=strategy, aggressiveness=0.3 + index * 0.2
+            )
+            CompetitorProduction.objects.create(
+                competitor=competitor, bike_type=bike_type, price_segment='standard',
+                month=3 - months_old, year=2024, quantity_planned=60, quantity_produced=60,
+                quantity_in_inventory=60, months_in_inventory=months_old,
+                production_cost_per_unit=Decimal('300.00')
+            )
+
+    def _engine(self, vectorized, rng=None):
+        engine = CompetitorAIEngine(self.session, vectorized=vectorized, rng=rng)
+        engine.month_state = CompetitorMonthState(self.session, engine.state, engine._get_last_three_months())
+        return engine
+
+    def _sell(self, engine):
+        """Verkaufsphase ohne zu schreiben; verkaufte Einheiten je Konkurrent"""
+        engine._process_competitor_sales()
+        sold = {competitor_id: 0 for competitor_id in engine.state.competitors}
+        for sale in engine.month_state.sales:
+            sold[sale.competitor_id] += sale.quantity_sold
+        return sold
+
+    def test_seeded_generator_is_reproducible(self):
+        first = self._engine(True, rng=np.random.default_rng(5))
+        second = self._engine(True, rng=np.random.default_rng(5))
+
+        self.assertEqual(self._sell(first), self._sell(second))
+        self.assertEqual(
+            [sale.sale_price for sale in first.month_state.sales],
+            [sale.sale_price for sale in second.month_state.sales]
+        )
+
+    def test_sales_respect_inventory_and_demand(self):
+        engine = self._engine(True, rng=np.random.default_rng(9))
+        self._sell(engine)
+
+        demand = {
+            (competition.market_id, competition.price_segment): competition.estimated_demand
+            for competition in engine.month_state.competitions.values()
+        }
+        for sale in engine.month_state.sales:
+            self.assertLessEqual(sale.quantity_sold, sale.quantity_offered)
+            self.assertLessEqual(sale.quantity_sold, demand[(sale.market_id, sale.price_segment)])
+        for production in engine.month_state.productions:
+            self.assertGreaterEqual(production.quantity_in_inventory, 0)
+
+    def test_no_competition_data_means_no_sales(self):
+        engine = self._engine(True)
+        productions = engine.month_state.sale_productions()
+        kernel = CompetitorSalesKernel(productions, engine.state.markets.values(), rng=np.random.default_rng(1))
+
+        self.assertEqual(kernel.run(engine._get_base_price, lambda *args: 1.0, lambda *args: None), [])
+
+    def test_distribution_matches_loop(self):
+        trials = 150
+        random.seed(3)
+        loop_results = [self._sell(self._engine(False)) for _ in range(trials)]
+        kernel_rng = np.random.default_rng(3)
+        kernel_results = [self._sell(self._engine(True, rng=kernel_rng)) for _ in range(trials)]
+
+        for competitor_id in loop_results[0]:
+            expected = np.array([result[competitor_id] for result in loop_results], dtype=float)
+            actual = np.array([result[competitor_id] for result in kernel_results], dtype=float)
+            standard_error = np.sqrt((expected.var() + actual.var()) / trials)
+            self.assertLess(abs(expected.mean() - actual.mean()), 4 * standard_error + 1e-9)
+
+    def test_many_competitors_use_kernel(self):
+        engine = CompetitorAIEngine(self.session)
+        self.assertFalse(engine._use_sales_kernel())
 
-# Create your tests here.
+        for index in range(CompetitorAIEngine.VECTORIZED_SALES_MIN_COMPETITORS):
+            AICompetitor.objects.create(session=self.session, name=f'Extra Rival {index}', strategy='balanced')
+        self.assertTrue(CompetitorAIEngine(self.session)._use_sales_kernel())
+        self.assertFalse(CompetitorAIEngine(self.session, vectorized=False)._use_sales_kernel())
@@ -6,7 +6,7 @@ from .models import (
     CashFlowStatement, BalanceSheet, LiquidityAnalysis, SalesReport
 )
 from bikeshop.models import GameSession
-from production.models import ProducedBike
+from production.inventory import BikeInventory
 from sales.models import SalesOrder
 from warehouse.models import ComponentStock
 from procurement.models import ProcurementOrder
@@ -393,7 +393,7 @@ class FinancialReportingEngine:
             session=self.session,
             sale_month=month,
             sale_year=year
-        )
+        ).select_related('bike__bike_type', 'market')
         
         # Overall Sales Performance
         sr.total_units_sold = sales_orders.count()  # Each order is one bike
@@ -789,14 +789,7 @@ class FinancialReportingEngine:
     
     def _calculate_finished_goods_inventory(self):
         """Calculate finished goods inventory value"""
-        total_value = Decimal('0')
-        bikes = ProducedBike.objects.filter(
-            session=self.session,
-            is_sold=False
-        )
-        for bike in bikes:
-            total_value += bike.production_cost
-        return total_value
+        return BikeInventory(self.session).statistics()['total_production_cost']
     
     def _calculate_prepaid_expenses(self):
         """Calculate prepaid expenses"""
@@ -0,0 +1,82 @@
+"""
+Monatliches Hauptbuch (Unit of Work) für Buchungen und Kontostand.
+
+During month processing every engine used to call Transaction.objects.create
+and session.save() for each payment, rewriting the session row dozens of times
+per turn. SessionLedger collects the ledger entries and balance changes in
+memory instead. ``flush`` writes them with one bulk insert and a single relative
+balance update (``balance + net change``), so payments booked elsewhere in the
+meantime, e.g. by a view, are not overwritten.
+
+``session.balance`` keeps the stored value until the flush, so a session.save()
+in between cannot write the change that the flush adds again. Checks against
+the balance including buffered payments read ``ledger.balance``. Outside the
+monthly simulation (views, scripts) engines use an unbuffered ledger that
+writes every entry right away, exactly like before.
+"""
+from decimal import Decimal
+
+from django.db.models import F
+
+from bikeshop.models import GameSession
+
+from .models import Transaction
+
+
+class SessionLedger:
+    """Sammelt Buchungen und Kontostandsänderungen einer Session"""
+
+    def __init__(self, session, buffered=True):
+        self.session = session
+        self.buffered = buffered
+        self.pending_transactions = []
+        # Net balance change of the buffered entries
+        self.balance_delta = Decimal('0')
+
+    def add_transaction(self, transaction_type, category, amount, description, month=None, year=None):
+        """Bucht eine Transaktion, ohne den Kontostand zu verändern"""
+        entry = Transaction(
+            session=self.session,
+            transaction_type=transaction_type,
+            category=category,
+            amount=amount,
+            description=description,
+            month=month or self.session.current_month,
+            year=year or self.session.current_year
+        )
+        if self.buffered:
+            self.pending_transactions.append(entry)
+        else:
+            entry.save()
+        return entry
+
+    @property
+    def balance(self):
+        """Kontostand inklusive der noch nicht geschriebenen Änderungen"""
+        return self.session.balance + self.balance_delta
+
+    def adjust_balance(self, amount):
+        """Verändert den Kontostand um ``amount`` (negativ für Ausgaben)"""
+        if self.buffered:
+            self.balance_delta += Decimal(amount)
+        else:
+            self.session.balance += amount
+            self.session.save()
+
+    def record(self, transaction_type, category, amount, description, month=None, year=None):
+        """Bucht eine Einnahme oder Ausgabe und passt den Kontostand an"""
+        self.adjust_balance(amount if transaction_type == 'income' else -amount)
+        return self.add_transaction(transaction_type, category, amount, description, month, year)
+
+    def flush(self):
+        """Schreibt alle gesammelten Buchungen und den Kontostand in die Datenbank"""
+        if self.pending_transactions:
+            Transaction.objects.bulk_create(self.pending_transactions)
+            self.pending_transactions = []
+
+        if self.balance_delta:
+            GameSession.objects.filter(pk=self.session.pk).update(
+                balance=F('balance') + self.balance_delta
+            )
+            self.balance_delta = Decimal('0')
+            self.session.refresh_from_db(fields=['balance'])
@@ -5,7 +5,7 @@ from django.db.models import Sum
 from .models import BankruptcyEvent
 from sales.models import SalesOrder
 from procurement.models import ProcurementOrder
-from production.models import ProducedBike
+from production.inventory import BikeInventory
 
 
 class BankruptcyChecker:
@@ -191,12 +191,7 @@ class BankruptcyChecker:
             })
         
         # High inventory with no sales
-        total_bikes = ProducedBike.objects.filter(session=self.session).count()
-        sold_bikes = SalesOrder.objects.filter(session=self.session).aggregate(
-            total=Sum('quantity')
-        )['total'] or 0
-        
-        unsold_bikes = total_bikes - sold_bikes
+        unsold_bikes = BikeInventory(self.session).statistics()['total_unsold']
         if unsold_bikes > 20:
             risk_factors.append({
                 'factor': 'excess_inventory',
@@ -272,7 +267,7 @@ class BankruptcyChecker:
         factors = []
         
         # Check production vs sales ratio
-        total_produced = ProducedBike.objects.filter(session=self.session).count()
+        total_produced = BikeInventory(self.session).produced_quantity()
         total_sold = SalesOrder.objects.filter(session=self.session).aggregate(
             total=Sum('quantity')
         )['total'] or 0
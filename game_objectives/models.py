@@ -138,7 +138,7 @@ class GameObjective(models.Model):
     def get_current_value(self, session):
         """Get the current value for this objective type"""
         from sales.models import SalesOrder
-        from production.models import ProducedBike
+        from production.inventory import BikeInventory
         from competitors.models import CompetitorSale
         from django.db.models import Sum, Avg, Count
         
@@ -166,7 +166,7 @@ class GameObjective(models.Model):
             return self.calculate_market_share(session)
         
         elif self.objective_type == 'bikes_produced':
-            produced = ProducedBike.objects.filter(session=session).count()
+            produced = BikeInventory(session).produced_quantity()
             return float(produced)
         
         elif self.objective_type == 'bikes_sold':
@@ -175,13 +175,14 @@ class GameObjective(models.Model):
         
         elif self.objective_type == 'quality_rating':
             # Since there's no quality score field, calculate based on price segment
-            total_bikes = ProducedBike.objects.filter(session=session).count()
+            inventory = BikeInventory(session)
+            total_bikes = inventory.produced_quantity()
             if total_bikes == 0:
                 return 0.0
             
-            premium_bikes = ProducedBike.objects.filter(session=session, price_segment='premium').count()
-            standard_bikes = ProducedBike.objects.filter(session=session, price_segment='standard').count()
-            cheap_bikes = ProducedBike.objects.filter(session=session, price_segment='cheap').count()
+            premium_bikes = inventory.produced_quantity(price_segment='premium')
+            standard_bikes = inventory.produced_quantity(price_segment='standard')
+            cheap_bikes = inventory.produced_quantity(price_segment='cheap')
             
             # Calculate weighted quality score (premium=10, standard=7, cheap=4)
             if total_bikes > 0:
@@ -260,10 +261,10 @@ class GameObjective(models.Model):
     
     def calculate_efficiency_score(self, session):
         """Calculate efficiency score based on profit per unit produced"""
-        from production.models import ProducedBike
+        from production.inventory import BikeInventory
         
         total_profit = self.calculate_total_profit(session)
-        bikes_produced = ProducedBike.objects.filter(session=session).count()
+        bikes_produced = BikeInventory(session).produced_quantity()
         
         if bikes_produced > 0:
             return total_profit / bikes_produced
@@ -289,14 +290,15 @@ class GameObjective(models.Model):
     
     def calculate_cost_per_unit(self, session):
         """Calculate average cost per bike produced"""
-        from production.models import ProducedBike, ProductionCost
+        from production.models import ProductionCost
+        from production.inventory import BikeInventory
         from django.db.models import Sum
         
         total_cost = ProductionCost.objects.filter(session=session).aggregate(
             total=Sum('total_cost')
         )['total'] or 0
         
-        bikes_produced = ProducedBike.objects.filter(session=session).count()
+        bikes_produced = BikeInventory(session).produced_quantity()
         
         if bikes_produced > 0:
             return float(total_cost) / bikes_produced
@@ -551,9 +553,9 @@ class GameResult(models.Model):
         self.total_profit = self.total_revenue - total_costs
         
         # Calculate bikes
-        from production.models import ProducedBike
+        from production.inventory import BikeInventory
         
-        self.bikes_produced = ProducedBike.objects.filter(session=session).count()
+        self.bikes_produced = BikeInventory(session).produced_quantity()
         self.bikes_sold = SalesOrder.objects.filter(session=session).count()
         
         # Calculate market share
@@ -49,7 +49,8 @@ class MultiplayerGameAdmin(admin.ModelAdmin):
             'fields': ('starting_balance', 'bankruptcy_threshold')
         }),
         ('Features', {
-            'fields': ('allow_bankruptcy', 'enable_real_time_updates', 'enable_player_chat', 'enable_market_intelligence')
+            'fields': ('allow_bankruptcy', 'enable_real_time_updates', 'enable_player_chat', 'enable_market_intelligence',
+                       'enable_performance_tracking')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at', 'started_at', 'ended_at'),
@@ -10,7 +10,9 @@ from django.utils import timezone
 
 from bikeshop.models import GameSession, BikeType, Component, BikePrice
 from sales.models import Market, MarketDemand, SalesOrder
-from production.models import ProductionPlan, ProductionOrder, ProducedBike
+from production.models import ProductionPlan, ProductionOrder, ProducedBikeLot
+from production.cost_model import get_production_cost_model
+from production.inventory import BikeInventory
 from procurement.models import ProcurementOrder, ProcurementOrderItem, Supplier
 from warehouse.models import ComponentStock, Warehouse
 from finance.models import Credit, Transaction, MonthlyReport
@@ -212,18 +214,11 @@ class MultiplayerIntegrationManager:
                             actual_production = int(segment_quantity * success_rate)
                             
                             if actual_production > 0:
-                                # Create produced bikes
-                                for _ in range(actual_production):
-                                    ProducedBike.objects.create(
-                                        session=game_session,
-                                        bike_type=bike_type,
-                                        price_segment=segment,
-                                        production_order=production_order,
-                                        production_cost=production_cost,
-                                        quality_level=self._determine_quality_level(ai_player),
-                                        month_produced=self.game.current_month,
-                                        year_produced=self.game.current_year
-                                    )
+                                # Book the produced bikes into the inventory lot
+                                BikeInventory(game_session).add(
+                                    bike_type, segment, actual_production, production_cost,
+                                    month=self.game.current_month, year=self.game.current_year
+                                )
                                 
                                 results['bikes_produced'] += actual_production
                 
@@ -341,11 +336,8 @@ class MultiplayerIntegrationManager:
             with transaction.atomic():
                 pricing_method = decisions.get('pricing_method', 'market_adaptive')
                 
-                # Get available bikes to sell
-                available_bikes = ProducedBike.objects.filter(
-                    session=game_session,
-                    is_sold=False
-                )
+                # Get available bikes to sell (inventory lots, oldest first)
+                inventory = BikeInventory(game_session)
                 
                 # Get markets
                 markets = Market.objects.filter(session=game_session)
@@ -355,43 +347,46 @@ class MultiplayerIntegrationManager:
                 orders_created = 0
                 
                 for market in markets:
-                    market_bikes = available_bikes.filter(
+                    market_lots = inventory.get_lots().filter(
                         bike_type__in=market.bike_types.all()
-                    )[:10]  # Limit per market
+                    ).select_related('bike_type')
                     
-                    for bike in market_bikes:
-                        # Calculate selling price
-                        selling_price = self._calculate_selling_price(
-                            bike, market, pricing_method, decisions
-                        )
-                        
-                        # Simulate sale success
-                        sale_probability = self._calculate_sale_probability(
-                            bike, market, selling_price, ai_player
-                        )
-                        
-                        if sale_probability > 0.5:  # 50% threshold for sale
-                            # Create sales order
-                            sales_order = SalesOrder.objects.create(
-                                session=game_session,
-                                market=market,
-                                bike_type=bike.bike_type,
-                                price_segment=bike.price_segment,
-                                quantity=1,
-                                selling_price=selling_price,
-                                month=self.game.current_month,
-                                year=self.game.current_year
+                    offered = 0
+                    for lot in market_lots:
+                        # Limit per market
+                        while lot.quantity > 0 and offered < 10:
+                            offered += 1
+                            
+                            # Calculate selling price
+                            selling_price = self._calculate_selling_price(
+                                lot, market, pricing_method, decisions
                             )
                             
-                            # Mark bike as sold
-                            bike.is_sold = True
-                            bike.selling_price = selling_price
-                            bike.sales_order = sales_order
-                            bike.save()
+                            # Simulate sale success
+                            sale_probability = self._calculate_sale_probability(
+                                lot, market, selling_price, ai_player
+                            )
                             
-                            total_revenue += selling_price
-                            bikes_sold += 1
-                            orders_created += 1
+                            if sale_probability > 0.5:  # 50% threshold for sale
+                                # Take the bike out of its lot
+                                bike = inventory.take(lot, 1)[0]
+                                
+                                # Create sales order
+                                SalesOrder.objects.create(
+                                    session=game_session,
+                                    market=market,
+                                    bike=bike,
+                                    bike_type=lot.bike_type,
+                                    price_segment=lot.price_segment,
+                                    quantity=1,
+                                    selling_price=selling_price,
+                                    month=self.game.current_month,
+                                    year=self.game.current_year
+                                )
+                                
+                                total_revenue += selling_price
+                                bikes_sold += 1
+                                orders_created += 1
                 
                 # Update AI player stats
                 ai_player.balance += total_revenue
@@ -536,11 +531,13 @@ class MultiplayerIntegrationManager:
         # Base component costs
         base_cost = Decimal('200')  # Simplified base cost
         
-        # Labor costs
-        labor_cost = Decimal(str(
-            bike_type.skilled_worker_hours * 15 + 
-            bike_type.unskilled_worker_hours * 10
-        ))
+        # Labor costs from the session's monthly cost model: the wages of the session's
+        # workers (15/10 per hour without workers) with the R&D cost reduction applied,
+        # like the player's production
+        cost_model = get_production_cost_model(session)
+        labor_cost = cost_model.labour_cost(
+            bike_type, default_skilled_wage=Decimal('15'), default_unskilled_wage=Decimal('10')
+        ) * cost_model.cost_factor
         
         # Segment adjustments
         segment_multipliers = {
@@ -646,7 +643,7 @@ class MultiplayerIntegrationManager:
         
         return base_cost
     
-    def _calculate_selling_price(self, bike: ProducedBike, market: Market,
+    def _calculate_selling_price(self, bike: ProducedBikeLot, market: Market,
                                pricing_method: str, decisions: Dict) -> Decimal:
         """Calculate selling price for bike"""
         base_price = bike.production_cost * Decimal('1.5')  # 50% markup base
@@ -674,7 +671,7 @@ class MultiplayerIntegrationManager:
         
         return final_price
     
-    def _calculate_sale_probability(self, bike: ProducedBike, market: Market,
+    def _calculate_sale_probability(self, bike: ProducedBikeLot, market: Market,
                                    price: Decimal, ai_player: PlayerSession) -> float:
         """Calculate probability of successful sale"""
         base_probability = 0.6
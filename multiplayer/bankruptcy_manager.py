@@ -6,7 +6,7 @@ import logging
 
 from .models import PlayerSession, MultiplayerGame, GameEvent, TurnState
 from finance.models import MonthlyReport, Transaction
-from production.models import ProducedBike
+from production.inventory import BikeInventory
 from sales.models import SalesOrder
 
 logger = logging.getLogger(__name__)
@@ -172,18 +172,13 @@ class BankruptcyManager:
         """Calculate and apply asset liquidation value."""
         # Get player's inventory value
         from warehouse.models import ComponentStock
-        from production.models import ProducedBike
         
         total_value = Decimal('0.00')
         
         # Liquidate finished bikes (at 60% of cost)
-        bikes = ProducedBike.objects.filter(
-            session_id=player.id,  # Assuming this maps to player session
-            sold=False
-        )
-        for bike in bikes:
-            liquidation_value = bike.total_cost * Decimal('0.6')
-            total_value += liquidation_value
+        inventory = BikeInventory(player.id)  # Assuming this maps to player session
+        finished_goods = inventory.statistics()['total_production_cost']
+        total_value += finished_goods * Decimal('0.6')
         
         # Liquidate component inventory (at 40% of cost)
         components = ComponentStock.objects.filter(
@@ -315,11 +310,10 @@ class BankruptcyManager:
     def _check_production_capacity(self, player):
         """Check if player has lost production capacity."""
         # Get recent production data
-        recent_production = ProducedBike.objects.filter(
-            session_id=player.id,
+        recent_production = BikeInventory(player.id).produced_quantity(
             production_month__gte=self.game.current_month - 3,
             production_year=self.game.current_year
-        ).count()
+        )
         
         # Compare with average competitor production
         active_competitors = self.game.players.filter(
@@ -0,0 +1,107 @@
+"""
+Materialisierte Effektivwerte der Spielparameter.
+
+SupplierPrice.price, BikePrice.price and BikeType.storage_space_per_unit used
+to apply their GameParameters multiplier on every read. The effective values are
+now written to real columns (``effective_price``,
+``effective_storage_space_per_unit``) with a few bulk UPDATEs per game:
+when a player's game state is initialized, when the game starts and whenever
+GameParameters are saved (edit_parameters, log_change, admin). Existing rows
+were filled by a data migration. A row without an effective value (created
+since, e.g. with bulk_create) reads its base value, which is exact for single
+player sessions; code creating rows for a multiplayer session materializes
+them afterwards.
+
+Warehouse capacity/rent and market transport costs are already stored with
+their multipliers applied when player state is created, so they are not
+handled here. The maintained Warehouse.used_space counter does depend on the
+bike storage space, so it is recalculated for the sessions' warehouses.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import models
+from django.db.models import Case, ExpressionWrapper, F, Value, When
+
+from .parameter_utils import _load_game_parameters_context
+
+PRICE_FIELD = models.DecimalField(max_digits=8, decimal_places=2)
+
+
+def _decimal(value):
+    return Decimal(str(value))
+
+
+def _multipliers(params):
+    """Multiplikatoren eines Spiels (1.0 ohne Spielparameter)"""
+    if params is None:
+        return {
+            'component_cost': Decimal('1'),
+            'bike_storage_space': 1.0,
+            'bike_price': {'cheap': Decimal('1'), 'standard': Decimal('1'), 'premium': Decimal('1')},
+        }
+    return {
+        'component_cost': _decimal(params.component_cost_multiplier),
+        'bike_storage_space': float(params.bike_storage_space_multiplier),
+        'bike_price': {
+            'cheap': _decimal(params.bike_price_cheap_multiplier),
+            'standard': _decimal(params.bike_price_standard_multiplier),
+            'premium': _decimal(params.bike_price_premium_multiplier),
+        },
+    }
+
+
+def materialize_effective_values(sessions):
+    """
+    Schreibt die effektiven Preise und Lagerflächen der Sessions neu.
+
+    Sessions of the same multiplayer game share one set of multipliers, so the
+    work is three UPDATE statements per game, regardless of the number of rows,
+    plus recalculating the usage of the sessions' warehouses.
+    """
+    from bikeshop.models import BikePrice, BikeType, SupplierPrice
+    from warehouse.models import Warehouse
+
+    session_ids_by_game = defaultdict(list)
+    for session in sessions:
+        session_ids_by_game[session.multiplayer_game_id].append(session.id)
+
+    for multiplayer_game_id, session_ids in session_ids_by_game.items():
+        params = _load_game_parameters_context(multiplayer_game_id) if multiplayer_game_id else None
+        multipliers = _multipliers(params)
+
+        SupplierPrice.objects.filter(session_id__in=session_ids).update(
+            effective_price=ExpressionWrapper(
+                F('base_price') * Value(multipliers['component_cost']), output_field=PRICE_FIELD
+            )
+        )
+        BikeType.objects.filter(session_id__in=session_ids).update(
+            effective_storage_space_per_unit=F('base_storage_space_per_unit') * Value(
+                multipliers['bike_storage_space']
+            )
+        )
+        BikePrice.objects.filter(session_id__in=session_ids).update(
+            effective_price=Case(
+                *[
+                    When(price_segment=segment, then=F('base_price') * Value(multiplier))
+                    for segment, multiplier in multipliers['bike_price'].items()
+                ],
+                default=F('base_price'),
+                output_field=PRICE_FIELD
+            )
+        )
+
+        # Stored bikes now take up a different amount of space
+        warehouses = list(Warehouse.objects.filter(session_id__in=session_ids))
+        for warehouse in warehouses:
+            warehouse.used_space = warehouse.calculate_usage()
+        Warehouse.objects.bulk_update(warehouses, ['used_space'])
+
+
+def materialize_effective_values_for_game(multiplayer_game):
+    """Effektivwerte aller Spieler-Sessions eines Multiplayer-Spiels neu berechnen"""
+    from bikeshop.models import GameSession
+
+    materialize_effective_values(
+        GameSession.objects.filter(multiplayer_game=multiplayer_game).only('id', 'multiplayer_game_id')
+    )
@@ -12,6 +12,7 @@ from django.db import transaction
 from decimal import Decimal
 from multiplayer.models import MultiplayerGame, PlayerSession
 from multiplayer.player_state_manager import PlayerStateManager
+from multiplayer.effective_values import materialize_effective_values
 from bikeshop.models import Supplier, SupplierPrice, Component
 
 
@@ -133,6 +134,9 @@ class Command(BaseCommand):
                                 )
                                 added += 1
 
+                    # New prices get the game's component cost multiplier
+                    materialize_effective_values([game_session])
+
                     self.stdout.write(
                         self.style.SUCCESS(
                             f"  ✓ {player.company_name}: Added {added} components to BikeComponents GmbH"
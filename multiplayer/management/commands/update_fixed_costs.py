@@ -98,7 +98,7 @@ class Command(BaseCommand):
                             )
                         else:
                             warehouse.rent_per_month = new_rent
-                            warehouse.save()
+                            warehouse.save(update_fields=['rent_per_month'])
                             self.stdout.write(
                                 self.style.SUCCESS(
                                     f"  ✓ Updated {warehouse.name}: {old_rent}€ → {new_rent}€"
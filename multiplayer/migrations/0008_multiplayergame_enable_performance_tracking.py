@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('multiplayer', '0007_add_turn_deadline_validator_and_help_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='multiplayergame',
+            name='enable_performance_tracking',
+            field=models.BooleanField(default=False, help_text='Record per-phase timings of every turn (see Turn performance records in the admin)'),
+        ),
+    ]
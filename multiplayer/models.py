@@ -74,6 +74,10 @@ class MultiplayerGame(models.Model):
     enable_real_time_updates = models.BooleanField(default=True)
     enable_player_chat = models.BooleanField(default=True)
     enable_market_intelligence = models.BooleanField(default=False)  # Show competitor info
+    enable_performance_tracking = models.BooleanField(
+        default=False,
+        help_text="Record per-phase timings of every turn (see Turn performance records in the admin)"
+    )
 
     # Admin-managed user assignment
     assigned_users = models.ManyToManyField(
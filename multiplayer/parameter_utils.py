@@ -9,40 +9,119 @@ from decimal import Decimal
 from typing import Optional
 import logging
 
+from django.core.cache import cache
+
 logger = logging.getLogger(__name__)
 
 
+PARAMETER_CONTEXT_ATTRIBUTE = '_game_parameter_context'
+PARAMETER_CONTEXT_TIMEOUT = 60 * 60 * 24
+
+# Not needed for any multiplier, can grow large
+_EXCLUDED_FIELDS = ('modification_history',)
+
+
+class GameParameterContext:
+    """
+    Read-only, resolved GameParameters values of a multiplayer game.
+
+    Exposes the same attributes as GameParameters (``params.worker_cost_multiplier``),
+    but assignments raise AttributeError.
+    """
+
+    def __init__(self, values):
+        object.__setattr__(self, '_values', dict(values))
+
+    @classmethod
+    def from_parameters(cls, parameters):
+        return cls({
+            field.attname: getattr(parameters, field.attname)
+            for field in parameters._meta.concrete_fields
+            if field.name not in _EXCLUDED_FIELDS
+        })
+
+    def __getattr__(self, name):
+        # Read __dict__ directly: __getattr__ also runs for a half-built instance (copy/pickle)
+        try:
+            return self.__dict__['_values'][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        raise AttributeError('GameParameterContext is read-only')
+
+    def __delattr__(self, name):
+        raise AttributeError('GameParameterContext is read-only')
+
+
+def _parameter_context_key(multiplayer_game_id, last_modified_at):
+    # Every save (also via log_change) moves last_modified_at, so other workers never read old values
+    return f'multiplayer:parameters:{multiplayer_game_id}:{last_modified_at.isoformat()}'
+
+
+def clear_game_parameters_context(session):
+    """Löst die Spielparameter der Session beim nächsten Zugriff neu auf (z.B. pro Runde)"""
+    session.__dict__.pop(PARAMETER_CONTEXT_ATTRIBUTE, None)
+
+
+def _load_game_parameters_context(multiplayer_game_id):
+    from multiplayer.models import GameParameters
+
+    # Version check: one small query instead of the full row (modification_history can be large)
+    last_modified_at = GameParameters.objects.filter(
+        multiplayer_game_id=multiplayer_game_id
+    ).values_list('last_modified_at', flat=True).first()
+    if last_modified_at is None:
+        logger.warning(f"No GameParameters found for game {multiplayer_game_id}")
+        return None
+
+    key = _parameter_context_key(multiplayer_game_id, last_modified_at)
+    values = cache.get(key)
+    if values is None:
+        parameters = GameParameters.objects.filter(multiplayer_game_id=multiplayer_game_id).defer(
+            *_EXCLUDED_FIELDS
+        ).first()
+        if parameters is None:
+            return None
+        values = GameParameterContext.from_parameters(parameters)._values
+        cache.set(key, values, PARAMETER_CONTEXT_TIMEOUT)
+    return GameParameterContext(values)
+
+
 def get_game_parameters(session):
     """
     Get GameParameters for a given GameSession.
 
-    Returns the GameParameters object if the session is part of a multiplayer game,
-    otherwise returns None (for singleplayer games).
+    Returns the resolved, read-only GameParameterContext if the session is part
+    of a multiplayer game, otherwise returns None (for singleplayer games).
+
+    The context is resolved once and attached to the session object, so the
+    multiplier helpers below cost no I/O for the rest of the request or turn.
+    Resolving costs one query for ``last_modified_at``, which is part of the
+    cache key, so a save of GameParameters (also via ``log_change``) in any
+    worker is seen by all of them.
 
     Args:
         session: GameSession object
 
     Returns:
-        GameParameters object or None
+        GameParameterContext or None
     """
     try:
-        from multiplayer.models import GameParameters
-
         # Handle None case
         if session is None:
             return None
 
         # Use direct link from GameSession to MultiplayerGame (Fix for Issue #1)
-        if not session.multiplayer_game:
+        if not session.multiplayer_game_id:
             # This is a singleplayer session
             return None
 
-        # Get GameParameters for this multiplayer game
-        try:
-            return GameParameters.objects.get(multiplayer_game=session.multiplayer_game)
-        except GameParameters.DoesNotExist:
-            logger.warning(f"No GameParameters found for game {session.multiplayer_game.name}")
-            return None
+        if PARAMETER_CONTEXT_ATTRIBUTE not in session.__dict__:
+            session.__dict__[PARAMETER_CONTEXT_ATTRIBUTE] = _load_game_parameters_context(
+                session.multiplayer_game_id
+            )
+        return session.__dict__[PARAMETER_CONTEXT_ATTRIBUTE]
 
     except Exception as e:
         logger.error(f"Error retrieving game parameters: {e}")
@@ -9,12 +9,14 @@ from decimal import Decimal
 from django.db import transaction
 import logging
 
+from bikeshop.cache_versions import batched_cache_bumps
 from bikeshop.models import (
     GameSession, Supplier, Component, ComponentType, SupplierPrice,
     BikeType, BikePrice, Worker, TransportCost
 )
 from warehouse.models import Warehouse, ComponentStock, WarehouseType
 from sales.models import Market, MarketDemand, MarketPriceSensitivity
+from sales.demand_calculator import DemandCalculator
 from .models import PlayerSession, MultiplayerGame
 
 logger = logging.getLogger(__name__)
@@ -26,6 +28,7 @@ class PlayerStateManager:
     def __init__(self, multiplayer_game):
         self.multiplayer_game = multiplayer_game
 
+    @batched_cache_bumps()
     @transaction.atomic
     def initialize_player_game_state(self, player_session):
         """
@@ -37,6 +40,7 @@ class PlayerStateManager:
 
         from multiplayer.parameter_utils import get_game_parameters_for_multiplayer_game
         from .balance_manager import BalanceManager
+        from .effective_values import materialize_effective_values
 
         # Apply starting balance multiplier and set on PlayerSession (source of truth)
         base_balance = self.multiplayer_game.starting_balance
@@ -75,6 +79,10 @@ class PlayerStateManager:
             # Sync balances using BalanceManager
             balance_mgr = BalanceManager(player_session, game_session)
             balance_mgr.sync_balances()
+            materialize_effective_values([game_session])
+            DemandCalculator(game_session).generate_monthly_demand(
+                game_session.current_month, game_session.current_year
+            )
 
             logger.info(f"Updated existing GameSession for {player_session.company_name}")
             return game_session
@@ -94,6 +102,11 @@ class PlayerStateManager:
             self._initialize_markets(game_session)
             self._initialize_starting_inventory(game_session)
 
+        # Store prices and storage space with the game's multipliers applied
+        materialize_effective_values([game_session])
+        # Demand of the first month, later months are drawn when the turn advances
+        DemandCalculator(game_session).generate_monthly_demand(game_session.current_month, game_session.current_year)
+
         logger.info(f"Game state initialized for {player_session.company_name}")
         return game_session
 
@@ -1,6 +1,6 @@
-from django.db.models.signals import pre_delete
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
-from .models import MultiplayerGame
+from .models import GameParameters, MultiplayerGame
 from bikeshop.models import GameSession
 
 
@@ -29,3 +29,12 @@ def cleanup_game_sessions_on_multiplayer_game_delete(sender, instance, **kwargs)
 
     # Delete the initially found sessions
     game_sessions.delete()
+
+
+@receiver(post_save, sender=GameParameters)
+@receiver(post_delete, sender=GameParameters)
+def materialize_effective_values_on_parameter_change(sender, instance, **kwargs):
+    """Parameter changes (also via log_change) update the materialized effective values"""
+    from .effective_values import materialize_effective_values_for_game
+    # Effective prices and storage space of all player sessions follow the new multipliers
+    materialize_effective_values_for_game(instance.multiplayer_game_id)
@@ -8,6 +8,10 @@ from .models import MultiplayerGame, PlayerSession, TurnState, GameEvent
 from .ai_manager import MultiplayerAIManager
 from .bankruptcy_manager import BankruptcyManager, BankruptcyPreventionSystem
 from simulation.engine import SimulationEngine
+from simulation.instrumentation import PhaseTimer, NullPhaseTimer
+from simulation.models import TurnPerformanceRecord
+from sales.offer_book import OfferBook
+from production.inventory import BikeInventory
 from bikeshop.models import GameSession
 from competitors.models import AICompetitor
 import json
@@ -112,37 +116,56 @@ class MultiplayerSimulationEngine:
     def process_multiplayer_turn(self):
         """Process a complete multiplayer turn including all player decisions and AI actions."""
         logger.info(f"Processing turn {self.game.current_year}/{self.game.current_month:02d} for game {self.game.name}")
+
+        # Optional per-phase timings (MultiplayerGame.enable_performance_tracking)
+        month, year = self.game.current_month, self.game.current_year
+        timer = PhaseTimer() if self.game.enable_performance_tracking else NullPhaseTimer()
         
         try:
             with transaction.atomic():
                 # 1. Check turn submission status
-                turn_status = self._check_turn_submission_status()
+                with timer.phase('submission_status'):
+                    turn_status = self._check_turn_submission_status()
                 
                 # 2. Auto-submit for timed-out players and AI players
-                self._handle_auto_submissions()
+                with timer.phase('auto_submissions'):
+                    self._handle_auto_submissions()
                 
                 # 3. Process AI decisions
-                self._process_ai_decisions()
+                with timer.phase('ai_decisions'):
+                    self._process_ai_decisions()
                 
                 # 4. Execute all player decisions simultaneously
-                self._execute_all_player_decisions()
+                with timer.phase('player_decisions'):
+                    self._execute_all_player_decisions()
                 
                 # 5. Process market competition and dynamics
-                self._process_market_competition()
+                with timer.phase('market_competition'):
+                    self._process_market_competition()
                 
                 # 6. Check bankruptcy conditions
-                bankruptcy_results = self._check_bankruptcy_conditions()
+                with timer.phase('bankruptcy'):
+                    bankruptcy_results = self._check_bankruptcy_conditions()
                 
                 # 7. Update game state and advance turn
-                self._advance_game_turn()
+                with timer.phase('advance_turn'):
+                    self._advance_game_turn()
                 
                 # 8. Generate turn summary and events
-                self._generate_turn_summary(bankruptcy_results)
+                with timer.phase('turn_summary'):
+                    self._generate_turn_summary(bankruptcy_results)
                 
                 # 9. Check game end conditions
-                self._check_game_end_conditions()
+                with timer.phase('game_end'):
+                    self._check_game_end_conditions()
                 
                 logger.info(f"Turn processing completed successfully for game {self.game.name}")
+
+                if self.game.enable_performance_tracking:
+                    # Written after the turn is committed, a failed turn stores no records
+                    transaction.on_commit(lambda: TurnPerformanceRecord.record(
+                        timer, 'multiplayer_turn', month, year, multiplayer_game=self.game
+                    ))
                 
                 return {
                     'success': True,
@@ -318,9 +341,7 @@ class MultiplayerSimulationEngine:
         This is adapted from MarketSimulator but handles multiple players with separate GameSessions.
         """
         from sales.models import Market, SalesOrder
-        from production.models import ProducedBike
         from finance.models import Transaction
-        import random
 
         logger.info(f"Processing multiplayer market segment: {market.name} - {bike_type.name} ({price_segment})")
 
@@ -329,52 +350,44 @@ class MultiplayerSimulationEngine:
         base_demand = self._calculate_market_demand(market, bike_type, price_segment, month, first_session)
         logger.info(f"Base demand: {base_demand} bikes")
 
-        # Collect all offers from all players
-        all_offers = []
+        # Collect all offers from all players in one offer book
+        book = OfferBook()
 
+        # Each player sells from the inventory lots of their own session (oldest bikes first)
+        reserved = {}
         for decision in player_decisions:
-            # Find available bikes from THIS player's session
-            available_bikes = ProducedBike.objects.filter(
-                session=decision.session,  # Use the decision's session, not a shared one
-                bike_type=bike_type,
-                price_segment=price_segment,
-                is_sold=False
-            )[:decision.quantity]
-
-            if len(available_bikes) < decision.quantity:
+            inventory = BikeInventory(decision.session)
+            allocation = inventory.allocate_fifo(
+                bike_type, price_segment, decision.quantity, reserved=reserved.setdefault(decision.session.id, {})
+            )
+            allocated = sum(quantity for _, quantity in allocation)
+
+            if allocated < decision.quantity:
                 logger.warning(
-                    f"Player {decision._player_session.company_name}: Requested {decision.quantity} bikes but only {len(available_bikes)} available"
+                    f"Player {decision._player_session.company_name}: Requested {decision.quantity} bikes but only {allocated} available"
                 )
 
-            # Create offers for each bike
-            for bike in available_bikes:
+            # One offer per inventory lot (age cohort)
+            quality_factor = self._get_quality_factor_for_segment(price_segment)
+            for lot, quantity in allocation:
                 # Apply aging penalty to effective price
-                age_penalty = bike.get_age_penalty_factor() if hasattr(bike, 'get_age_penalty_factor') else 1.0
-                effective_price = decision.desired_price * Decimal(str(age_penalty))
+                effective_price = decision.desired_price * Decimal(str(lot.get_age_penalty_factor()))
 
-                all_offers.append({
+                book.add({
                     'type': 'player',
                     'decision': decision,
-                    'bike': bike,
+                    'lot': lot,
                     'price': effective_price,
                     'transport_cost': decision.transport_cost,
-                    'quality_factor': self._get_quality_factor_for_segment(price_segment),
+                    'quality_factor': quality_factor,
                     'player_session': decision._player_session,
-                })
+                }, decision._player_session.id, effective_price, quality_factor, quantity)
 
-        logger.info(f"Total offers: {len(all_offers)} from {len(player_decisions)} players")
-
-        # Sort offers by effective price (lower prices sell first)
-        # Add small random factor for realism (10% variance)
-        for offer in all_offers:
-            random_factor = random.uniform(0.95, 1.05)
-            offer['sort_price'] = float(offer['price']) * random_factor / offer['quality_factor']
-
-        all_offers.sort(key=lambda x: x['sort_price'])
+        logger.info(f"Total offers: {len(book)} for {book.total_quantity} bikes from {len(player_decisions)} players")
 
         # Apply price elasticity - higher average prices reduce demand
-        if all_offers:
-            avg_price = sum(float(offer['price']) for offer in all_offers) / len(all_offers)
+        if book.total_quantity:
+            avg_price = book.average_price()
             base_price = self._get_base_price_for_segment(price_segment)
             price_ratio = avg_price / base_price if base_price > 0 else 1.0
             elasticity_adjustment = 1.0 - (price_ratio - 1.0) * 0.3  # Simple elasticity
@@ -384,20 +397,20 @@ class MultiplayerSimulationEngine:
         else:
             adjusted_demand = base_demand
 
-        # Allocate sales based on demand
-        bikes_to_sell = min(len(all_offers), adjusted_demand)
-        logger.info(f"Allocating {bikes_to_sell} sales out of {len(all_offers)} offers (demand: {adjusted_demand})")
+        # Rank offers by effective price (lower prices sell first, 10% random jitter)
+        # and allocate the demand to the top offers
+        clearing = book.allocate(adjusted_demand)
+        logger.info(f"Allocating {clearing.units_sold} sales out of {book.total_quantity} bikes (demand: {adjusted_demand})")
 
-        # Execute sales for the top offers
-        for i, offer in enumerate(all_offers[:bikes_to_sell]):
-            self._execute_multiplayer_player_sale(offer, month, year)
+        player_sales = []
+        for offer, sold, unsold in clearing.ranked():
+            if sold:
+                player_sales.append((offer, sold))
+            if unsold:
+                decision = offer['decision']
+                decision._temp_unsold_count = getattr(decision, '_temp_unsold_count', 0) + unsold
 
-        # Mark remaining offers as unsold
-        for offer in all_offers[bikes_to_sell:]:
-            decision = offer['decision']
-            if not hasattr(decision, '_temp_unsold_count'):
-                decision._temp_unsold_count = 0
-            decision._temp_unsold_count += 1
+        self._execute_multiplayer_player_sales(bike_type, player_sales, month, year)
 
         # Update all player decisions with results
         for decision in player_decisions:
@@ -419,63 +432,79 @@ class MultiplayerSimulationEngine:
                 f"Player {decision._player_session.company_name}: {sold_count}/{decision.quantity} sold, revenue: {total_revenue}€"
             )
 
-    def _execute_multiplayer_player_sale(self, offer, month, year):
-        """Execute a sale for a player in multiplayer context."""
-        from sales.models import SalesOrder
+    def _execute_multiplayer_player_sales(self, bike_type, sales, month, year):
+        """
+        Execute the allocated sales of a segment, settled per player.
+
+        ``sales`` holds (offer, quantity sold). Each player's bikes are taken
+        from their inventory lots together and their SalesOrders bulk inserted;
+        the revenue is booked as one Transaction and one balance adjustment per
+        player.
+        """
         from finance.models import Transaction
+        from multiplayer.balance_manager import BalanceManager
+        from sales.settlement import SaleSettlement
 
-        decision = offer['decision']
-        bike = offer['bike']
-        sale_price = offer['price']
-        transport_cost = offer['transport_cost']
-        player_session = offer['player_session']
-
-        # Mark bike as sold
-        bike.is_sold = True
-        bike.selling_price = sale_price
-        bike.save()
-
-        # Create sales order
-        sales_order = SalesOrder.objects.create(
-            session=decision.session,
-            market=decision.market,
-            bike=bike,
-            sale_price=sale_price,
-            transport_cost=transport_cost,
-            sale_month=month,
-            sale_year=year
-        )
+        sales_by_session = {}
+        for offer, sold in sales:
+            sales_by_session.setdefault(offer['decision'].session.id, []).append((offer, sold))
 
-        # Calculate net revenue (after transport cost)
-        # Transport cost is per shipment, not per bike, but we divide it across bikes
-        net_revenue = sale_price - (transport_cost / Decimal(str(decision.quantity)))
+        settlements = []
+        for session_sales in sales_by_session.values():
+            first_offer = session_sales[0][0]
+            # Multiplayer SalesOrders stay not completed, as before the bulk settlement
+            settlement = SaleSettlement(first_offer['decision'].session, month, year, is_completed=False)
+            settlements.append((first_offer['player_session'], settlement))
 
-        # Update decision statistics
-        if not hasattr(decision, '_temp_sold_count'):
-            decision._temp_sold_count = 0
-        if not hasattr(decision, '_temp_total_revenue'):
-            decision._temp_total_revenue = Decimal('0')
+            taken = BikeInventory(settlement.session).take_many(
+                [(offer['lot'], sold) for offer, sold in session_sales]
+            )
+            for (offer, sold), bikes in zip(session_sales, taken):
+                decision = offer['decision']
+                if len(bikes) < sold:
+                    decision._temp_unsold_count = getattr(decision, '_temp_unsold_count', 0) + sold - len(bikes)
 
-        decision._temp_sold_count += 1
-        decision._temp_total_revenue += net_revenue
+                # Transport cost is per shipment, not per bike, but we divide it across bikes
+                net_revenue = offer['price'] - (offer['transport_cost'] / Decimal(str(decision.quantity)))
 
-        # Update player balance using BalanceManager
-        from multiplayer.balance_manager import BalanceManager
-        game_session = decision.session
-        balance_mgr = BalanceManager(player_session, game_session)
-        balance_mgr.add_to_balance(net_revenue, reason=f"bike_sale_{bike.id}")
-
-        # Create transaction record
-        Transaction.objects.create(
-            session=game_session,
-            transaction_type='sale',
-            amount=net_revenue,
-            description=f'Verkauf: {bike.bike_type.name} ({bike.get_price_segment_display()})',
-            month=month,
-            year=year
-        )
+                for bike in bikes:
+                    settlement.add(
+                        decision.market, bike, offer['price'], offer['transport_cost'], net_revenue=net_revenue
+                    )
+
+                # Update decision statistics
+                decision._temp_sold_count = getattr(decision, '_temp_sold_count', 0) + len(bikes)
+                decision._temp_total_revenue = (
+                    getattr(decision, '_temp_total_revenue', Decimal('0')) + net_revenue * len(bikes)
+                )
 
-        logger.info(f"Sale executed: {bike.bike_type.name} for {sale_price}€ (net: {net_revenue}€)")
+        for player_session, settlement in settlements:
+            if not settlement:
+                continue
+
+            # Bikes were marked sold by take_many
+            revenue = settlement.settle(mark_sold=False)
+            game_session = settlement.session
+            segment_display = settlement.orders[0].bike.get_price_segment_display()
+
+            # Update player balance using BalanceManager
+            balance_mgr = BalanceManager(player_session, game_session)
+            balance_mgr.add_to_balance(revenue, reason=f"bike_sales_{bike_type.id}_{len(settlement)}")
+
+            # Create transaction record
+            Transaction.objects.create(
+                session=game_session,
+                transaction_type='sale',
+                amount=revenue,
+                description=f'Verkauf: {len(settlement)}x {bike_type.name} ({segment_display})',
+                month=month,
+                year=year
+            )
+
+            logger.info(
+                f"Sales executed for {player_session.company_name}: {len(settlement)}x {bike_type.name} "
+                f"(net: {revenue}€)"
+            )
 
     def _calculate_market_demand(self, market, bike_type, price_segment, month, session):
         """Calculate market demand for a specific bike type/segment."""
@@ -536,7 +565,6 @@ class MultiplayerSimulationEngine:
         try:
             from sales.market_simulator import MarketSimulator
             from sales.models import Market, SalesDecision
-            from production.models import ProducedBike
             from finance.models import Transaction
             from bikeshop.models import BikeType
             from decimal import Decimal
@@ -781,6 +809,7 @@ class MultiplayerSimulationEngine:
 
         # Reset worker hours for all players for the new month
         self._reset_all_player_worker_hours()
+        self._generate_player_demand()
 
         # Create turn advancement event
         GameEvent.objects.create(
@@ -794,6 +823,19 @@ class MultiplayerSimulationEngine:
             }
         )
 
+    def _generate_player_demand(self):
+        """Draw the new month's demand for all active players (readers never write it)."""
+        from sales.demand_calculator import DemandCalculator
+
+        for player in self.game.players.filter(is_active=True, is_bankrupt=False):
+            try:
+                game_session = self._get_or_create_game_session(player)
+                DemandCalculator(game_session).generate_monthly_demand(
+                    self.game.current_month, self.game.current_year
+                )
+            except Exception as e:
+                logger.error(f"Error generating demand for player {player.company_name}: {e}")
+
     def _reset_all_player_worker_hours(self):
         """Reset worker hours for all active players for the new month."""
         from bikeshop.models import Worker
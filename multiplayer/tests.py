@@ -521,4 +521,182 @@ class MultiplayerViewPermissionsTestCase(TestCase):
             multiplayer_game=self.game,
             user=self.user1
         )
-        self.assertEqual(sessions.count(), 1)
\ No newline at end of file
+        self.assertEqual(sessions.count(), 1)
+
+
+class GameParameterContextTestCase(TestCase):
+    """Aufgelöste Spielparameter werden pro Session/Runde nur einmal geladen"""
+
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from .models import GameParameters
+
+        self.user = get_user_model().objects.create_user(username='paramuser', password='testpass123')
+        self.game = MultiplayerGame.objects.create(
+            name='Parameter Game', created_by=self.user, max_players=2,
+            human_players_count=1, ai_players_count=1, starting_balance=80000
+        )
+        self.parameters = GameParameters.objects.create(
+            multiplayer_game=self.game, component_cost_multiplier=2.0
+        )
+        self.session = GameSession.objects.create(
+            user=self.user, name='Parameter Session', multiplayer_game=self.game
+        )
+
+    def test_parameters_resolved_once_per_session(self):
+        from .parameter_utils import apply_component_cost_multiplier, get_game_parameters
+
+        self.assertEqual(apply_component_cost_multiplier(Decimal('10.00'), self.session), Decimal('20.00'))
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                apply_component_cost_multiplier(Decimal('10.00'), self.session)
+
+        # Another instance of the session reuses the shared resolved values after the version check
+        other = GameSession.objects.get(id=self.session.id)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_game_parameters(other).component_cost_multiplier, 2.0)
+
+        with self.assertRaises(AttributeError):
+            get_game_parameters(other).component_cost_multiplier = 5.0
+
+    def test_save_and_log_change_invalidate(self):
+        from .parameter_utils import clear_game_parameters_context, get_game_parameters
+
+        self.assertEqual(get_game_parameters(self.session).component_cost_multiplier, 2.0)
+
+        self.parameters.component_cost_multiplier = 3.0
+        self.parameters.save()
+        clear_game_parameters_context(self.session)
+        self.assertEqual(get_game_parameters(self.session).component_cost_multiplier, 3.0)
+
+        self.parameters.component_cost_multiplier = 4.0
+        self.parameters.log_change(self.user, 'component_cost_multiplier', 3.0, 4.0)
+        self.assertEqual(
+            get_game_parameters(GameSession.objects.get(id=self.session.id)).component_cost_multiplier, 4.0
+        )
+
+    def test_change_in_other_worker_is_seen(self):
+        from django.utils import timezone
+        from .models import GameParameters
+        from .parameter_utils import get_game_parameters
+
+        self.assertEqual(get_game_parameters(self.session).component_cost_multiplier, 2.0)
+        # Saved by another process: no signal reaches this one's cache
+        GameParameters.objects.filter(pk=self.parameters.pk).update(
+            component_cost_multiplier=3.0, last_modified_at=timezone.now()
+        )
+
+        self.assertEqual(
+            get_game_parameters(GameSession.objects.get(id=self.session.id)).component_cost_multiplier, 3.0
+        )
+
+    def test_singleplayer_session_has_no_parameters(self):
+        from .parameter_utils import get_game_parameters
+
+        session = GameSession.objects.create(user=self.user, name='Single Player')
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_game_parameters(session))
+
+
+class EffectiveValuesTestCase(TestCase):
+    """Effektive Preise und Lagerflächen werden bei Parameteränderungen materialisiert"""
+
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from bikeshop.models import BikePrice, BikeType, Component, ComponentType, Supplier, SupplierPrice
+        from .models import GameParameters
+
+        self.user = get_user_model().objects.create_user(username='effectiveuser', password='testpass123')
+        self.game = MultiplayerGame.objects.create(
+            name='Effective Game', created_by=self.user, max_players=2,
+            human_players_count=1, ai_players_count=1, starting_balance=80000
+        )
+        self.session = GameSession.objects.create(
+            user=self.user, name='Effective Session', multiplayer_game=self.game
+        )
+        supplier = Supplier.objects.create(
+            session=self.session, name='Supplier', quality='basic', complaint_probability=0, complaint_quantity=0
+        )
+        component_type = ComponentType.objects.create(session=self.session, name='Rahmen', storage_space_per_unit=1.0)
+        component = Component.objects.create(session=self.session, component_type=component_type, name='Frame')
+        self.supplier_price = SupplierPrice.objects.create(
+            session=self.session, supplier=supplier, component=component, base_price=Decimal('10.00')
+        )
+        self.bike_type = BikeType.objects.create(
+            session=self.session, name='City Bike', base_storage_space_per_unit=2.0
+        )
+        for segment, price in (('cheap', '100.00'), ('premium', '300.00')):
+            BikePrice.objects.create(
+                session=self.session, bike_type=self.bike_type, price_segment=segment, base_price=Decimal(price)
+            )
+
+        # Saving the parameters materializes the effective values of all player sessions
+        self.parameters = GameParameters.objects.create(
+            multiplayer_game=self.game, component_cost_multiplier=1.5, bike_storage_space_multiplier=2.0,
+            bike_price_cheap_multiplier=0.5, bike_price_premium_multiplier=2.0
+        )
+
+    def test_effective_values_read_without_queries(self):
+        from bikeshop.models import BikePrice, BikeType, SupplierPrice
+
+        supplier_price = SupplierPrice.objects.get(id=self.supplier_price.id)
+        bike_type = BikeType.objects.get(id=self.bike_type.id)
+        prices = list(BikePrice.objects.filter(session=self.session).order_by('-effective_price'))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(supplier_price.price, Decimal('15.00'))
+            self.assertEqual(bike_type.storage_space_per_unit, 4.0)
+            self.assertEqual([price.price for price in prices], [Decimal('600.00'), Decimal('50.00')])
+
+    def test_parameter_change_recomputes_effective_values(self):
+        from bikeshop.models import SupplierPrice
+
+        self.parameters.component_cost_multiplier = 2.0
+        self.parameters.save()
+
+        self.assertEqual(SupplierPrice.objects.get(id=self.supplier_price.id).effective_price, Decimal('20.00'))
+
+    def test_storage_multiplier_change_recalculates_warehouse_usage(self):
+        from production.models import ProducedBike
+        from bikeshop.models import BikeType
+        from warehouse.models import BikeStock, Warehouse
+
+        bike_type = BikeType.objects.get(id=self.bike_type.id)
+        warehouse = Warehouse.objects.create(
+            session=self.session, name='Lager', location='Home', capacity_m2=100.0, rent_per_month=Decimal('100.00')
+        )
+        for _ in range(3):
+            bike = ProducedBike.objects.create(
+                session=self.session, bike_type=bike_type, price_segment='cheap',
+                production_month=1, production_year=2024
+            )
+            BikeStock.objects.create(session=self.session, warehouse=warehouse, bike=bike)
+        warehouse.refresh_from_db()
+        self.assertEqual(warehouse.used_space, 12.0)
+
+        self.parameters.bike_storage_space_multiplier = 3.0
+        self.parameters.save()
+
+        warehouse.refresh_from_db()
+        self.assertEqual(warehouse.used_space, 18.0)
+
+    def test_rows_without_effective_value_fall_back_to_base(self):
+        from bikeshop.models import BikePrice, BikeType
+        from .effective_values import materialize_effective_values
+
+        single_player = GameSession.objects.create(user=self.user, name='Single Player')
+        BikeType.objects.bulk_create([
+            BikeType(session=single_player, name='City Bike', base_storage_space_per_unit=2.0)
+        ])
+        bike_type = BikeType.objects.get(session=single_player)
+        BikePrice.objects.create(
+            session=single_player, bike_type=bike_type, price_segment='premium', base_price=Decimal('300.00')
+        )
+        self.assertEqual(bike_type.storage_space_per_unit, 2.0)
+        self.assertEqual(BikePrice.objects.get(session=single_player).price, Decimal('300.00'))
+
+        # Rows created for a multiplayer session get their multiplier with the next materialization
+        bike_type = BikeType.objects.create(session=self.session, name='E-Bike', base_storage_space_per_unit=1.5)
+        self.assertEqual(bike_type.storage_space_per_unit, 1.5)
+        materialize_effective_values([self.session])
+        self.assertEqual(BikeType.objects.get(id=bike_type.id).storage_space_per_unit, 3.0)
@@ -21,6 +21,7 @@ from .simulation_engine import MultiplayerSimulationEngine, MultiplayerTurnManag
 from .bankruptcy_manager import BankruptcyPreventionSystem
 from .ai_manager import MultiplayerAIManager
 from .player_state_manager import PlayerStateManager
+from .effective_values import materialize_effective_values_for_game
 from django.contrib.auth.models import User
 from functools import wraps
 
@@ -448,6 +449,9 @@ def start_game(request, game_id):
             game.status = 'active'
             game.started_at = timezone.now()
             game.save()
+
+            # Effective prices and storage space of all player sessions
+            materialize_effective_values_for_game(game)
             
             # Create game start event
             GameEvent.objects.create(
@@ -517,9 +521,8 @@ def submit_decisions(request, game_id):
     )
 
     # Get game data for display
-    from simulation.engine import SimulationEngine
-    sim_engine = SimulationEngine(game_session)
-    dashboard_data = sim_engine.get_dashboard_data()
+    from simulation.dashboard import get_dashboard_snapshot
+    dashboard_data = get_dashboard_snapshot(game_session)
 
     if request.method == 'POST':
         if request.POST.get('action') == 'submit_turn':
@@ -778,59 +781,19 @@ def multiplayer_procurement(request, game_id):
     game_session = state_manager.get_player_game_session(player_session)
 
     # Import models needed for procurement
-    from bikeshop.models import Supplier, SupplierPrice, BikeType, Component, ComponentType
-    from procurement.models import ProcurementOrder, ProcurementOrderItem
-    from warehouse.models import Warehouse, ComponentStock
+    from bikeshop.models import Supplier, SupplierPrice, BikeType
+    from bikeshop.compatibility import get_compatibility_index
+    from warehouse.allocation import place_procurement_order
 
     suppliers = Supplier.objects.filter(session=game_session)
     bike_types = BikeType.objects.filter(session=game_session)
 
     # Create bike type component mapping using new flexible system
-    bike_component_mapping = {}
-    for bike_type in bike_types:
-        compatible_component_ids = []
-
-        requirements = bike_type.get_required_components()
-
-        if not requirements:
-            # Fallback: use legacy system if available
-            legacy_components = []
-            if bike_type.wheel_set:
-                legacy_components.append(bike_type.wheel_set.id)
-            if bike_type.frame:
-                legacy_components.append(bike_type.frame.id)
-            if bike_type.handlebar:
-                legacy_components.append(bike_type.handlebar.id)
-            if bike_type.saddle:
-                legacy_components.append(bike_type.saddle.id)
-            if bike_type.gearshift:
-                legacy_components.append(bike_type.gearshift.id)
-            if bike_type.motor:
-                legacy_components.append(bike_type.motor.id)
-
-            if legacy_components:
-                compatible_component_ids = legacy_components
-            else:
-                # Ultimate fallback: include all components
-                all_components = Component.objects.filter(session=game_session)
-                compatible_component_ids = [c.id for c in all_components]
-        else:
-            # Use the new requirements system
-            for component_type_name, compatible_names in requirements.items():
-                component_type = ComponentType.objects.filter(
-                    session=game_session,
-                    name=component_type_name
-                ).first()
-
-                if component_type:
-                    compatible_components = Component.objects.filter(
-                        session=game_session,
-                        component_type=component_type,
-                        name__in=compatible_names
-                    )
-                    compatible_component_ids.extend([c.id for c in compatible_components])
-
-        bike_component_mapping[bike_type.id] = compatible_component_ids
+    compatibility_index = get_compatibility_index(game_session)
+    bike_component_mapping = {
+        bike_type.id: compatibility_index.get_compatible_component_ids(bike_type)
+        for bike_type in bike_types
+    }
 
     # Get supplier data
     supplier_data = {}
@@ -872,126 +835,9 @@ def multiplayer_procurement(request, game_id):
         try:
             with transaction.atomic():
                 order_data = json.loads(request.body)
-                total_cost = Decimal('0')
-
-                # Get all warehouses for this session
-                warehouses = Warehouse.objects.filter(session=game_session)
-
-                # Create warehouse if none exist
-                # Increased default warehouse size from 200m² to 500m² for better gameplay
-                if not warehouses.exists():
-                    warehouse = Warehouse.objects.create(
-                        session=game_session,
-                        name='Hauptlager',
-                        location='Standort 1',
-                        capacity_m2=500.0,
-                        rent_per_month=Decimal('2400.00')
-                    )
-                    warehouses = [warehouse]
-
-                # Calculate total remaining capacity across all warehouses
-                total_remaining_capacity = sum(w.remaining_capacity for w in warehouses)
-                total_current_usage = sum(w.current_usage for w in warehouses)
-                total_capacity = sum(w.capacity_m2 for w in warehouses)
-
-                # First pass: Check warehouse capacity for all items
-                total_required_space = 0
-                for supplier_id, items in order_data.items():
-                    if not items:
-                        continue
-
-                    for item in items:
-                        component_id = item['component_id']
-                        quantity = int(item['quantity'])
-
-                        if quantity <= 0:
-                            continue
-
-                        price_obj = SupplierPrice.objects.filter(
-                            session=game_session,
-                            supplier_id=supplier_id,
-                            component_id=component_id
-                        ).first()
-
-                        if price_obj:
-                            required_space = warehouses[0].get_required_space_for_components(price_obj.component, quantity)
-                            total_required_space += required_space
-
-                # Check if total order would exceed total warehouse capacity
-                if total_required_space > total_remaining_capacity:
-                    current_percentage = (total_current_usage / total_capacity * 100) if total_capacity > 0 else 100
-                    new_usage = total_current_usage + total_required_space
-                    new_percentage = (new_usage / total_capacity) * 100 if total_capacity > 0 else 100
-
-                    return JsonResponse({
-                        'success': False,
-                        'error': f'Lagerkapazität überschritten! Diese Bestellung würde {total_required_space:.1f}m² benötigen, aber nur {total_remaining_capacity:.1f}m² sind in allen Lagern verfügbar. Aktuelle Auslastung: {current_percentage:.1f}%, nach Bestellung: {new_percentage:.1f}%. Bitte kaufen Sie zusätzliche Lagerkapazität oder reduzieren Sie die Bestellmenge.'
-                    })
-
-                # Second pass: Create orders (capacity check passed)
-                for supplier_id, items in order_data.items():
-                    if not items:
-                        continue
-
-                    supplier = get_object_or_404(Supplier, id=supplier_id, session=game_session)
-                    order = ProcurementOrder.objects.create(
-                        session=game_session,
-                        supplier=supplier,
-                        month=game_session.current_month,
-                        year=game_session.current_year
-                    )
-
-                    order_total = Decimal('0')
-                    for item in items:
-                        component_id = item['component_id']
-                        quantity = int(item['quantity'])
-
-                        if quantity <= 0:
-                            return JsonResponse({'success': False, 'error': 'Quantity must be greater than 0'})
-
-                        price_obj = get_object_or_404(SupplierPrice,
-                                                      session=game_session,
-                                                      supplier=supplier,
-                                                      component_id=component_id
-                                                      )
-
-                        ProcurementOrderItem.objects.create(
-                            order=order,
-                            component=price_obj.component,
-                            quantity_ordered=quantity,
-                            quantity_delivered=quantity,
-                            unit_price=price_obj.price
-                        )
-
-                        # Find a warehouse with available capacity
-                        required_space = warehouses[0].get_required_space_for_components(price_obj.component, quantity)
-                        target_warehouse = None
-
-                        for wh in warehouses:
-                            if wh.remaining_capacity >= required_space:
-                                target_warehouse = wh
-                                break
-
-                        # If no single warehouse has enough space, use the one with most space
-                        if not target_warehouse:
-                            target_warehouse = max(warehouses, key=lambda w: w.remaining_capacity)
-
-                        # Add to warehouse inventory (track supplier for quality!)
-                        component_stock, created = ComponentStock.objects.get_or_create(
-                            session=game_session,
-                            warehouse=target_warehouse,
-                            component=price_obj.component,
-                            supplier=supplier,  # Track which supplier this came from
-                            defaults={'quantity': 0}
-                        )
-                        component_stock.quantity += quantity
-                        component_stock.save()
-
-                        order_total += price_obj.price * quantity
-
-                    order.total_cost = order_total
-                    order.save()
-                    total_cost += order_total
+                total_cost, error = place_procurement_order(game_session, order_data)
+                if error:
+                    return JsonResponse({'success': False, 'error': error})
 
                 # Reduce balance using BalanceManager
                 from .balance_manager import BalanceManager
@@ -1071,8 +917,10 @@ def multiplayer_production(request, game_id):
 
     # Import models needed for production
     from bikeshop.models import BikeType, Worker
-    from production.models import ProductionPlan, ProductionOrder, ProducedBike
+    from production.models import ProductionPlan, ProductionOrder
+    from production.inventory import BikeInventory
     from warehouse.models import Warehouse, ComponentStock, BikeStock
+    from bikeshop.compatibility import get_compatibility_index
 
     bike_types = BikeType.objects.filter(session=game_session)
     workers = Worker.objects.filter(session=game_session)
@@ -1082,6 +930,7 @@ def multiplayer_production(request, game_id):
         try:
             with transaction.atomic():
                 production_data = json.loads(request.body)
+                compatibility_index = get_compatibility_index(game_session)
 
                 plan, created = ProductionPlan.objects.get_or_create(
                     session=game_session,
@@ -1114,7 +963,7 @@ def multiplayer_production(request, game_id):
                             total_bikes_produced += quantity
 
                             # Use the new flexible component matching system
-                            component_match_result = bike_type.find_best_components_for_segment(game_session, segment)
+                            component_match_result = bike_type.find_best_components_for_segment(game_session, segment, compatibility_index)
 
                             # Check if any components are missing
                             if component_match_result['missing']:
@@ -1243,15 +1092,9 @@ def multiplayer_production(request, game_id):
                                 quantity_planned=quantity
                             )
 
-                            # Produce individual bikes and add to warehouse
-                            for _ in range(quantity):
-                                produced_bike = ProducedBike.objects.create(
-                                    session=game_session,
-                                    bike_type=bike_type,
-                                    price_segment=segment,
-                                    production_month=game_session.current_month,
-                                    production_year=game_session.current_year
-                                )
+                            # Produce individual bikes (one row each for the BikeStock) and add to warehouse
+                            produced_bikes = BikeInventory(game_session).add_bikes(bike_type, segment, quantity)
+                            for produced_bike in produced_bikes:
 
                                 # Find a warehouse with available capacity for this bike
                                 bike_space_needed = bike_type.storage_space_per_unit
@@ -1447,8 +1290,9 @@ def multiplayer_sales(request, game_id):
     from bikeshop.models import BikePrice, BikeType
     from sales.models import Market, MarketDemand, SalesOrder
     from production.models import ProducedBike
+    from production.inventory import BikeInventory
     from finance.models import Transaction
-    from django.db.models import Count, Avg, Min, Sum
+    from django.db.models import Count, Min, Sum
     from collections import defaultdict
 
     markets = Market.objects.filter(session=game_session)
@@ -1494,17 +1338,8 @@ def multiplayer_sales(request, game_id):
         return (round(min_price, 2), round(max_price, 2))
 
     # Group available bikes by bike_type and price_segment
-    bike_groups = ProducedBike.objects.filter(
-        session=game_session,
-        is_sold=False
-    ).values(
-        'bike_type__id',
-        'bike_type__name',
-        'price_segment'
-    ).annotate(
-        count=Count('id'),
-        avg_production_cost=Avg('production_cost')
-    ).order_by('bike_type__name', 'price_segment')
+    bike_inventory = BikeInventory(game_session)
+    bike_groups = bike_inventory.available_groups()
 
     # Add price range information to each group
     for group in bike_groups:
@@ -1559,12 +1394,7 @@ def multiplayer_sales(request, game_id):
                             })
 
                         # Check bike availability
-                        available_bikes = ProducedBike.objects.filter(
-                            session=game_session,
-                            bike_type_id=bike_type_id,
-                            price_segment=price_segment,
-                            is_sold=False
-                        ).count()
+                        available_bikes = bike_inventory.available_quantity(bike_type, price_segment)
 
                         if available_bikes < quantity:
                             return JsonResponse({
@@ -1626,7 +1456,7 @@ def multiplayer_sales(request, game_id):
             return JsonResponse({'success': False, 'error': str(e)})
 
     # Calculate total available bikes count
-    total_bikes_count = ProducedBike.objects.filter(session=game_session, is_sold=False).count()
+    total_bikes_count = bike_inventory.available_quantity()
 
     # Get pending sales decisions for current turn
     pending_decisions = turn_state.sales_decisions if isinstance(turn_state.sales_decisions, list) else []
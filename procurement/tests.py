@@ -1285,3 +1285,76 @@ class BikeComponentFilteringTestCase(ProcurementTestCase):
         self.assertIn('Stadtrad', bike_type_names)
         self.assertIn('E-Bike', bike_type_names)
         self.assertIn('Mountainbike', bike_type_names)
+
+
+class ProcurementBatchAllocationTestCase(TestCase):
+    """Bestellungen werden in einem Durchgang auf die Lager verteilt"""
+
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        self.user = get_user_model().objects.create_user(username='batchuser', password='testpass123')
+        self.session = GameSession.objects.create(
+            user=self.user, name='Batch Session', balance=Decimal('100000.00')
+        )
+        self.first = Warehouse.objects.create(
+            session=self.session, name='Lager 1', location='A', capacity_m2=50.0,
+            rent_per_month=Decimal('100.00')
+        )
+        self.second = Warehouse.objects.create(
+            session=self.session, name='Lager 2', location='B', capacity_m2=50.0,
+            rent_per_month=Decimal('100.00')
+        )
+        self.supplier = Supplier.objects.create(
+            session=self.session, name='Supplier', quality='basic',
+            complaint_probability=0, complaint_quantity=0
+        )
+        component_type = ComponentType.objects.create(
+            session=self.session, name='Rahmen', storage_space_per_unit=1.0
+        )
+        self.components = []
+        for index in range(3):
+            component = Component.objects.create(
+                session=self.session, component_type=component_type, name=f'Frame {index}'
+            )
+            SupplierPrice.objects.create(
+                session=self.session, supplier=self.supplier, component=component, base_price=Decimal('10.00')
+            )
+            self.components.append(component)
+        self.client.force_login(self.user)
+        self.url = reverse('procurement:procurement', args=[self.session.id])
+
+    def _order(self, quantities):
+        return self.client.post(self.url, json.dumps({
+            str(self.supplier.id): [
+                {'component_id': component.id, 'quantity': quantity}
+                for component, quantity in zip(self.components, quantities)
+            ]
+        }), content_type='application/json').json()
+
+    def test_order_spread_over_warehouses(self):
+        result = self._order([30, 30, 30])
+
+        self.assertTrue(result['success'], result)
+        self.assertEqual(ProcurementOrder.objects.filter(session=self.session).count(), 1)
+        order = ProcurementOrder.objects.get(session=self.session)
+        self.assertEqual(order.total_cost, Decimal('900.00'))
+        self.assertEqual(order.items.count(), 3)
+
+        # The second line moves on to the second warehouse, the third one is split
+        self.assertEqual(ComponentStock.objects.get(
+            warehouse=self.second, component=self.components[1]).quantity, 30)
+        self.assertEqual(ComponentStock.objects.get(
+            warehouse=self.first, component=self.components[2]).quantity, 20)
+        self.assertEqual(ComponentStock.objects.get(
+            warehouse=self.second, component=self.components[2]).quantity, 10)
+        for warehouse in (self.first, self.second):
+            warehouse.refresh_from_db()
+        self.assertEqual((self.first.used_space, self.second.used_space), (50.0, 40.0))
+
+    def test_order_over_capacity_rejected_without_writes(self):
+        result = self._order([40, 40, 40])
+
+        self.assertFalse(result['success'])
+        self.assertIn('Lagerkapazität überschritten', result['error'])
+        self.assertFalse(ProcurementOrder.objects.filter(session=self.session).exists())
+        self.assertFalse(ComponentStock.objects.filter(session=self.session).exists())
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class ProductionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'production'
+
+    def ready(self):
+        """Import signals when app is ready."""
+        import production.signals  # noqa
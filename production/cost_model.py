@@ -0,0 +1,104 @@
+"""
+Monatliches Produktionskostenmodell einer Session.
+
+Production cost used to be recomputed per production order (and per produced
+bike before batching): two Worker queries for the wages plus a scan over all
+ResearchBenefit rows for the R&D cost reduction. ProductionCostModel computes
+the labour cost per bike type and the R&D cost factor once per session and
+month. It is shared by SimulationEngine and the multiplayer AI production.
+
+The model is cached and only rebuilt in a new month or after workers, research
+benefits or bike types of the session change (see signals.py).
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+
+from bikeshop.cache_versions import bump_cache_version, get_cache_version
+
+CACHE_NAME = 'production_cost_model'
+
+
+def _model_key(session_id, version, month, year):
+    return f'production:cost_model:{session_id}:{version}:{year}:{month}'
+
+
+def invalidate_production_cost_model(session_id):
+    """Markiert das Kostenmodell einer Session als veraltet"""
+    bump_cache_version(session_id, CACHE_NAME)
+
+
+def get_production_cost_model(session, state=None):
+    """Liefert das (gecachte) Kostenmodell der Session für den aktuellen Monat
+
+    ``state`` (simulation.session_state.SessionState) supplies already loaded
+    workers and bike types when the model has to be built.
+    """
+    version = get_cache_version(session.id, CACHE_NAME)
+    key = _model_key(session.id, version, session.current_month, session.current_year)
+    model = cache.get(key)
+    if model is None:
+        model = ProductionCostModel.build(session, state=state)
+        # One month is enough, the key changes with the month anyway
+        cache.set(key, model, 60 * 60 * 24)
+    return model
+
+
+class ProductionCostModel:
+    """Lohnkosten je Fahrradtyp und F&E-Kostenfaktor eines Monats"""
+
+    def __init__(self, skilled_wage=None, unskilled_wage=None, rd_bonuses=None, worker_hours=None):
+        self.skilled_wage = skilled_wage
+        self.unskilled_wage = unskilled_wage
+        self.rd_bonuses = rd_bonuses or {'efficiency_bonus': 0.0, 'quality_bonus': 0.0, 'cost_reduction': 0.0}
+        # bike type id -> (skilled hours, unskilled hours)
+        self.worker_hours = worker_hours or {}
+
+        cost_reduction = self.rd_bonuses.get('cost_reduction', 0.0) / 100.0  # Convert percentage to decimal
+        # Apply cost reduction (cannot reduce below 10% of original cost)
+        self.cost_factor = Decimal(str(max(0.1, 1.0 - cost_reduction)))
+
+    @classmethod
+    def build(cls, session, state=None):
+        from bikeshop.models import BikeType, Worker
+        from business_strategy.business_engine import BusinessStrategyEngine
+
+        if state is not None:
+            workers = state.workers
+            bike_types = state.bike_types.values()
+        else:
+            workers = Worker.objects.filter(session=session).order_by('id')
+            bike_types = BikeType.objects.filter(session=session)
+
+        wages = {}
+        for worker in workers:
+            wages.setdefault(worker.worker_type, worker.hourly_wage)
+
+        worker_hours = {
+            bike_type.id: (bike_type.skilled_worker_hours, bike_type.unskilled_worker_hours)
+            for bike_type in bike_types
+        }
+
+        return cls(
+            skilled_wage=wages.get('skilled'),
+            unskilled_wage=wages.get('unskilled'),
+            rd_bonuses=BusinessStrategyEngine(session).get_rd_production_bonuses(),
+            worker_hours=worker_hours
+        )
+
+    def labour_cost(self, bike_type, default_skilled_wage=Decimal('0'), default_unskilled_wage=Decimal('0')):
+        """Lohnkosten eines Fahrrads ohne F&E-Rabatt
+
+        The default wages are used when the session has no worker of that type.
+        """
+        skilled_hours, unskilled_hours = self.worker_hours.get(
+            bike_type.id, (bike_type.skilled_worker_hours, bike_type.unskilled_worker_hours)
+        )
+        skilled_wage = self.skilled_wage if self.skilled_wage is not None else default_skilled_wage
+        unskilled_wage = self.unskilled_wage if self.unskilled_wage is not None else default_unskilled_wage
+        return (skilled_wage * Decimal(str(skilled_hours))
+                + unskilled_wage * Decimal(str(unskilled_hours)))
+
+    def unit_cost(self, bike_type):
+        """Produktionskosten eines Fahrrads mit F&E-Kostensenkung"""
+        return self.labour_cost(bike_type) * self.cost_factor
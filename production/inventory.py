@@ -0,0 +1,375 @@
+"""
+Lagerposten-basierter Fertigwarenbestand.
+
+Unsold bikes are stored as ProducedBikeLot rows keyed by (session, bike type,
+price segment, production month, warehouse) with a quantity. The lot is the
+stored unit: production books quantities into lots, aging, FIFO allocation
+and the inventory statistics work on lots, so storage and month processing
+scale with the number of lots instead of the number of bikes.
+
+ProducedBike rows only exist where a single bike is needed: sold bikes (one
+per SalesOrder, created by ``take_many``) and bikes that are placed one by one
+(BikeStock in the immediate production views, created by ``add_bikes``). An
+unsold ProducedBike row is counted in its lot like every other bike of it.
+
+Sales are deliberately not lot-level: SalesOrder references one bike, and
+reports, finance and the sales views count orders as bikes sold. Every sold
+bike therefore still gets its own ProducedBike row, so the sales history
+grows with the number of bikes sold (as the SalesOrders do); only the unsold
+inventory is bounded by the number of lots.
+
+BikeInventory owns every write path; code outside this module must not create,
+sell or delete ProducedBike rows directly. ``reconcile`` checks the lots
+against the unsold ProducedBike rows and repairs lots that fell behind, see
+the reconcile_bike_lots management command.
+"""
+import operator
+from decimal import Decimal
+from functools import reduce
+
+from django.db import models
+from django.db.models import Avg, Case, Count, ExpressionWrapper, F, Max, Q, Sum, Value, When
+
+from .models import ProducedBike, ProducedBikeLot, months_since_production_expression
+
+
+# Aging buckets of unsold bikes (same limits as ProducedBike.get_age_penalty_factor)
+AGING_BUCKETS = {
+    'new': Q(months_in_inventory__lte=1),                                # 0-1 months
+    'aging': Q(months_in_inventory__gt=1, months_in_inventory__lte=3),   # 2-3 months
+    'old': Q(months_in_inventory__gt=3, months_in_inventory__lte=6),     # 4-6 months
+    'very_old': Q(months_in_inventory__gt=6),                            # 7+ months
+}
+
+# Fields of ProducedBike that identify its lot
+LOT_FIELDS = ['bike_type_id', 'price_segment', 'production_month', 'production_year', 'warehouse_id']
+
+MONEY = models.DecimalField(max_digits=14, decimal_places=2)
+
+
+def _lot_condition(group):
+    return Q(**{field: group[field] for field in LOT_FIELDS})
+
+
+def _lot_key(item):
+    """LOT_FIELDS-Werte eines Lagerpostens, Fahrrads oder Gruppen-Dicts"""
+    if isinstance(item, dict):
+        return tuple(item[field] for field in LOT_FIELDS)
+    return tuple(getattr(item, field) for field in LOT_FIELDS)
+
+
+class BikeInventory:
+    """Fertigwarenbestand einer Session als FIFO-Lagerposten"""
+
+    def __init__(self, session):
+        self.session = session
+
+    def add(self, bike_type, price_segment, quantity, production_cost, warehouse=None, month=None, year=None):
+        """Bucht produzierte Fahrräder in den passenden Lagerposten ein"""
+        if quantity <= 0:
+            return None
+
+        lot, created = ProducedBikeLot.objects.get_or_create(
+            session=self.session,
+            bike_type=bike_type,
+            price_segment=price_segment,
+            production_month=month or self.session.current_month,
+            production_year=year or self.session.current_year,
+            warehouse=warehouse,
+            defaults={'quantity': 0, 'production_cost': production_cost}
+        )
+
+        # Keep the average unit cost of the lot
+        total_cost = lot.production_cost * lot.quantity + Decimal(str(production_cost)) * quantity
+        lot.quantity += quantity
+        lot.quantity_produced += quantity
+        lot.production_cost = (total_cost / lot.quantity).quantize(Decimal('0.01'))
+        lot.save(update_fields=['quantity', 'quantity_produced', 'production_cost'])
+        return lot
+
+    def add_bikes(self, bike_type, price_segment, quantity, production_cost=Decimal('0'), warehouse=None,
+                  month=None, year=None):
+        """
+        Produziert einzelne Fahrräder, die als eigene Zeile gebraucht werden.
+
+        For bikes that are placed one by one (BikeStock). The bikes are created
+        with one bulk insert and booked into their lot like any other
+        production. Returns the new ProducedBike rows.
+        """
+        if quantity <= 0:
+            return []
+
+        month = month or self.session.current_month
+        year = year or self.session.current_year
+        bikes = ProducedBike.objects.bulk_create([
+            ProducedBike(
+                session=self.session,
+                bike_type=bike_type,
+                price_segment=price_segment,
+                production_month=month,
+                production_year=year,
+                warehouse=warehouse,
+                production_cost=production_cost
+            )
+            for _ in range(quantity)
+        ])
+        self.add(bike_type, price_segment, quantity, production_cost, warehouse=warehouse, month=month, year=year)
+        return bikes
+
+    def get_lots(self, bike_type=None, price_segment=None):
+        """Nicht leere Lagerposten, älteste zuerst (FIFO)"""
+        lots = ProducedBikeLot.objects.filter(session=self.session, quantity__gt=0)
+        if bike_type is not None:
+            lots = lots.filter(bike_type=bike_type)
+        if price_segment is not None:
+            lots = lots.filter(price_segment=price_segment)
+        return lots.order_by('production_year', 'production_month', 'id')
+
+    def available_quantity(self, bike_type=None, price_segment=None):
+        """Anzahl verfügbarer Fahrräder (optional eines Typs und Segments)"""
+        return self.get_lots(bike_type, price_segment).aggregate(total=Sum('quantity'))['total'] or 0
+
+    def available_groups(self):
+        """Verfügbare Fahrräder je Fahrradtyp und Segment mit mittleren Produktionskosten (Verkaufsansicht)"""
+        return self.get_lots().values(
+            'bike_type__id',
+            'bike_type__name',
+            'price_segment'
+        ).annotate(
+            count=Sum('quantity'),
+            avg_production_cost=ExpressionWrapper(
+                Sum(F('production_cost') * F('quantity')) / Sum('quantity'), output_field=MONEY
+            )
+        ).order_by('bike_type__name', 'price_segment')
+
+    def produced_quantity(self, **filters):
+        """Anzahl je produzierter Fahrräder (verkaufte eingeschlossen), gefiltert nach Lagerposten-Feldern"""
+        return ProducedBikeLot.objects.filter(session=self.session, **filters).aggregate(
+            total=Sum('quantity_produced')
+        )['total'] or 0
+
+    def statistics(self):
+        """
+        Kennzahlen des unverkauften Fertigwarenbestands in einer Abfrage.
+
+        Returns ``buckets`` (bikes per aging bucket), ``total_unsold``,
+        ``total_storage_cost`` and ``total_production_cost``.
+        """
+        totals = ProducedBikeLot.objects.filter(session=self.session, quantity__gt=0).aggregate(
+            total_unsold=Sum('quantity'),
+            # 2% of the production cost per month in inventory (see ProducedBike.update_inventory_age)
+            total_storage_cost=Sum(ExpressionWrapper(
+                F('production_cost') * Value(Decimal('0.02')) * F('months_in_inventory') * F('quantity'),
+                output_field=MONEY
+            )),
+            total_production_cost=Sum(ExpressionWrapper(F('production_cost') * F('quantity'), output_field=MONEY)),
+            **{name: Sum('quantity', filter=condition) for name, condition in AGING_BUCKETS.items()}
+        )
+        return {
+            'buckets': {name: totals[name] or 0 for name in AGING_BUCKETS},
+            'total_unsold': totals['total_unsold'] or 0,
+            'total_storage_cost': totals['total_storage_cost'] or Decimal('0'),
+            'total_production_cost': totals['total_production_cost'] or Decimal('0'),
+        }
+
+    def allocate_fifo(self, bike_type, price_segment, quantity, reserved=None):
+        """
+        Plans a FIFO withdrawal without writing anything.
+
+        Returns a list of (lot, quantity) tuples, oldest lots first. ``reserved``
+        maps lot ids to quantities already promised to other decisions and is
+        updated in place, so several decisions never draw the same bikes.
+        """
+        if reserved is None:
+            reserved = {}
+
+        allocation = []
+        remaining = quantity
+        for lot in self.get_lots(bike_type, price_segment):
+            if remaining <= 0:
+                break
+            free = lot.quantity - reserved.get(lot.id, 0)
+            if free <= 0:
+                continue
+            taken = min(free, remaining)
+            reserved[lot.id] = reserved.get(lot.id, 0) + taken
+            allocation.append((lot, taken))
+            remaining -= taken
+        return allocation
+
+    def take(self, lot, quantity):
+        """Verkauft ``quantity`` Fahrräder aus einem Lagerposten und gibt die verkauften Fahrräder zurück"""
+        return self.take_many([(lot, quantity)])[0]
+
+    def take_many(self, takes):
+        """
+        Verkauft Fahrräder aus mehreren Lagerposten auf einmal.
+
+        ``takes`` is a list of (lot, quantity) tuples, several of them may draw
+        from the same lot; a lot gives at most its quantity. Returns the sold
+        bikes per tuple as ProducedBike rows for the SalesOrders: bikes of the
+        lot that already have a row are used first, rows for the others are
+        created as sold. One query reads the existing rows, one bulk insert
+        creates the new ones and one UPDATE each writes the sold flags and the
+        lot quantities.
+        """
+        lots = {}
+        wanted = {}
+        for lot, quantity in takes:
+            if quantity > 0:
+                lots.setdefault(lot.id, lot)
+                wanted[lot.id] = wanted.get(lot.id, 0) + quantity
+        if not wanted:
+            return [[] for _ in takes]
+
+        taken_per_lot = {lot_id: min(quantity, max(lots[lot_id].quantity, 0)) for lot_id, quantity in wanted.items()}
+
+        # Bikes that already have a row (placed one by one) are sold first
+        existing = {}
+        lot_ids_by_key = {_lot_key(lot): lot_id for lot_id, lot in lots.items()}
+        for bike in ProducedBike.objects.filter(session=self.session, is_sold=False).filter(
+            reduce(operator.or_, (_lot_condition({field: getattr(lot, field) for field in LOT_FIELDS})
+                                  for lot in lots.values()))
+        ).select_related('bike_type').order_by('id'):
+            lot_id = lot_ids_by_key[_lot_key(bike)]
+            if len(existing.setdefault(lot_id, [])) < taken_per_lot[lot_id]:
+                existing[lot_id].append(bike)
+
+        new_bikes = []
+        available = {}
+        for lot_id, taken in taken_per_lot.items():
+            lot = lots[lot_id]
+            bikes = existing.get(lot_id, [])
+            created = [
+                ProducedBike(
+                    session=self.session,
+                    bike_type_id=lot.bike_type_id,
+                    price_segment=lot.price_segment,
+                    production_month=lot.production_month,
+                    production_year=lot.production_year,
+                    warehouse_id=lot.warehouse_id,
+                    production_cost=lot.production_cost,
+                    months_in_inventory=lot.months_in_inventory,
+                    storage_cost_accumulated=lot.production_cost * Decimal('0.02') * lot.months_in_inventory,
+                    is_sold=True
+                )
+                for _ in range(taken - len(bikes))
+            ]
+            if ProducedBikeLot.bike_type.is_cached(lot):
+                for bike in created:
+                    bike.bike_type = lot.bike_type
+            new_bikes.extend(created)
+            available[lot_id] = bikes + created
+
+        sold_rows = [bike.id for bikes in existing.values() for bike in bikes]
+        if sold_rows:
+            ProducedBike.objects.filter(id__in=sold_rows).update(is_sold=True)
+            for bikes in existing.values():
+                for bike in bikes:
+                    bike.is_sold = True
+        if new_bikes:
+            ProducedBike.objects.bulk_create(new_bikes)
+
+        taken_per_lot = {lot_id: taken for lot_id, taken in taken_per_lot.items() if taken}
+        if taken_per_lot:
+            ProducedBikeLot.objects.filter(id__in=taken_per_lot).update(quantity=Case(
+                *[When(id=lot_id, then=F('quantity') - taken) for lot_id, taken in taken_per_lot.items()],
+                default=F('quantity')
+            ))
+            for lot in {id(lot): lot for lot, _ in takes}.values():
+                lot.quantity -= taken_per_lot.get(lot.id, 0)
+
+        result = []
+        for lot, quantity in takes:
+            if quantity <= 0:
+                result.append([])
+                continue
+            bikes = available[lot.id]
+            result.append(bikes[:quantity])
+            available[lot.id] = bikes[quantity:]
+        return result
+
+    def mark_sold(self, bike_ids):
+        """
+        Markiert einzelne Fahrräder als verkauft und bucht sie aus ihren Lagerposten aus.
+
+        For sales that pick bikes by id instead of by lot. One query groups the
+        still unsold bikes by lot, one UPDATE each writes the sold flags and the
+        lot quantities. Returns the number of bikes marked.
+        """
+        unsold = ProducedBike.objects.filter(session=self.session, id__in=list(bike_ids), is_sold=False)
+        groups = list(unsold.values(*LOT_FIELDS).annotate(quantity=Count('id')).order_by())
+        if not groups:
+            return 0
+
+        unsold.update(is_sold=True)
+        self.remove_from_lots(groups)
+        return sum(group['quantity'] for group in groups)
+
+    def remove_from_lots(self, groups):
+        """Verringert Lagerposten; ``groups`` sind Dicts mit LOT_FIELDS und ``quantity``"""
+        ProducedBikeLot.objects.filter(session=self.session).filter(
+            reduce(operator.or_, (_lot_condition(group) for group in groups))
+        ).update(quantity=Case(
+            *[When(_lot_condition(group), then=F('quantity') - group['quantity']) for group in groups],
+            default=F('quantity')
+        ))
+
+    def update_ages(self, current_month, current_year):
+        """Altert Lagerposten und einzeln angelegte Fahrräder mit je einem UPDATE"""
+        ProducedBikeLot.objects.filter(session=self.session, quantity__gt=0).update(
+            months_in_inventory=months_since_production_expression(current_month, current_year)
+        )
+        ProducedBike.update_inventory_ages(self.session, current_month, current_year)
+
+    def reconcile(self, dry_run=False):
+        """
+        Prüft die Lagerposten gegen die unverkauften Einzelfahrräder.
+
+        Every unsold ProducedBike row must be counted in its lot, so a lot may
+        never hold fewer bikes than it has unsold rows (nor a negative
+        quantity). Rows written past BikeInventory, e.g. a bulk_create or
+        queryset update() on ProducedBike, break this. Lots that fell behind are
+        raised to their row count, missing lots are created. Returns a list of
+        (lot key, lot quantity, unsold rows) for every lot that was off.
+        """
+        lots = {_lot_key(lot): lot for lot in ProducedBikeLot.objects.filter(session=self.session)}
+        groups = ProducedBike.objects.filter(session=self.session, is_sold=False).values(*LOT_FIELDS).annotate(
+            quantity=Count('id'),
+            production_cost=Avg('production_cost'),
+            months_in_inventory=Max('months_in_inventory')
+        ).order_by()
+
+        drift = []
+        new_lots = []
+        changed_lots = []
+        for group in groups:
+            key = _lot_key(group)
+            lot = lots.pop(key, None)
+            if lot is None:
+                drift.append((key, 0, group['quantity']))
+                new_lots.append(ProducedBikeLot(
+                    session=self.session,
+                    quantity=group['quantity'],
+                    quantity_produced=group['quantity'],
+                    production_cost=Decimal(str(group['production_cost'] or 0)).quantize(Decimal('0.01')),
+                    months_in_inventory=group['months_in_inventory'] or 0,
+                    **dict(zip(LOT_FIELDS, key))
+                ))
+            elif lot.quantity < group['quantity']:
+                drift.append((key, lot.quantity, group['quantity']))
+                lot.quantity_produced += group['quantity'] - lot.quantity
+                lot.quantity = group['quantity']
+                changed_lots.append(lot)
+
+        # Lots without unsold rows only have to be non-negative
+        for key, lot in lots.items():
+            if lot.quantity < 0:
+                drift.append((key, lot.quantity, 0))
+                lot.quantity = 0
+                changed_lots.append(lot)
+
+        if not dry_run:
+            ProducedBikeLot.objects.bulk_create(new_lots)
+            ProducedBikeLot.objects.bulk_update(changed_lots, ['quantity', 'quantity_produced'])
+        return drift
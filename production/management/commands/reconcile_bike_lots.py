@@ -0,0 +1,59 @@
+"""
+Management command to check the finished-goods lots.
+
+ProducedBikeLot rows are the stored unit of unsold bikes and are written by
+production.inventory.BikeInventory. This command checks every session's lots
+against the unsold ProducedBike rows and repairs lots that fell behind (rows
+written past BikeInventory).
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from bikeshop.models import GameSession
+from production.inventory import BikeInventory
+
+
+class Command(BaseCommand):
+    help = 'Check the finished-goods lots of all sessions against their unsold bikes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show which lots differ without changing them',
+        )
+        parser.add_argument(
+            '--game-id',
+            type=str,
+            help='Only reconcile lots of a specific game session ID',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        game_id = options.get('game_id')
+
+        sessions = GameSession.objects.all().order_by('id')
+        if game_id:
+            sessions = sessions.filter(id=game_id)
+
+        checked = 0
+        corrected = 0
+        for session in sessions:
+            checked += 1
+            with transaction.atomic():
+                drift = BikeInventory(session).reconcile(dry_run=dry_run)
+
+            for (bike_type_id, price_segment, month, year, warehouse_id), quantity, rows in drift:
+                self.stdout.write(
+                    f'{session.name} ({session.id}): bike type {bike_type_id} {price_segment} '
+                    f'{month}/{year} warehouse {warehouse_id}: {quantity} -> {max(rows, 0)}'
+                )
+            if drift:
+                corrected += 1
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING(
+                f'DRY RUN: lots of {corrected} of {checked} session(s) would be corrected'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ Corrected lots of {corrected} of {checked} session(s)'))
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:14
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('warehouse', '0003_alter_componentstock_unique_together_and_more'),
+        ('bikeshop', '0007_make_parameters_dynamic'),
+        ('production', '0003_producedbike_months_in_inventory_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProducedBikeLot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price_segment', models.CharField(choices=[('cheap', 'Günstig'), ('standard', 'Standard'), ('premium', 'Premium')], max_length=20)),
+                ('production_month', models.IntegerField()),
+                ('production_year', models.IntegerField()),
+                ('quantity', models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)])),
+                ('production_cost', models.DecimalField(decimal_places=2, default=0, help_text='Average production cost per bike in this lot', max_digits=8)),
+                ('months_in_inventory', models.IntegerField(default=0, help_text='How many months this lot has been in inventory')),
+                ('bike_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bikeshop.biketype')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bike_lots', to='bikeshop.gamesession')),
+                ('warehouse', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='warehouse.warehouse')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['session', 'bike_type', 'price_segment', 'production_year', 'production_month'], name='production__session_876abb_idx')],
+                'unique_together': {('session', 'bike_type', 'price_segment', 'production_month', 'production_year', 'warehouse')},
+            },
+        ),
+    ]
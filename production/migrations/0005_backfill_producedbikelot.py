@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-16 21:05
+
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Avg, Count, Max
+
+
+def backfill_lots(apps, schema_editor):
+    """Lagerposten aus den unverkauften Fahrrädern (the month processing no longer rebuilds them)"""
+    ProducedBike = apps.get_model('production', 'ProducedBike')
+    ProducedBikeLot = apps.get_model('production', 'ProducedBikeLot')
+
+    ProducedBikeLot.objects.all().delete()
+    groups = ProducedBike.objects.filter(is_sold=False).values(
+        'session_id', 'bike_type_id', 'price_segment', 'production_month', 'production_year', 'warehouse_id'
+    ).annotate(
+        quantity=Count('id'),
+        production_cost=Avg('production_cost'),
+        months_in_inventory=Max('months_in_inventory')
+    ).order_by()
+
+    ProducedBikeLot.objects.bulk_create([
+        ProducedBikeLot(
+            session_id=group['session_id'],
+            bike_type_id=group['bike_type_id'],
+            price_segment=group['price_segment'],
+            production_month=group['production_month'],
+            production_year=group['production_year'],
+            warehouse_id=group['warehouse_id'],
+            quantity=group['quantity'],
+            production_cost=Decimal(str(group['production_cost'] or 0)).quantize(Decimal('0.01')),
+            months_in_inventory=group['months_in_inventory'] or 0
+        )
+        for group in groups
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('production', '0004_producedbikelot'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_lots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:40
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Avg, Count
+
+
+def backfill_quantity_produced(apps, schema_editor):
+    """Produzierte Menge je Lagerposten aus allen bisherigen Fahrrädern (verkauft oder nicht)"""
+    ProducedBike = apps.get_model('production', 'ProducedBike')
+    ProducedBikeLot = apps.get_model('production', 'ProducedBikeLot')
+
+    lot_fields = ['session_id', 'bike_type_id', 'price_segment', 'production_month', 'production_year', 'warehouse_id']
+    lots = {
+        tuple(getattr(lot, field) for field in lot_fields): lot
+        for lot in ProducedBikeLot.objects.all()
+    }
+
+    new_lots = []
+    changed_lots = []
+    groups = ProducedBike.objects.values(*lot_fields).annotate(
+        produced=Count('id'),
+        production_cost=Avg('production_cost')
+    ).order_by()
+    for group in groups:
+        key = tuple(group[field] for field in lot_fields)
+        lot = lots.get(key)
+        if lot is None:
+            # Fully sold lots, kept for the production statistics
+            new_lots.append(ProducedBikeLot(
+                quantity=0,
+                quantity_produced=group['produced'],
+                production_cost=Decimal(str(group['production_cost'] or 0)).quantize(Decimal('0.01')),
+                **dict(zip(lot_fields, key))
+            ))
+        else:
+            lot.quantity_produced = group['produced']
+            changed_lots.append(lot)
+
+    ProducedBikeLot.objects.bulk_create(new_lots, batch_size=1000)
+    ProducedBikeLot.objects.bulk_update(changed_lots, ['quantity_produced'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('production', '0005_backfill_producedbikelot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producedbikelot',
+            name='quantity_produced',
+            field=models.IntegerField(default=0, help_text='Bikes ever produced into this lot (sold ones included)'),
+        ),
+        migrations.RunPython(backfill_quantity_produced, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,18 @@
 from django.db import models
+from django.db.models import ExpressionWrapper, F, Value
+from django.db.models.functions import Greatest
 from bikeshop.models import GameSession, BikeType
 from django.core.validators import MinValueValidator
+from decimal import Decimal
+
+
+def months_since_production_expression(current_month, current_year, month_field='production_month',
+                                       year_field='production_year'):
+    """SQL expression for max(0, months between production and the given month)"""
+    return Greatest(
+        Value(0),
+        (Value(current_year) - F(year_field)) * Value(12) + (Value(current_month) - F(month_field))
+    )
 
 
 class ProductionPlan(models.Model):
@@ -67,4 +79,55 @@ class ProducedBike(models.Model):
         from decimal import Decimal
         monthly_storage_cost = self.production_cost * Decimal('0.02')
         self.storage_cost_accumulated = monthly_storage_cost * self.months_in_inventory
-        self.save()
\ No newline at end of file
+        self.save()
+
+    @classmethod
+    def update_inventory_ages(cls, session, current_month, current_year):
+        """Set-based variant of update_inventory_age for all unsold bikes of a session (one UPDATE)"""
+        months_in_inventory = months_since_production_expression(current_month, current_year)
+        return cls.objects.filter(session=session, is_sold=False).update(
+            months_in_inventory=months_in_inventory,
+            storage_cost_accumulated=ExpressionWrapper(
+                F('production_cost') * Value(Decimal('0.02')) * months_in_inventory,
+                output_field=models.DecimalField(max_digits=8, decimal_places=2)
+            )
+        )
+
+
+class ProducedBikeLot(models.Model):
+    """Lagerposten unverkaufter Fahrräder gleicher Art, gleichen Segments und gleichen Produktionsmonats"""
+    session = models.ForeignKey(GameSession, on_delete=models.CASCADE, related_name='bike_lots')
+    bike_type = models.ForeignKey(BikeType, on_delete=models.CASCADE)
+    price_segment = models.CharField(max_length=20, choices=[
+        ('cheap', 'Günstig'),
+        ('standard', 'Standard'),
+        ('premium', 'Premium')
+    ])
+    production_month = models.IntegerField()
+    production_year = models.IntegerField()
+    warehouse = models.ForeignKey('warehouse.Warehouse', on_delete=models.CASCADE, null=True, blank=True)
+    quantity = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+    quantity_produced = models.IntegerField(default=0, help_text="Bikes ever produced into this lot (sold ones included)")
+    production_cost = models.DecimalField(max_digits=8, decimal_places=2, default=0,
+                                          help_text="Average production cost per bike in this lot")
+
+    # Inventory aging (same rules as ProducedBike)
+    months_in_inventory = models.IntegerField(default=0, help_text="How many months this lot has been in inventory")
+
+    class Meta:
+        unique_together = ['session', 'bike_type', 'price_segment', 'production_month', 'production_year', 'warehouse']
+        indexes = [
+            models.Index(fields=['session', 'bike_type', 'price_segment', 'production_year', 'production_month']),
+        ]
+
+    def __str__(self):
+        return f"{self.bike_type.name} ({self.get_price_segment_display()}) {self.production_month}/{self.production_year}: {self.quantity}"
+
+    def get_age_penalty_factor(self):
+        """Returns price penalty factor based on inventory age"""
+        return ProducedBike(months_in_inventory=self.months_in_inventory).get_age_penalty_factor()
+
+    @property
+    def storage_cost_accumulated(self):
+        """Accumulated storage costs for all bikes in this lot (2% of production cost per month)"""
+        return self.production_cost * Decimal('0.02') * self.months_in_inventory * self.quantity
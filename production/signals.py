@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from bikeshop.models import BikeType, Worker
+from business_strategy.models import ResearchBenefit
+from .cost_model import invalidate_production_cost_model
+
+
+@receiver(post_save, sender=Worker)
+@receiver(post_delete, sender=Worker)
+@receiver(post_save, sender=ResearchBenefit)
+@receiver(post_delete, sender=ResearchBenefit)
+@receiver(post_save, sender=BikeType)
+@receiver(post_delete, sender=BikeType)
+def invalidate_production_cost_model_on_change(sender, instance, **kwargs):
+    """
+    Wages, R&D cost reductions and bike worker hours feed the session's
+    production cost model, so any change to them invalidates it.
+    """
+    invalidate_production_cost_model(instance.session_id)
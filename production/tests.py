@@ -11,7 +11,8 @@ from bikeshop.models import (
     Supplier, SupplierPrice, BikePrice, Worker
 )
 from warehouse.models import Warehouse, ComponentStock, BikeStock
-from .models import ProductionPlan, ProductionOrder, ProducedBike
+from .models import ProductionPlan, ProductionOrder, ProducedBike, ProducedBikeLot
+from .inventory import BikeInventory
 
 
 class ProductionTestCase(TestCase):
@@ -2357,3 +2358,247 @@ class AtomicTransactionTests(ProductionTestCase):
         # Verify wheels stock unchanged after failed request
         self.wheel_stock.refresh_from_db()
         self.assertEqual(self.wheel_stock.quantity, 2)  # Should still be 2
+
+
+class BikeInventoryTests(TestCase):
+    """Tests für den lagerposten-basierten Fertigwarenbestand"""
+
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        user = get_user_model().objects.create_user(username='lotuser', password='testpass123')
+        self.session = GameSession.objects.create(
+            user=user, name='Lot Session', current_month=5, current_year=2024
+        )
+        self.bike_type = BikeType.objects.create(session=self.session, name='City Bike')
+        self.inventory = BikeInventory(self.session)
+
+    def _produce(self, quantity, month, cost='100.00', segment='standard'):
+        return self.inventory.add(self.bike_type, segment, quantity, Decimal(cost), month=month, year=2024)
+
+    def test_add_merges_into_lot_with_average_cost(self):
+        self._produce(2, month=3, cost='100.00')
+        lot = self._produce(2, month=3, cost='200.00')
+
+        self.assertEqual(ProducedBikeLot.objects.filter(session=self.session).count(), 1)
+        self.assertEqual(lot.quantity, 4)
+        self.assertEqual(lot.quantity_produced, 4)
+        self.assertEqual(lot.production_cost, Decimal('150.00'))
+        # Production stores the lot only, no row per bike
+        self.assertFalse(ProducedBike.objects.filter(session=self.session).exists())
+
+    def test_allocate_fifo_takes_oldest_lots_and_respects_reservations(self):
+        old_lot = self._produce(3, month=1)
+        new_lot = self._produce(5, month=4)
+        reserved = {}
+
+        first = self.inventory.allocate_fifo(self.bike_type, 'standard', 4, reserved=reserved)
+        second = self.inventory.allocate_fifo(self.bike_type, 'standard', 10, reserved=reserved)
+
+        self.assertEqual([(lot.id, qty) for lot, qty in first], [(old_lot.id, 3), (new_lot.id, 1)])
+        self.assertEqual([(lot.id, qty) for lot, qty in second], [(new_lot.id, 4)])
+        self.assertEqual(self.inventory.available_quantity(self.bike_type, 'standard'), 8)
+
+    def test_take_creates_sold_bikes_of_lot(self):
+        old_lot = self._produce(3, month=1)
+        self._produce(2, month=4)
+
+        with self.assertNumQueries(3):
+            bikes = self.inventory.take(old_lot, 2)
+
+        self.assertEqual(len(bikes), 2)
+        self.assertTrue(all(bike.pk and bike.is_sold and bike.production_month == 1 for bike in bikes))
+        old_lot.refresh_from_db()
+        self.assertEqual(old_lot.quantity, 1)
+        self.assertEqual(old_lot.quantity_produced, 3)
+        self.assertEqual(ProducedBike.objects.filter(session=self.session).count(), 2)
+
+    def test_take_never_exceeds_lot(self):
+        lot = self._produce(2, month=1)
+
+        bikes = self.inventory.take(lot, 5)
+
+        self.assertEqual(len(bikes), 2)
+        lot.refresh_from_db()
+        self.assertEqual(lot.quantity, 0)
+
+    def test_single_bikes_are_counted_in_their_lot(self):
+        bikes = self.inventory.add_bikes(self.bike_type, 'standard', 3, Decimal('100.00'), month=2, year=2024)
+        lot = ProducedBikeLot.objects.get(session=self.session, production_month=2)
+        self.assertEqual(lot.quantity, 3)
+
+        self.assertEqual(self.inventory.mark_sold([bikes[1].id, bikes[1].id]), 1)
+        # Already sold bikes are not taken out twice
+        self.assertEqual(self.inventory.mark_sold([bikes[1].id]), 0)
+
+        # Bikes that already have a row are sold before new rows are created
+        lot.refresh_from_db()
+        taken = self.inventory.take(lot, 1)
+        self.assertIn(taken[0].id, {bikes[0].id, bikes[2].id})
+
+        lot.refresh_from_db()
+        self.assertEqual(lot.quantity, 1)
+        self.assertEqual(self.inventory.available_quantity(self.bike_type, 'standard'), 1)
+        self.assertEqual(ProducedBike.objects.filter(session=self.session).count(), 3)
+
+    def test_reconcile_repairs_lots_behind_their_bikes(self):
+        self._produce(3, month=1)
+        self.inventory.add_bikes(self.bike_type, 'premium', 2, Decimal('80.00'), month=2, year=2024)
+        # Rows written past BikeInventory
+        ProducedBike.objects.bulk_create([
+            ProducedBike(
+                session=self.session, bike_type=self.bike_type, price_segment='premium',
+                production_month=2, production_year=2024, production_cost=Decimal('80.00')
+            ),
+            ProducedBike(
+                session=self.session, bike_type=self.bike_type, price_segment='cheap',
+                production_month=3, production_year=2024, production_cost=Decimal('50.00'),
+                months_in_inventory=4
+            ),
+        ])
+
+        self.assertEqual(len(self.inventory.reconcile(dry_run=True)), 2)
+        self.assertEqual(self.inventory.available_quantity(), 5)
+
+        drift = self.inventory.reconcile()
+
+        self.assertEqual(sorted((key[1], quantity, rows) for key, quantity, rows in drift),
+                         [('cheap', 0, 1), ('premium', 2, 3)])
+        lots = {lot.production_month: lot for lot in ProducedBikeLot.objects.filter(session=self.session)}
+        # Lots without rows are left alone
+        self.assertEqual(lots[1].quantity, 3)
+        self.assertEqual(lots[2].quantity, 3)
+        self.assertEqual(lots[3].quantity, 1)
+        self.assertEqual(lots[3].get_age_penalty_factor(), 0.90)
+        self.assertEqual(self.inventory.reconcile(), [])
+
+    def test_reconcile_command(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        ProducedBike.objects.create(
+            session=self.session, bike_type=self.bike_type, price_segment='standard',
+            production_month=2, production_year=2024
+        )
+        out = StringIO()
+        call_command('reconcile_bike_lots', game_id=str(self.session.id), stdout=out)
+
+        self.assertIn('Corrected lots of 1 of 1 session(s)', out.getvalue())
+        self.assertEqual(self.inventory.available_quantity(self.bike_type, 'standard'), 1)
+
+    def test_statistics_in_one_query(self):
+        self._produce(2, month=5, cost='100.00')
+        self._produce(3, month=3, cost='50.00')
+        old_lot = self._produce(2, month=1, cost='200.00')
+        self.inventory.update_ages(5, 2024)
+        old_lot.refresh_from_db()
+        self.inventory.take(old_lot, 1)
+
+        with self.assertNumQueries(1):
+            statistics = self.inventory.statistics()
+
+        self.assertEqual(statistics['buckets'], {'new': 2, 'aging': 3, 'old': 1, 'very_old': 0})
+        self.assertEqual(statistics['total_unsold'], 6)
+        self.assertEqual(statistics['total_production_cost'], Decimal('550.00'))
+        # 3 x 50 x 2% x 2 months + 200 x 2% x 4 months
+        self.assertEqual(statistics['total_storage_cost'], Decimal('22.00'))
+        self.assertEqual(self.inventory.produced_quantity(), 7)
+        self.assertEqual(self.inventory.produced_quantity(production_month__lte=3), 5)
+
+
+class ProductionCostModelTests(TestCase):
+    """Tests für das monatliche Produktionskostenmodell"""
+
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        user = get_user_model().objects.create_user(username='costuser', password='testpass123')
+        self.session = GameSession.objects.create(
+            user=user, name='Cost Session', current_month=2, current_year=2024
+        )
+        self.bike_type = BikeType.objects.create(
+            session=self.session, name='City Bike',
+            base_skilled_worker_hours=2.0, base_unskilled_worker_hours=1.0
+        )
+        self.skilled = Worker.objects.create(
+            session=self.session, worker_type='skilled', hourly_wage=Decimal('20.00'), count=5
+        )
+        Worker.objects.create(session=self.session, worker_type='unskilled', hourly_wage=Decimal('10.00'), count=5)
+
+    def _add_research_benefit(self, cost_reduction):
+        from business_strategy.models import ResearchProject, ResearchBenefit
+        project = ResearchProject.objects.create(
+            session=self.session, name='Lean Production', project_type='cost_reduction',
+            description='', total_investment_required=Decimal('1000.00'),
+            duration_months=1, months_remaining=0
+        )
+        return ResearchBenefit.objects.create(
+            session=self.session, research_project=project, cost_reduction_bonus=cost_reduction,
+            activation_month=1, activation_year=2024
+        )
+
+    def test_unit_cost_computed_once_per_month(self):
+        from .cost_model import get_production_cost_model
+
+        self.assertEqual(get_production_cost_model(self.session).unit_cost(self.bike_type), Decimal('50.00'))
+
+        # Only the cache version is read
+        with self.assertNumQueries(1):
+            model = get_production_cost_model(self.session)
+            model.unit_cost(self.bike_type)
+
+    def test_cache_invalidated_by_workers_and_research(self):
+        from .cost_model import get_production_cost_model
+
+        get_production_cost_model(self.session)
+
+        self.skilled.hourly_wage = Decimal('30.00')
+        self.skilled.save()
+        self.assertEqual(get_production_cost_model(self.session).unit_cost(self.bike_type), Decimal('70.00'))
+
+        self._add_research_benefit(cost_reduction=50.0)
+        self.assertEqual(get_production_cost_model(self.session).unit_cost(self.bike_type), Decimal('35.00'))
+
+    def test_invalidation_reaches_other_workers(self):
+        from bikeshop.cache_versions import bump_cache_version
+        from .cost_model import CACHE_NAME, get_production_cost_model
+
+        get_production_cost_model(self.session)
+        # Saved without signals, e.g. in another process whose cache this one cannot see
+        Worker.objects.filter(pk=self.skilled.pk).update(hourly_wage=Decimal('30.00'))
+        bump_cache_version(self.session.id, CACHE_NAME)
+
+        self.assertEqual(get_production_cost_model(self.session).unit_cost(self.bike_type), Decimal('70.00'))
+
+    def test_rolled_back_wages_are_not_served(self):
+        from .cost_model import get_production_cost_model
+
+        get_production_cost_model(self.session)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.skilled.hourly_wage = Decimal('999.00')
+                self.skilled.save()
+                self.assertEqual(get_production_cost_model(self.session).skilled_wage, Decimal('999.00'))
+                # e.g. a later phase of process_month fails
+                raise RuntimeError('month failed')
+
+        self.assertEqual(get_production_cost_model(self.session).skilled_wage, Decimal('20.00'))
+        # A committed change bumps the version again, the rolled back model stays unused
+        Worker.objects.filter(session=self.session, worker_type='unskilled').get().save()
+        self.assertEqual(get_production_cost_model(self.session).skilled_wage, Decimal('20.00'))
+
+    def test_ai_production_cost_uses_session_wages_and_research(self):
+        from multiplayer.ai_integration import MultiplayerIntegrationManager
+
+        manager = MultiplayerIntegrationManager(None)
+        # (200 + 2h * 20 + 1h * 10) * segment multiplier
+        self.assertEqual(manager._calculate_production_cost(self.bike_type, 'cheap', self.session), Decimal('200.00'))
+        self.assertEqual(manager._calculate_production_cost(self.bike_type, 'premium', self.session), Decimal('325.00'))
+
+        # The R&D cost reduction applies to the labour share
+        self._add_research_benefit(cost_reduction=50.0)
+        self.assertEqual(manager._calculate_production_cost(self.bike_type, 'standard', self.session), Decimal('225.00'))
+
+        # Without workers and research the former flat rates of 15/10 per hour apply
+        from business_strategy.models import ResearchBenefit
+        Worker.objects.filter(session=self.session).delete()
+        ResearchBenefit.objects.filter(session=self.session).delete()
+        self.assertEqual(manager._calculate_production_cost(self.bike_type, 'standard', self.session), Decimal('240.00'))
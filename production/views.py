@@ -4,7 +4,9 @@ from django.contrib import messages
 from django.http import JsonResponse
 from django.db import transaction
 from bikeshop.models import GameSession, BikeType, Worker
-from .models import ProductionPlan, ProductionOrder, ProducedBike
+from bikeshop.compatibility import get_compatibility_index
+from .models import ProductionPlan, ProductionOrder
+from .inventory import BikeInventory
 from warehouse.models import Warehouse, ComponentStock, BikeStock
 import json
 import random
@@ -20,6 +22,8 @@ def production_view(request, session_id):
 
     # Aktuelle Lagerbestände
     component_stocks = ComponentStock.objects.filter(session=session)
+    # Fetched once for all component loops of this request
+    compatibility_index = get_compatibility_index(session)
 
     if request.method == 'POST':
         try:
@@ -57,7 +61,7 @@ def production_view(request, session_id):
                             total_bikes_produced += quantity
                             
                             # Use the new flexible component matching system
-                            component_match_result = bike_type.find_best_components_for_segment(session, segment)
+                            component_match_result = bike_type.find_best_components_for_segment(session, segment, compatibility_index)
                             
                             # Check if any components are missing
                             if component_match_result['missing']:
@@ -187,15 +191,9 @@ def production_view(request, session_id):
                                 quantity_planned=quantity
                             )
 
-                            # Produce individual bikes and add to warehouse
-                            for _ in range(quantity):
-                                produced_bike = ProducedBike.objects.create(
-                                    session=session,
-                                    bike_type=bike_type,
-                                    price_segment=segment,
-                                    production_month=session.current_month,
-                                    production_year=session.current_year
-                                )
+                            # Produce individual bikes (one row each for the BikeStock) and add to warehouse
+                            produced_bikes = BikeInventory(session).add_bikes(bike_type, segment, quantity)
+                            for produced_bike in produced_bikes:
 
                                 # Find a warehouse with available capacity for this bike
                                 bike_space_needed = bike_type.storage_space_per_unit
@@ -263,7 +261,7 @@ def production_view(request, session_id):
 
         # For each segment, find required components with stock info
         for segment in ['cheap', 'standard', 'premium']:
-            component_match_result = bike_type.find_best_components_for_segment(session, segment)
+            component_match_result = bike_type.find_best_components_for_segment(session, segment, compatibility_index)
 
             components_info = []
             for component_type_name, component in component_match_result['components'].items():
@@ -272,7 +270,7 @@ def production_view(request, session_id):
                 stock_quantity = stock.quantity if stock else 0
 
                 # Get quality from supplier
-                quality = component.get_quality_for_session(session)
+                quality = component.get_quality_for_session(session, compatibility_index)
                 quality_display = {
                     'basic': 'Basis',
                     'standard': 'Standard',
@@ -280,7 +278,7 @@ def production_view(request, session_id):
                 }.get(quality, quality or 'Unbekannt')
 
                 # Determine if it's an upgrade for this segment
-                is_upgrade = component.is_quality_upgrade(session, segment)
+                is_upgrade = component.is_quality_upgrade(session, segment, compatibility_index)
 
                 components_info.append({
                     'id': component.id,
@@ -10,7 +10,7 @@ from .models import (
     EventCategory, RandomEvent, EventOccurrence, RegulationTimeline,
     RegulationCompliance, MarketOpportunity, EventChoice
 )
-from finance.models import Transaction
+from finance.ledger import SessionLedger
 
 logger = logging.getLogger(__name__)
 
@@ -18,8 +18,9 @@ logger = logging.getLogger(__name__)
 class RandomEventsEngine:
     """Engine for processing random events and regulatory changes"""
     
-    def __init__(self, session):
+    def __init__(self, session, ledger=None):
         self.session = session
+        self.ledger = ledger or SessionLedger(session, buffered=False)
     
     def process_monthly_events(self):
         """Process all random events and regulatory changes for the current month"""
@@ -170,17 +171,14 @@ class RandomEventsEngine:
             banned_components = regulation.affected_components.all()
             if banned_components.exists():
                 # Check production and inventory for banned components
-                from production.models import ProducedBike
+                from production.inventory import BikeInventory
                 from warehouse.models import ComponentStock
                 
                 # Check recent production (last 3 months)
-                recent_bikes = ProducedBike.objects.filter(
-                    session=self.session,
+                total_bikes = BikeInventory(self.session).produced_quantity(
                     production_year=self.session.current_year,
                     production_month__gte=max(1, self.session.current_month - 3)
                 )
-                
-                total_bikes = recent_bikes.count()
                 compliant_bikes = total_bikes  # Assume compliant unless proven otherwise
                 
                 # For now, assume perfect compliance (would need detailed component tracking)
@@ -242,40 +240,28 @@ class RandomEventsEngine:
             monthly_penalty = base_penalty * Decimal(str(compliance_factor))
             
             if monthly_penalty > 0:
-                self.session.balance -= monthly_penalty
-                self.session.save()
-                
                 compliance.penalties_paid += monthly_penalty
                 
-                # Create transaction record
-                Transaction.objects.create(
-                    session=self.session,
-                    transaction_type='expense',
-                    category='Strafen & Bußgelder',
-                    amount=monthly_penalty,
-                    description=f'Regulatorische Strafe: {regulation.title}',
-                    month=self.session.current_month,
-                    year=self.session.current_year
+                # Book penalty
+                self.ledger.record(
+                    'expense',
+                    'Strafen & Bußgelder',
+                    monthly_penalty,
+                    f'Regulatorische Strafe: {regulation.title}'
                 )
         
         # Apply benefits for good compliance
         elif new_score >= 80:
             benefit_amount = Decimal(str(regulation.benefits.get('compliance_bonus', 0)))
             if benefit_amount > 0:
-                self.session.balance += benefit_amount
-                self.session.save()
-                
                 compliance.benefits_received += benefit_amount
                 
-                # Create transaction record
-                Transaction.objects.create(
-                    session=self.session,
-                    transaction_type='income',
-                    category='Regulatorische Vorteile',
-                    amount=benefit_amount,
-                    description=f'Compliance-Bonus: {regulation.title}',
-                    month=self.session.current_month,
-                    year=self.session.current_year
+                # Book compliance bonus
+                self.ledger.record(
+                    'income',
+                    'Regulatorische Vorteile',
+                    benefit_amount,
+                    f'Compliance-Bonus: {regulation.title}'
                 )
     
     def _trigger_random_events(self):
@@ -451,34 +437,16 @@ class RandomEventsEngine:
         # One-time income
         if 'one_time_income' in financial_effects:
             amount = Decimal(str(financial_effects['one_time_income']))
-            self.session.balance += amount
             applied['one_time_income'] = float(amount)
             
-            Transaction.objects.create(
-                session=self.session,
-                transaction_type='income',
-                category='Zufallsereignisse',
-                amount=amount,
-                description='Einmaliger Ertrag durch Ereignis',
-                month=self.session.current_month,
-                year=self.session.current_year
-            )
+            self.ledger.record('income', 'Zufallsereignisse', amount, 'Einmaliger Ertrag durch Ereignis')
         
         # One-time cost
         if 'one_time_cost' in financial_effects:
             amount = Decimal(str(financial_effects['one_time_cost']))
-            self.session.balance -= amount
             applied['one_time_cost'] = float(amount)
             
-            Transaction.objects.create(
-                session=self.session,
-                transaction_type='expense',
-                category='Zufallsereignisse',
-                amount=amount,
-                description='Einmalige Kosten durch Ereignis',
-                month=self.session.current_month,
-                year=self.session.current_year
-            )
+            self.ledger.record('expense', 'Zufallsereignisse', amount, 'Einmalige Kosten durch Ereignis')
         
         # Monthly income/expenses are handled in ongoing effects
         if 'monthly_income' in financial_effects:
@@ -487,7 +455,6 @@ class RandomEventsEngine:
         if 'monthly_cost' in financial_effects:
             applied['monthly_cost'] = financial_effects['monthly_cost']
         
-        self.session.save()
         return applied
     
     def _apply_regulatory_effects(self, regulatory_effects):
@@ -569,33 +536,21 @@ class RandomEventsEngine:
             
             if 'monthly_income' in financial:
                 amount = Decimal(str(financial['monthly_income']))
-                self.session.balance += amount
-                
-                Transaction.objects.create(
-                    session=self.session,
-                    transaction_type='income',
-                    category='Zufallsereignisse',
-                    amount=amount,
-                    description=f'Monatlicher Ertrag: {event_occurrence.event.title}',
-                    month=self.session.current_month,
-                    year=self.session.current_year
+                self.ledger.record(
+                    'income',
+                    'Zufallsereignisse',
+                    amount,
+                    f'Monatlicher Ertrag: {event_occurrence.event.title}'
                 )
             
             if 'monthly_cost' in financial:
                 amount = Decimal(str(financial['monthly_cost']))
-                self.session.balance -= amount
-                
-                Transaction.objects.create(
-                    session=self.session,
-                    transaction_type='expense',
-                    category='Zufallsereignisse',
-                    amount=amount,
-                    description=f'Monatliche Kosten: {event_occurrence.event.title}',
-                    month=self.session.current_month,
-                    year=self.session.current_year
+                self.ledger.record(
+                    'expense',
+                    'Zufallsereignisse',
+                    amount,
+                    f'Monatliche Kosten: {event_occurrence.event.title}'
                 )
-            
-            self.session.save()
     
     def _cleanup_expired_events(self):
         """Clean up expired events and opportunities"""
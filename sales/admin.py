@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Market, MarketDemand, MarketPriceSensitivity, SalesOrder, SalesDecision
+from .models import Market, MarketDemand, MarketPriceSensitivity, MonthlyDemand, SalesOrder, SalesDecision
 
 
 @admin.register(Market)
@@ -15,6 +15,12 @@ class MarketDemandAdmin(admin.ModelAdmin):
     list_filter = ['market', 'bike_type', 'session']
 
 
+@admin.register(MonthlyDemand)
+class MonthlyDemandAdmin(admin.ModelAdmin):
+    list_display = ['market', 'bike_type', 'month', 'year', 'demand', 'session']
+    list_filter = ['year', 'month', 'market', 'session']
+
+
 @admin.register(MarketPriceSensitivity)
 class MarketPriceSensitivityAdmin(admin.ModelAdmin):
     list_display = ['market', 'price_segment', 'percentage', 'session']
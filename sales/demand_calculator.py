@@ -3,6 +3,14 @@ Demand Calculator for Sales
 
 Calculates actual and estimated market demand for bikes.
 Handles market research precision to provide better estimates to players.
+
+The actual ("true") demand of a month is drawn once per session and month
+into MonthlyDemand, when the session is set up and at the month rollover.
+Estimates, market research and the MarketSimulator read it from there with one
+query per month, so the demand no longer shifts with every page refresh.
+Readers never write: a combination without a row (a session from before the
+table, a market or bike type added during the month) reads its expected
+demand, the same formula without the random factor.
 """
 
 from decimal import Decimal
@@ -14,40 +22,111 @@ import random
 class DemandCalculator:
     """Calculate market demand with research-based precision."""
 
-    def __init__(self, session):
+    def __init__(self, session, state=None):
         self.session = session
-
-    def calculate_actual_demand(self, market, bike_type, month, year):
+        # Shared SessionState of the month processing (markets, bike types, demand shares)
+        self.state = state
+        # (month, year) -> {(market_id, bike_type_id): demand}
+        self._monthly_demand = {}
+        # ({(market_id, bike_type_id): demand percentage}, default percentage)
+        self._demand_shares = None
+
+    def get_monthly_demand(self, month, year):
         """
-        Calculate the actual monthly demand for a bike type in a market.
+        Actual demand of all market/bike type combinations of a month.
 
-        This is the "true" demand that players don't see directly.
+        Returns:
+            dict: {(market_id, bike_type_id): demand}
+        """
+        from .models import MonthlyDemand
+
+        key = (month, year)
+        if key not in self._monthly_demand:
+            self._monthly_demand[key] = {
+                (market_id, bike_type_id): value
+                for market_id, bike_type_id, value in MonthlyDemand.objects.filter(
+                    session=self.session, month=month, year=year
+                ).values_list('market_id', 'bike_type_id', 'demand')
+            }
+        return self._monthly_demand[key]
 
-        Args:
-            market: Market object
-            bike_type: BikeType object
-            month: Current month
-            year: Current year
+    def generate_monthly_demand(self, month, year):
+        """
+        Draws the actual demand of a month for all combinations without one.
 
-        Returns:
-            int: Actual monthly demand in bikes
+        Existing rows are kept, so calling this again (e.g. after a market
+        was added) never changes a month's demand.
         """
-        from .models import MarketDemand
+        from .models import Market, MonthlyDemand
+        from bikeshop.models import BikeType
+
+        existing = set(MonthlyDemand.objects.filter(
+            session=self.session, month=month, year=year
+        ).values_list('market_id', 'bike_type_id'))
+
+        if self.state is not None:
+            markets = list(self.state.markets.values())
+            bike_types = list(self.state.bike_types.values())
+        else:
+            markets = list(Market.objects.filter(session=self.session))
+            bike_types = list(BikeType.objects.filter(session=self.session))
+        seasonal_modifier = self._seasonal_modifier(month)
 
-        # Get base demand from MarketDemand model
-        try:
-            market_demand = MarketDemand.objects.get(
+        MonthlyDemand.objects.bulk_create([
+            MonthlyDemand(
                 session=self.session,
                 market=market,
-                bike_type=bike_type
+                bike_type=bike_type,
+                month=month,
+                year=year,
+                demand=self._draw_demand(
+                    market, bike_type, self._demand_percentage(market, bike_type), seasonal_modifier
+                )
             )
-            demand_percentage = market_demand.demand_percentage
-        except MarketDemand.DoesNotExist:
+            for market in markets
+            for bike_type in bike_types
+            if (market.id, bike_type.id) not in existing
+        ], ignore_conflicts=True)
+
+        demand = {
+            (market_id, bike_type_id): value
+            for market_id, bike_type_id, value in MonthlyDemand.objects.filter(
+                session=self.session, month=month, year=year
+            ).values_list('market_id', 'bike_type_id', 'demand')
+        }
+        self._monthly_demand[(month, year)] = demand
+        return demand
+
+    def _demand_percentage(self, market, bike_type):
+        """Nachfrageanteil eines Fahrradtyps in einem Markt (Anteile einmal je Rechner geladen)"""
+        from .models import MarketDemand
+        from bikeshop.models import BikeType
+
+        if self._demand_shares is None:
+            if self.state is not None:
+                percentages = {key: demand.demand_percentage for key, demand in self.state.market_demands.items()}
+                bike_type_count = len(self.state.bike_types)
+            else:
+                percentages = {
+                    (market_id, bike_type_id): percentage
+                    for market_id, bike_type_id, percentage in MarketDemand.objects.filter(
+                        session=self.session
+                    ).values_list('market_id', 'bike_type_id', 'demand_percentage')
+                }
+                bike_type_count = BikeType.objects.filter(session=self.session).count()
             # Default to equal distribution if not configured
-            from bikeshop.models import BikeType
-            bike_types_count = BikeType.objects.filter(session=self.session).count()
-            demand_percentage = 100.0 / bike_types_count if bike_types_count > 0 else 0
+            self._demand_shares = (percentages, 100.0 / bike_type_count if bike_type_count else 0)
+
+        percentages, default_percentage = self._demand_shares
+        return percentages.get((market.id, bike_type.id), default_percentage)
 
+    def _seasonal_modifier(self, month):
+        from multiplayer.parameter_utils import are_seasonal_effects_enabled
+
+        return self._get_seasonal_modifier(month) if are_seasonal_effects_enabled(self.session) else 1.0
+
+    def _draw_demand(self, market, bike_type, demand_percentage, seasonal_modifier, random_modifier=None):
+        """Würfelt die Monatsnachfrage einer Markt/Fahrradtyp-Kombination aus"""
         # Calculate base demand from market capacity
         base_demand = int(market.monthly_volume_capacity * (demand_percentage / 100.0))
 
@@ -56,15 +135,39 @@ class DemandCalculator:
         actual_demand = int(base_demand * location_modifier)
 
         # Add seasonal variation (±15%)
-        seasonal_modifier = self._get_seasonal_modifier(month)
         actual_demand = int(actual_demand * seasonal_modifier)
 
         # Add some randomness (±10%) to keep it interesting
-        random_modifier = random.uniform(0.90, 1.10)
+        if random_modifier is None:
+            random_modifier = random.uniform(0.90, 1.10)
         actual_demand = int(actual_demand * random_modifier)
 
         return max(0, actual_demand)
 
+    def calculate_actual_demand(self, market, bike_type, month, year):
+        """
+        Get the actual monthly demand for a bike type in a market.
+
+        This is the "true" demand that players don't see directly.
+
+        Args:
+            market: Market object
+            bike_type: BikeType object
+            month: Current month
+            year: Current year
+
+        Returns:
+            int: Actual monthly demand in bikes
+        """
+        demand = self.get_monthly_demand(month, year).get((market.id, bike_type.id))
+        if demand is None:
+            # Not drawn yet: expected demand, stable until the next rollover draws it
+            demand = self._draw_demand(
+                market, bike_type, self._demand_percentage(market, bike_type), self._seasonal_modifier(month),
+                random_modifier=1.0
+            )
+        return demand
+
     def get_demand_estimate(self, market, bike_type, month, year):
         """
         Get demand estimate for a player based on their market research.
@@ -84,36 +187,37 @@ class DemandCalculator:
                 'precision': float
             }
         """
-        from .models_market_research import MarketResearch
+        from .research_estimates import get_research_estimates
 
         # Calculate actual demand
         actual_demand = self.calculate_actual_demand(market, bike_type, month, year)
 
-        # Check if player has research for this market/bike combination
-        try:
-            research = MarketResearch.objects.get(
-                session=self.session,
-                market=market,
-                bike_type=bike_type
-            )
+        # Precomputed research range for this market/bike combination (cached per session)
+        research = get_research_estimates(self.session).get((market.id, bike_type.id))
 
-            # Check if research is expired
-            if research.is_expired():
-                # Research expired - use default estimates
-                estimated_min, estimated_max = MarketResearch.get_default_estimates(actual_demand)
-                research_level = 'none'
-                precision = MarketResearch.RESEARCH_PRECISION['none']
-            else:
-                # Use research-based estimates
-                estimated_min, estimated_max = research.calculate_estimates(actual_demand)
-                research_level = research.research_level
-                precision = research.get_precision_modifier()
+        return self._estimate(actual_demand, research)
+
+    def _estimate(self, actual_demand, research):
+        """
+        Schätzbereich zur tatsächlichen Nachfrage.
 
-        except MarketResearch.DoesNotExist:
-            # No research - use default (very wide) estimates
+        ``research`` is the precomputed (level, demand, min, max, expires_at)
+        tuple from get_research_estimates or None. A range stored for another
+        month's demand is scaled to the current one.
+        """
+        from .models_market_research import MarketResearch
+
+        if research is None or research[4] <= timezone.now().timestamp():
+            # No or expired research - use default (very wide) estimates
             estimated_min, estimated_max = MarketResearch.get_default_estimates(actual_demand)
             research_level = 'none'
-            precision = MarketResearch.RESEARCH_PRECISION['none']
+        else:
+            research_level, research_demand, estimated_min, estimated_max, _ = research
+            if research_demand != actual_demand:
+                estimated_min, estimated_max = self._scale_estimates(
+                    research_level, research_demand, estimated_min, estimated_max, actual_demand
+                )
+        precision = MarketResearch.RESEARCH_PRECISION.get(research_level, MarketResearch.RESEARCH_PRECISION['none'])
 
         return {
             'actual': actual_demand,  # Hidden from player in UI
@@ -124,18 +228,36 @@ class DemandCalculator:
             'precision_percentage': int(precision * 100)
         }
 
+    @staticmethod
+    def _scale_estimates(research_level, research_demand, estimated_min, estimated_max, actual_demand):
+        """Überträgt einen gespeicherten Schätzbereich auf eine andere Nachfrage"""
+        from .models_market_research import MarketResearch
+
+        if research_demand:
+            scale = actual_demand / research_demand
+            return int(round(estimated_min * scale)), int(round(estimated_max * scale))
+
+        range_size = int(actual_demand * MarketResearch.RESEARCH_PRECISION.get(research_level, 0.60))
+        return max(0, actual_demand - range_size), actual_demand + range_size
+
     def get_all_market_estimates(self, month, year):
         """
         Get demand estimates for all markets and bike types.
 
+        Demand is read with one query and the research ranges come from the
+        cache, independent of the number of markets and bike types.
+
         Returns:
             dict: Nested dict of estimates by market and bike type
         """
         from .models import Market
+        from .research_estimates import get_research_estimates
         from bikeshop.models import BikeType
 
         markets = Market.objects.filter(session=self.session)
-        bike_types = BikeType.objects.filter(session=self.session)
+        bike_types = list(BikeType.objects.filter(session=self.session))
+        monthly_demand = self.get_monthly_demand(month, year)
+        research_estimates = get_research_estimates(self.session)
 
         estimates = {}
 
@@ -146,7 +268,10 @@ class DemandCalculator:
             }
 
             for bike_type in bike_types:
-                estimate = self.get_demand_estimate(market, bike_type, month, year)
+                actual_demand = monthly_demand.get((market.id, bike_type.id))
+                if actual_demand is None:
+                    actual_demand = self.calculate_actual_demand(market, bike_type, month, year)
+                estimate = self._estimate(actual_demand, research_estimates.get((market.id, bike_type.id)))
                 estimates[market.id]['bike_types'][bike_type.id] = {
                     'bike_type': bike_type,
                     **estimate
@@ -5,18 +5,26 @@ This module handles the deferred sales system where player sales decisions
 are stored and then executed during month processing with market simulation.
 """
 
+from collections import defaultdict
 from django.db import transaction, models
 from decimal import Decimal
 import random
 import logging
 
-from .models import Market, SalesDecision, SalesOrder
-from production.models import ProducedBike
-from finance.models import Transaction
+from .models import Market, SalesDecision
+from .demand_calculator import DemandCalculator
+from .offer_book import OfferBook
+from .settlement import SaleSettlement
+from production.inventory import BikeInventory
+from finance.ledger import SessionLedger
+from simulation.session_state import SessionState
 from competitors.models import AICompetitor, CompetitorSale, CompetitorProduction
 
 logger = logging.getLogger(__name__)
 
+# SalesDecision fields set by the market simulation
+DECISION_RESULT_FIELDS = ['quantity_sold', 'is_processed', 'unsold_reason', 'actual_revenue']
+
 
 class MarketSimulator:
     """
@@ -27,8 +35,12 @@ class MarketSimulator:
     market characteristics.
     """
 
-    def __init__(self, session):
+    def __init__(self, session, ledger=None, state=None):
         self.session = session
+        self.bike_inventory = BikeInventory(session)
+        self.ledger = ledger or SessionLedger(session, buffered=False)
+        self.state = state or SessionState(session)
+        self.demand_calculator = DemandCalculator(session, state=self.state)
 
     def process_pending_sales_decisions(self, month, year):
         """
@@ -59,21 +71,54 @@ class MarketSimulator:
                     market_segments[key] = []
                 market_segments[key].append(decision)
 
+            # Competitor stock is read once for all segments
+            self._load_competitor_productions()
+
             # Process each market segment
             for (market_id, bike_type_id, price_segment), decisions in market_segments.items():
-                market = Market.objects.get(id=market_id)
-                from bikeshop.models import BikeType
-                bike_type = BikeType.objects.get(id=bike_type_id)
-
                 self._process_market_segment(
-                    market=market,
-                    bike_type=bike_type,
+                    market=decisions[0].market,
+                    bike_type=decisions[0].bike_type,
                     price_segment=price_segment,
                     player_decisions=decisions,
                     month=month,
                     year=year
                 )
 
+            self._flush_sales()
+
+    def _load_competitor_productions(self):
+        """Konkurrenzbestände nach (Fahrradtyp-ID, Preissegment) und leere Schreibpuffer"""
+        self._competitor_productions = defaultdict(list)
+        for production in CompetitorProduction.objects.filter(
+            competitor__session=self.session,
+            quantity_in_inventory__gt=0
+        ).order_by('id'):
+            production.competitor = self.state.get_competitor(production.competitor_id)
+            production.bike_type = self.state.get_bike_type(production.bike_type_id)
+            self._competitor_productions[(production.bike_type_id, production.price_segment)].append(production)
+
+        # Written by _flush_sales
+        self._processed_decisions = []
+        self._changed_productions = {}
+        self._changed_competitors = {}
+        self._competitor_sales = []
+
+    def _flush_sales(self):
+        """Schreibt Entscheidungen und Konkurrenzverkäufe aller Segmente mit je einer Anweisung"""
+        if self._processed_decisions:
+            SalesDecision.objects.bulk_update(self._processed_decisions, DECISION_RESULT_FIELDS)
+        if self._changed_productions:
+            CompetitorProduction.objects.bulk_update(
+                list(self._changed_productions.values()), ['quantity_in_inventory']
+            )
+        if self._competitor_sales:
+            CompetitorSale.objects.bulk_create(self._competitor_sales)
+        if self._changed_competitors:
+            AICompetitor.objects.bulk_update(
+                list(self._changed_competitors.values()), ['total_bikes_sold', 'total_revenue']
+            )
+
     def _process_market_segment(self, market, bike_type, price_segment, player_decisions, month, year):
         """
         Process sales for a specific market/bike_type/segment combination.
@@ -86,59 +131,60 @@ class MarketSimulator:
         logger.info(f"Processing market segment: {market.name} - {bike_type.name} ({price_segment})")
 
         # Calculate market demand for this segment
-        base_demand = self._calculate_market_demand(market, bike_type, price_segment, month)
+        base_demand = self._calculate_market_demand(market, bike_type, price_segment, month, year)
         logger.info(f"Base demand: {base_demand} bikes")
 
-        # Collect all offers (player + competitors)
-        all_offers = []
+        # Collect all offers (player + competitors) in one offer book
+        book = OfferBook()
+        player_units = 0
 
-        # Add player offers
+        # Add player offers (drawn FIFO from the inventory lots, oldest bikes first)
+        reserved = {}
         for decision in player_decisions:
-            # Find available bikes for this decision
-            available_bikes = ProducedBike.objects.filter(
-                session=self.session,
-                bike_type=bike_type,
-                price_segment=price_segment,
-                is_sold=False
-            )[:decision.quantity]
+            allocation = self.bike_inventory.allocate_fifo(
+                bike_type, price_segment, decision.quantity, reserved=reserved
+            )
+            allocated = sum(quantity for _, quantity in allocation)
 
-            if len(available_bikes) < decision.quantity:
+            if allocated < decision.quantity:
                 logger.warning(
-                    f"Decision {decision.id}: Requested {decision.quantity} bikes but only {len(available_bikes)} available"
+                    f"Decision {decision.id}: Requested {decision.quantity} bikes but only {allocated} available"
                 )
 
-            # Create offers for each bike
-            for bike in available_bikes:
+            # One offer per inventory lot (age cohort)
+            quality_factor = self._get_quality_factor(price_segment)
+            for lot, quantity in allocation:
                 # Apply aging penalty to effective price
-                age_penalty = bike.get_age_penalty_factor() if hasattr(bike, 'get_age_penalty_factor') else 1.0
+                age_penalty = lot.get_age_penalty_factor()
                 effective_price = decision.desired_price * Decimal(str(age_penalty))
-
-                all_offers.append({
+                offer = {
                     'type': 'player',
                     'decision': decision,
-                    'bike': bike,
+                    'lot': lot,
                     'price': effective_price,
                     'transport_cost': decision.transport_cost,
-                    'quality_factor': self._get_quality_factor(price_segment),
-                })
+                    'quality_factor': quality_factor,
+                    'quantity': quantity,
+                }
+                book.add(offer, ('player', decision.id), effective_price, quality_factor, quantity)
+                player_units += quantity
 
         # Add competitor offers
         competitor_offers = self._collect_competitor_offers(market, bike_type, price_segment, month, year)
-        all_offers.extend(competitor_offers)
-
-        logger.info(f"Total offers: {len(all_offers)} ({len([o for o in all_offers if o['type'] == 'player'])} player, {len(competitor_offers)} competitor)")
-
-        # Sort offers by effective price (lower prices sell first)
-        # Add small random factor for realism (10% variance)
-        for offer in all_offers:
-            random_factor = random.uniform(0.95, 1.05)
-            offer['sort_price'] = float(offer['price']) * random_factor / offer['quality_factor']
+        for offer in competitor_offers:
+            book.add(
+                offer, ('competitor', offer['production'].id), offer['price'], offer['quality_factor'],
+                offer['quantity']
+            )
 
-        all_offers.sort(key=lambda x: x['sort_price'])
+        logger.info(
+            f"Total offers: {len(book)} for {book.total_quantity} bikes "
+            f"({player_units} player, {book.total_quantity - player_units} competitor)"
+        )
 
         # Apply price elasticity - higher average prices reduce demand
-        if all_offers:
-            avg_price = sum(float(offer['price']) for offer in all_offers) / len(all_offers)
+        if book.total_quantity:
+            avg_price = book.average_price()
             # Simple elasticity model: for each 10% price increase above base, demand drops by elasticity_factor%
             base_price = self._get_base_price_for_segment(price_segment)
             price_ratio = avg_price / base_price if base_price > 0 else 1.0
@@ -149,32 +195,29 @@ class MarketSimulator:
         else:
             adjusted_demand = base_demand
 
-        # Allocate sales based on demand
-        bikes_to_sell = min(len(all_offers), adjusted_demand)
-        logger.info(f"Allocating {bikes_to_sell} sales out of {len(all_offers)} offers (demand: {adjusted_demand})")
+        # Rank offers by effective price (lower prices sell first, 10% random jitter)
+        # and allocate the demand to the top offers
+        clearing = book.allocate(adjusted_demand)
+        logger.info(f"Allocating {clearing.units_sold} sales out of {book.total_quantity} bikes (demand: {adjusted_demand})")
 
-        # Execute sales for the top offers
-        for i, offer in enumerate(all_offers[:bikes_to_sell]):
+        player_sales = []
+        for offer, sold, unsold in clearing.ranked():
             if offer['type'] == 'player':
-                self._execute_player_sale(offer, month, year)
-            else:
-                self._execute_competitor_sale(offer, month, year)
+                if sold:
+                    player_sales.append((offer, sold))
+                if unsold:
+                    # Update decision statistics but don't mark as fully processed yet
+                    # We'll mark as processed after aggregating all results
+                    decision = offer['decision']
+                    decision._temp_unsold_count = getattr(decision, '_temp_unsold_count', 0) + unsold
+            elif sold:
+                self._execute_competitor_sale(offer, sold, month, year)
+
+        self._execute_player_sales(market, bike_type, player_sales, month, year)
 
         # Mark remaining offers as unsold
-        oversaturated_count = len(all_offers) - bikes_to_sell
-        if oversaturated_count > 0:
-            logger.info(f"Market oversaturated: {oversaturated_count} bikes did not sell")
-
-        for offer in all_offers[bikes_to_sell:]:
-            if offer['type'] == 'player':
-                decision = offer['decision']
-                # Update decision statistics but don't mark as fully processed yet
-                # We'll mark as processed after aggregating all results
-                if not hasattr(decision, '_temp_sold_count'):
-                    decision._temp_sold_count = 0
-                if not hasattr(decision, '_temp_unsold_count'):
-                    decision._temp_unsold_count = 0
-                decision._temp_unsold_count += 1
+        if clearing.units_unsold > 0:
+            logger.info(f"Market oversaturated: {clearing.units_unsold} bikes did not sell")
 
         # Mark all player decisions as processed and update results
         for decision in player_decisions:
@@ -190,27 +233,26 @@ class MarketSimulator:
                 else:
                     decision.unsold_reason = 'partially_sold_market_oversaturated'
 
-            decision.save()
+            self._processed_decisions.append(decision)
             logger.info(
                 f"Decision {decision.id} processed: {sold_count}/{decision.quantity} sold"
                 + (f" ({decision.unsold_reason})" if decision.unsold_reason else "")
             )
 
-    def _calculate_market_demand(self, market, bike_type, price_segment, month):
+    def _calculate_market_demand(self, market, bike_type, price_segment, month, year=None):
         """
         Calculate market demand for a specific bike type/segment.
 
-        Considers:
-        - Market's monthly_volume_capacity
-        - Location characteristics (e.g., green_city_factor for e-bikes)
-        - Segment-specific demand distribution
-        - Seasonal factors
+        The month's actual demand for the bike type in this market is drawn
+        once per month into MonthlyDemand (capacity, demand share, location
+        characteristics, season and random variation, see DemandCalculator),
+        so the simulator sells against the same demand the players' estimates
+        and market research are based on. It is split over the price segments
+        here.
         """
-        # Base capacity
-        base_capacity = market.monthly_volume_capacity
-
-        # Adjust for bike type based on location characteristics
-        bike_type_multiplier = market.get_bike_type_demand_multiplier(bike_type.name)
+        monthly_demand = self.demand_calculator.calculate_actual_demand(
+            market, bike_type, month, year or self.session.current_year
+        )
 
         # Segment distribution (simpler segments have higher demand)
         segment_distribution = {
@@ -220,53 +262,15 @@ class MarketSimulator:
         }
         segment_factor = segment_distribution.get(price_segment, 0.33)
 
-        # Seasonal adjustment
-        seasonal_factor = self._get_seasonal_factor(bike_type.name, month)
-
         # Calculate final demand
-        demand = int(base_capacity * bike_type_multiplier * segment_factor * seasonal_factor)
+        demand = int(monthly_demand * segment_factor)
 
         logger.debug(
-            f"Demand calculation: base={base_capacity}, bike_type_mult={bike_type_multiplier:.2f}, "
-            f"segment={segment_factor:.2f}, seasonal={seasonal_factor:.2f}, final={demand}"
+            f"Demand calculation: monthly={monthly_demand}, segment={segment_factor:.2f}, final={demand}"
         )
 
         return max(1, demand)  # Ensure at least 1 bike can be sold
 
-    def _get_seasonal_factor(self, bike_type_name, month):
-        """Get seasonal demand adjustment factor"""
-        from multiplayer.parameter_utils import are_seasonal_effects_enabled
-
-        # Check if seasonal effects are enabled via game parameters
-        if not are_seasonal_effects_enabled(self.session):
-            return 1.0  # No seasonal variation when disabled
-
-        bike_type_lower = bike_type_name.lower()
-
-        # Mountain bikes peak in summer
-        if 'mountain' in bike_type_lower or 'mtb' in bike_type_lower:
-            if month in [5, 6, 7, 8]:  # May-August
-                return 1.3
-            elif month in [11, 12, 1, 2]:  # Winter
-                return 0.7
-
-        # Road/Racing bikes peak in spring/summer
-        if 'road' in bike_type_lower or 'racing' in bike_type_lower or 'rennrad' in bike_type_lower:
-            if month in [4, 5, 6, 7, 8]:  # April-August
-                return 1.2
-            elif month in [11, 12, 1, 2]:  # Winter
-                return 0.8
-
-        # E-bikes have steadier demand but peak in fall
-        if 'e-' in bike_type_lower or 'elektro' in bike_type_lower:
-            if month in [9, 10]:  # September-October
-                return 1.2
-            elif month in [12, 1, 2]:  # Winter
-                return 0.9
-
-        # City bikes are relatively stable year-round
-        return 1.0
-
     def _get_base_price_for_segment(self, price_segment):
         """Get base price for a segment for elasticity calculations"""
         base_prices = {
@@ -289,13 +293,11 @@ class MarketSimulator:
         """Collect competitor sales offers for this market segment"""
         offers = []
 
-        # Get all competitors with inventory for this segment
-        competitor_productions = CompetitorProduction.objects.filter(
-            competitor__session=self.session,
-            bike_type=bike_type,
-            price_segment=price_segment,
-            quantity_in_inventory__gt=0
-        ).select_related('competitor')
+        # Competitors with inventory for this segment (see _load_competitor_productions)
+        competitor_productions = [
+            production for production in self._competitor_productions.get((bike_type.id, price_segment), [])
+            if production.quantity_in_inventory > 0
+        ]
 
         for production in competitor_productions:
             competitor = production.competitor
@@ -320,15 +322,15 @@ class MarketSimulator:
             # Quality factor
             quality_factor = self._get_competitor_quality_factor(competitor, price_segment)
 
-            for _ in range(max_offer):
-                offers.append({
-                    'type': 'competitor',
-                    'competitor': competitor,
-                    'production': production,
-                    'price': final_price,
-                    'transport_cost': market.transport_cost_foreign,
-                    'quality_factor': quality_factor,
-                })
+            offers.append({
+                'type': 'competitor',
+                'competitor': competitor,
+                'production': production,
+                'price': final_price,
+                'transport_cost': market.transport_cost_foreign,
+                'quality_factor': quality_factor,
+                'quantity': max_offer,
+            })
 
         return offers
 
@@ -374,95 +376,92 @@ class MarketSimulator:
 
         return final_quality
 
-    def _execute_player_sale(self, offer, month, year):
-        """Execute a successful player sale"""
-        decision = offer['decision']
-        bike = offer['bike']
-
-        # Track sold count on decision
-        if not hasattr(decision, '_temp_sold_count'):
-            decision._temp_sold_count = 0
-        decision._temp_sold_count += 1
-
-        # Transport cost is per shipment, not per bike
-        # Only apply it on the first bike sold in this decision
-        transport_cost_for_this_bike = Decimal('0')
-        if decision._temp_sold_count == 1:
-            # First bike sold - apply the one-time transport cost
-            transport_cost_for_this_bike = offer['transport_cost']
-
-        # Create sales order
-        sales_order = SalesOrder.objects.create(
-            session=self.session,
-            market=decision.market,
-            bike=bike,
-            sale_month=month,
-            sale_year=year,
-            sale_price=offer['price'],
-            transport_cost=transport_cost_for_this_bike,  # Only first bike has transport cost
-            is_completed=True
-        )
+    def _execute_player_sales(self, market, bike_type, sales, month, year):
+        """
+        Execute the successful player sales of a segment in one settlement.
+
+        ``sales`` holds (offer, quantity sold) in sale order. The bikes are
+        taken from their lots together, the SalesOrders are bulk inserted and
+        the revenue is booked as one ledger entry.
+        """
+        if not sales:
+            return
 
-        # Mark bike as sold
-        bike.is_sold = True
-        bike.save()
+        taken = self.bike_inventory.take_many([(offer['lot'], sold) for offer, sold in sales])
+        settlement = SaleSettlement(self.session, month, year)
 
-        # Calculate revenue (only first bike pays transport)
-        revenue = offer['price'] - transport_cost_for_this_bike
+        for (offer, sold), bikes in zip(sales, taken):
+            decision = offer['decision']
+            if len(bikes) < sold:
+                logger.warning(
+                    f"Decision {decision.id}: inventory lot {offer['lot'].id} had only {len(bikes)} of {sold} bikes left"
+                )
+                decision._temp_unsold_count = getattr(decision, '_temp_unsold_count', 0) + sold - len(bikes)
 
-        # Update session balance
-        self.session.balance += revenue
-        self.session.save()
+            for bike in bikes:
+                # Track sold count on decision
+                decision._temp_sold_count = getattr(decision, '_temp_sold_count', 0) + 1
 
-        # Update decision actual revenue
-        decision.actual_revenue += revenue
-        decision.save()
+                # Transport cost is per shipment, not per bike
+                # Only apply it on the first bike sold in this decision
+                transport_cost = offer['transport_cost'] if decision._temp_sold_count == 1 else Decimal('0')
 
-        # Create transaction record
-        Transaction.objects.create(
-            session=self.session,
-            transaction_type='income',
-            category='Verkäufe',
-            amount=revenue,
-            description=f'Verkauf {bike.bike_type.name} ({bike.get_price_segment_display()}) an {decision.market.name}',
+                order = settlement.add(decision.market, bike, offer['price'], transport_cost)
+                decision.actual_revenue += order.net_revenue
+
+        if not settlement:
+            return
+
+        # Bikes were marked sold by take_many
+        revenue = settlement.settle(mark_sold=False)
+
+        # Book revenue (written with the month's other ledger entries)
+        self.ledger.record(
+            'income',
+            'Verkäufe',
+            revenue,
+            f'Verkauf {len(settlement)}x {bike_type.name} '
+            f'({settlement.orders[0].bike.get_price_segment_display()}) an {market.name}',
             month=month,
             year=year
         )
 
-        logger.debug(f"Player sale executed: {bike.bike_type.name} for {offer['price']}€ (net: {revenue}€)")
+        logger.debug(f"Player sales executed: {len(settlement)}x {bike_type.name} (net: {revenue}€)")
 
-    def _execute_competitor_sale(self, offer, month, year):
-        """Execute a successful competitor sale"""
+    def _execute_competitor_sale(self, offer, quantity, month, year):
+        """Execute the successful sales of a competitor offer (written by _flush_sales)"""
         competitor = offer['competitor']
         production = offer['production']
+        revenue = offer['price'] * quantity
 
         # Update production inventory
-        production.quantity_in_inventory -= 1
-        production.save()
+        production.quantity_in_inventory -= quantity
+        self._changed_productions[production.id] = production
 
         # Create competitor sale record
-        from sales.models import Market
-        market = Market.objects.filter(session=self.session).first()  # Simplified for now
+        market = next(iter(self.state.markets.values()), None)  # Simplified for now
 
-        CompetitorSale.objects.create(
+        self._competitor_sales.append(CompetitorSale(
             competitor=competitor,
             market=market,
             bike_type=production.bike_type,
             price_segment=production.price_segment,
             month=month,
             year=year,
-            quantity_offered=1,
-            quantity_sold=1,
+            quantity_offered=quantity,
+            quantity_sold=quantity,
             sale_price=offer['price'],
-            total_revenue=offer['price']
-        )
+            total_revenue=revenue
+        ))
 
         # Update competitor statistics
-        competitor.total_bikes_sold += 1
-        competitor.total_revenue += offer['price']
-        competitor.save()
+        competitor.total_bikes_sold += quantity
+        competitor.total_revenue += revenue
+        self._changed_competitors[competitor.id] = competitor
 
-        logger.debug(f"Competitor sale executed: {competitor.name} - {production.bike_type.name} for {offer['price']}€")
+        logger.debug(
+            f"Competitor sale executed: {competitor.name} - {quantity}x {production.bike_type.name} for {offer['price']}€"
+        )
 
     def get_pending_decisions_summary(self):
         """Get summary of pending sales decisions for UI feedback"""
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bikeshop', '0008_effective_values'),
+        ('sales', '0005_add_market_research'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyDemand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.IntegerField()),
+                ('year', models.IntegerField()),
+                ('demand', models.IntegerField(help_text='Actual monthly demand in bikes (hidden from player)')),
+                ('bike_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bikeshop.biketype')),
+                ('market', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='sales.market')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bikeshop.gamesession')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['session', 'year', 'month'], name='sales_month_session_fbc697_idx')],
+                'unique_together': {('session', 'market', 'bike_type', 'month', 'year')},
+            },
+        ),
+    ]
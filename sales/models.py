@@ -59,6 +59,20 @@ class MarketDemand(models.Model):
     bike_type = models.ForeignKey(BikeType, on_delete=models.CASCADE)
     demand_percentage = models.FloatField()  # Anteil der Nachfrage für diesen Fahrradtyp
 
+
+class MonthlyDemand(models.Model):
+    """Tatsächliche Monatsnachfrage je Markt und Fahrradtyp (einmal pro Monat ausgewürfelt)"""
+    session = models.ForeignKey(GameSession, on_delete=models.CASCADE)
+    market = models.ForeignKey(Market, on_delete=models.CASCADE)
+    bike_type = models.ForeignKey(BikeType, on_delete=models.CASCADE)
+    month = models.IntegerField()
+    year = models.IntegerField()
+    demand = models.IntegerField(help_text="Actual monthly demand in bikes (hidden from player)")
+
+    class Meta:
+        unique_together = ['session', 'market', 'bike_type', 'month', 'year']
+        indexes = [models.Index(fields=['session', 'year', 'month'])]
+
 class MarketPriceSensitivity(models.Model):
     """Preissensibilität des Marktes"""
     session = models.ForeignKey(GameSession, on_delete=models.CASCADE)
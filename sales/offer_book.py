@@ -0,0 +1,154 @@
+"""
+Angebotsbuch eines Marktsegments.
+
+MarketSimulator and MultiplayerSimulationEngine used to build a dict per bike,
+draw a random factor and a ``sort_price`` for every dict in Python, sort the
+list and walk it. OfferBook keeps prices, quality factors, quantities and
+seller ids as NumPy arrays, so a segment is cleared with a handful of array
+operations.
+
+An offer stands for ``quantity`` identical units (one decision and age cohort,
+one competitor production), so selling 400 bikes is one offer with a partial
+fill instead of 400 offers. The ranking is still done per unit, exactly as
+before: every unit draws its own jitter from U(0.95, 1.05) and units sell in
+ascending order of ``price * jitter / quality_factor``. Only the per-unit work
+moved from Python dicts into arrays, so results are distributed exactly as
+with one offer per bike. The jitter generator is seeded from ``random``, so
+``random.seed()`` still makes a month reproducible.
+"""
+import random
+
+import numpy as np
+
+PRICE_JITTER = (0.95, 1.05)
+
+
+def default_rng():
+    """NumPy-Generator, der dem ``random``-Modul folgt"""
+    return np.random.default_rng(random.getrandbits(64))
+
+
+class OfferBook:
+    """Angebote (Spieler und Konkurrenz) eines Markt/Fahrradtyp/Segment-Paares"""
+
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else default_rng()
+        # Payload per offer, handed back by the allocation
+        self.offers = []
+        # Distinct sellers; seller_ids index into this list
+        self.sellers = []
+        self._seller_codes = {}
+        self._prices = []
+        self._quality_factors = []
+        self._quantities = []
+        self._seller_ids = []
+        # NumPy views of the lists above, rebuilt after add()
+        self._arrays = {}
+
+    def __len__(self):
+        return len(self.offers)
+
+    def add(self, offer, seller, price, quality_factor, quantity=1):
+        """Fügt ein Angebot über ``quantity`` Einheiten hinzu"""
+        code = self._seller_codes.get(seller)
+        if code is None:
+            code = self._seller_codes[seller] = len(self.sellers)
+            self.sellers.append(seller)
+
+        self.offers.append(offer)
+        self._prices.append(float(price))
+        self._quality_factors.append(float(quality_factor))
+        self._quantities.append(int(quantity))
+        self._seller_ids.append(code)
+        self._arrays = {}
+        return len(self.offers) - 1
+
+    def _array(self, name, dtype):
+        array = self._arrays.get(name)
+        if array is None:
+            array = self._arrays[name] = np.asarray(getattr(self, f'_{name}'), dtype=dtype)
+        return array
+
+    @property
+    def prices(self):
+        return self._array('prices', np.float64)
+
+    @property
+    def quality_factors(self):
+        return self._array('quality_factors', np.float64)
+
+    @property
+    def quantities(self):
+        return self._array('quantities', np.int64)
+
+    @property
+    def seller_ids(self):
+        return self._array('seller_ids', np.int64)
+
+    @property
+    def total_quantity(self):
+        return int(sum(self._quantities))
+
+    def average_price(self):
+        """Mengengewichteter Durchschnittspreis (0 ohne Angebote)"""
+        quantities = self.quantities
+        if not quantities.sum():
+            return 0.0
+        return float(np.dot(self.prices, quantities) / quantities.sum())
+
+    def rank(self):
+        """
+        Zieht den Preisaufschlag je Einheit und sortiert alle Einheiten.
+
+        Returns the offer index of every unit in sale order and the matching
+        sort prices.
+        """
+        unit_offers = np.repeat(np.arange(len(self.offers)), self.quantities)
+        noise = self.rng.uniform(PRICE_JITTER[0], PRICE_JITTER[1], size=len(unit_offers))
+        sort_prices = (self.prices / self.quality_factors)[unit_offers] * noise
+        unit_order = np.argsort(sort_prices)
+        return unit_offers[unit_order], sort_prices[unit_order]
+
+    def allocate(self, demand):
+        """Verteilt ``demand`` Einheiten auf die günstigsten Angebote"""
+        ranked_units, _ = self.rank()
+        demand = min(max(int(demand), 0), len(ranked_units))
+        filled = np.bincount(ranked_units[:demand], minlength=len(self.offers))
+
+        # Offers in the order of their cheapest unit, offers without units last
+        first_units = np.full(len(self.offers), len(ranked_units))
+        np.minimum.at(first_units, ranked_units, np.arange(len(ranked_units)))
+        order = np.argsort(first_units, kind='stable')
+        return OfferAllocation(self, order, filled)
+
+
+class OfferAllocation:
+    """Ergebnis der Zuteilung eines Angebotsbuchs"""
+
+    def __init__(self, book, order, filled):
+        self.book = book
+        self.order = order
+        # Units sold per offer, indexed like book.offers
+        self.filled = filled
+
+    @property
+    def units_sold(self):
+        return int(self.filled.sum())
+
+    @property
+    def units_unsold(self):
+        return self.book.total_quantity - self.units_sold
+
+    def ranked(self):
+        """(offer, sold, unsold) in Verkaufsreihenfolge"""
+        quantities = self.book.quantities
+        for index in self.order.tolist():
+            sold = int(self.filled[index])
+            yield self.book.offers[index], sold, int(quantities[index]) - sold
+
+    def sold_by_seller(self):
+        """Verkaufte Einheiten je Verkäufer"""
+        counts = np.bincount(
+            self.book.seller_ids, weights=self.filled, minlength=len(self.book.sellers)
+        )
+        return {seller: int(count) for seller, count in zip(self.book.sellers, counts)}
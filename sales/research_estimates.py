@@ -0,0 +1,90 @@
+"""
+Vorberechnete Marktforschungs-Schätzungen einer Session.
+
+get_demand_estimate used to look up the MarketResearch row of every market and
+bike type and re-roll its range with ``calculate_estimates`` on each request,
+so the estimates page cost one query per combination and the ranges jumped on
+every refresh. The ranges of all running research are now computed when
+research is purchased and for every new month (``refresh_research_estimates``)
+and stored on the MarketResearch rows. Readers get a compact per-session dict
+from the cache:
+
+    {(market_id, bike_type_id): (research_level, actual_demand, estimated_min,
+                                 estimated_max, expires_at timestamp)}
+
+Purchases, refreshes and saves of MarketResearch invalidate it (see signals.py).
+"""
+from django.core.cache import cache
+from django.utils import timezone
+
+from bikeshop.cache_versions import bump_cache_version, get_cache_version
+
+CACHE_NAME = 'research_estimates'
+ESTIMATES_TIMEOUT = 60 * 60 * 24
+
+
+def _estimates_key(session_id, version):
+    return f'sales:research_estimates:{session_id}:{version}'
+
+
+def invalidate_research_estimates(session_id):
+    """Markiert die gecachten Schätzungen einer Session als veraltet"""
+    bump_cache_version(session_id, CACHE_NAME)
+
+
+def get_research_estimates(session):
+    """Liefert die (gecachten) Marktforschungs-Schätzungen einer Session"""
+    version = get_cache_version(session.id, CACHE_NAME)
+    key = _estimates_key(session.id, version)
+    estimates = cache.get(key)
+    if estimates is None:
+        estimates = build_research_estimates(session)
+        cache.set(key, estimates, ESTIMATES_TIMEOUT)
+    return estimates
+
+
+def build_research_estimates(session):
+    """Liest die gespeicherten Schätzbereiche aller Marktforschungen der Session"""
+    from .models_market_research import MarketResearch
+
+    return {
+        (research.market_id, research.bike_type_id): (
+            research.research_level,
+            research.actual_demand,
+            research.estimated_min,
+            research.estimated_max,
+            research.expires_at.timestamp(),
+        )
+        for research in MarketResearch.objects.filter(session=session).only(
+            'market_id', 'bike_type_id', 'research_level', 'actual_demand', 'estimated_min', 'estimated_max', 'expires_at'
+        )
+    }
+
+
+def refresh_research_estimates(session, month, year, calculator=None):
+    """
+    Berechnet die Schätzbereiche aller laufenden Marktforschungen neu.
+
+    Uses the month's actual demand (MonthlyDemand) and writes all rows with a
+    single bulk update. Expired research keeps its last range; readers fall
+    back to the default estimate for it.
+    """
+    from .demand_calculator import DemandCalculator
+    from .models_market_research import MarketResearch
+
+    calculator = calculator or DemandCalculator(session)
+    demand = calculator.get_monthly_demand(month, year)
+
+    researches = []
+    for research in MarketResearch.objects.filter(session=session, expires_at__gt=timezone.now()):
+        actual_demand = demand.get((research.market_id, research.bike_type_id))
+        if actual_demand is None:
+            continue
+        research.actual_demand = actual_demand
+        research.estimated_min, research.estimated_max = research.calculate_estimates(actual_demand)
+        researches.append(research)
+
+    if researches:
+        MarketResearch.objects.bulk_update(researches, ['actual_demand', 'estimated_min', 'estimated_max'])
+    invalidate_research_estimates(session.id)
+    return len(researches)
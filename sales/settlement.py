@@ -0,0 +1,79 @@
+"""
+Sammelabrechnung der Verkäufe eines Marktsegments.
+
+The sales engines used to settle every bike on its own: one SalesOrder insert,
+one save of the bike, one Transaction and one balance update per bike, i.e.
+about 4,000 queries for a 1,000-bike sale. SaleSettlement collects the sales
+of a segment for one session and writes them together: the SalesOrder rows
+with one bulk insert, the sold flags and the lot quantities with one UPDATE
+each. The caller books the returned net revenue as a single income entry and
+balance adjustment.
+"""
+from decimal import Decimal
+
+from production.inventory import BikeInventory
+
+from .models import SalesOrder
+
+
+class SaleSettlement:
+    """Verkäufe einer Session in einem Marktsegment
+
+    ``is_completed`` is stored on every SalesOrder. Singleplayer sales are
+    completed when they are settled; multiplayer sales keep the default of
+    the model (not completed), as they did before the bulk settlement.
+    """
+
+    def __init__(self, session, month, year, is_completed=True):
+        self.session = session
+        self.month = month
+        self.year = year
+        self.is_completed = is_completed
+        self.orders = []
+
+    def __len__(self):
+        return len(self.orders)
+
+    def add(self, market, bike, sale_price, transport_cost=Decimal('0'), net_revenue=None):
+        """
+        Merkt einen Verkauf vor.
+
+        ``net_revenue`` defaults to ``sale_price - transport_cost`` and is what
+        the sale contributes to the booked income.
+        """
+        order = SalesOrder(
+            session=self.session,
+            market=market,
+            bike=bike,
+            sale_month=self.month,
+            sale_year=self.year,
+            sale_price=sale_price,
+            transport_cost=transport_cost,
+            is_completed=self.is_completed
+        )
+        order.net_revenue = sale_price - transport_cost if net_revenue is None else net_revenue
+        self.orders.append(order)
+        return order
+
+    @property
+    def revenue(self):
+        """Summe der Nettoerlöse"""
+        return sum((order.net_revenue for order in self.orders), Decimal('0'))
+
+    def settle(self, mark_sold=True):
+        """
+        Schreibt alle vorgemerkten Verkäufe.
+
+        ``mark_sold=False`` skips the UPDATE of the sold flags for bikes that
+        were already taken out of the inventory (BikeInventory.take_many).
+        """
+        if not self.orders:
+            return Decimal('0')
+
+        if mark_sold:
+            BikeInventory(self.session).mark_sold([order.bike_id for order in self.orders])
+            for order in self.orders:
+                order.bike.is_sold = True
+
+        SalesOrder.objects.bulk_create(self.orders)
+        return self.revenue
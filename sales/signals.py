@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models_market_research import MarketResearch
+from .research_estimates import invalidate_research_estimates
+
+
+@receiver(post_save, sender=MarketResearch)
+@receiver(post_delete, sender=MarketResearch)
+def invalidate_research_estimates_on_change(sender, instance, **kwargs):
+    """Purchased, changed or deleted research changes the session's estimates"""
+    invalidate_research_estimates(instance.session_id)
@@ -1,3 +1,384 @@
-from django.test import TestCase
+import random
+import time
 
-# Create your tests here.
+import numpy as np
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from bikeshop.models import BikeType, GameSession
+from .demand_calculator import DemandCalculator, purchase_market_research
+from .market_simulator import MarketSimulator
+from .models import Market, MonthlyDemand
+from .models_market_research import MarketResearch
+from .offer_book import OfferBook
+from .research_estimates import get_research_estimates, refresh_research_estimates
+
+
+class OfferBookTests(SimpleTestCase):
+    """Ranking und Zuteilung des Angebotsbuchs"""
+
+    def make_book(self, seed=1):
+        return OfferBook(rng=np.random.default_rng(seed))
+
+    def test_cheapest_offers_sell_first(self):
+        book = self.make_book()
+        book.add('expensive', 'a', 1000, 1.0)
+        book.add('cheap', 'b', 500, 1.0)
+        book.add('middle', 'c', 700, 1.0)
+
+        allocation = book.allocate(2)
+
+        self.assertEqual([offer for offer, _, _ in allocation.ranked()], ['cheap', 'middle', 'expensive'])
+        self.assertEqual([sold for _, sold, _ in allocation.ranked()], [1, 1, 0])
+        self.assertEqual(allocation.units_sold, 2)
+        self.assertEqual(allocation.units_unsold, 1)
+
+    def test_quality_factor_lowers_sort_price(self):
+        book = self.make_book()
+        book.add('plain', 'a', 1000, 1.0)
+        book.add('premium', 'b', 1200, 1.3)
+
+        allocation = book.allocate(1)
+
+        self.assertEqual(next(allocation.ranked())[0], 'premium')
+
+    def test_partial_fill_with_cumulative_quantities(self):
+        book = self.make_book()
+        book.add('first', 'a', 100, 1.0, quantity=5)
+        book.add('second', 'b', 200, 1.0, quantity=5)
+        book.add('third', 'a', 300, 1.0, quantity=5)
+
+        allocation = book.allocate(7)
+
+        self.assertEqual(allocation.filled.tolist(), [5, 2, 0])
+        self.assertEqual(allocation.sold_by_seller(), {'a': 5, 'b': 2})
+        self.assertEqual(book.average_price(), 200.0)
+
+    def test_demand_above_supply_sells_everything(self):
+        book = self.make_book()
+        for i in range(10):
+            book.add(i, i % 3, 500 + i, 1.0)
+
+        allocation = book.allocate(100)
+
+        self.assertEqual(allocation.units_sold, 10)
+        self.assertEqual(allocation.units_unsold, 0)
+
+    def test_empty_book(self):
+        allocation = self.make_book().allocate(10)
+
+        self.assertEqual(allocation.units_sold, 0)
+        self.assertEqual(list(allocation.ranked()), [])
+        self.assertEqual(allocation.sold_by_seller(), {})
+
+    def test_jitter_reorders_close_prices(self):
+        # Two offers within the 10% jitter band swap places in some draws
+        winners = set()
+        for seed in range(50):
+            book = self.make_book(seed)
+            book.add('a', 'a', 1000, 1.0)
+            book.add('b', 'b', 1020, 1.0)
+            winners.add(next(book.allocate(1).ranked())[0])
+
+        self.assertEqual(winners, {'a', 'b'})
+
+    def test_thousands_of_offers_clear_quickly(self):
+        rng = np.random.default_rng(7)
+        book = self.make_book()
+        for i, price in enumerate(rng.uniform(300, 1500, size=5000)):
+            book.add(i, i % 40, price, 1.0)
+
+        started = time.perf_counter()
+        allocation = book.allocate(2500)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(allocation.units_sold, 2500)
+        # Generous bound for slow CI machines; typically well under 1ms
+        self.assertLess(elapsed, 0.05)
+
+
+class QuantityOfferEquivalenceTests(SimpleTestCase):
+    """Mengenangebote verhalten sich wie ein Angebot je Fahrrad"""
+
+    # (seller, price, quality factor, quantity); prices overlap within the jitter band
+    OFFERS = [
+        ('player', 1000, 1.0, 40),
+        ('old_cohort', 950, 1.0, 15),
+        ('competitor_a', 1030, 1.0, 30),
+        ('competitor_b', 1210, 1.2, 20),
+    ]
+    DEMAND = 60
+    TRIALS = 3000
+
+    def per_bike_reference(self, draw):
+        """Das frühere Modell: ein Angebot je Fahrrad, sortiert nach sort_price"""
+        offers = []
+        for seller, price, quality_factor, quantity in self.OFFERS:
+            for _ in range(quantity):
+                offers.append({'seller': seller, 'price': price, 'quality_factor': quality_factor})
+        for offer in offers:
+            offer['sort_price'] = float(offer['price']) * draw() / offer['quality_factor']
+        offers.sort(key=lambda x: x['sort_price'])
+
+        sold = {seller: 0 for seller, _, _, _ in self.OFFERS}
+        for offer in offers[:self.DEMAND]:
+            sold[offer['seller']] += 1
+        return sold
+
+    def quantity_offers(self, rng):
+        book = OfferBook(rng=rng)
+        for seller, price, quality_factor, quantity in self.OFFERS:
+            book.add(seller, seller, price, quality_factor, quantity)
+        return book.allocate(self.DEMAND).sold_by_seller()
+
+    def test_same_jitter_draws_give_identical_fills(self):
+        for seed in range(200):
+            rng = np.random.default_rng(seed)
+            reference_rng = np.random.default_rng(seed)
+
+            self.assertEqual(
+                self.quantity_offers(rng),
+                self.per_bike_reference(lambda: reference_rng.uniform(0.95, 1.05))
+            )
+
+    def test_fill_distribution_matches_per_bike_model(self):
+        reference_random = random.Random(20240101)
+        rng = np.random.default_rng(20240101)
+
+        reference = [
+            self.per_bike_reference(lambda: reference_random.uniform(0.95, 1.05)) for _ in range(self.TRIALS)
+        ]
+        grouped = [self.quantity_offers(rng) for _ in range(self.TRIALS)]
+
+        for seller, _, _, quantity in self.OFFERS:
+            expected = np.array([result[seller] for result in reference], dtype=float)
+            actual = np.array([result[seller] for result in grouped], dtype=float)
+
+            # Means agree within four standard errors of the difference
+            standard_error = np.sqrt((expected.var() + actual.var()) / self.TRIALS)
+            self.assertLess(abs(expected.mean() - actual.mean()), 4 * standard_error + 1e-9, seller)
+            # Spread agrees as well
+            if expected.var() > 0:
+                self.assertAlmostEqual(actual.var() / expected.var(), 1.0, delta=0.15, msg=seller)
+
+            # Histograms are close (total variation distance)
+            bins = np.arange(quantity + 2)
+            expected_hist = np.histogram(expected, bins=bins)[0] / self.TRIALS
+            actual_hist = np.histogram(actual, bins=bins)[0] / self.TRIALS
+            self.assertLess(0.5 * np.abs(expected_hist - actual_hist).sum(), 0.06, seller)
+
+    def test_large_decision_is_one_offer(self):
+        book = OfferBook(rng=np.random.default_rng(3))
+        book.add('decision', 'player', 800, 1.0, quantity=400)
+        book.add('competitor', 'competitor', 820, 1.0, quantity=400)
+
+        clearing = book.allocate(500)
+
+        self.assertEqual(len(book), 2)
+        self.assertEqual(clearing.units_sold, 500)
+        self.assertEqual(sum(sold for _, sold, _ in clearing.ranked()), 500)
+        self.assertEqual(sum(unsold for _, _, unsold in clearing.ranked()), 300)
+
+
+class MonthlyDemandTests(TestCase):
+    """Die tatsächliche Nachfrage wird einmal pro Monat erzeugt"""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='demanduser', password='testpass123')
+        self.session = GameSession.objects.create(
+            user=user, name='Demand Session', current_month=4, current_year=2024, balance=Decimal('80000.00')
+        )
+        self.bike_types = [
+            BikeType.objects.create(session=self.session, name=name, base_storage_space_per_unit=1.0)
+            for name in ('City Bike', 'Mountainbike')
+        ]
+        self.markets = [self._market(f'Market {i}') for i in range(2)]
+
+    def _market(self, name):
+        return Market.objects.create(
+            session=self.session, name=name, location=name,
+            transport_cost_home=Decimal('10.00'), transport_cost_foreign=Decimal('20.00'),
+            monthly_volume_capacity=1000
+        )
+
+    def test_estimates_do_not_write_demand(self):
+        with CaptureQueriesContext(connection) as queries:
+            first = DemandCalculator(self.session).get_all_market_estimates(4, 2024)
+        second = DemandCalculator(self.session).get_all_market_estimates(4, 2024)
+
+        # Without drawn rows the expected demand is shown, the same on every request
+        self.assertFalse(MonthlyDemand.objects.filter(session=self.session).exists())
+        self.assertFalse([query for query in queries.captured_queries if query['sql'].startswith('INSERT')])
+        for market_id, market_data in first.items():
+            for bike_type_id, estimate in market_data['bike_types'].items():
+                self.assertEqual(estimate['actual'], second[market_id]['bike_types'][bike_type_id]['actual'])
+        # 1000 capacity * 50% share * April season (1.15), no random factor
+        self.assertEqual(first[self.markets[0].id]['bike_types'][self.bike_types[0].id]['actual'], 575)
+
+    def test_generate_keeps_existing_rows(self):
+        calculator = DemandCalculator(self.session)
+        demand = calculator.generate_monthly_demand(5, 2024)
+        self.assertEqual(MonthlyDemand.objects.filter(session=self.session, month=5, year=2024).count(), 4)
+
+        self.assertEqual(calculator.generate_monthly_demand(5, 2024), demand)
+
+        # A market added later reads its expected demand until the next generation draws it
+        market = self._market('Late Market')
+        DemandCalculator(self.session).calculate_actual_demand(market, self.bike_types[0], 5, 2024)
+        self.assertEqual(MonthlyDemand.objects.filter(session=self.session, month=5, year=2024).count(), 4)
+
+        self.assertEqual(len(DemandCalculator(self.session).generate_monthly_demand(5, 2024)), 6)
+        self.assertEqual(
+            {key: value for key, value in DemandCalculator(self.session).get_monthly_demand(5, 2024).items()
+             if key in demand},
+            demand
+        )
+
+    def test_estimates_query_count_independent_of_markets(self):
+        DemandCalculator(self.session).generate_monthly_demand(4, 2024)
+        DemandCalculator(self.session).get_all_market_estimates(4, 2024)
+        with CaptureQueriesContext(connection) as few_markets:
+            DemandCalculator(self.session).get_all_market_estimates(4, 2024)
+
+        for i in range(4):
+            self._market(f'Extra Market {i}')
+        DemandCalculator(self.session).generate_monthly_demand(4, 2024)
+        with CaptureQueriesContext(connection) as many_markets:
+            estimates = DemandCalculator(self.session).get_all_market_estimates(4, 2024)
+
+        self.assertEqual(len(estimates), 6)
+        self.assertEqual(len(many_markets), len(few_markets))
+
+    def test_market_simulator_sells_against_monthly_demand(self):
+        market, bike_type = self.markets[0], self.bike_types[0]
+        MonthlyDemand.objects.create(
+            session=self.session, market=market, bike_type=bike_type, month=4, year=2024, demand=250
+        )
+
+        simulator = MarketSimulator(self.session)
+
+        self.assertEqual(simulator._calculate_market_demand(market, bike_type, 'cheap', 4, 2024), 100)
+        self.assertEqual(simulator._calculate_market_demand(market, bike_type, 'premium', 4, 2024), 50)
+
+    def test_market_simulator_demand_model(self):
+        """Pins the simulator's demand: drawn monthly demand split 40/40/20 over the segments"""
+        from unittest import mock
+
+        market, bike_type = self.markets[0], self.bike_types[1]
+        market.mountain_bike_factor = 1.5
+        market.save()
+
+        with mock.patch('sales.demand_calculator.random.uniform', return_value=1.1):
+            DemandCalculator(self.session).generate_monthly_demand(6, 2024)
+
+        # 1000 capacity * 50% share * mountain factor 1.5 * June season 1.15 * random 1.1
+        simulator = MarketSimulator(self.session)
+        self.assertEqual(simulator._calculate_market_demand(market, bike_type, 'cheap', 6, 2024), 379)
+        self.assertEqual(simulator._calculate_market_demand(market, bike_type, 'standard', 6, 2024), 379)
+        self.assertEqual(simulator._calculate_market_demand(market, bike_type, 'premium', 6, 2024), 189)
+
+
+class ResearchEstimateCacheTests(TestCase):
+    """Marktforschungs-Schätzungen werden vorberechnet und gecacht"""
+
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(username='researchuser', password='testpass123')
+        self.session = GameSession.objects.create(
+            user=user, name='Research Session', current_month=4, current_year=2024, balance=Decimal('80000.00')
+        )
+        self.bike_type = BikeType.objects.create(session=self.session, name='City Bike', base_storage_space_per_unit=1.0)
+        self.markets = [self._market(f'Market {i}') for i in range(2)]
+
+    def _market(self, name):
+        return Market.objects.create(
+            session=self.session, name=name, location=name,
+            transport_cost_home=Decimal('10.00'), transport_cost_foreign=Decimal('20.00'),
+            monthly_volume_capacity=1000
+        )
+
+    def _estimate(self, market):
+        return DemandCalculator(self.session).get_demand_estimate(market, self.bike_type, 4, 2024)
+
+    def test_purchase_serves_stored_range(self):
+        self.assertEqual(self._estimate(self.markets[0])['research_level'], 'none')
+
+        research, _ = purchase_market_research(self.session, self.markets[0], self.bike_type, 'premium', 4, 2024)
+
+        # The purchase invalidated the cached (empty) estimates
+        estimates = [self._estimate(self.markets[0]) for _ in range(5)]
+        for estimate in estimates:
+            self.assertEqual(estimate['research_level'], 'premium')
+            self.assertEqual((estimate['estimated_min'], estimate['estimated_max']),
+                             (research.estimated_min, research.estimated_max))
+
+    def test_invalidation_reaches_other_workers(self):
+        from bikeshop.cache_versions import bump_cache_version
+        from .research_estimates import CACHE_NAME
+
+        research, _ = purchase_market_research(self.session, self.markets[0], self.bike_type, 'basic', 4, 2024)
+        self._estimate(self.markets[0])
+        # Changed in another process: no signal here, only its version bump is visible
+        MarketResearch.objects.filter(pk=research.pk).update(estimated_min=1, estimated_max=2)
+        bump_cache_version(self.session.id, CACHE_NAME)
+
+        estimate = self._estimate(self.markets[0])
+        self.assertEqual((estimate['estimated_min'], estimate['estimated_max']), (1, 2))
+
+    def test_cached_estimates_need_no_research_query(self):
+        purchase_market_research(self.session, self.markets[0], self.bike_type, 'basic', 4, 2024)
+        DemandCalculator(self.session).get_all_market_estimates(4, 2024)
+
+        with CaptureQueriesContext(connection) as few_markets:
+            DemandCalculator(self.session).get_all_market_estimates(4, 2024)
+
+        for i in range(5):
+            market = self._market(f'Extra Market {i}')
+            purchase_market_research(self.session, market, self.bike_type, 'advanced', 4, 2024)
+        DemandCalculator(self.session).get_all_market_estimates(4, 2024)
+
+        with CaptureQueriesContext(connection) as many_markets:
+            estimates = DemandCalculator(self.session).get_all_market_estimates(4, 2024)
+
+        self.assertEqual(len(estimates), 7)
+        self.assertEqual(len(many_markets), len(few_markets))
+        self.assertFalse(any('sales_marketresearch' in query['sql'] for query in many_markets.captured_queries))
+
+    def test_refresh_updates_ranges_for_new_month(self):
+        for market in self.markets:
+            purchase_market_research(self.session, market, self.bike_type, 'advanced', 4, 2024)
+
+        calculator = DemandCalculator(self.session)
+        demand = calculator.generate_monthly_demand(5, 2024)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(refresh_research_estimates(self.session, 5, 2024, calculator=calculator), 2)
+        self.assertLessEqual(len(queries), 3)
+
+        for market in self.markets:
+            research = MarketResearch.objects.get(session=self.session, market=market)
+            self.assertEqual(research.actual_demand, demand[(market.id, self.bike_type.id)])
+            self.assertEqual(
+                get_research_estimates(self.session)[(market.id, self.bike_type.id)][1:4],
+                (research.actual_demand, research.estimated_min, research.estimated_max)
+            )
+
+    def test_stored_range_follows_other_month_demand(self):
+        market = self.markets[0]
+        purchase_market_research(self.session, market, self.bike_type, 'premium', 4, 2024)
+        MonthlyDemand.objects.create(
+            session=self.session, market=market, bike_type=self.bike_type, month=5, year=2024, demand=1000
+        )
+        research = MarketResearch.objects.get(session=self.session, market=market)
+        MarketResearch.objects.filter(pk=research.pk).update(actual_demand=500, estimated_min=480, estimated_max=530)
+
+        # Rows changed behind the cache's back are only picked up after invalidation
+        cache.clear()
+        estimate = DemandCalculator(self.session).get_demand_estimate(market, self.bike_type, 5, 2024)
+
+        self.assertEqual((estimate['estimated_min'], estimate['estimated_max']), (960, 1060))
+        self.assertEqual(estimate['precision_percentage'], 5)
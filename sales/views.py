@@ -2,10 +2,11 @@ from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.db import transaction
-from django.db.models import Count, Avg, Min, Sum
+from django.db.models import Count, Min, Sum
 from bikeshop.models import GameSession, BikePrice, BikeType
 from .models import Market, MarketDemand, SalesOrder, SalesDecision
 from production.models import ProducedBike
+from production.inventory import BikeInventory
 from finance.models import Transaction
 from .market_simulator import MarketSimulator
 from collections import defaultdict
@@ -51,17 +52,8 @@ def sales_view(request, session_id):
     markets = Market.objects.filter(session=session)
 
     # Group available bikes by bike_type and price_segment
-    bike_groups = ProducedBike.objects.filter(
-        session=session,
-        is_sold=False
-    ).values(
-        'bike_type__id',
-        'bike_type__name',
-        'price_segment'
-    ).annotate(
-        count=Count('id'),
-        avg_production_cost=Avg('production_cost')
-    ).order_by('bike_type__name', 'price_segment')
+    bike_inventory = BikeInventory(session)
+    bike_groups = bike_inventory.available_groups()
 
     # Add price range information to each group
     for group in bike_groups:
@@ -113,12 +105,7 @@ def sales_view(request, session_id):
                             })
 
                         # Check if bikes are available
-                        available_bikes = ProducedBike.objects.filter(
-                            session=session,
-                            bike_type_id=bike_type_id,
-                            price_segment=price_segment,
-                            is_sold=False
-                        ).count()
+                        available_bikes = bike_inventory.available_quantity(bike_type, price_segment)
 
                         if available_bikes < quantity:
                             return JsonResponse({
@@ -176,7 +163,7 @@ def sales_view(request, session_id):
             return JsonResponse({'success': False, 'error': str(e)})
 
     # Calculate total available bikes count
-    total_bikes_count = ProducedBike.objects.filter(session=session, is_sold=False).count()
+    total_bikes_count = bike_inventory.available_quantity()
 
     # Get sales history for current month
     current_month_sales = SalesOrder.objects.filter(
@@ -1,3 +1,40 @@
 from django.contrib import admin
+from .models import SimulationSettings, TurnPerformanceRecord
 
-# Register your models here.
+
+@admin.register(SimulationSettings)
+class SimulationSettingsAdmin(admin.ModelAdmin):
+    list_display = ('session', 'max_months', 'seasonal_effects', 'market_trends', 'performance_tracking')
+    list_filter = ('performance_tracking',)
+
+
+@admin.register(TurnPerformanceRecord)
+class TurnPerformanceRecordAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'engine', 'turn', 'game_or_session', 'phase', 'duration_ms_display',
+                    'query_count', 'rows_written', 'slowest_sql_ms_display')
+    list_filter = ('engine', 'phase', 'multiplayer_game')
+    search_fields = ('phase', 'slowest_sql', 'multiplayer_game__name', 'session__name')
+    readonly_fields = [field.name for field in TurnPerformanceRecord._meta.fields]
+    list_select_related = ('session', 'multiplayer_game')
+    date_hierarchy = 'created_at'
+
+    def turn(self, obj):
+        return f"{obj.year}/{obj.month:02d}"
+    turn.short_description = 'Turn'
+
+    def game_or_session(self, obj):
+        return obj.multiplayer_game or obj.session
+    game_or_session.short_description = 'Game / Session'
+
+    def duration_ms_display(self, obj):
+        return f"{obj.duration_ms:.1f} ms"
+    duration_ms_display.short_description = 'Duration'
+    duration_ms_display.admin_order_field = 'duration_ms'
+
+    def slowest_sql_ms_display(self, obj):
+        return f"{obj.slowest_sql_ms:.1f} ms"
+    slowest_sql_ms_display.short_description = 'Slowest SQL'
+    slowest_sql_ms_display.admin_order_field = 'slowest_sql_ms'
+
+    def has_add_permission(self, request):
+        return False
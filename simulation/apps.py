@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class SimulationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'simulation'
+
+    def ready(self):
+        """Import signals when app is ready."""
+        import simulation.signals  # noqa
@@ -0,0 +1,274 @@
+"""
+Performance-Benchmarks der Monatssimulation.
+
+Builds a synthetic session at a configurable scale (bikes in inventory,
+markets, AI competitors), then times process_month, the dashboard snapshot,
+the sales view and the finance views and checks their query counts against
+budgets. Sales are processed every third month, so months with sales are
+reported (and budgeted) as ``process_month_sales``; the default run of three
+months covers both kinds. Everything runs inside a transaction that is rolled
+back, so the benchmark never leaves data behind.
+
+Used by ``manage.py benchmark_simulation`` (JSON output) and the test suite.
+"""
+import random
+import time
+from collections import Counter
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from bikeshop.models import (
+    GameSession, Supplier, ComponentType, Component, SupplierPrice, BikeType, BikePrice, Worker
+)
+from competitors.models import AICompetitor
+from finance.models import Transaction
+from production.models import ProducedBikeLot, ProductionPlan, ProductionOrder
+from sales.models import Market, MarketDemand, SalesDecision
+from warehouse.models import Warehouse, ComponentStock
+
+SCALES = {
+    'tiny': {'bikes': 100, 'markets': 2, 'competitors': 1},
+    'small': {'bikes': 1000, 'markets': 5, 'competitors': 3},
+    'medium': {'bikes': 10000, 'markets': 50, 'competitors': 30},
+    'large': {'bikes': 100000, 'markets': 50, 'competitors': 30},
+}
+
+# Maximum number of SQL queries per benchmark target and scale (about 1.5x the measured counts)
+QUERY_BUDGETS = {
+    'tiny': {'process_month': 405, 'process_month_sales': 370, 'dashboard': 6, 'sales_view': 50,
+             'finance_view': 6, 'financial_dashboard': 110},
+    'small': {'process_month': 405, 'process_month_sales': 365, 'dashboard': 6, 'sales_view': 50,
+              'finance_view': 6, 'financial_dashboard': 110},
+    'medium': {'process_month': 410, 'process_month_sales': 390, 'dashboard': 6, 'sales_view': 50,
+               'finance_view': 6, 'financial_dashboard': 110},
+    'large': {'process_month': 410, 'process_month_sales': 430, 'dashboard': 6, 'sales_view': 50,
+              'finance_view': 6, 'financial_dashboard': 110},
+}
+
+COMPONENT_TYPES = ['Laufradsatz', 'Rahmen', 'Lenker', 'Sattel', 'Schaltung']
+QUALITIES = ['basic', 'standard', 'premium']
+SEGMENTS = ['cheap', 'standard', 'premium']
+BIKE_TYPES = ['Damenrad', 'Herrenrad', 'Mountainbike', 'Rennrad']
+STRATEGIES = ['cheap_only', 'balanced', 'premium_focus', 'e_bike_specialist']
+
+
+class BenchmarkSessionBuilder:
+    """Erzeugt eine synthetische Spielsession in der gewünschten Größe"""
+
+    def __init__(self, bikes=1000, markets=5, competitors=3, seed=42):
+        self.bikes = bikes
+        self.markets = markets
+        self.competitors = competitors
+        self.random = random.Random(seed)
+
+    def build(self, user):
+        session = GameSession.objects.create(
+            user=user, name=f'Benchmark {self.bikes} bikes', current_month=1, current_year=2025,
+            balance=Decimal('1000000.00')
+        )
+        warehouse = Warehouse.objects.create(
+            session=session, name='Benchmark Lager', location='Hamburg',
+            capacity_m2=float(self.bikes * 10 + 100000), rent_per_month=Decimal('5000.00')
+        )
+
+        suppliers = {
+            quality: Supplier.objects.create(
+                session=session, name=f'Lieferant {quality}', quality=quality,
+                complaint_probability=0, complaint_quantity=0
+            )
+            for quality in QUALITIES
+        }
+
+        component_names = {}
+        for type_name in COMPONENT_TYPES:
+            component_type = ComponentType.objects.create(
+                session=session, name=type_name, storage_space_per_unit=0.1
+            )
+            component_names[type_name] = []
+            for quality in QUALITIES:
+                component = Component.objects.create(
+                    session=session, component_type=component_type, name=f'{type_name} {quality}'
+                )
+                SupplierPrice.objects.create(
+                    session=session, supplier=suppliers[quality], component=component,
+                    base_price=Decimal('20.00') * (QUALITIES.index(quality) + 1)
+                )
+                ComponentStock.objects.create(
+                    session=session, warehouse=warehouse, component=component,
+                    supplier=suppliers[quality], quantity=self.bikes
+                )
+                component_names[type_name].append(component.name)
+
+        bike_types = []
+        for name in BIKE_TYPES:
+            bike_type = BikeType.objects.create(
+                session=session, name=name,
+                base_skilled_worker_hours=2.0, base_unskilled_worker_hours=1.0, base_storage_space_per_unit=0.5,
+                required_wheel_set_names=component_names['Laufradsatz'],
+                required_frame_names=component_names['Rahmen'],
+                required_handlebar_names=component_names['Lenker'],
+                required_saddle_names=component_names['Sattel'],
+                required_gearshift_names=component_names['Schaltung'],
+            )
+            for index, segment in enumerate(SEGMENTS):
+                BikePrice.objects.create(
+                    session=session, bike_type=bike_type, price_segment=segment,
+                    base_price=Decimal('400.00') * (index + 1)
+                )
+            bike_types.append(bike_type)
+
+        Worker.objects.create(session=session, worker_type='skilled', hourly_wage=Decimal('25.00'), count=50)
+        Worker.objects.create(session=session, worker_type='unskilled', hourly_wage=Decimal('15.00'), count=50)
+
+        markets = []
+        for index in range(self.markets):
+            market = Market.objects.create(
+                session=session, name=f'Markt {index + 1}', location=f'Stadt {index + 1}',
+                transport_cost_home=Decimal('5.00'), transport_cost_foreign=Decimal('15.00'),
+                monthly_volume_capacity=max(50, self.bikes // max(1, self.markets))
+            )
+            MarketDemand.objects.bulk_create([
+                MarketDemand(session=session, market=market, bike_type=bike_type, demand_percentage=25.0)
+                for bike_type in bike_types
+            ])
+            markets.append(market)
+
+        for index in range(self.competitors):
+            AICompetitor.objects.create(
+                session=session, name=f'Konkurrent {index + 1}', strategy=STRATEGIES[index % len(STRATEGIES)]
+            )
+
+        # Unsold inventory produced over the last twelve months, stored as lots like production does
+        seeded = Counter(
+            (self.random.choice(bike_types), self.random.choice(SEGMENTS), self.random.randint(1, 12))
+            for _ in range(self.bikes)
+        )
+        ProducedBikeLot.objects.bulk_create([
+            ProducedBikeLot(
+                session=session, bike_type=bike_type, price_segment=segment,
+                production_month=month, production_year=2024, warehouse=warehouse,
+                quantity=quantity, quantity_produced=quantity, production_cost=Decimal('150.00')
+            )
+            for (bike_type, segment, month), quantity in seeded.items()
+        ], batch_size=1000)
+
+        plan = ProductionPlan.objects.create(session=session, month=1, year=2025)
+        ProductionOrder.objects.bulk_create([
+            ProductionOrder(plan=plan, bike_type=bike_type, price_segment=segment,
+                            quantity_planned=max(1, self.bikes // 100))
+            for bike_type in bike_types for segment in SEGMENTS
+        ])
+
+        SalesDecision.objects.bulk_create([
+            SalesDecision(
+                session=session, market=markets[index % len(markets)], bike_type=bike_type,
+                price_segment=segment, quantity=max(1, self.bikes // 50),
+                desired_price=Decimal('400.00') * (SEGMENTS.index(segment) + 1),
+                transport_cost=Decimal('5.00'), decision_month=1, decision_year=2025
+            )
+            for index, (bike_type, segment) in enumerate(
+                (bike_type, segment) for bike_type in bike_types for segment in SEGMENTS
+            )
+        ])
+
+        Transaction.objects.bulk_create([
+            Transaction(
+                session=session, transaction_type='income' if index % 2 else 'expense',
+                category='Verkäufe' if index % 2 else 'Einkauf', amount=Decimal('100.00'),
+                description='Benchmark', month=(index % 12) + 1, year=2024
+            )
+            for index in range(min(self.bikes, 5000))
+        ], batch_size=1000)
+
+        return session
+
+
+class _QueryCounter:
+    """Zählt Abfragen ohne sie zu speichern (CaptureQueriesContext hört bei 9000 auf)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _measure(name, func, budget):
+    counter = _QueryCounter()
+    with connection.execute_wrapper(counter):
+        started = time.perf_counter()
+        func()
+        wall_time = time.perf_counter() - started
+    queries = counter.count
+    return {
+        'target': name,
+        'wall_time_ms': round(wall_time * 1000, 2),
+        'queries': queries,
+        'query_budget': budget,
+        'within_budget': budget is None or queries <= budget,
+    }
+
+
+def run_benchmarks(scale='small', bikes=None, markets=None, competitors=None, months=3, seed=42):
+    """Führt alle Benchmarks aus und liefert die Ergebnisse als JSON-fähiges Dict"""
+    from simulation.dashboard import build_dashboard_snapshot
+    from simulation.engine import SimulationEngine
+    from sales.views import sales_view
+    from finance.views import finance_view, financial_dashboard
+
+    config = dict(SCALES[scale])
+    if bikes is not None:
+        config['bikes'] = bikes
+    if markets is not None:
+        config['markets'] = markets
+    if competitors is not None:
+        config['competitors'] = competitors
+    budgets = QUERY_BUDGETS.get(scale, {})
+
+    results = []
+    factory = RequestFactory()
+
+    with transaction.atomic():
+        user = get_user_model().objects.create_user(username=f'benchmark-{time.time_ns()}', password=None)
+        started = time.perf_counter()
+        session = BenchmarkSessionBuilder(seed=seed, **config).build(user)
+        setup_time = time.perf_counter() - started
+
+        def view(view_func):
+            def call():
+                request = factory.get('/')
+                request.user = user
+                response = view_func(request, session_id=session.id)
+                assert response.status_code == 200, f'{view_func.__name__}: HTTP {response.status_code}'
+            return call
+
+        random.seed(seed)
+        for month in range(months):
+            # Same condition as SimulationEngine.process_month
+            target = 'process_month_sales' if session.current_month % 3 == 0 else 'process_month'
+            results.append(_measure(
+                target, lambda: SimulationEngine(session).process_month(), budgets.get(target)
+            ))
+            session.refresh_from_db()
+
+        results.append(_measure(
+            'dashboard', lambda: build_dashboard_snapshot(session), budgets.get('dashboard')
+        ))
+        results.append(_measure('sales_view', view(sales_view), budgets.get('sales_view')))
+        results.append(_measure('finance_view', view(finance_view), budgets.get('finance_view')))
+        results.append(_measure('financial_dashboard', view(financial_dashboard), budgets.get('financial_dashboard')))
+
+        transaction.set_rollback(True)
+
+    return {
+        'scale': scale,
+        'config': config,
+        'months': months,
+        'setup_time_ms': round(setup_time * 1000, 2),
+        'results': results,
+        'within_budget': all(result['within_budget'] for result in results),
+    }
@@ -1,73 +1,108 @@
+from collections import defaultdict
 from django.db import models, transaction
 from decimal import Decimal
 import random
-from sales.models import Market, SalesOrder
+from sales.models import SalesOrder
 from competitors.models import AICompetitor, CompetitorSale, CompetitorProduction, MarketCompetition
-from production.models import ProducedBike
-from finance.models import Transaction
+from production.inventory import BikeInventory
+from finance.ledger import SessionLedger
 from .market_volume_engine import MarketVolumeEngine
+from .session_state import SessionState
+
+# MarketCompetition fields written after the segment allocation
+COMPETITION_RESULT_FIELDS = ['actual_sales_volume', 'total_supply', 'saturation_level', 'average_price', 'price_pressure']
 
 
 class CompetitiveSalesEngine:
     """Engine for processing competitive sales with market volume constraints"""
     
-    def __init__(self, session):
+    def __init__(self, session, ledger=None, state=None):
         self.session = session
-        self.market_engine = MarketVolumeEngine(session)
+        self.state = state or SessionState(session)
+        self.market_engine = MarketVolumeEngine(session, state=self.state)
+        self.ledger = ledger or SessionLedger(session, buffered=False)
     
     def process_competitive_sales(self, month, year):
         """Process sales for all competitors and players with market competition"""
         with transaction.atomic():
             # Update market volumes for this period
-            self.market_engine.calculate_market_volume_for_period(month, year)
+            competitions = self.market_engine.calculate_market_volume_for_period(month, year)
             
             # Update inventory aging for all bikes
             self._update_all_inventory_ages(month, year)
+
+            # Open orders and competitor stock are read once for all segments
+            self._load_offers(month, year)
             
             # Process competitive sales for each market/bike/segment combination
-            markets = Market.objects.filter(session=self.session)
-            from bikeshop.models import BikeType
-            bike_types = BikeType.objects.filter(session=self.session)
-            
-            for market in markets:
-                for bike_type in bike_types:
+            for market in self.state.markets.values():
+                for bike_type in self.state.bike_types.values():
                     for segment in ['cheap', 'standard', 'premium']:
-                        self._process_competitive_segment_sales(market, bike_type, segment, month, year)
+                        self._process_competitive_segment_sales(
+                            market, bike_type, segment, month, year,
+                            competition=competitions.get((market.id, bike_type.id, segment))
+                        )
+
+            self._flush_sales()
+
+    def _load_offers(self, month, year):
+        """Lädt offene Aufträge und Konkurrenzbestände der Periode, gruppiert nach Segment"""
+        self._player_orders = defaultdict(list)
+        self._open_orders = {}
+        for order in SalesOrder.objects.filter(
+            session=self.session,
+            sale_month__lte=month,
+            sale_year=year,
+            is_completed=False
+        ).select_related('bike').order_by('id'):
+            self._open_orders[order.id] = order
+            self._player_orders[(order.market_id, order.bike.bike_type_id, order.bike.price_segment)].append(order)
+
+        self._competitor_productions = defaultdict(list)
+        for production in CompetitorProduction.objects.filter(
+            competitor__session=self.session,
+            quantity_in_inventory__gt=0
+        ).order_by('id'):
+            production.competitor = self.state.get_competitor(production.competitor_id)
+            self._competitor_productions[(production.bike_type_id, production.price_segment)].append(production)
+
+        # Written by _flush_sales
+        self._completed_orders = []
+        self._changed_productions = {}
+        self._changed_competitors = {}
+        self._competitor_sales = []
+        self._changed_competitions = []
+
+    def _flush_sales(self):
+        """Schreibt die Verkäufe aller Segmente mit je einer Anweisung pro Tabelle"""
+        if self._completed_orders:
+            SalesOrder.objects.filter(id__in=[order.id for order in self._completed_orders]).update(is_completed=True)
+            BikeInventory(self.session).mark_sold([order.bike_id for order in self._completed_orders])
+        if self._changed_productions:
+            CompetitorProduction.objects.bulk_update(
+                list(self._changed_productions.values()), ['quantity_in_inventory']
+            )
+        if self._competitor_sales:
+            CompetitorSale.objects.bulk_create(self._competitor_sales)
+        if self._changed_competitors:
+            AICompetitor.objects.bulk_update(
+                list(self._changed_competitors.values()), ['total_bikes_sold', 'total_revenue']
+            )
+        if self._changed_competitions:
+            MarketCompetition.objects.bulk_update(self._changed_competitions, COMPETITION_RESULT_FIELDS)
     
     def _update_all_inventory_ages(self, month, year):
         """Update inventory ages for all unsold bikes"""
-        # Update player inventory
-        unsold_bikes = ProducedBike.objects.filter(
-            session=self.session,
-            is_sold=False
-        )
-        
-        for bike in unsold_bikes:
-            bike.update_inventory_age(month, year)
-        
+        # Update player inventory (bikes and inventory lots)
+        BikeInventory(self.session).update_ages(month, year)
+
         # Update competitor inventory
-        competitor_productions = CompetitorProduction.objects.filter(
-            competitor__session=self.session,
-            quantity_in_inventory__gt=0
-        )
-        
-        for production in competitor_productions:
-            production.update_inventory_age(month, year)
+        CompetitorProduction.update_inventory_ages(self.session, month, year)
     
-    def _process_competitive_segment_sales(self, market, bike_type, segment, month, year):
+    def _process_competitive_segment_sales(self, market, bike_type, segment, month, year, competition=None):
         """Process sales for a specific market/bike/segment with competitive allocation"""
-        # Get market competition data
-        try:
-            competition = MarketCompetition.objects.get(
-                session=self.session,
-                market=market,
-                bike_type=bike_type,
-                price_segment=segment,
-                month=month,
-                year=year
-            )
-        except MarketCompetition.DoesNotExist:
-            # Create if not exists
+        if competition is None:
+            # Create if not calculated for this period
             competition = self.market_engine._calculate_segment_volume(market, bike_type, segment, month, year)
         
         # Collect all offers (player + competitors)
@@ -87,12 +122,17 @@ class CompetitiveSalesEngine:
         # Distribute market demand among offers
         allocations = self.market_engine.distribute_market_demand(competition, offers)
         
-        # Process allocations
+        # Process allocations (player sales are settled together)
         total_sold = 0
+        player_allocations = []
         for allocation in allocations:
             if allocation['quantity_allocated'] > 0:
                 total_sold += allocation['quantity_allocated']
-                self._execute_sale(allocation, market, bike_type, segment, month, year)
+                if allocation['seller'] == 'player':
+                    player_allocations.append(allocation)
+                else:
+                    self._execute_sale(allocation, market, bike_type, segment, month, year)
+        self._execute_player_sales(player_allocations, market, bike_type, month, year)
         
         # Update market competition with actual results
         competition.actual_sales_volume = total_sold
@@ -117,22 +157,14 @@ class CompetitiveSalesEngine:
         else:
             competition.price_pressure = (1.0 - competition.saturation_level) * 0.2
         
-        competition.save()
+        self._changed_competitions.append(competition)
     
     def _collect_player_offers(self, market, bike_type, segment, month, year):
         """Collect player sales offers for this market segment"""
         offers = []
         
-        # Find player sales orders for this segment
-        player_orders = SalesOrder.objects.filter(
-            session=self.session,
-            market=market,
-            bike__bike_type=bike_type,
-            bike__price_segment=segment,
-            sale_month__lte=month,
-            sale_year=year,
-            is_completed=False
-        )
+        # Player sales orders for this segment (see _load_offers)
+        player_orders = self._player_orders.get((market.id, bike_type.id, segment), [])
         
         for order in player_orders:
             # Apply aging penalty to price
@@ -158,13 +190,11 @@ class CompetitiveSalesEngine:
         """Collect competitor sales offers for this market segment"""
         offers = []
         
-        # Get all competitors with inventory for this segment
-        competitor_productions = CompetitorProduction.objects.filter(
-            competitor__session=self.session,
-            bike_type=bike_type,
-            price_segment=segment,
-            quantity_in_inventory__gt=0
-        )
+        # Competitor productions with inventory for this segment (see _load_offers)
+        competitor_productions = [
+            production for production in self._competitor_productions.get((bike_type.id, segment), [])
+            if production.quantity_in_inventory > 0
+        ]
         
         for production in competitor_productions:
             competitor = production.competitor
@@ -195,6 +225,7 @@ class CompetitiveSalesEngine:
                 'seller': 'competitor',
                 'seller_id': competitor.id,
                 'production_id': production.id,
+                'production': production,
                 'quantity': max_offer,
                 'price': final_price,
                 'quality_factor': quality_factor,
@@ -260,87 +291,67 @@ class CompetitiveSalesEngine:
     def _execute_sale(self, allocation, market, bike_type, segment, month, year):
         """Execute a successful sale allocation"""
         if allocation['seller'] == 'player':
-            self._execute_player_sale(allocation, month, year)
+            self._execute_player_sales([allocation], market, bike_type, month, year)
         elif allocation['seller'] == 'competitor':
             self._execute_competitor_sale(allocation, market, bike_type, segment, month, year)
     
-    def _execute_player_sale(self, allocation, month, year):
-        """Execute player sale"""
-        try:
-            order = SalesOrder.objects.get(id=allocation['order_id'])
-            
-            # Mark order as completed
-            order.is_completed = True
-            order.save()
-            
-            # Mark bike as sold
-            if allocation.get('bike_id'):
-                try:
-                    bike = ProducedBike.objects.get(id=allocation['bike_id'])
-                    bike.is_sold = True
-                    bike.save()
-                except ProducedBike.DoesNotExist:
-                    pass
-            
-            # Calculate revenue (price already includes aging penalty)
-            revenue = allocation['price'] - order.transport_cost
-            
-            # Update session balance
-            self.session.balance += revenue
-            self.session.save()
-            
-            # Create transaction record
-            Transaction.objects.create(
-                session=self.session,
-                transaction_type='income',
-                category='Verkäufe',
-                amount=revenue,
-                description=f'Verkauf {order.bike.bike_type.name} in {order.market.name}',
-                month=month,
-                year=year
-            )
-            
-        except SalesOrder.DoesNotExist:
-            pass
-    
+    def _execute_player_sales(self, allocations, market, bike_type, month, year):
+        """Execute the player sales of a segment; orders and bikes are written by _flush_sales"""
+        if not allocations:
+            return
+
+        orders = [order for order in (self._open_orders.get(allocation['order_id']) for allocation in allocations) if order]
+        if not orders:
+            return
+
+        # Mark orders as completed and bikes as sold
+        self._completed_orders.extend(orders)
+        for order in orders:
+            del self._open_orders[order.id]
+
+        # Calculate revenue (price already includes aging penalty)
+        prices = {allocation['order_id']: allocation['price'] for allocation in allocations}
+        revenue = sum((prices[order.id] - order.transport_cost for order in orders), Decimal('0'))
+
+        # Book revenue (written with the month's other ledger entries)
+        self.ledger.record(
+            'income',
+            'Verkäufe',
+            revenue,
+            f'Verkauf {len(orders)}x {bike_type.name} in {market.name}',
+            month=month,
+            year=year
+        )
+
     def _execute_competitor_sale(self, allocation, market, bike_type, segment, month, year):
-        """Execute competitor sale"""
-        try:
-            if 'production_id' not in allocation:
-                print(f"Warning: No production_id in allocation: {allocation}")
-                return
-            
-            production = CompetitorProduction.objects.get(id=allocation['production_id'])
-            competitor = allocation['competitor']
-            
-            quantity_sold = allocation['quantity_allocated']
-            sale_price = allocation['price']
-            
-            # Update production inventory
-            production.quantity_in_inventory -= quantity_sold
-            production.save()
-            
-            # Create competitor sale record
-            CompetitorSale.objects.create(
-                competitor=competitor,
-                market=market,
-                bike_type=bike_type,
-                price_segment=segment,
-                month=month,
-                year=year,
-                quantity_offered=allocation['quantity'],
-                quantity_sold=quantity_sold,
-                sale_price=sale_price,
-                total_revenue=sale_price * quantity_sold
-            )
-            
-            # Update competitor statistics
-            competitor.total_bikes_sold += quantity_sold
-            competitor.total_revenue += sale_price * quantity_sold
-            competitor.save()
-            
-        except CompetitorProduction.DoesNotExist:
-            pass
+        """Execute competitor sale; the rows are written by _flush_sales"""
+        production = allocation['production']
+        competitor = allocation['competitor']
+        quantity_sold = allocation['quantity_allocated']
+        sale_price = allocation['price']
+
+        # Update production inventory
+        production.quantity_in_inventory -= quantity_sold
+        self._changed_productions[production.id] = production
+
+        # Create competitor sale record
+        self._competitor_sales.append(CompetitorSale(
+            competitor=competitor,
+            market=market,
+            bike_type=bike_type,
+            price_segment=segment,
+            month=month,
+            year=year,
+            quantity_offered=allocation['quantity'],
+            quantity_sold=quantity_sold,
+            sale_price=sale_price,
+            total_revenue=sale_price * quantity_sold
+        ))
+
+        # Update competitor statistics
+        competitor.total_bikes_sold += quantity_sold
+        competitor.total_revenue += sale_price * quantity_sold
+        self._changed_competitors[competitor.id] = competitor
     
     def get_market_competition_data(self, market, bike_type, segment, month, year):
         """Get market competition data for analysis"""
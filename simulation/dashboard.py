@@ -0,0 +1,91 @@
+"""
+Gecachter Dashboard-Snapshot einer Session.
+
+session_detail used to build a full SimulationEngine (all sub-engines) on every
+page view, list every unsold bike and walk all of them for the aging summary.
+The snapshot holds only plain values (counts, sums, the latest transactions)
+and is cached until something it shows changes. The month rollover and saves
+of the session's transactions, component stocks, workers or finished-goods
+lots bump its version (see signals.py). Balance and month come from the
+session row the caller has already loaded; they are part of the cache key, so
+saving the session needs no bump.
+
+Unsold bikes are summarised with one aggregate query (BikeInventory.statistics)
+over the inventory lots when the snapshot is built, so serving a cached
+dashboard never touches the inventory.
+"""
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from bikeshop.cache_versions import bump_cache_version, get_cache_version
+
+CACHE_NAME = 'dashboard'
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+
+def _snapshot_key(session, version):
+    return (f'simulation:dashboard:snapshot:{session.id}:{version}:'
+            f'{session.current_year}:{session.current_month}:{session.balance}')
+
+
+def invalidate_dashboard_snapshot(session_id):
+    """Markiert den Dashboard-Snapshot einer Session als veraltet"""
+    bump_cache_version(session_id, CACHE_NAME)
+
+
+def get_dashboard_snapshot(session):
+    """Liefert den (gecachten) Dashboard-Snapshot einer Session"""
+    version = get_cache_version(session.id, CACHE_NAME)
+    key = _snapshot_key(session, version)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_dashboard_snapshot(session)
+        snapshot['version'] = version
+        cache.set(key, snapshot, SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def build_dashboard_snapshot(session):
+    """Berechnet die Dashboard-Werte einer Session"""
+    from bikeshop.models import Worker
+    from finance.models import Transaction
+    from production.inventory import BikeInventory
+    from warehouse.models import ComponentStock
+
+    stocks = ComponentStock.objects.filter(session=session).aggregate(
+        rows=Count('id'), quantity=Sum('quantity')
+    )
+
+    workers = {}
+    for worker in Worker.objects.filter(session=session).order_by('id'):
+        workers.setdefault(worker.worker_type, worker.count)
+    total_workers = workers.get('skilled', 0) + workers.get('unskilled', 0)
+
+    recent_transactions = list(Transaction.objects.filter(
+        session=session
+    ).order_by('-created_at').values(
+        'transaction_type', 'category', 'amount', 'description', 'month', 'year'
+    )[:10])
+
+    inventory = BikeInventory(session).statistics()
+
+    return {
+        'balance': session.balance,
+        'month': session.current_month,
+        'year': session.current_year,
+        'component_stock_count': stocks['rows'] or 0,
+        'total_components': stocks['quantity'] or 0,
+        'total_bikes': inventory['total_unsold'],
+        'workers': total_workers,
+        'total_workers': total_workers,
+        'skilled_workers': workers.get('skilled', 0),
+        'unskilled_workers': workers.get('unskilled', 0),
+        'recent_transactions': recent_transactions,
+        'inventory_aging_summary': {
+            'buckets': inventory['buckets'],
+            'total_unsold': inventory['total_unsold'],
+            'total_storage_cost': inventory['total_storage_cost'],
+        },
+        'generated_at': timezone.now(),
+    }
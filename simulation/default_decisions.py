@@ -0,0 +1,165 @@
+"""
+Standardentscheidungen für Sessions ohne Spieler.
+
+Used by the headless ``simulate_months`` command: for the current month it
+orders missing components, plans production for every bike type and offers
+all unsold bikes on the first market at their list price.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from bikeshop.compatibility import get_compatibility_index
+from bikeshop.models import BikePrice, BikeType, SupplierPrice
+from procurement.models import ProcurementOrder, ProcurementOrderItem
+from production.inventory import BikeInventory
+from production.models import ProductionPlan, ProductionOrder
+from sales.models import Market, SalesDecision
+from warehouse.models import ComponentStock
+
+
+class DefaultDecisionGenerator:
+    """Erzeugt Einkauf, Produktionsplan und Verkaufsentscheidungen für den aktuellen Monat"""
+
+    def __init__(self, session, bikes_per_type=10, price_segment='standard'):
+        self.session = session
+        self.bikes_per_type = bikes_per_type
+        self.price_segment = price_segment
+
+    def generate(self):
+        """Legt alle Standardentscheidungen an und liefert eine Zusammenfassung"""
+        plan_orders = self._plan_production()
+        components_ordered = self._order_components(plan_orders)
+        bikes_offered = self._create_sales_decisions()
+        return {
+            'bikes_planned': sum(order.quantity_planned for order in plan_orders),
+            'components_ordered': components_ordered,
+            'bikes_offered': bikes_offered,
+        }
+
+    def _plan_production(self):
+        """Produktionsplan mit ``bikes_per_type`` Fahrrädern je Fahrradtyp (falls noch keiner existiert)"""
+        plan, created = ProductionPlan.objects.get_or_create(
+            session=self.session,
+            month=self.session.current_month,
+            year=self.session.current_year
+        )
+        if not created:
+            return []
+
+        return ProductionOrder.objects.bulk_create([
+            ProductionOrder(
+                plan=plan,
+                bike_type=bike_type,
+                price_segment=self.price_segment,
+                quantity_planned=self.bikes_per_type
+            )
+            for bike_type in BikeType.objects.filter(session=self.session).order_by('id')
+        ])
+
+    def _order_components(self, plan_orders):
+        """Bestellt fehlende Komponenten beim günstigsten Lieferanten der passendsten Komponente"""
+        if not plan_orders:
+            return 0
+
+        index = get_compatibility_index(self.session)
+        stock = defaultdict(int)
+        for component_id, quantity in ComponentStock.objects.filter(
+            session=self.session, quantity__gt=0
+        ).values_list('component_id', 'quantity'):
+            stock[component_id] += quantity
+
+        cheapest_prices = {}
+        for supplier_price in SupplierPrice.objects.filter(
+            session=self.session
+        ).select_related('supplier', 'component').order_by('base_price', 'id'):
+            cheapest_prices.setdefault(supplier_price.component_id, supplier_price)
+
+        # supplier -> [(supplier price, quantity)]
+        needed = defaultdict(list)
+        for order in plan_orders:
+            for component_type_name in index.get_required_components(order.bike_type):
+                ranked = index.get_ranked_components(order.bike_type, order.price_segment, component_type_name)
+                if not ranked:
+                    continue
+
+                shortfall = order.quantity_planned
+                for component_id, _ in ranked:
+                    used = min(stock[component_id], shortfall)
+                    stock[component_id] -= used
+                    shortfall -= used
+
+                purchasable = [cheapest_prices[component_id] for component_id, _ in ranked
+                               if component_id in cheapest_prices]
+                if shortfall > 0 and purchasable:
+                    needed[purchasable[0].supplier].append((purchasable[0], shortfall))
+
+        components_ordered = 0
+        for supplier, items in needed.items():
+            order_total = sum((price.price * quantity for price, quantity in items), Decimal('0'))
+            if order_total > self.session.balance:
+                continue
+
+            procurement_order = ProcurementOrder.objects.create(
+                session=self.session,
+                supplier=supplier,
+                month=self.session.current_month,
+                year=self.session.current_year,
+                total_cost=order_total
+            )
+            ProcurementOrderItem.objects.bulk_create([
+                ProcurementOrderItem(
+                    order=procurement_order,
+                    component=price.component,
+                    quantity_ordered=quantity,
+                    unit_price=price.price
+                )
+                for price, quantity in items
+            ])
+
+            # Guthaben reduzieren (wie in der Einkaufsansicht)
+            self.session.balance -= order_total
+            components_ordered += sum(quantity for _, quantity in items)
+
+        self.session.save()
+        return components_ordered
+
+    def _create_sales_decisions(self):
+        """Bietet alle nicht bereits verplanten Fahrräder zum Listenpreis auf dem ersten Markt an"""
+        market = Market.objects.filter(session=self.session).order_by('id').first()
+        if not market:
+            return 0
+
+        prices = {
+            (bike_price.bike_type_id, bike_price.price_segment): bike_price.price
+            for bike_price in BikePrice.objects.filter(session=self.session).select_related('session')
+        }
+
+        already_offered = defaultdict(int)
+        for decision in SalesDecision.objects.filter(session=self.session, is_processed=False):
+            already_offered[(decision.bike_type_id, decision.price_segment)] += decision.quantity
+
+        inventory = BikeInventory(self.session)
+        available = defaultdict(int)
+        for lot in inventory.get_lots():
+            available[(lot.bike_type_id, lot.price_segment)] += lot.quantity
+
+        decisions = []
+        for (bike_type_id, price_segment), quantity in available.items():
+            quantity -= already_offered[(bike_type_id, price_segment)]
+            price = prices.get((bike_type_id, price_segment))
+            if quantity <= 0 or not price:
+                continue
+            decisions.append(SalesDecision(
+                session=self.session,
+                market=market,
+                bike_type_id=bike_type_id,
+                price_segment=price_segment,
+                quantity=quantity,
+                desired_price=price,
+                transport_cost=market.transport_cost_home,
+                decision_month=self.session.current_month,
+                decision_year=self.session.current_year
+            ))
+
+        SalesDecision.objects.bulk_create(decisions)
+        return sum(decision.quantity for decision in decisions)
@@ -1,17 +1,26 @@
 from django.db import transaction, models
 from bikeshop.models import GameSession, Worker, BikeType
 from procurement.models import ProcurementOrder, ProcurementOrderItem
-from production.models import ProductionPlan, ProductionOrder, ProducedBike
-from warehouse.models import Warehouse, ComponentStock
+from production.models import ProductionPlan, ProductionOrder, ProducedBike, ProducedBikeLot
+from production.inventory import BikeInventory
+from production.cost_model import get_production_cost_model
+from warehouse.models import ComponentStock
 from finance.models import Credit, Transaction, MonthlyReport
+from finance.ledger import SessionLedger
 from sales.models import SalesOrder, Market
 from sales.market_simulator import MarketSimulator
+from sales.research_estimates import refresh_research_estimates
 from competitors.ai_engine import CompetitorAIEngine
 from competitors.models import MarketCompetition, CompetitorSale
 from .competitive_sales_engine import CompetitiveSalesEngine
+from .dashboard import invalidate_dashboard_snapshot
+from .instrumentation import NullPhaseTimer, PhaseTimer
+from .session_state import SessionState
 from business_strategy.business_engine import BusinessStrategyEngine
 from random_events.event_engine import RandomEventsEngine
 from finance.financial_engine import FinancialReportingEngine
+from multiplayer.parameter_utils import clear_game_parameters_context
+from collections import defaultdict
 from decimal import Decimal
 import random
 import logging
@@ -24,62 +33,120 @@ class SimulationEngine:
 
     def __init__(self, session):
         self.session = session
-        self.competitor_engine = CompetitorAIEngine(session)
-        self.competitive_sales_engine = CompetitiveSalesEngine(session)
-        self.market_simulator = MarketSimulator(session)
-        self.business_strategy_engine = BusinessStrategyEngine(session)
-        self.random_events_engine = RandomEventsEngine(session)
+        # Buchungen und Kontostand werden pro Monat gesammelt und gemeinsam geschrieben
+        self.ledger = SessionLedger(session)
+        # Stammdaten (Arbeiter, Lager, Märkte, Fahrradtypen, Preise) für alle Engines
+        self.state = SessionState(session)
+        self.competitor_engine = CompetitorAIEngine(session, state=self.state)
+        self.competitive_sales_engine = CompetitiveSalesEngine(session, ledger=self.ledger, state=self.state)
+        self.market_simulator = MarketSimulator(session, ledger=self.ledger, state=self.state)
+        self.business_strategy_engine = BusinessStrategyEngine(session, ledger=self.ledger)
+        self.random_events_engine = RandomEventsEngine(session, ledger=self.ledger)
         self.financial_engine = FinancialReportingEngine(session)
+        self.bike_inventory = BikeInventory(session)
+
+    def process_month(self, timer=None):
+        """Verarbeitet einen Monat der Simulation
+
+        ``timer`` (see simulation.instrumentation.PhaseTimer) optionally measures
+        every phase of the month. Without one, phases are measured and stored as
+        TurnPerformanceRecords when performance tracking is enabled in the
+        session's SimulationSettings. The records are written once the month is
+        committed, so a failed month stores none. Multiplayer turns are recorded
+        by MultiplayerSimulationEngine (MultiplayerGame.enable_performance_tracking).
+        """
+        month, year = self.session.current_month, self.session.current_year
+        record_performance = timer is None and self._performance_tracking_enabled()
+        if record_performance:
+            timer = PhaseTimer()
+        timer = timer or NullPhaseTimer()
+
+        self._process_month_phases(timer)
+
+        if record_performance:
+            from .models import TurnPerformanceRecord
+            transaction.on_commit(lambda: TurnPerformanceRecord.record(
+                timer, 'process_month', month, year, session=self.session
+            ))
+
+    def _performance_tracking_enabled(self):
+        """Per-Phase-Messung für diese Session eingeschaltet?"""
+        from .models import SimulationSettings
+
+        return SimulationSettings.objects.filter(session=self.session, performance_tracking=True).exists()
+
+    def _process_month_phases(self, timer):
+        """Führt die zehn Phasen eines Monats aus"""
+        self.state.refresh()
+        clear_game_parameters_context(self.session)
 
-    def process_month(self):
-        """Verarbeitet einen Monat der Simulation"""
         with transaction.atomic():
             # 1. Business Strategy processing (R&D, Marketing, Sustainability)
-            self.business_strategy_engine.process_monthly_business_strategy()
+            with timer.phase('business_strategy'):
+                self.business_strategy_engine.process_monthly_business_strategy()
 
             # 2. Random Events processing (innovations, regulations, market opportunities)
-            self.random_events_engine.process_monthly_events()
+            with timer.phase('random_events'):
+                self.random_events_engine.process_monthly_events()
 
             # 3. Lieferungen verarbeiten
-            self._process_deliveries()
+            with timer.phase('deliveries'):
+                self._process_deliveries()
 
             # 4. Produktion durchführen (with business strategy bonuses)
-            self._process_production()
+            with timer.phase('production'):
+                self._process_production()
 
             # 5. Konkurrenten-Aktivitäten
-            self.competitor_engine.process_competitor_month()
+            with timer.phase('competitors'):
+                self.competitor_engine.process_competitor_month()
 
             # 6. Löhne zahlen
-            self._pay_salaries()
+            with timer.phase('salaries'):
+                self._pay_salaries()
 
             # 7. Kreditzahlungen
-            self._process_credit_payments()
+            with timer.phase('credits'):
+                self._process_credit_payments()
 
             # 8. Alle 3 Monate: Verkäufe verarbeiten (with marketing and sustainability effects)
-            if self.session.current_month % 3 == 0:
-                self._process_competitive_sales()
-                self._pay_rent()
-            else:
-                # Update inventory aging monthly
-                self._update_inventory_ages()
+            with timer.phase('sales'):
+                if self.session.current_month % 3 == 0:
+                    self._process_competitive_sales()
+                    self._pay_rent()
+                else:
+                    # Update inventory aging monthly
+                    self._update_inventory_ages()
 
             # 9. Generate comprehensive financial reports and monthly settlement
-            self.financial_engine.generate_monthly_settlement()
+            with timer.phase('financial_settlement'):
+                # Gesammelte Buchungen schreiben, bevor die Berichte sie auswerten
+                self.ledger.flush()
+                self.financial_engine.generate_monthly_settlement()
 
             # 10. Nächsten Monat
-            self._advance_month()
+            with timer.phase('month_advance'):
+                self._advance_month()
+
+        # Dashboard zeigt ab jetzt den neuen Monat
+        invalidate_dashboard_snapshot(self.session.id)
 
     def _process_deliveries(self):
-        """Verarbeitet Lieferungen"""
-        orders = ProcurementOrder.objects.filter(
+        """Verarbeitet Lieferungen (alle Bestellungen des Monats in einem Durchgang)"""
+        orders = list(ProcurementOrder.objects.filter(
             session=self.session,
             month=self.session.current_month,
             year=self.session.current_year,
             is_delivered=False
-        )
+        ).select_related('supplier').prefetch_related('items'))
 
-        warehouses = list(Warehouse.objects.filter(session=self.session))
-        default_warehouse = warehouses[0] if warehouses else None
+        if not orders:
+            return
+
+        default_warehouse = self.state.default_warehouse
+        delivered_items = []
+        # (component_id, supplier_id) -> delivered quantity
+        stock_deltas = defaultdict(int)
 
         for order in orders:
             # Reklamationen simulieren
@@ -95,213 +162,154 @@ class SimulationEngine:
                     item.is_defective = defective_quantity > 0
 
                 item.quantity_delivered = delivered_quantity
-                item.save()
+                delivered_items.append(item)
 
-                # In Lager einbuchen
                 if default_warehouse and delivered_quantity > 0:
-                    stock, created = ComponentStock.objects.get_or_create(
-                        session=self.session,
-                        warehouse=default_warehouse,
-                        component=item.component,
-                        defaults={'quantity': 0}
-                    )
-                    stock.quantity += delivered_quantity
-                    stock.save()
+                    stock_deltas[(item.component_id, order.supplier_id)] += delivered_quantity
 
             order.is_delivered = True
-            order.save()
+
+        ProcurementOrderItem.objects.bulk_update(delivered_items, ['quantity_delivered', 'is_defective'])
+        ProcurementOrder.objects.bulk_update(orders, ['is_delivered'])
+
+        # In Lager einbuchen
+        if stock_deltas:
+            self._book_component_deliveries(default_warehouse, stock_deltas)
+
+    def _book_component_deliveries(self, warehouse, stock_deltas):
+        """Bucht gelieferte Mengen pro (Komponente, Lieferant) in den Lagerbestand ein"""
+        existing = {
+            (stock.component_id, stock.supplier_id): stock
+            for stock in ComponentStock.objects.filter(
+                session=self.session,
+                warehouse=warehouse,
+                component_id__in={component_id for component_id, _ in stock_deltas}
+            )
+        }
+
+        updated_stocks = []
+        new_stocks = []
+        for (component_id, supplier_id), quantity in stock_deltas.items():
+            stock = existing.get((component_id, supplier_id))
+            if stock:
+                stock.quantity += quantity
+                updated_stocks.append(stock)
+            else:
+                new_stocks.append(ComponentStock(
+                    session=self.session,
+                    warehouse=warehouse,
+                    component_id=component_id,
+                    supplier_id=supplier_id,
+                    quantity=quantity
+                ))
+
+        ComponentStock.objects.bulk_update(updated_stocks, ['quantity'])
+        ComponentStock.objects.bulk_create(new_stocks)
+        ComponentStock.book_usage(updated_stocks + new_stocks)
 
     def _process_production(self):
-        """Führt Produktion durch"""
+        """Führt Produktion durch (Batch pro Produktionsauftrag)"""
         try:
             plan = ProductionPlan.objects.get(
                 session=self.session,
                 month=self.session.current_month,
                 year=self.session.current_year
             )
+        except ProductionPlan.DoesNotExist:
+            return
 
-            warehouses = Warehouse.objects.filter(session=self.session)
-            default_warehouse = warehouses.first()
-
-            for order in plan.orders.all():
-                produced = 0
-
-                for _ in range(order.quantity_planned):
-                    # Prüfe verfügbare Materialien
-                    if self._check_materials_available(order.bike_type, order.price_segment):
-                        # Materialien verbrauchen
-                        self._consume_materials(order.bike_type, order.price_segment)
-
-                        # Fahrrad produzieren
-                        bike = ProducedBike.objects.create(
-                            session=self.session,
-                            bike_type=order.bike_type,
-                            price_segment=order.price_segment,
-                            production_month=self.session.current_month,
-                            production_year=self.session.current_year,
-                            warehouse=default_warehouse,
-                            production_cost=self._calculate_production_cost(order.bike_type)
-                        )
-                        produced += 1
-                    else:
-                        break
-
-                order.quantity_produced = produced
-                order.save()
+        default_warehouse = self.state.default_warehouse
 
-        except ProductionPlan.DoesNotExist:
-            pass
+        # One in-memory snapshot of components, qualities and stock for the whole plan
+        snapshot = self._load_production_snapshot()
+        touched_stocks = {}
 
-    def _check_materials_available(self, bike_type, price_segment='standard'):
-        """Prüft ob Materialien mit passender Qualität verfügbar sind"""
-        from bikeshop.models import Component, ComponentType
-        
-        # Get all required component types for this bike
-        required_components = bike_type.get_required_components()
-        
-        for component_type_name, compatible_names in required_components.items():
-            # Check if we have any compatible components in stock
-            component_type = ComponentType.objects.filter(
-                session=self.session, 
-                name=component_type_name
-            ).first()
-            
-            if not component_type:
-                continue
-                
-            # Find compatible components
-            compatible_components = Component.objects.filter(
-                session=self.session,
-                component_type=component_type,
-                name__in=compatible_names
-            )
-            
-            # Check if any compatible component has stock AND correct quality
-            has_stock = False
-            for component in compatible_components:
-                if component.is_compatible_with_segment(self.session, price_segment):
-                    total_stock = ComponentStock.objects.filter(
-                        session=self.session,
-                        component=component
-                    ).aggregate(total=models.Sum('quantity'))['total'] or 0
-                    
-                    if total_stock >= 1:
-                        has_stock = True
-                        break
-            
-            if not has_stock:
-                return False
+        orders = list(plan.orders.select_related('bike_type'))
+        for order in orders:
+            produced = self._produce_order_batch(order, snapshot, touched_stocks, default_warehouse)
+            order.quantity_produced = produced
 
-        return True
+        if touched_stocks:
+            ComponentStock.objects.bulk_update(touched_stocks.values(), ['quantity'])
+            ComponentStock.book_usage(touched_stocks.values())
+        if orders:
+            ProductionOrder.objects.bulk_update(orders, ['quantity_produced'])
 
-    def _consume_materials(self, bike_type, price_segment='standard'):
-        """Verbraucht Materialien für Produktion mit Qualitätsprüfung"""
-        from bikeshop.models import Component, ComponentType
-        
-        # Get all required component types for this bike
-        required_components = bike_type.get_required_components()
-        
-        for component_type_name, compatible_names in required_components.items():
-            # Find the first available compatible component
-            component_type = ComponentType.objects.filter(
-                session=self.session, 
-                name=component_type_name
-            ).first()
-            
-            if not component_type:
+    def _load_production_snapshot(self):
+        """Lädt Kompatibilitätsindex und Lagerbestände einmalig"""
+        from bikeshop.compatibility import get_compatibility_index
+
+        stocks_by_component = {}
+        for stock in ComponentStock.objects.filter(
+            session=self.session,
+            quantity__gt=0
+        ).order_by('id'):
+            stocks_by_component.setdefault(stock.component_id, []).append(stock)
+
+        return {
+            'index': get_compatibility_index(self.session),
+            'stocks_by_component': stocks_by_component,
+        }
+
+    def _produce_order_batch(self, order, snapshot, touched_stocks, warehouse):
+        """Produziert die maximal mögliche Menge eines Auftrags aus dem Lager-Snapshot"""
+        bike_type = order.bike_type
+        stocks_by_component = snapshot['stocks_by_component']
+
+        # Collect the stock rows usable for every required component type, best quality first
+        stock_queues = []
+        producible = order.quantity_planned
+        index = snapshot['index']
+        for component_type_name in index.get_required_components(bike_type):
+            if index.get_component_type_id(component_type_name) is None:
                 continue
-                
-            # Find compatible components with stock
-            compatible_components = Component.objects.filter(
-                session=self.session,
-                component_type=component_type,
-                name__in=compatible_names
-            )
-            
-            # Filter by quality compatibility and prioritize appropriate quality
-            quality_compatible = []
-            for component in compatible_components:
-                if component.is_compatible_with_segment(self.session, price_segment):
-                    stock = ComponentStock.objects.filter(
-                        session=self.session,
-                        component=component,
-                        quantity__gt=0
-                    ).first()
-                    if stock:
-                        quality_compatible.append((component, stock))
-            
-            # Sort by quality to prefer exact matches
-            def quality_priority(comp_stock):
-                component, stock = comp_stock
-                quality = component.get_quality_for_session(self.session)
-                quality_rank = {'basic': 1, 'standard': 2, 'premium': 3}
-                segment_rank = {'cheap': 1, 'standard': 2, 'premium': 3}
-                
-                # Prefer exact quality matches
-                if (quality == 'basic' and price_segment == 'cheap') or \
-                   (quality == 'standard' and price_segment == 'standard') or \
-                   (quality == 'premium' and price_segment == 'premium'):
-                    return 0  # Highest priority
-                else:
-                    return abs(quality_rank.get(quality, 2) - segment_rank.get(price_segment, 2))
-            
-            quality_compatible.sort(key=quality_priority)
-            
-            # Consume from the best available component
-            consumed = False
-            if quality_compatible:
-                component, stock = quality_compatible[0]
-                stock.quantity -= 1
-                stock.save()
-                consumed = True
-            
-            # This should not happen if _check_materials_available passed
-            if not consumed:
-                print(f"Warning: Could not consume {component_type_name} for {bike_type.name} ({price_segment})")
 
-    def _calculate_production_cost(self, bike_type):
-        """Berechnet Produktionskosten mit Business Strategy Boni"""
-        workers = Worker.objects.filter(session=self.session)
-        skilled_worker = workers.filter(worker_type='skilled').first()
-        unskilled_worker = workers.filter(worker_type='unskilled').first()
+            queue = []
+            for component_id, _ in index.get_ranked_components(
+                bike_type, order.price_segment, component_type_name
+            ):
+                queue.extend(stocks_by_component.get(component_id, []))
 
-        base_skilled_cost = (skilled_worker.hourly_wage * Decimal(str(bike_type.skilled_worker_hours))
-                            if skilled_worker else Decimal('0'))
-        base_unskilled_cost = (unskilled_worker.hourly_wage * Decimal(str(bike_type.unskilled_worker_hours))
-                              if unskilled_worker else Decimal('0'))
+            available = sum(stock.quantity for stock in queue)
+            producible = min(producible, available)
+            stock_queues.append(queue)
 
-        base_cost = base_skilled_cost + base_unskilled_cost
-        
-        # Apply R&D cost reduction bonuses
-        rd_bonuses = self.business_strategy_engine.get_rd_production_bonuses()
-        cost_reduction = rd_bonuses.get('cost_reduction', 0.0) / 100.0  # Convert percentage to decimal
-        
-        # Apply cost reduction (cannot reduce below 10% of original cost)
-        final_cost = base_cost * Decimal(str(max(0.1, 1.0 - cost_reduction)))
-        
-        return final_cost
+        if producible <= 0:
+            return 0
+
+        # Deduct component stock in memory; persisted with one bulk_update per plan
+        for queue in stock_queues:
+            remaining = producible
+            for stock in queue:
+                if remaining == 0:
+                    break
+                taken = min(stock.quantity, remaining)
+                if taken <= 0:
+                    continue
+                stock.quantity -= taken
+                remaining -= taken
+                touched_stocks[stock.id] = stock
+
+        production_cost = self._calculate_production_cost(bike_type)
+        self.bike_inventory.add(
+            bike_type, order.price_segment, producible, production_cost, warehouse=warehouse
+        )
+
+        return producible
+
+    def _calculate_production_cost(self, bike_type):
+        """Berechnet Produktionskosten mit Business Strategy Boni (aus dem Monats-Kostenmodell)"""
+        return get_production_cost_model(self.session, state=self.state).unit_cost(bike_type)
 
     def _pay_salaries(self):
         """Zahlt Löhne"""
-        workers = Worker.objects.filter(session=self.session)
         total_salaries = Decimal('0')
 
-        for worker in workers:
+        for worker in self.state.workers:
             salary = Decimal(str(worker.count)) * worker.hourly_wage * Decimal(str(worker.monthly_hours))
             total_salaries += salary
 
-        self.session.balance -= total_salaries
-        self.session.save()
-
-        Transaction.objects.create(
-            session=self.session,
-            transaction_type='expense',
-            category='Löhne',
-            amount=total_salaries,
-            description='Monatliche Lohnzahlungen',
-            month=self.session.current_month,
-            year=self.session.current_year
-        )
+        self.ledger.record('expense', 'Löhne', total_salaries, 'Monatliche Lohnzahlungen')
 
     def _process_credit_payments(self):
         """Verarbeitet Kreditzahlungen"""
@@ -310,7 +318,6 @@ class SimulationEngine:
 
         for credit in active_credits:
             if credit.remaining_months > 0:
-                self.session.balance -= credit.monthly_payment
                 total_payments += credit.monthly_payment
 
                 credit.remaining_months -= 1
@@ -319,15 +326,7 @@ class SimulationEngine:
                 credit.save()
 
         if total_payments > 0:
-            Transaction.objects.create(
-                session=self.session,
-                transaction_type='expense',
-                category='Kreditzahlungen',
-                amount=total_payments,
-                description='Monatliche Kreditzahlungen',
-                month=self.session.current_month,
-                year=self.session.current_year
-            )
+            self.ledger.record('expense', 'Kreditzahlungen', total_payments, 'Monatliche Kreditzahlungen')
 
     def _process_competitive_sales(self):
         """Process sales using competitive market system"""
@@ -349,13 +348,7 @@ class SimulationEngine:
     
     def _update_inventory_ages(self):
         """Update inventory ages for unsold bikes monthly"""
-        unsold_bikes = ProducedBike.objects.filter(
-            session=self.session,
-            is_sold=False
-        )
-        
-        for bike in unsold_bikes:
-            bike.update_inventory_age(self.session.current_month, self.session.current_year)
+        self.bike_inventory.update_ages(self.session.current_month, self.session.current_year)
     
     def _process_sales_legacy(self):
         """Legacy sales processing (kept for reference)"""
@@ -379,18 +372,7 @@ class SimulationEngine:
                 order.save()
 
         if total_revenue > 0:
-            self.session.balance += total_revenue
-            self.session.save()
-
-            Transaction.objects.create(
-                session=self.session,
-                transaction_type='income',
-                category='Verkäufe',
-                amount=total_revenue,
-                description='Verkaufserlöse',
-                month=self.session.current_month,
-                year=self.session.current_year
-            )
+            self.ledger.record('income', 'Verkäufe', total_revenue, 'Verkaufserlöse')
 
     def _simulate_sale_success(self, order):
         """Simuliert Verkaufserfolg mit Markt-Wettbewerb"""
@@ -452,26 +434,13 @@ class SimulationEngine:
 
     def _pay_rent(self):
         """Zahlt Lagermiete (alle 3 Monate)"""
-        warehouses = Warehouse.objects.filter(session=self.session)
-        total_rent = sum(w.rent_per_month for w in warehouses) * Decimal('3')  # 3 Monate
-
-        self.session.balance -= total_rent
-        self.session.save()
+        total_rent = sum(w.rent_per_month for w in self.state.warehouses) * Decimal('3')  # 3 Monate
 
-        Transaction.objects.create(
-            session=self.session,
-            transaction_type='expense',
-            category='Lagermiete',
-            amount=total_rent,
-            description='Quartalsweise Lagermiete',
-            month=self.session.current_month,
-            year=self.session.current_year
-        )
+        self.ledger.record('expense', 'Lagermiete', total_rent, 'Quartalsweise Lagermiete')
 
     def _reset_worker_hours(self):
         """Reset worker hours for the new month"""
-        workers = Worker.objects.filter(session=self.session)
-        for worker in workers:
+        for worker in self.state.workers:
             worker.used_hours_this_month = Decimal('0')
             worker.tracking_month = self.session.current_month
             worker.tracking_year = self.session.current_year
@@ -489,6 +458,16 @@ class SimulationEngine:
 
         self.session.save()
 
+        # Nachfrage des neuen Monats einmal auswürfeln
+        self.market_simulator.demand_calculator.generate_monthly_demand(
+            self.session.current_month, self.session.current_year
+        )
+        # Schätzbereiche laufender Marktforschung für den neuen Monat
+        refresh_research_estimates(
+            self.session, self.session.current_month, self.session.current_year,
+            calculator=self.market_simulator.demand_calculator
+        )
+
         # Reset worker hours for the new month
         self._reset_worker_hours()
         
@@ -527,75 +506,87 @@ class SimulationEngine:
             year=current_year
         )
         
-        total_income = sum(t.amount for t in transactions if t.transaction_type == 'income')
-        total_expenses = sum(t.amount for t in transactions if t.transaction_type == 'expense')
-        
-        # Production data
-        produced_bikes = ProducedBike.objects.filter(
-            session=self.session,
-            production_month=current_month,
-            production_year=current_year
+        transaction_totals = transactions.aggregate(
+            income=models.Sum('amount', filter=models.Q(transaction_type='income')),
+            expenses=models.Sum('amount', filter=models.Q(transaction_type='expense'))
         )
+        total_income = transaction_totals['income'] or Decimal('0')
+        total_expenses = transaction_totals['expenses'] or Decimal('0')
         
-        bikes_produced_count = produced_bikes.count()
-        total_production_cost = sum(bike.production_cost for bike in produced_bikes)
+        segment_names = dict(ProducedBike._meta.get_field('price_segment').choices)
         
+        # Production data (grouped per bike type and segment, from the inventory lots)
+        production_groups = ProducedBikeLot.objects.filter(
+            session=self.session,
+            production_month=current_month,
+            production_year=current_year,
+            quantity_produced__gt=0
+        ).values('bike_type__name', 'price_segment').annotate(
+            count=models.Sum('quantity_produced'),
+            cost=models.Sum(models.ExpressionWrapper(
+                models.F('quantity_produced') * models.F('production_cost'),
+                output_field=models.DecimalField(max_digits=14, decimal_places=2)
+            )),
+            first_id=models.Min('id')
+        ).order_by('first_id')
+        
+        bikes_produced_count = 0
+        total_production_cost = Decimal('0')
         production_summary = {}
-        for bike in produced_bikes:
-            bike_key = f"{bike.bike_type.name} ({bike.get_price_segment_display()})"
-            if bike_key not in production_summary:
-                production_summary[bike_key] = {'count': 0, 'cost': 0}
-            production_summary[bike_key]['count'] += 1
-            production_summary[bike_key]['cost'] += float(bike.production_cost)
+        for group in production_groups:
+            bike_key = f"{group['bike_type__name']} ({segment_names.get(group['price_segment'], group['price_segment'])})"
+            summary = production_summary.setdefault(bike_key, {'count': 0, 'cost': 0})
+            summary['count'] += group['count']
+            summary['cost'] += float(group['cost'] or 0)
+            bikes_produced_count += group['count']
+            total_production_cost += group['cost'] or Decimal('0')
         
         # ACTUAL COMPLETED SALES DATA (bikes actually sold this month)
-        # Get sales orders created this month directly from SalesOrder model
-        sales_orders_this_month = SalesOrder.objects.filter(
+        # PLANNED SALES DATA (sales orders created this month but not necessarily completed)
+        # Both summaries come from the same grouped SalesOrder query
+        sales_groups = SalesOrder.objects.filter(
             session=self.session,
             sale_month=current_month,
             sale_year=current_year
-        ).select_related('bike', 'bike__bike_type', 'market')
-
-        bikes_sold_count = sales_orders_this_month.count()
-
-        # Calculate revenues directly from sales orders
+        ).values('bike__bike_type__name', 'bike__price_segment').annotate(
+            count=models.Count('id'),
+            revenue=models.Sum('sale_price'),
+            transport_cost=models.Sum('transport_cost'),
+            completed=models.Count('id', filter=models.Q(is_completed=True)),
+            first_id=models.Min('id')
+        ).order_by('first_id')
+        
+        bikes_sold_count = 0
         total_sales_revenue = Decimal('0')
         total_transport_costs = Decimal('0')
-
-        # Create sales summary from sales orders
         sales_summary = {}
-        for sale_order in sales_orders_this_month:
-            bike_key = f"{sale_order.bike.bike_type.name} ({sale_order.bike.get_price_segment_display()})"
+        planned_sales_summary = {}
+        for group in sales_groups:
+            bike_key = f"{group['bike__bike_type__name']} ({segment_names.get(group['bike__price_segment'], group['bike__price_segment'])})"
+            revenue = group['revenue'] or Decimal('0')
+            transport_cost = group['transport_cost'] or Decimal('0')
 
-            if bike_key not in sales_summary:
-                sales_summary[bike_key] = {'count': 0, 'revenue': 0, 'transport_cost': 0, 'net_revenue': 0}
+            summary = sales_summary.setdefault(
+                bike_key, {'count': 0, 'revenue': 0, 'transport_cost': 0, 'net_revenue': 0}
+            )
+            summary['count'] += group['count']
+            summary['revenue'] += float(revenue)
+            summary['transport_cost'] += float(transport_cost)
+            summary['net_revenue'] += float(revenue - transport_cost)
 
-            sales_summary[bike_key]['count'] += 1
-            sales_summary[bike_key]['revenue'] += float(sale_order.sale_price)
-            sales_summary[bike_key]['transport_cost'] += float(sale_order.transport_cost)
-            sales_summary[bike_key]['net_revenue'] += float(sale_order.sale_price - sale_order.transport_cost)
+            planned = planned_sales_summary.setdefault(
+                bike_key, {'count': 0, 'revenue': 0, 'transport_cost': 0, 'status': 'pending'}
+            )
+            planned['count'] += group['count']
+            planned['revenue'] += float(revenue)
+            planned['transport_cost'] += float(transport_cost)
+            if group['completed']:
+                planned['status'] = 'completed'
 
             # Add to totals
-            total_sales_revenue += sale_order.sale_price
-            total_transport_costs += sale_order.transport_cost
-        
-        # PLANNED SALES DATA (sales orders created this month but not necessarily completed)
-        planned_sales = SalesOrder.objects.filter(
-            session=self.session,
-            sale_month=current_month,
-            sale_year=current_year
-        )
-        
-        planned_sales_summary = {}
-        for order in planned_sales:
-            bike_key = f"{order.bike.bike_type.name} ({order.bike.get_price_segment_display()})"
-            if bike_key not in planned_sales_summary:
-                planned_sales_summary[bike_key] = {'count': 0, 'revenue': 0, 'transport_cost': 0, 'status': 'pending'}
-            planned_sales_summary[bike_key]['count'] += 1
-            planned_sales_summary[bike_key]['revenue'] += float(order.sale_price)
-            planned_sales_summary[bike_key]['transport_cost'] += float(order.transport_cost)
-            if order.is_completed:
-                planned_sales_summary[bike_key]['status'] = 'completed'
+            bikes_sold_count += group['count']
+            total_sales_revenue += revenue
+            total_transport_costs += transport_cost
         
         # Procurement data
         procurement_orders = ProcurementOrder.objects.filter(
@@ -605,20 +596,26 @@ class SimulationEngine:
             is_delivered=True
         )
         
-        total_procurement_cost = sum(order.total_cost for order in procurement_orders)
+        total_procurement_cost = procurement_orders.aggregate(total=models.Sum('total_cost'))['total'] or Decimal('0')
+        
+        procurement_groups = ProcurementOrderItem.objects.filter(
+            order__in=procurement_orders
+        ).values('component__name', 'order__supplier__name').annotate(
+            quantity=models.Sum('quantity_delivered'),
+            cost=models.Sum(models.F('quantity_delivered') * models.F('unit_price')),
+            first_id=models.Min('id')
+        ).order_by('first_id')
         
         procurement_summary = {}
-        for order in procurement_orders:
-            for item in order.items.all():
-                component_name = item.component.name
-                if component_name not in procurement_summary:
-                    procurement_summary[component_name] = {
-                        'quantity': 0, 
-                        'cost': 0, 
-                        'supplier': order.supplier.name
-                    }
-                procurement_summary[component_name]['quantity'] += item.quantity_delivered
-                procurement_summary[component_name]['cost'] += float(item.total_price)
+        for group in procurement_groups:
+            # The first supplier of a component is shown (as before)
+            summary = procurement_summary.setdefault(group['component__name'], {
+                'quantity': 0,
+                'cost': 0,
+                'supplier': group['order__supplier__name']
+            })
+            summary['quantity'] += group['quantity'] or 0
+            summary['cost'] += float(group['cost'] or 0)
         
         # Calculate profit/loss
         profit_loss = total_income - total_expenses
@@ -694,7 +691,7 @@ class SimulationEngine:
         
         # Aktuelle Bestände
         component_stocks = ComponentStock.objects.filter(session=self.session)
-        produced_bikes = ProducedBike.objects.filter(session=self.session, is_sold=False)
+        produced_bikes = self.bike_inventory.get_lots()
 
         # Finanzübersicht
         recent_transactions = Transaction.objects.filter(
@@ -745,34 +742,9 @@ class SimulationEngine:
     
     def _get_inventory_aging_summary(self):
         """Get summary of inventory aging for dashboard"""
-        unsold_bikes = ProducedBike.objects.filter(
-            session=self.session,
-            is_sold=False
-        )
-        
-        aging_buckets = {
-            'new': 0,        # 0-1 months
-            'aging': 0,      # 2-3 months
-            'old': 0,        # 4-6 months
-            'very_old': 0    # 7+ months
-        }
-        
-        total_storage_cost = Decimal('0')
-        
-        for bike in unsold_bikes:
-            total_storage_cost += bike.storage_cost_accumulated
-            
-            if bike.months_in_inventory <= 1:
-                aging_buckets['new'] += 1
-            elif bike.months_in_inventory <= 3:
-                aging_buckets['aging'] += 1
-            elif bike.months_in_inventory <= 6:
-                aging_buckets['old'] += 1
-            else:
-                aging_buckets['very_old'] += 1
-        
+        statistics = self.bike_inventory.statistics()
         return {
-            'buckets': aging_buckets,
-            'total_unsold': unsold_bikes.count(),
-            'total_storage_cost': total_storage_cost
+            'buckets': statistics['buckets'],
+            'total_unsold': statistics['total_unsold'],
+            'total_storage_cost': statistics['total_storage_cost']
         }
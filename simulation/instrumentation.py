@@ -0,0 +1,116 @@
+"""
+Laufzeitmessung der Monatsverarbeitung.
+
+PhaseTimer measures each phase of SimulationEngine.process_month and
+MultiplayerSimulationEngine.process_multiplayer_turn: wall time, number of SQL
+queries, rows written (INSERT/UPDATE/DELETE row counts) and the slowest SQL
+statement. TurnPerformanceRecord.record stores the results.
+"""
+import time
+from contextlib import contextmanager, nullcontext
+
+from django.db import connection
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class PhaseStats:
+    """Messwerte einer Phase"""
+
+    def __init__(self, name):
+        self.name = name
+        self.wall_time = 0.0
+        self.queries = 0
+        self.rows_written = 0
+        self.slowest_sql = None
+        self.slowest_sql_time = 0.0
+
+    def add_query(self, sql, duration):
+        self.queries += 1
+        if duration > self.slowest_sql_time:
+            self.slowest_sql = sql
+            self.slowest_sql_time = duration
+
+    def as_dict(self):
+        return {
+            'phase': self.name,
+            'wall_time': self.wall_time,
+            'queries': self.queries,
+            'rows_written': self.rows_written,
+            'slowest_sql': self.slowest_sql,
+            'slowest_sql_time': self.slowest_sql_time,
+        }
+
+
+class PhaseTimer:
+    """Sammelt Messwerte pro Phase über eine oder mehrere Monatsverarbeitungen"""
+
+    def __init__(self):
+        self.phases = {}
+        self._current = None
+
+    def _execute_wrapper(self, execute, sql, params, many, context):
+        stats = self._current
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        if stats is not None:
+            stats.add_query(sql, time.perf_counter() - started)
+            if sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+                stats.rows_written += self._rows_written(sql, params, many, context)
+        return result
+
+    @staticmethod
+    def _rows_written(sql, params, many, context):
+        rowcount = getattr(context.get('cursor'), 'rowcount', -1)
+        returning = ' RETURNING ' in sql.upper()
+        if rowcount is not None and rowcount >= 0 and not returning:
+            return rowcount
+        # INSERT ... RETURNING reports no rowcount before the rows are fetched
+        if many:
+            return len(params)
+        return sql.count('), (') + 1
+
+    @contextmanager
+    def phase(self, name):
+        """Misst den umschlossenen Block als Phase ``name``"""
+        stats = self.phases.setdefault(name, PhaseStats(name))
+        previous = self._current
+        self._current = stats
+        started = time.perf_counter()
+        # Nested phases reuse the outer wrapper so queries are only counted once
+        wrapper = connection.execute_wrapper(self._execute_wrapper) if previous is None else nullcontext()
+        try:
+            with wrapper:
+                yield stats
+        finally:
+            stats.wall_time += time.perf_counter() - started
+            self._current = previous
+
+    def merge(self, other):
+        """Addiert die Messwerte eines anderen Timers"""
+        for name, stats in other.phases.items():
+            total = self.phases.setdefault(name, PhaseStats(name))
+            total.wall_time += stats.wall_time
+            total.queries += stats.queries
+            total.rows_written += stats.rows_written
+            if stats.slowest_sql_time > total.slowest_sql_time:
+                total.slowest_sql = stats.slowest_sql
+                total.slowest_sql_time = stats.slowest_sql_time
+
+    def results(self):
+        return [stats.as_dict() for stats in self.phases.values()]
+
+    def totals(self):
+        return {
+            'wall_time': sum(stats.wall_time for stats in self.phases.values()),
+            'queries': sum(stats.queries for stats in self.phases.values()),
+            'rows_written': sum(stats.rows_written for stats in self.phases.values()),
+        }
+
+
+class NullPhaseTimer:
+    """Phase timer that measures nothing (default for regular month processing)"""
+
+    @contextmanager
+    def phase(self, name):
+        yield None
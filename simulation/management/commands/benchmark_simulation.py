@@ -0,0 +1,54 @@
+"""
+Django management command that benchmarks the monthly simulation.
+
+Builds a synthetic session (rolled back afterwards), times process_month,
+the dashboard snapshot, the sales view and the finance views, checks their query
+budgets and prints the results as JSON so runs can be compared between commits.
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from simulation.benchmarks import SCALES, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the monthly simulation at a synthetic scale and emits JSON results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='small',
+                            help='Predefined scale (bikes/markets/competitors), default: small')
+        parser.add_argument('--bikes', type=int, help='Override number of unsold bikes')
+        parser.add_argument('--markets', type=int, help='Override number of markets')
+        parser.add_argument('--competitors', type=int, help='Override number of AI competitors')
+        parser.add_argument('--months', type=int, default=3,
+                            help='Months to simulate (default: 3, the third one processes sales)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+        parser.add_argument('--fail-over-budget', action='store_true',
+                            help='Exit with an error if any query budget is exceeded')
+
+    def handle(self, *args, **options):
+        results = run_benchmarks(
+            scale=options['scale'],
+            bikes=options['bikes'],
+            markets=options['markets'],
+            competitors=options['competitors'],
+            months=options['months'],
+            seed=options['seed'],
+        )
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output)
+            self.stdout.write(self.style.SUCCESS(f"Benchmark results written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+        if not results['within_budget']:
+            over_budget = [r['target'] for r in results['results'] if not r['within_budget']]
+            message = f"Query budget exceeded: {', '.join(over_budget)}"
+            if options['fail_over_budget']:
+                raise CommandError(message)
+            self.stderr.write(self.style.WARNING(message))
@@ -0,0 +1,83 @@
+"""
+Django management command that fast-forwards game sessions without HTTP.
+
+Runs SimulationEngine.process_month for one or more sessions, optionally
+creating default decisions first, and prints wall time, query count and rows
+written for every phase of the month.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from bikeshop.models import GameSession
+from simulation.engine import SimulationEngine
+from simulation.default_decisions import DefaultDecisionGenerator
+from simulation.instrumentation import PhaseTimer
+
+
+class Command(BaseCommand):
+    help = 'Advances game sessions by N months (headless) and reports per-phase timings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('session_ids', nargs='*', help='IDs of the sessions to advance')
+        parser.add_argument('--all', action='store_true', help='Advance all active sessions')
+        parser.add_argument('--months', type=int, default=1, help='Number of months to simulate (default: 1)')
+        parser.add_argument(
+            '--no-default-decisions',
+            action='store_true',
+            help='Do not generate default procurement/production/sales decisions before each month',
+        )
+        parser.add_argument('--bikes-per-type', type=int, default=10,
+                            help='Bikes planned per bike type by the default decisions (default: 10)')
+
+    def handle(self, *args, **options):
+        if options['months'] < 1:
+            raise CommandError('--months must be at least 1')
+
+        if options['all']:
+            sessions = list(GameSession.objects.filter(is_active=True))
+        elif options['session_ids']:
+            sessions = list(GameSession.objects.filter(id__in=options['session_ids']))
+            if len(sessions) != len(set(options['session_ids'])):
+                raise CommandError('One or more sessions do not exist')
+        else:
+            raise CommandError('Pass session IDs or --all')
+
+        if not sessions:
+            self.stdout.write(self.style.WARNING('No sessions to simulate'))
+            return
+
+        timer = PhaseTimer()
+        for session in sessions:
+            self.stdout.write(f'Session {session.name} ({session.id})')
+            for _ in range(options['months']):
+                month_label = f'{session.current_month}/{session.current_year}'
+                if not options['no_default_decisions']:
+                    DefaultDecisionGenerator(session, bikes_per_type=options['bikes_per_type']).generate()
+
+                month_timer = PhaseTimer()
+                SimulationEngine(session).process_month(timer=month_timer)
+                timer.merge(month_timer)
+
+                totals = month_timer.totals()
+                self.stdout.write(
+                    f"  Monat {month_label}: {totals['wall_time'] * 1000:.1f} ms, "
+                    f"{totals['queries']} queries, {totals['rows_written']} rows written"
+                )
+
+        self.stdout.write('')
+        self._write_table(timer, len(sessions) * options['months'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Simulated {options['months']} month(s) for {len(sessions)} session(s)"
+        ))
+
+    def _write_table(self, timer, months):
+        self.stdout.write(f"{'Phase':<22}{'total ms':>12}{'ms/month':>12}{'queries':>10}{'rows written':>14}")
+        for result in timer.results():
+            self.stdout.write(
+                f"{result['phase']:<22}{result['wall_time'] * 1000:>12.1f}"
+                f"{result['wall_time'] * 1000 / months:>12.1f}{result['queries']:>10}{result['rows_written']:>14}"
+            )
+        totals = timer.totals()
+        self.stdout.write(
+            f"{'total':<22}{totals['wall_time'] * 1000:>12.1f}"
+            f"{totals['wall_time'] * 1000 / months:>12.1f}{totals['queries']:>10}{totals['rows_written']:>14}"
+        )
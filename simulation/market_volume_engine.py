@@ -2,29 +2,70 @@ from django.db import models
 from decimal import Decimal
 import math
 import random
-from sales.models import Market, MarketDemand, MarketPriceSensitivity
+from sales.models import MarketPriceSensitivity
 from competitors.models import MarketCompetition, AICompetitor, CompetitorSale
 from production.models import ProducedBike
 from sales.models import SalesOrder
+from .session_state import SessionState
 
 
 class MarketVolumeEngine:
     """Engine for calculating market volume constraints and demand curves"""
+
+    COMPETITION_DEFAULTS = {
+        'estimated_demand': 0,
+        'maximum_market_volume': 0,
+        'demand_curve_elasticity': 1.0,
+        'optimal_price_point': Decimal('500.00')
+    }
+    VOLUME_FIELDS = ['estimated_demand', 'maximum_market_volume', 'demand_curve_elasticity', 'optimal_price_point']
     
-    def __init__(self, session):
+    def __init__(self, session, state=None):
         self.session = session
+        self.state = state or SessionState(session)
     
     def calculate_market_volume_for_period(self, month, year):
-        """Calculate market volumes for all markets and bike types for a given period"""
-        markets = Market.objects.filter(session=self.session)
-        from bikeshop.models import BikeType
-        bike_types = BikeType.objects.filter(session=self.session)
-        
-        for market in markets:
-            for bike_type in bike_types:
+        """
+        Calculate market volumes for all markets and bike types for a given period
+
+        Returns the period's MarketCompetition rows by (market_id, bike_type_id,
+        price_segment), read, created and updated with one statement each.
+        """
+        competitions = self._load_competitions(month, year)
+        missing = [
+            MarketCompetition(
+                session=self.session,
+                market=market,
+                bike_type=bike_type,
+                price_segment=segment,
+                month=month,
+                year=year,
+                **self.COMPETITION_DEFAULTS
+            )
+            for market in self.state.markets.values()
+            for bike_type in self.state.bike_types.values()
+            for segment in ['cheap', 'standard', 'premium']
+            if (market.id, bike_type.id, segment) not in competitions
+        ]
+        if missing:
+            MarketCompetition.objects.bulk_create(missing, ignore_conflicts=True)
+            # Re-read so every row has its primary key (not returned on all backends)
+            competitions = self._load_competitions(month, year)
+
+        for market in self.state.markets.values():
+            for bike_type in self.state.bike_types.values():
                 for segment in ['cheap', 'standard', 'premium']:
-                    self._calculate_segment_volume(market, bike_type, segment, month, year)
-    
+                    competition = competitions[(market.id, bike_type.id, segment)]
+                    self._apply_segment_volume(competition, market, bike_type, segment, month)
+        MarketCompetition.objects.bulk_update(list(competitions.values()), self.VOLUME_FIELDS)
+        return competitions
+
+    def _load_competitions(self, month, year):
+        return {
+            (competition.market_id, competition.bike_type_id, competition.price_segment): competition
+            for competition in MarketCompetition.objects.filter(session=self.session, month=month, year=year)
+        }
+
     def _calculate_segment_volume(self, market, bike_type, segment, month, year):
         """Calculate volume constraints for a specific market/bike/segment combination"""
         # Get or create market competition record
@@ -35,14 +76,15 @@ class MarketVolumeEngine:
             price_segment=segment,
             month=month,
             year=year,
-            defaults={
-                'estimated_demand': 0,
-                'maximum_market_volume': 0,
-                'demand_curve_elasticity': 1.0,
-                'optimal_price_point': Decimal('500.00')
-            }
+            defaults=self.COMPETITION_DEFAULTS
         )
+        self._apply_segment_volume(competition, market, bike_type, segment, month)
+        competition.save()
         
+        return competition
+
+    def _apply_segment_volume(self, competition, market, bike_type, segment, month):
+        """Set the volume constraints of a competition record (without saving)"""
         # Calculate base demand
         base_demand = self._calculate_base_demand(market, bike_type, segment, month)
         
@@ -58,21 +100,14 @@ class MarketVolumeEngine:
         competition.maximum_market_volume = max_volume
         competition.demand_curve_elasticity = elasticity
         competition.optimal_price_point = optimal_price
-        competition.save()
-        
-        return competition
     
     def _calculate_base_demand(self, market, bike_type, segment, month):
         """Calculate base demand considering seasonal, preference, and business strategy factors"""
         # Start with market demand if available
-        try:
-            market_demand = MarketDemand.objects.get(
-                session=self.session,
-                market=market,
-                bike_type=bike_type
-            )
+        market_demand = self.state.get_market_demand(market, bike_type)
+        if market_demand:
             base_demand_percentage = market_demand.demand_percentage
-        except MarketDemand.DoesNotExist:
+        else:
             # Fallback to default values
             base_demand_percentage = 0.3
         
@@ -129,11 +164,7 @@ class MarketVolumeEngine:
         """Calculate price elasticity of demand"""
         # Get market price sensitivity if available
         try:
-            price_sensitivity = MarketPriceSensitivity.objects.filter(
-                session=self.session,
-                market=market,
-                price_segment=segment
-            ).first()
+            price_sensitivity = self.state.get_price_sensitivity(market, segment)
             if price_sensitivity:
                 base_elasticity = price_sensitivity.percentage / 100.0
             else:
@@ -168,17 +199,11 @@ class MarketVolumeEngine:
     
     def _calculate_optimal_price(self, bike_type, segment):
         """Calculate the optimal price point for maximum volume"""
-        from bikeshop.models import BikePrice
-        
         # Try to get configured price
-        try:
-            bike_price = BikePrice.objects.get(
-                session=self.session,
-                bike_type=bike_type,
-                price_segment=segment
-            )
+        bike_price = self.state.get_bike_price(bike_type, segment)
+        if bike_price:
             return bike_price.price
-        except BikePrice.DoesNotExist:
+        else:
             # Estimate based on segment and bike complexity
             base_prices = {
                 'cheap': Decimal('300.00'),
@@ -228,15 +253,15 @@ class MarketVolumeEngine:
     def _get_business_strategy_demand_factor(self, market, bike_type, segment):
         """Get demand multiplier from business strategy effects (marketing and sustainability)"""
         try:
-            from business_strategy.business_engine import BusinessStrategyEngine
-            engine = BusinessStrategyEngine(self.session)
+            # Loaded once per month, the same for every market segment
+            effects = self.state.business_demand_effects
             
             # Get marketing effects
-            marketing_effects = engine.get_marketing_demand_bonuses()
+            marketing_effects = effects['marketing']
             marketing_boost = marketing_effects.get('demand_boost', 0.0) / 100.0  # Convert percentage to decimal
             
             # Get sustainability effects
-            sustainability_effects = engine.get_sustainability_effects()
+            sustainability_effects = effects['sustainability']
             sustainability_modifier = sustainability_effects.get('demand_modifier', 1.0)
             
             # Combine effects
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('multiplayer', '0008_multiplayergame_enable_performance_tracking'),
+        ('bikeshop', '0007_make_parameters_dynamic'),
+        ('simulation', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulationsettings',
+            name='performance_tracking',
+            field=models.BooleanField(default=False, help_text='Record per-phase timings of every processed month (TurnPerformanceRecord)'),
+        ),
+        migrations.CreateModel(
+            name='TurnPerformanceRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('engine', models.CharField(choices=[('process_month', 'Monatsverarbeitung (process_month)'), ('multiplayer_turn', 'Multiplayer-Runde (process_multiplayer_turn)')], max_length=20)),
+                ('month', models.IntegerField()),
+                ('year', models.IntegerField()),
+                ('phase', models.CharField(max_length=50)),
+                ('position', models.IntegerField(default=0, help_text='Order of the phase within the turn')),
+                ('duration_ms', models.FloatField()),
+                ('query_count', models.IntegerField(default=0)),
+                ('rows_written', models.IntegerField(default=0)),
+                ('slowest_sql', models.TextField(blank=True)),
+                ('slowest_sql_ms', models.FloatField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('multiplayer_game', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='performance_records', to='multiplayer.multiplayergame')),
+                ('session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='performance_records', to='bikeshop.gamesession')),
+            ],
+            options={
+                'ordering': ['-created_at', 'position'],
+                'indexes': [models.Index(fields=['multiplayer_game', 'year', 'month'], name='simulation__multipl_08d52d_idx'), models.Index(fields=['session', 'year', 'month'], name='simulation__session_13553b_idx')],
+            },
+        ),
+    ]
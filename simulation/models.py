@@ -7,3 +7,62 @@ class SimulationSettings(models.Model):
     max_months = models.IntegerField(default=24)
     seasonal_effects = models.BooleanField(default=True)
     market_trends = models.BooleanField(default=True)
+    performance_tracking = models.BooleanField(
+        default=False,
+        help_text="Record per-phase timings of every processed month (TurnPerformanceRecord)"
+    )
+
+
+class TurnPerformanceRecord(models.Model):
+    """Laufzeitmessung einer Phase der Monats- bzw. Rundenverarbeitung"""
+    ENGINE_CHOICES = [
+        ('process_month', 'Monatsverarbeitung (process_month)'),
+        ('multiplayer_turn', 'Multiplayer-Runde (process_multiplayer_turn)'),
+    ]
+
+    session = models.ForeignKey(GameSession, on_delete=models.CASCADE, null=True, blank=True,
+                                related_name='performance_records')
+    multiplayer_game = models.ForeignKey('multiplayer.MultiplayerGame', on_delete=models.CASCADE,
+                                         null=True, blank=True, related_name='performance_records')
+    engine = models.CharField(max_length=20, choices=ENGINE_CHOICES)
+    month = models.IntegerField()
+    year = models.IntegerField()
+    phase = models.CharField(max_length=50)
+    position = models.IntegerField(default=0, help_text="Order of the phase within the turn")
+    duration_ms = models.FloatField()
+    query_count = models.IntegerField(default=0)
+    rows_written = models.IntegerField(default=0)
+    slowest_sql = models.TextField(blank=True)
+    slowest_sql_ms = models.FloatField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at', 'position']
+        indexes = [
+            models.Index(fields=['multiplayer_game', 'year', 'month']),
+            models.Index(fields=['session', 'year', 'month']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_engine_display()} {self.month}/{self.year} - {self.phase}: {self.duration_ms:.0f} ms"
+
+    @classmethod
+    def record(cls, timer, engine, month, year, session=None, multiplayer_game=None):
+        """Speichert die Messwerte eines PhaseTimers (eine Zeile pro Phase)"""
+        return cls.objects.bulk_create([
+            cls(
+                session=session,
+                multiplayer_game=multiplayer_game,
+                engine=engine,
+                month=month,
+                year=year,
+                phase=result['phase'],
+                position=position,
+                duration_ms=result['wall_time'] * 1000,
+                query_count=result['queries'],
+                rows_written=result['rows_written'],
+                slowest_sql=result['slowest_sql'] or '',
+                slowest_sql_ms=result['slowest_sql_time'] * 1000,
+            )
+            for position, result in enumerate(timer.results())
+        ])
@@ -0,0 +1,134 @@
+"""
+Gemeinsame Stammdaten einer Session für die Monatsverarbeitung.
+
+SimulationEngine builds several engines (competitors, competitive sales,
+market simulator, market volumes, ...). Each of them used to re-query the same
+workers, warehouses, markets, bike types, prices and market demands. A
+SessionState is created once per engine and passed to every sub-engine. It
+loads each group of reference data on first access and exposes dictionary
+lookups. ``refresh`` drops everything at the start of a month.
+
+The sales phase also reads the price sensitivities and the marketing and
+sustainability demand effects here, once per month instead of once per
+market segment. Rows the sales phase changes itself (open sales orders,
+competitor inventory, market competition) are loaded once per phase by
+CompetitiveSalesEngine.
+
+Engines created on their own (views, scripts) build a private SessionState,
+so nothing is loaded unless it is used.
+"""
+from functools import cached_property
+
+from bikeshop.models import BikePrice, BikeType, Worker
+from competitors.models import AICompetitor
+from sales.models import Market, MarketDemand, MarketPriceSensitivity
+from warehouse.models import Warehouse
+
+
+class SessionState:
+    """Einmal pro Monat geladene Stammdaten einer Session"""
+
+    CACHED_ATTRIBUTES = (
+        'workers', 'warehouses', 'markets', 'bike_types', 'bike_prices', 'market_demands', 'competitors',
+        'price_sensitivities', 'business_demand_effects'
+    )
+
+    def __init__(self, session):
+        self.session = session
+
+    def refresh(self):
+        """Verwirft alle geladenen Daten; sie werden beim nächsten Zugriff neu gelesen"""
+        for name in self.CACHED_ATTRIBUTES:
+            self.__dict__.pop(name, None)
+
+    @cached_property
+    def workers(self):
+        return list(Worker.objects.filter(session=self.session).order_by('id'))
+
+    def get_worker(self, worker_type):
+        """Erster Arbeiter-Datensatz eines Typs (wie ``.filter(worker_type=...).first()``)"""
+        return next((worker for worker in self.workers if worker.worker_type == worker_type), None)
+
+    @cached_property
+    def warehouses(self):
+        return list(Warehouse.objects.filter(session=self.session).order_by('id'))
+
+    @property
+    def default_warehouse(self):
+        return self.warehouses[0] if self.warehouses else None
+
+    @cached_property
+    def markets(self):
+        """Märkte nach ID"""
+        return {market.id: market for market in Market.objects.filter(session=self.session).order_by('id')}
+
+    def get_market(self, market_id):
+        return self.markets.get(market_id)
+
+    @cached_property
+    def bike_types(self):
+        """Fahrradtypen nach ID"""
+        return {
+            bike_type.id: bike_type
+            for bike_type in BikeType.objects.filter(session=self.session).order_by('id')
+        }
+
+    def get_bike_type(self, bike_type_id):
+        return self.bike_types.get(bike_type_id)
+
+    @cached_property
+    def bike_prices(self):
+        """Verkaufspreise nach (Fahrradtyp-ID, Preissegment)"""
+        prices = {}
+        for bike_price in BikePrice.objects.filter(session=self.session):
+            prices[(bike_price.bike_type_id, bike_price.price_segment)] = bike_price
+        return prices
+
+    def get_bike_price(self, bike_type, price_segment):
+        """BikePrice für Fahrradtyp und Segment oder None"""
+        return self.bike_prices.get((bike_type.id, price_segment))
+
+    @cached_property
+    def market_demands(self):
+        """Marktnachfrage nach (Markt-ID, Fahrradtyp-ID)"""
+        return {
+            (demand.market_id, demand.bike_type_id): demand
+            for demand in MarketDemand.objects.filter(session=self.session)
+        }
+
+    def get_market_demand(self, market, bike_type):
+        """MarketDemand für Markt und Fahrradtyp oder None"""
+        return self.market_demands.get((market.id, bike_type.id))
+
+    @cached_property
+    def competitors(self):
+        """KI-Konkurrenten nach ID"""
+        return {
+            competitor.id: competitor
+            for competitor in AICompetitor.objects.filter(session=self.session).order_by('id')
+        }
+
+    def get_competitor(self, competitor_id):
+        return self.competitors.get(competitor_id)
+
+    @cached_property
+    def price_sensitivities(self):
+        """Preissensibilität nach (Markt-ID, Preissegment), erster Datensatz je Paar"""
+        sensitivities = {}
+        for sensitivity in MarketPriceSensitivity.objects.filter(session=self.session).order_by('id'):
+            sensitivities.setdefault((sensitivity.market_id, sensitivity.price_segment), sensitivity)
+        return sensitivities
+
+    def get_price_sensitivity(self, market, price_segment):
+        """MarketPriceSensitivity für Markt und Segment oder None"""
+        return self.price_sensitivities.get((market.id, price_segment))
+
+    @cached_property
+    def business_demand_effects(self):
+        """Nachfrageeffekte aus Marketing und Nachhaltigkeit (see BusinessStrategyEngine)"""
+        from business_strategy.business_engine import BusinessStrategyEngine
+        engine = BusinessStrategyEngine(self.session)
+        return {
+            'marketing': engine.get_marketing_demand_bonuses(),
+            'sustainability': engine.get_sustainability_effects(),
+        }
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from bikeshop.models import Worker
+from finance.models import Transaction
+from production.models import ProducedBikeLot
+from warehouse.models import ComponentStock
+from .dashboard import invalidate_dashboard_snapshot
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_save, sender=ComponentStock)
+@receiver(post_delete, sender=ComponentStock)
+@receiver(post_save, sender=Worker)
+@receiver(post_delete, sender=Worker)
+@receiver(post_save, sender=ProducedBikeLot)
+@receiver(post_delete, sender=ProducedBikeLot)
+def invalidate_dashboard_on_change(sender, instance, **kwargs):
+    """
+    Player actions that change transactions, component stock, workers or
+    finished-goods lots invalidate the session's dashboard snapshot.
+    """
+    invalidate_dashboard_snapshot(instance.session_id)
@@ -1,3 +1,862 @@
 from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import F, Sum
+from django.test.utils import CaptureQueriesContext
+from decimal import Decimal
+import random
 
-# Create your tests here.
+from bikeshop.models import (
+    GameSession, BikeType, Component, ComponentType,
+    Supplier, SupplierPrice, Worker
+)
+from warehouse.models import Warehouse, ComponentStock
+from production.models import ProductionPlan, ProductionOrder, ProducedBike
+from .engine import SimulationEngine
+
+
+class SimulationTestCase(TestCase):
+    """Gemeinsame Testdaten für die Simulations-Engine"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='simuser',
+            password='testpass123'
+        )
+        self.session = GameSession.objects.create(
+            user=self.user,
+            name='Simulation Session',
+            current_month=1,
+            current_year=2024,
+            balance=Decimal('100000.00')
+        )
+        self.warehouse = Warehouse.objects.create(
+            session=self.session,
+            name='Main Warehouse',
+            location='Test Location',
+            capacity_m2=1000.0,
+            rent_per_month=Decimal('5000.00')
+        )
+
+        self.basic_supplier = Supplier.objects.create(
+            session=self.session, name='Basic Supplier', quality='basic',
+            complaint_probability=0, complaint_quantity=0
+        )
+        self.premium_supplier = Supplier.objects.create(
+            session=self.session, name='Premium Supplier', quality='premium',
+            complaint_probability=0, complaint_quantity=0
+        )
+
+        self.frame_type = ComponentType.objects.create(
+            session=self.session, name='Rahmen', storage_space_per_unit=1.0
+        )
+        self.wheel_type = ComponentType.objects.create(
+            session=self.session, name='Laufradsatz', storage_space_per_unit=1.0
+        )
+
+        self.frame_basic = self._create_component(self.frame_type, 'Basic Frame', self.basic_supplier)
+        self.frame_premium = self._create_component(self.frame_type, 'Premium Frame', self.premium_supplier)
+        self.wheel_basic = self._create_component(self.wheel_type, 'Basic Wheels', self.basic_supplier)
+
+        self.bike_type = BikeType.objects.create(
+            session=self.session,
+            name='City Bike',
+            base_skilled_worker_hours=2.0,
+            base_unskilled_worker_hours=1.0,
+            base_storage_space_per_unit=1.0,
+            required_frame_names=['Basic Frame', 'Premium Frame'],
+            required_wheel_set_names=['Basic Wheels']
+        )
+
+        Worker.objects.create(session=self.session, worker_type='skilled', hourly_wage=Decimal('20.00'), count=5)
+        Worker.objects.create(session=self.session, worker_type='unskilled', hourly_wage=Decimal('10.00'), count=5)
+
+        self.engine = SimulationEngine(self.session)
+
+    def _create_component(self, component_type, name, supplier):
+        component = Component.objects.create(
+            session=self.session, component_type=component_type, name=name
+        )
+        SupplierPrice.objects.create(
+            session=self.session, supplier=supplier, component=component, base_price=Decimal('10.00')
+        )
+        return component
+
+    def _stock(self, component, quantity):
+        return ComponentStock.objects.create(
+            session=self.session, warehouse=self.warehouse, component=component, quantity=quantity
+        )
+
+    def _plan(self, quantity, price_segment='cheap'):
+        plan = ProductionPlan.objects.create(
+            session=self.session,
+            month=self.session.current_month,
+            year=self.session.current_year
+        )
+        return ProductionOrder.objects.create(
+            plan=plan, bike_type=self.bike_type, price_segment=price_segment, quantity_planned=quantity
+        )
+
+
+class BatchProductionTest(SimulationTestCase):
+    """Tests für die Batch-Produktion pro Produktionsauftrag"""
+
+    def test_produces_full_order_and_deducts_stock(self):
+        frame_stock = self._stock(self.frame_basic, 30)
+        wheel_stock = self._stock(self.wheel_basic, 30)
+        order = self._plan(25)
+
+        self.engine._process_production()
+
+        order.refresh_from_db()
+        frame_stock.refresh_from_db()
+        wheel_stock.refresh_from_db()
+        self.assertEqual(order.quantity_produced, 25)
+        self.assertEqual(self.engine.bike_inventory.available_quantity(self.bike_type, 'cheap'), 25)
+        # The lot is the stored unit, no row per bike
+        self.assertFalse(ProducedBike.objects.filter(session=self.session).exists())
+        self.assertEqual(frame_stock.quantity, 5)
+        self.assertEqual(wheel_stock.quantity, 5)
+
+    def test_quantity_limited_by_scarcest_component(self):
+        self._stock(self.frame_basic, 30)
+        self._stock(self.wheel_basic, 7)
+        order = self._plan(20)
+
+        self.engine._process_production()
+
+        order.refresh_from_db()
+        self.assertEqual(order.quantity_produced, 7)
+        self.assertEqual(self.engine.bike_inventory.available_quantity(self.bike_type, 'cheap'), 7)
+
+    def test_prefers_exact_quality_match_before_upgrade(self):
+        basic_frames = self._stock(self.frame_basic, 3)
+        premium_frames = self._stock(self.frame_premium, 10)
+        self._stock(self.wheel_basic, 10)
+        order = self._plan(5, price_segment='cheap')
+
+        self.engine._process_production()
+
+        order.refresh_from_db()
+        basic_frames.refresh_from_db()
+        premium_frames.refresh_from_db()
+        self.assertEqual(order.quantity_produced, 5)
+        self.assertEqual(basic_frames.quantity, 0)
+        self.assertEqual(premium_frames.quantity, 8)
+
+    def test_incompatible_quality_is_not_used(self):
+        # Basic frames may not be used for premium bikes
+        self._stock(self.frame_basic, 10)
+        self._stock(self.wheel_basic, 10)
+        order = self._plan(5, price_segment='premium')
+
+        self.engine._process_production()
+
+        order.refresh_from_db()
+        self.assertEqual(order.quantity_produced, 0)
+
+    def test_query_count_independent_of_plan_size(self):
+        self._stock(self.frame_basic, 500)
+        self._stock(self.wheel_basic, 500)
+        self._plan(400)
+
+        # Queries must not grow per planned bike
+        with CaptureQueriesContext(connection) as context:
+            self.engine._process_production()
+        self.assertLess(len(context.captured_queries), 40)
+        self.assertEqual(self.engine.bike_inventory.available_quantity(self.bike_type, 'cheap'), 400)
+
+
+class LotBasedSalesTest(SimulationTestCase):
+    """Spieler-Verkäufe werden FIFO aus den Lagerposten bedient"""
+
+    def test_pending_decision_sells_oldest_bikes_first(self):
+        from sales.models import Market, SalesDecision, SalesOrder
+
+        market = Market.objects.create(
+            session=self.session, name='Home Market', location='Home',
+            transport_cost_home=Decimal('10.00'), transport_cost_foreign=Decimal('20.00'),
+            monthly_volume_capacity=1000
+        )
+        for month, quantity in ((1, 2), (2, 3)):
+            self.engine.bike_inventory.add(
+                self.bike_type, 'cheap', quantity, Decimal('100.00'), month=month, year=2024
+            )
+
+        decision = SalesDecision.objects.create(
+            session=self.session, market=market, bike_type=self.bike_type, price_segment='cheap',
+            quantity=3, desired_price=Decimal('400.00'), transport_cost=Decimal('10.00'),
+            decision_month=1, decision_year=2024
+        )
+
+        self.engine.market_simulator.process_pending_sales_decisions(1, 2024)
+
+        decision.refresh_from_db()
+        self.assertEqual(decision.quantity_sold, 3)
+        sold_months = sorted(SalesOrder.objects.filter(session=self.session).values_list(
+            'bike__production_month', flat=True))
+        self.assertEqual(sold_months, [1, 1, 2])
+        self.assertEqual(self.engine.bike_inventory.available_quantity(self.bike_type, 'cheap'), 2)
+
+
+class SetBasedInventoryAgingTest(SimulationTestCase):
+    """Set-based aging must match the per-bike update_inventory_age results"""
+
+    def _create_bikes(self):
+        costs = ['0.00', '99.99', '100.25', '123.45', '250.00', '1337.37']
+        periods = [(1, 2023), (11, 2023), (12, 2023), (1, 2024), (3, 2024), (6, 2024)]
+        bikes = []
+        for cost in costs:
+            for month, year in periods:
+                bikes.append(ProducedBike(
+                    session=self.session, bike_type=self.bike_type, price_segment='standard',
+                    production_month=month, production_year=year, production_cost=Decimal(cost)
+                ))
+        return ProducedBike.objects.bulk_create(bikes)
+
+    def test_matches_per_bike_update(self):
+        self._create_bikes()
+        self.session.current_month = 3
+        self.session.save()
+
+        for bike in ProducedBike.objects.filter(session=self.session):
+            bike.update_inventory_age(3, 2024)
+        expected = {
+            bike.id: (bike.months_in_inventory, bike.storage_cost_accumulated)
+            for bike in ProducedBike.objects.filter(session=self.session)
+        }
+        ProducedBike.objects.filter(session=self.session).update(
+            months_in_inventory=0, storage_cost_accumulated=0
+        )
+
+        with self.assertNumQueries(2):
+            self.engine._update_inventory_ages()
+
+        actual = {
+            bike.id: (bike.months_in_inventory, bike.storage_cost_accumulated)
+            for bike in ProducedBike.objects.filter(session=self.session)
+        }
+        self.assertEqual(actual, expected)
+
+    def test_sold_bikes_are_not_aged(self):
+        bike = self._create_bikes()[0]
+        ProducedBike.objects.filter(id=bike.id).update(is_sold=True)
+
+        self.engine._update_inventory_ages()
+
+        bike.refresh_from_db()
+        self.assertEqual(bike.months_in_inventory, 0)
+
+    def test_competitor_inventory_aged_in_one_update(self):
+        from competitors.models import AICompetitor, CompetitorProduction
+
+        competitor = AICompetitor.objects.create(session=self.session, name='Rival', strategy='balanced')
+        production = CompetitorProduction.objects.create(
+            competitor=competitor, bike_type=self.bike_type, price_segment='cheap',
+            month=10, year=2023, quantity_planned=5, quantity_produced=5,
+            quantity_in_inventory=5, production_cost_per_unit=Decimal('100.00')
+        )
+
+        with self.assertNumQueries(1):
+            CompetitorProduction.update_inventory_ages(self.session, 2, 2024)
+
+        production.refresh_from_db()
+        self.assertEqual(production.months_in_inventory, 4)
+
+
+class MonthlyReportAggregationTest(SimulationTestCase):
+    """Monatsbericht aus gruppierten Aggregaten"""
+
+    def setUp(self):
+        super().setUp()
+        from sales.models import Market, SalesOrder
+        from finance.models import Transaction
+        from procurement.models import ProcurementOrder, ProcurementOrderItem
+
+        market = Market.objects.create(
+            session=self.session, name='Home Market', location='Home',
+            transport_cost_home=Decimal('10.00'), transport_cost_foreign=Decimal('20.00')
+        )
+        inventory = self.engine.bike_inventory
+        for segment, cost in [('cheap', '100.10'), ('cheap', '100.20'), ('premium', '300.00')]:
+            inventory.add(self.bike_type, segment, 1, Decimal(cost), month=1, year=2024)
+        bikes = inventory.take(inventory.get_lots(self.bike_type, 'cheap').get(), 2)
+        SalesOrder.objects.create(
+            session=self.session, market=market, bike=bikes[0], sale_month=1, sale_year=2024,
+            sale_price=Decimal('400.00'), transport_cost=Decimal('10.00'), is_completed=True
+        )
+        SalesOrder.objects.create(
+            session=self.session, market=market, bike=bikes[1], sale_month=1, sale_year=2024,
+            sale_price=Decimal('390.00'), transport_cost=Decimal('0.00'), is_completed=False
+        )
+        Transaction.objects.create(session=self.session, transaction_type='income', category='Verkäufe',
+                                   amount=Decimal('790.00'), description='Verkauf', month=1, year=2024)
+        Transaction.objects.create(session=self.session, transaction_type='expense', category='Löhne',
+                                   amount=Decimal('250.50'), description='Löhne', month=1, year=2024)
+
+        order = ProcurementOrder.objects.create(
+            session=self.session, supplier=self.basic_supplier, month=1, year=2024,
+            total_cost=Decimal('150.00'), is_delivered=True
+        )
+        ProcurementOrderItem.objects.create(order=order, component=self.frame_basic, quantity_ordered=10,
+                                            quantity_delivered=10, unit_price=Decimal('10.00'))
+        ProcurementOrderItem.objects.create(order=order, component=self.wheel_basic, quantity_ordered=5,
+                                            quantity_delivered=5, unit_price=Decimal('10.00'))
+
+    def test_report_totals_and_summaries(self):
+        report = self.engine._create_monthly_report()
+
+        self.assertEqual(report.total_income, Decimal('790.00'))
+        self.assertEqual(report.total_expenses, Decimal('250.50'))
+        self.assertEqual(report.profit_loss, Decimal('539.50'))
+        self.assertEqual(report.bikes_produced_count, 3)
+        self.assertEqual(report.total_production_cost, Decimal('500.30'))
+        self.assertEqual(report.production_summary['City Bike (Günstig)']['count'], 2)
+        self.assertAlmostEqual(report.production_summary['City Bike (Günstig)']['cost'], 200.30)
+        self.assertEqual(report.bikes_sold_count, 2)
+        self.assertEqual(report.total_sales_revenue, Decimal('790.00'))
+        self.assertEqual(report.sales_summary['City Bike (Günstig)'], {
+            'count': 2, 'revenue': 790.0, 'transport_cost': 10.0, 'net_revenue': 780.0
+        })
+        self.assertEqual(report.total_procurement_cost, Decimal('150.00'))
+        self.assertEqual(report.procurement_summary['Basic Frame'], {
+            'quantity': 10, 'cost': 100.0, 'supplier': 'Basic Supplier'
+        })
+
+        planned = report.detailed_transactions[-1]
+        self.assertEqual(planned['type'], 'planned_sales_data')
+        self.assertEqual(planned['planned_sales_summary']['City Bike (Günstig)']['status'], 'completed')
+
+    def test_query_count_independent_of_volume(self):
+        # First call creates the report, later calls update it
+        self.engine._create_monthly_report()
+        with CaptureQueriesContext(connection) as small:
+            self.engine._create_monthly_report()
+
+        self.engine.bike_inventory.add(self.bike_type, 'standard', 50, Decimal('150.00'), month=1, year=2024)
+        with CaptureQueriesContext(connection) as large:
+            self.engine._create_monthly_report()
+
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+
+class SimulateMonthsCommandTest(SimulationTestCase):
+    """Headless-Simulation per Management-Command"""
+
+    def setUp(self):
+        super().setUp()
+        from bikeshop.models import BikePrice
+        from sales.models import Market
+
+        BikePrice.objects.create(session=self.session, bike_type=self.bike_type,
+                                 price_segment='standard', base_price=Decimal('500.00'))
+        Market.objects.create(
+            session=self.session, name='Home Market', location='Home',
+            transport_cost_home=Decimal('10.00'), transport_cost_foreign=Decimal('20.00')
+        )
+
+    def test_default_decisions(self):
+        from simulation.default_decisions import DefaultDecisionGenerator
+        from procurement.models import ProcurementOrderItem
+
+        summary = DefaultDecisionGenerator(self.session, bikes_per_type=4).generate()
+
+        self.assertEqual(summary['bikes_planned'], 4)
+        # Frames and wheels for four bikes, no stock yet
+        self.assertEqual(summary['components_ordered'], 8)
+        self.assertEqual(
+            ProcurementOrderItem.objects.filter(order__session=self.session).count(), 2
+        )
+
+    def test_command_advances_months_and_reports_phases(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('simulate_months', str(self.session.id), months=3, bikes_per_type=4, stdout=out)
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.current_month, 4)
+        self.assertEqual(self.engine.bike_inventory.produced_quantity(), 12)
+        output = out.getvalue()
+        for phase in ['business_strategy', 'random_events', 'deliveries', 'production', 'competitors',
+                      'salaries', 'credits', 'sales', 'financial_settlement', 'month_advance']:
+            self.assertIn(phase, output)
+
+    def test_phase_timer_counts_queries_and_rows(self):
+        from finance.models import Transaction
+        from simulation.instrumentation import PhaseTimer
+
+        timer = PhaseTimer()
+        with timer.phase('write'):
+            # bulk_create: no signal handlers adding their own queries
+            Transaction.objects.bulk_create([Transaction(
+                session=self.session, transaction_type='expense', category='Test',
+                amount=Decimal('1.00'), description='Timer', month=1, year=2024
+            )])
+            Transaction.objects.filter(session=self.session).update(amount=Decimal('5.00'))
+
+        stats = timer.results()[0]
+        self.assertEqual(stats['queries'], 2)
+        self.assertEqual(stats['rows_written'], 2)
+
+
+class TurnPerformanceRecordTest(SimulationTestCase):
+    """Per-Phase-Messung wird pro Session eingeschaltet und gespeichert"""
+
+    def test_no_records_without_tracking(self):
+        from simulation.models import TurnPerformanceRecord
+
+        self.engine.process_month()
+
+        self.assertFalse(TurnPerformanceRecord.objects.exists())
+
+    def test_records_every_phase_when_enabled(self):
+        from simulation.models import SimulationSettings, TurnPerformanceRecord
+
+        SimulationSettings.objects.create(session=self.session, performance_tracking=True)
+        self._stock(self.frame_basic, 5)
+        self._stock(self.wheel_basic, 5)
+        self._plan(5)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.engine.process_month()
+
+        # One set of records per month, written after commit
+        self.assertEqual(len(callbacks), 1)
+        records = list(TurnPerformanceRecord.objects.filter(session=self.session).order_by('position'))
+        self.assertEqual([record.phase for record in records], [
+            'business_strategy', 'random_events', 'deliveries', 'production', 'competitors',
+            'salaries', 'credits', 'sales', 'financial_settlement', 'month_advance'
+        ])
+        self.assertTrue(all(record.month == 1 and record.year == 2024 for record in records))
+        production = records[3]
+        self.assertGreater(production.query_count, 0)
+        self.assertGreaterEqual(production.rows_written, 5)
+        self.assertTrue(production.slowest_sql)
+
+    def test_failed_month_keeps_its_exception_and_stores_no_records(self):
+        from unittest import mock
+        from simulation.models import SimulationSettings, TurnPerformanceRecord
+
+        SimulationSettings.objects.create(session=self.session, performance_tracking=True)
+
+        with mock.patch.object(SimulationEngine, '_process_deliveries', side_effect=ValueError('delivery failed')):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with self.assertRaisesMessage(ValueError, 'delivery failed'):
+                    self.engine.process_month()
+
+        self.assertEqual(callbacks, [])
+        self.assertFalse(TurnPerformanceRecord.objects.exists())
+
+
+class BenchmarkSuiteTest(TestCase):
+    """Benchmark-Suite läuft in kleinem Maßstab innerhalb der Query-Budgets"""
+
+    def test_tiny_scale_within_query_budgets(self):
+        from simulation.benchmarks import run_benchmarks
+
+        results = run_benchmarks(scale='tiny')
+
+        # Month 3 processes sales
+        self.assertEqual([result['target'] for result in results['results']], [
+            'process_month', 'process_month', 'process_month_sales',
+            'dashboard', 'sales_view', 'finance_view', 'financial_dashboard'
+        ])
+        for result in results['results']:
+            self.assertTrue(result['within_budget'], result)
+        # The synthetic session is rolled back
+        self.assertFalse(GameSession.objects.filter(name__startswith='Benchmark').exists())
+
+    def test_seeded_bikes_are_sold(self):
+        from simulation.benchmarks import BenchmarkSessionBuilder
+        from production.inventory import BikeInventory
+        from sales.models import SalesOrder
+
+        user = get_user_model().objects.create_user(username='benchmarkseed', password='testpass123')
+        session = BenchmarkSessionBuilder(bikes=100, markets=2, competitors=1).build(user)
+        inventory = BikeInventory(session)
+        self.assertEqual(inventory.available_quantity(), 100)
+
+        random.seed(42)
+        for _ in range(3):
+            SimulationEngine(session).process_month()
+            session.refresh_from_db()
+
+        # The seeded inventory was produced in 2024, production during the run in 2025
+        self.assertTrue(SalesOrder.objects.filter(session=session, bike__production_year=2024).exists())
+        self.assertLess(inventory.get_lots().filter(production_year=2024).aggregate(total=Sum('quantity'))['total'], 100)
+
+    def test_query_count_not_capped(self):
+        from simulation.benchmarks import _measure
+
+        def run_queries():
+            with connection.cursor() as cursor:
+                for _ in range(9500):
+                    cursor.execute('SELECT 1')
+
+        result = _measure('queries', run_queries, 9000)
+        self.assertEqual(result['queries'], 9500)
+        self.assertFalse(result['within_budget'])
+
+
+class MonthLedgerTest(SimulationTestCase):
+    """Buchungen eines Monats werden gesammelt und einmal geschrieben"""
+
+    def test_session_row_written_once_per_month(self):
+        from django.db.models import Q, Sum
+        from finance.models import Credit, Transaction
+
+        Credit.objects.create(
+            session=self.session, credit_type='short', amount=Decimal('6000.00'), interest_rate=5.0,
+            duration_months=6, remaining_months=6, monthly_payment=Decimal('1050.00'),
+            taken_month=1, taken_year=2024
+        )
+        self.session.current_month = 3
+        self.session.save()
+        opening_balance = self.session.balance
+
+        with CaptureQueriesContext(connection) as context:
+            self.engine.process_month()
+
+        session_updates = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "bikeshop_gamesession"')
+        ]
+        # One ledger flush plus the month advance
+        self.assertLessEqual(len(session_updates), 2)
+
+        transactions = Transaction.objects.filter(session=self.session, month=3, year=2024)
+        self.assertEqual(
+            set(transactions.values_list('category', flat=True)) & {'Löhne', 'Kreditzahlungen', 'Lagermiete'},
+            {'Löhne', 'Kreditzahlungen', 'Lagermiete'}
+        )
+        totals = transactions.aggregate(
+            income=Sum('amount', filter=Q(transaction_type='income')),
+            expense=Sum('amount', filter=Q(transaction_type='expense'))
+        )
+        self.session.refresh_from_db()
+        self.assertEqual(
+            self.session.balance,
+            opening_balance + (totals['income'] or 0) - (totals['expense'] or 0)
+        )
+
+    def test_flush_keeps_concurrent_balance_changes(self):
+        from finance.ledger import SessionLedger
+
+        opening_balance = self.session.balance
+        ledger = SessionLedger(self.session)
+        ledger.record('expense', 'Löhne', Decimal('300.00'), 'Monatliche Lohnzahlungen')
+        # Payment booked by a view while the month is being processed
+        GameSession.objects.filter(pk=self.session.pk).update(balance=F('balance') + Decimal('50.00'))
+
+        ledger.flush()
+
+        self.assertEqual(self.session.balance, opening_balance - Decimal('250.00'))
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.balance, opening_balance - Decimal('250.00'))
+
+    def test_session_save_before_flush_books_once(self):
+        from finance.ledger import SessionLedger
+
+        opening_balance = self.session.balance
+        ledger = SessionLedger(self.session)
+        ledger.record('expense', 'Löhne', Decimal('300.00'), 'Monatliche Lohnzahlungen')
+        self.assertEqual(ledger.balance, opening_balance - Decimal('300.00'))
+
+        # An engine saves the session while the month's entries are still buffered
+        self.session.save()
+        ledger.flush()
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.balance, opening_balance - Decimal('300.00'))
+
+
+class SessionStateTest(SimulationTestCase):
+    """Stammdaten werden pro Monat einmal geladen und von allen Engines geteilt"""
+
+    def test_reference_data_loaded_once_per_month(self):
+        from sales.models import Market
+
+        Market.objects.create(
+            session=self.session, name='Berlin', location='Berlin',
+            transport_cost_home=Decimal('5.00'), transport_cost_foreign=Decimal('10.00')
+        )
+        self.session.current_month = 3
+        self.session.save()
+        self._stock(self.frame_basic, 5)
+        self._stock(self.wheel_basic, 5)
+        self._plan(5)
+
+        with CaptureQueriesContext(connection) as context:
+            self.engine.process_month()
+
+        for table in ['bikeshop_worker', 'warehouse_warehouse', 'sales_market', 'bikeshop_biketype']:
+            # The compatibility index loads bike types with their components (JOIN) into its own cache
+            reads = [
+                query['sql'] for query in context.captured_queries
+                if query['sql'].startswith('SELECT') and f'FROM "{table}" WHERE' in query['sql']
+            ]
+            self.assertLessEqual(len(reads), 1, f'{table}: {reads}')
+
+    def test_refresh_reloads_data(self):
+        state = self.engine.state
+        self.assertEqual(state.get_worker('skilled').count, 5)
+
+        with self.assertNumQueries(0):
+            state.get_worker('unskilled')
+
+        Worker.objects.filter(session=self.session, worker_type='skilled').update(count=8)
+        state.refresh()
+        self.assertEqual(state.get_worker('skilled').count, 8)
+
+
+class CompetitiveSalesQueryTest(SimulationTestCase):
+    """Die Verkaufsphase liest ihre Daten einmal, nicht pro Marktsegment"""
+
+    def _add_markets(self, count):
+        from sales.models import Market, MarketPriceSensitivity
+
+        for index in range(count):
+            market = Market.objects.create(
+                session=self.session, name=f'Markt {Market.objects.count()}', location='Test',
+                transport_cost_home=Decimal('5.00'), transport_cost_foreign=Decimal('10.00')
+            )
+            MarketPriceSensitivity.objects.create(
+                session=self.session, market=market, price_segment='cheap', percentage=40.0
+            )
+
+    def _sell(self, month):
+        from sales.models import Market, SalesOrder
+        from .competitive_sales_engine import CompetitiveSalesEngine
+
+        bike = self.engine.bike_inventory.add_bikes(
+            self.bike_type, 'cheap', 1, Decimal('150.00'), month=1, year=2024
+        )[0]
+        SalesOrder.objects.create(
+            session=self.session, market=Market.objects.filter(session=self.session).first(), bike=bike,
+            sale_month=month, sale_year=2024, sale_price=Decimal('300.00'), transport_cost=Decimal('10.00')
+        )
+        with CaptureQueriesContext(connection) as context:
+            CompetitiveSalesEngine(self.session).process_competitive_sales(month, 2024)
+        return len(context.captured_queries)
+
+    def test_query_count_independent_of_markets(self):
+        from competitors.models import AICompetitor, CompetitorProduction, MarketCompetition
+
+        competitor = AICompetitor.objects.create(session=self.session, name='Rival', strategy='balanced')
+        CompetitorProduction.objects.create(
+            competitor=competitor, bike_type=self.bike_type, price_segment='cheap', month=1, year=2024,
+            quantity_planned=500, quantity_produced=500, quantity_in_inventory=500,
+            production_cost_per_unit=Decimal('150.00')
+        )
+
+        self._add_markets(1)
+        one_market = self._sell(3)
+        self._add_markets(4)
+        five_markets = self._sell(4)
+
+        self.assertEqual(one_market, five_markets)
+        self.assertEqual(MarketCompetition.objects.filter(session=self.session, month=4).count(), 15)
+
+
+class BulkDeliveryTest(SimulationTestCase):
+    """Lieferungen werden gesammelt verbucht, Bestand je Lieferant"""
+
+    def _order(self, supplier, items):
+        from procurement.models import ProcurementOrder, ProcurementOrderItem
+
+        order = ProcurementOrder.objects.create(
+            session=self.session, supplier=supplier, month=1, year=2024, total_cost=Decimal('0')
+        )
+        ProcurementOrderItem.objects.bulk_create([
+            ProcurementOrderItem(order=order, component=component, quantity_ordered=quantity,
+                                 unit_price=Decimal('10.00'))
+            for component, quantity in items
+        ])
+        return order
+
+    def test_deliveries_booked_per_component_and_supplier(self):
+        from procurement.models import ProcurementOrderItem
+
+        self.premium_supplier.complaint_probability = 100
+        self.premium_supplier.complaint_quantity = 50
+        self.premium_supplier.save()
+        existing = ComponentStock.objects.create(
+            session=self.session, warehouse=self.warehouse, component=self.frame_basic,
+            supplier=self.basic_supplier, quantity=3
+        )
+        basic_orders = [self._order(self.basic_supplier, [(self.frame_basic, 4), (self.wheel_basic, 6)])
+                        for _ in range(5)]
+        premium_order = self._order(self.premium_supplier, [(self.frame_premium, 10)])
+
+        with CaptureQueriesContext(connection) as context:
+            self.engine._process_deliveries()
+        self.assertLess(len(context.captured_queries), 12)
+
+        existing.refresh_from_db()
+        self.assertEqual(existing.quantity, 3 + 5 * 4)
+        self.assertEqual(ComponentStock.objects.get(
+            component=self.wheel_basic, supplier=self.basic_supplier).quantity, 30)
+        self.assertEqual(ComponentStock.objects.get(
+            component=self.frame_premium, supplier=self.premium_supplier).quantity, 5)
+
+        premium_item = ProcurementOrderItem.objects.get(order=premium_order)
+        self.assertEqual(premium_item.quantity_delivered, 5)
+        self.assertTrue(premium_item.is_defective)
+        for order in basic_orders + [premium_order]:
+            order.refresh_from_db()
+            self.assertTrue(order.is_delivered)
+
+        # Bulk-written stock is booked into the warehouse usage counter
+        self.warehouse.refresh_from_db()
+        self.assertEqual(self.warehouse.used_space, self.warehouse.calculate_usage())
+        self.assertEqual(self.warehouse.used_space, 3 + 5 * 4 + 30 + 5)
+
+
+class DashboardSnapshotTest(SimulationTestCase):
+    """Dashboard wird aus einem gecachten Snapshot bedient"""
+
+    def test_snapshot_cached_until_data_changes(self):
+        from finance.models import Transaction
+        from .dashboard import get_dashboard_snapshot
+
+        snapshot = get_dashboard_snapshot(self.session)
+        self.assertEqual(snapshot['total_workers'], 10)
+        self.assertEqual(snapshot['total_bikes'], 0)
+
+        # Only the snapshot version is read
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(get_dashboard_snapshot(self.session)['version'], snapshot['version'])
+        self.assertEqual(len(context.captured_queries), 1)
+
+        Transaction.objects.create(
+            session=self.session, transaction_type='expense', category='Test',
+            amount=Decimal('50.00'), description='Snapshot', month=1, year=2024
+        )
+        self.engine.bike_inventory.add(
+            self.bike_type, 'standard', 1, Decimal('100.00'), warehouse=self.warehouse, month=1, year=2024
+        )
+        refreshed = get_dashboard_snapshot(self.session)
+        self.assertNotEqual(refreshed['version'], snapshot['version'])
+        self.assertEqual(len(refreshed['recent_transactions']), 1)
+        self.assertEqual(refreshed['total_bikes'], 1)
+        self.assertEqual(refreshed['inventory_aging_summary']['buckets']['new'], 1)
+
+    def test_invalidation_reaches_other_workers(self):
+        from django.core.cache import cache
+        from bikeshop.cache_versions import bump_cache_version
+        from .dashboard import CACHE_NAME, _snapshot_key, get_dashboard_snapshot
+
+        snapshot = get_dashboard_snapshot(self.session)
+        # Bumped by another worker: this process still holds the old snapshot in its cache
+        bump_cache_version(self.session.id, CACHE_NAME)
+        Worker.objects.filter(session=self.session).update(count=1)
+
+        refreshed = get_dashboard_snapshot(self.session)
+        self.assertNotEqual(refreshed['version'], snapshot['version'])
+        self.assertEqual(refreshed['total_workers'], 2)
+        self.assertIsNotNone(cache.get(_snapshot_key(self.session, snapshot['version'])))
+
+    def test_session_save_needs_no_version_bump(self):
+        from .dashboard import get_dashboard_snapshot
+
+        snapshot = get_dashboard_snapshot(self.session)
+        self.session.balance -= Decimal('500.00')
+        with CaptureQueriesContext(connection) as context:
+            self.session.save()
+        self.assertFalse([query for query in context.captured_queries if 'sessioncacheversion' in query['sql']])
+
+        # Balance and month are part of the cache key
+        refreshed = get_dashboard_snapshot(self.session)
+        self.assertEqual(refreshed['version'], snapshot['version'])
+        self.assertEqual(refreshed['balance'], self.session.balance)
+
+    def test_session_detail_not_modified(self):
+        from django.urls import reverse
+
+        self.client.force_login(self.user)
+        url = reverse('bikeshop:session_detail', args=[self.session.id])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+
+        # ETag, Last-Modified and the view share one snapshot (one version lookup)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(
+            len([query for query in context.captured_queries if 'sessioncacheversion' in query['sql']]), 1
+        )
+
+        # Nach dem Monatswechsel wird die Seite neu ausgeliefert
+        etag = response['ETag']
+        self.engine.process_month()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class BulkSaleSettlementTest(SimulationTestCase):
+    """Verkäufe eines Segments werden gesammelt abgerechnet"""
+
+    def test_thousand_bike_sale_takes_few_queries(self):
+        from finance.models import Transaction
+        from sales.market_simulator import MarketSimulator
+        from sales.models import Market, SalesDecision, SalesOrder
+
+        market = Market.objects.create(
+            session=self.session, name='Home Market', location='Home',
+            transport_cost_home=Decimal('10.00'), transport_cost_foreign=Decimal('20.00'),
+            monthly_volume_capacity=100000
+        )
+        for month in (1, 2):
+            self.engine.bike_inventory.add(self.bike_type, 'cheap', 500, Decimal('100.00'), month=month, year=2024)
+
+        decision = SalesDecision.objects.create(
+            session=self.session, market=market, bike_type=self.bike_type, price_segment='cheap',
+            quantity=1000, desired_price=Decimal('400.00'), transport_cost=Decimal('10.00'),
+            decision_month=1, decision_year=2024
+        )
+
+        simulator = MarketSimulator(self.session)
+        with CaptureQueriesContext(connection) as queries:
+            simulator.process_pending_sales_decisions(1, 2024)
+
+        self.assertLess(len(queries), 40)
+
+        decision.refresh_from_db()
+        self.assertEqual(decision.quantity_sold, 1000)
+        self.assertEqual(decision.actual_revenue, Decimal('399990.00'))
+        self.assertEqual(SalesOrder.objects.filter(session=self.session).count(), 1000)
+        self.assertEqual(SalesOrder.objects.filter(session=self.session, transport_cost__gt=0).count(), 1)
+        self.assertFalse(SalesOrder.objects.filter(session=self.session, is_completed=False).exists())
+        self.assertEqual(ProducedBike.objects.filter(session=self.session, is_sold=True).count(), 1000)
+        self.assertEqual(self.engine.bike_inventory.available_quantity(self.bike_type, 'cheap'), 0)
+
+        income = Transaction.objects.filter(session=self.session, transaction_type='income')
+        self.assertEqual(income.count(), 1)
+        self.assertEqual(income.get().amount, Decimal('399990.00'))
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.balance, Decimal('499990.00'))
+
+    def test_completion_flag_is_set_per_caller(self):
+        from sales.models import Market, SalesOrder
+        from sales.settlement import SaleSettlement
+
+        market = Market.objects.create(
+            session=self.session, name='Home Market', location='Home',
+            transport_cost_home=Decimal('10.00'), transport_cost_foreign=Decimal('20.00')
+        )
+        self.engine.bike_inventory.add(self.bike_type, 'cheap', 2, Decimal('100.00'), month=1, year=2024)
+        lot = self.engine.bike_inventory.get_lots(self.bike_type, 'cheap').get()
+        singleplayer, multiplayer = self.engine.bike_inventory.take_many([(lot, 1), (lot, 1)])
+
+        # The multiplayer engine settles with is_completed=False, like its former per-bike SalesOrders
+        for bikes, is_completed in ((singleplayer, True), (multiplayer, False)):
+            settlement = SaleSettlement(self.session, 1, 2024, is_completed=is_completed)
+            settlement.add(market, bikes[0], Decimal('400.00'))
+            settlement.settle(mark_sold=False)
+
+        self.assertTrue(SalesOrder.objects.get(bike=singleplayer[0]).is_completed)
+        self.assertFalse(SalesOrder.objects.get(bike=multiplayer[0]).is_completed)
@@ -17,6 +17,7 @@ from bikeshop.models import GameSession, BikeType
 from sales.models import Market, MarketDemand, MarketPriceSensitivity
 from competitors.models import AICompetitor, CompetitorProduction, MarketCompetition
 from production.models import ProducedBike
+from production.inventory import BikeInventory
 from simulation.market_volume_engine import MarketVolumeEngine
 from simulation.competitive_sales_engine import CompetitiveSalesEngine
 from warehouse.models import Warehouse
@@ -207,20 +208,14 @@ def test_player_bikes(session):
     bike_types = BikeType.objects.filter(session=session)
     warehouse = Warehouse.objects.filter(session=session).first()
     
+    inventory = BikeInventory(session)
     for bike_type in bike_types:
         for segment in ['standard', 'premium']:
-            for i in range(3):  # 3 bikes of each type/segment
-                ProducedBike.objects.create(
-                    session=session,
-                    bike_type=bike_type,
-                    price_segment=segment,
-                    production_month=1,
-                    production_year=2024,
-                    warehouse=warehouse,
-                    production_cost=Decimal('400.00'),
-                    months_in_inventory=0,
-                    storage_cost_accumulated=Decimal('0.00')
-                )
+            # 3 bikes of each type/segment
+            inventory.add_bikes(
+                bike_type, segment, 3, Decimal('400.00'),
+                warehouse=warehouse, month=1, year=2024
+            )
     
     player_bikes = ProducedBike.objects.filter(session=session, is_sold=False)
     print(f"Created {player_bikes.count()} player bikes")
@@ -0,0 +1,230 @@
+"""
+Einlagerungsplanung für ganze Bestellungen.
+
+The procurement views used to look for a warehouse line by line, refreshing
+each warehouse from the database before every capacity check. WarehouseAllocator
+takes one snapshot of the usage counters (Warehouse.used_space) and places all
+lines of an order in a single pass: a line goes to the first warehouse with
+enough room for all of it, otherwise it is split across warehouses. The
+resulting AllocationPlan tells whether the order fits and where to book every
+line.
+
+``place_procurement_order`` is the whole component purchase shared by the
+single-player and the multiplayer procurement views: it parses the order,
+plans it and books orders, items and component stocks. The views only adjust
+the balance.
+"""
+from decimal import Decimal
+
+from bikeshop.models import SupplierPrice
+from procurement.models import ProcurementOrder, ProcurementOrderItem
+
+from .models import ComponentStock, Warehouse
+
+
+class AllocationPlan:
+    """Ergebnis der Einlagerungsplanung einer Bestellung"""
+
+    def __init__(self, warehouses, placements, required_space, unplaced):
+        self.warehouses = warehouses
+        # line key -> [(warehouse, quantity), ...]
+        self.placements = placements
+        self.required_space = required_space
+        # line keys that did not fit (completely)
+        self.unplaced = unplaced
+
+    @property
+    def feasible(self):
+        return not self.unplaced
+
+    @property
+    def total_capacity(self):
+        return sum(warehouse.capacity_m2 for warehouse in self.warehouses)
+
+    @property
+    def current_usage(self):
+        return sum(warehouse.current_usage for warehouse in self.warehouses)
+
+    @property
+    def remaining_capacity(self):
+        return sum(warehouse.remaining_capacity for warehouse in self.warehouses)
+
+    def usage_percentages(self):
+        """Auslastung in Prozent vor und nach der Bestellung"""
+        total_capacity = self.total_capacity
+        if total_capacity <= 0:
+            return 100, 100
+        current_usage = self.current_usage
+        return (
+            current_usage / total_capacity * 100,
+            (current_usage + self.required_space) / total_capacity * 100
+        )
+
+
+class WarehouseAllocator:
+    """Verteilt Bestellpositionen auf die Lager einer Session"""
+
+    def __init__(self, warehouses):
+        self.warehouses = list(warehouses)
+
+    @classmethod
+    def for_session(cls, session, lock=False):
+        """Allocator mit den Lagern der Session; ``lock`` sperrt sie bis zum Transaktionsende"""
+        warehouses = Warehouse.objects.filter(session=session).order_by('id')
+        if lock:
+            warehouses = warehouses.select_for_update()
+        return cls(warehouses)
+
+    def plan(self, lines):
+        """
+        Plant die Einlagerung aller Positionen.
+
+        ``lines`` is an iterable of (key, space_per_unit, quantity). Nothing is
+        written; the caller books the placements of a feasible plan.
+        """
+        remaining = {warehouse.id: warehouse.remaining_capacity for warehouse in self.warehouses}
+        placements = {}
+        unplaced = []
+        required_space = 0
+
+        for key, space_per_unit, quantity in lines:
+            required_space += space_per_unit * quantity
+            line_placements = placements.setdefault(key, [])
+
+            if space_per_unit <= 0:
+                # Takes no room, keep it in the first warehouse
+                if self.warehouses:
+                    line_placements.append((self.warehouses[0], quantity))
+                else:
+                    unplaced.append(key)
+                continue
+
+            # Whole line into the first warehouse with enough room
+            target = next(
+                (warehouse for warehouse in self.warehouses
+                 if remaining[warehouse.id] >= space_per_unit * quantity),
+                None
+            )
+            if target is not None:
+                remaining[target.id] -= space_per_unit * quantity
+                line_placements.append((target, quantity))
+                continue
+
+            # Otherwise split it across the warehouses
+            left = quantity
+            for warehouse in self.warehouses:
+                fitting = min(left, int(remaining[warehouse.id] // space_per_unit))
+                if fitting <= 0:
+                    continue
+                remaining[warehouse.id] -= space_per_unit * fitting
+                line_placements.append((warehouse, fitting))
+                left -= fitting
+                if left == 0:
+                    break
+            if left > 0:
+                unplaced.append(key)
+
+        return AllocationPlan(self.warehouses, placements, required_space, unplaced)
+
+
+def place_procurement_order(session, order_data):
+    """
+    Bestellt Komponenten und lagert sie ein.
+
+    ``order_data`` maps supplier ids to lists of {'component_id', 'quantity'}.
+    Must run inside a transaction (the warehouses are locked). Returns
+    (total_cost, None), or (None, error message) if the order is invalid or
+    does not fit into the warehouses.
+    """
+    total_cost = Decimal('0')
+
+    # Create warehouse if none exist
+    # Increased default warehouse size from 200m² to 500m² for better gameplay
+    if not Warehouse.objects.filter(session=session).exists():
+        Warehouse.objects.create(
+            session=session,
+            name='Hauptlager',
+            location='Standort 1',
+            capacity_m2=500.0,
+            rent_per_month=Decimal('2400.00')
+        )
+
+    # Collect all order lines and their prices in one query
+    lines = []
+    for supplier_id, items in order_data.items():
+        for item in items or []:
+            quantity = int(item['quantity'])
+            if quantity <= 0:
+                return None, 'Quantity must be greater than 0'
+            lines.append((int(supplier_id), int(item['component_id']), quantity))
+
+    prices = {
+        (price.supplier_id, price.component_id): price
+        for price in SupplierPrice.objects.filter(
+            session=session,
+            supplier_id__in={supplier_id for supplier_id, _, _ in lines},
+            component_id__in={component_id for _, component_id, _ in lines}
+        ).select_related('supplier', 'component__component_type')
+    }
+    for supplier_id, component_id, quantity in lines:
+        if (supplier_id, component_id) not in prices:
+            return None, 'No SupplierPrice matches the given query.'
+
+    # Plan the placement of the whole order from one snapshot of the warehouse usage
+    allocation = WarehouseAllocator.for_session(session, lock=True).plan(
+        (index, prices[(supplier_id, component_id)].component.component_type.storage_space_per_unit, quantity)
+        for index, (supplier_id, component_id, quantity) in enumerate(lines)
+    )
+
+    if not allocation.feasible:
+        current_percentage, new_percentage = allocation.usage_percentages()
+        return None, (
+            f'Lagerkapazität überschritten! Diese Bestellung würde {allocation.required_space:.1f}m² benötigen, '
+            f'aber nur {allocation.remaining_capacity:.1f}m² sind in allen Lagern verfügbar. '
+            f'Aktuelle Auslastung: {current_percentage:.1f}%, nach Bestellung: {new_percentage:.1f}%. '
+            f'Bitte kaufen Sie zusätzliche Lagerkapazität oder reduzieren Sie die Bestellmenge.'
+        )
+
+    # Create orders (capacity check passed)
+    orders = {}
+    for index, (supplier_id, component_id, quantity) in enumerate(lines):
+        price_obj = prices[(supplier_id, component_id)]
+        supplier = price_obj.supplier
+
+        if supplier_id not in orders:
+            orders[supplier_id] = ProcurementOrder.objects.create(
+                session=session,
+                supplier=supplier,
+                month=session.current_month,
+                year=session.current_year,
+                total_cost=Decimal('0')
+            )
+        order = orders[supplier_id]
+
+        ProcurementOrderItem.objects.create(
+            order=order,
+            component=price_obj.component,
+            quantity_ordered=quantity,
+            quantity_delivered=quantity,  # Vereinfachung
+            unit_price=price_obj.price
+        )
+
+        # Add to warehouse inventory as planned (track supplier for quality!)
+        for target_warehouse, placed_quantity in allocation.placements[index]:
+            component_stock, created = ComponentStock.objects.get_or_create(
+                session=session,
+                warehouse=target_warehouse,
+                component=price_obj.component,
+                supplier=supplier,  # Track which supplier this came from
+                defaults={'quantity': 0}
+            )
+            component_stock.quantity += placed_quantity
+            component_stock.save()
+
+        order.total_cost += price_obj.price * quantity
+        total_cost += price_obj.price * quantity
+
+    for order in orders.values():
+        order.save()
+
+    return total_cost, None
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class WarehouseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'warehouse'
+
+    def ready(self):
+        """Import signals when app is ready."""
+        import warehouse.signals  # noqa
@@ -78,7 +78,7 @@ class Command(BaseCommand):
             if not dry_run:
                 warehouse.capacity_m2 = new_capacity
                 warehouse.rent_per_month = new_rent
-                warehouse.save()
+                warehouse.save(update_fields=['capacity_m2', 'rent_per_month'])
                 self.stdout.write(self.style.SUCCESS('  ✓ Updated!'))
                 updated_count += 1
             else:
@@ -0,0 +1,69 @@
+"""
+Management command to rebuild the warehouse usage counters.
+
+Warehouse.used_space is maintained incrementally whenever component stock or
+bikes move in or out. This command recalculates it from the stored components
+and bikes and corrects warehouses whose counter has drifted.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from warehouse.models import Warehouse
+
+
+class Command(BaseCommand):
+    help = 'Recalculate the storage usage counter of all warehouses'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show which counters differ without changing them',
+        )
+        parser.add_argument(
+            '--game-id',
+            type=str,
+            help='Only reconcile warehouses of a specific game session ID',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.001,
+            help='Differences up to this many m² are ignored (default: 0.001)',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        game_id = options.get('game_id')
+        tolerance = options['tolerance']
+
+        warehouses = Warehouse.objects.all().order_by('id')
+        if game_id:
+            warehouses = warehouses.filter(session_id=game_id)
+
+        checked = 0
+        corrected = 0
+        for warehouse in warehouses:
+            checked += 1
+            with transaction.atomic():
+                # Lock the row so concurrent bookings cannot interleave with the rebuild
+                warehouse = Warehouse.objects.select_for_update().get(pk=warehouse.pk)
+                actual_usage = warehouse.calculate_usage()
+                if abs(actual_usage - warehouse.used_space) <= tolerance:
+                    continue
+
+                corrected += 1
+                self.stdout.write(
+                    f'{warehouse.name} ({warehouse.session_id}): '
+                    f'{warehouse.used_space:.2f}m² -> {actual_usage:.2f}m²'
+                )
+                if not dry_run:
+                    warehouse.used_space = actual_usage
+                    warehouse.save(update_fields=['used_space'])
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING(
+                f'DRY RUN: {corrected} of {checked} warehouse(s) would be corrected'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ Corrected {corrected} of {checked} warehouse(s)'))
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:48
+
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def populate_used_space(apps, schema_editor):
+    """Initial value of the usage counter (exact values: manage.py reconcile_warehouse_usage)"""
+    Warehouse = apps.get_model('warehouse', 'Warehouse')
+
+    for warehouse in Warehouse.objects.all():
+        component_usage = warehouse.component_stocks.aggregate(
+            usage=Sum(F('quantity') * F('component__component_type__storage_space_per_unit'))
+        )['usage'] or 0
+
+        # Historical models have no multiplier properties, use the materialized or base space
+        bike_usage = 0
+        for group in warehouse.stored_bikes.values(
+            'bike__bike_type__effective_storage_space_per_unit', 'bike__bike_type__base_storage_space_per_unit'
+        ).annotate(count=Count('id')).order_by():
+            space = group['bike__bike_type__effective_storage_space_per_unit']
+            if space is None:
+                space = group['bike__bike_type__base_storage_space_per_unit']
+            bike_usage += group['count'] * space
+
+        warehouse.used_space = component_usage + bike_usage
+        warehouse.save(update_fields=['used_space'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bikeshop', '0008_effective_values'),
+        ('production', '0004_producedbikelot'),
+        ('warehouse', '0003_alter_componentstock_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='warehouse',
+            name='used_space',
+            field=models.FloatField(default=0, help_text='Currently used storage space in m² (maintained counter)'),
+        ),
+        migrations.RunPython(populate_used_space, migrations.RunPython.noop),
+    ]
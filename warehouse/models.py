@@ -1,5 +1,8 @@
+from collections import defaultdict
+
 from django.db import models
-from bikeshop.models import GameSession, Component
+from django.db.models import Count, F, Sum
+from bikeshop.models import GameSession, Component, BikeType
 from production.models import ProducedBike
 from decimal import Decimal
 
@@ -11,22 +14,16 @@ class Warehouse(models.Model):
     location = models.CharField(max_length=100)
     capacity_m2 = models.FloatField()
     rent_per_month = models.DecimalField(max_digits=8, decimal_places=2)
+    # Belegte Fläche in m², laufend mitgeführt (siehe update_usage und warehouse.signals)
+    used_space = models.FloatField(default=0, help_text="Currently used storage space in m² (maintained counter)")
 
     def __str__(self):
         return f"{self.name} ({self.location})"
 
     @property
     def current_usage(self):
-        """Aktuelle Lagernutzung berechnen"""
-        component_usage = sum([
-            stock.quantity * stock.component.component_type.storage_space_per_unit
-            for stock in self.component_stocks.all()
-        ])
-        bike_usage = sum([
-            1 * bike.bike.bike_type.storage_space_per_unit
-            for bike in self.stored_bikes.all()
-        ])
-        return component_usage + bike_usage
+        """Aktuelle Lagernutzung (gepflegter Zähler)"""
+        return self.used_space
 
     @property
     def remaining_capacity(self):
@@ -39,6 +36,28 @@ class Warehouse(models.Model):
             return 100.0
         return (self.current_usage / self.capacity_m2) * 100
 
+    def calculate_usage(self):
+        """Lagernutzung aus den Beständen neu berechnen (für den Abgleich des Zählers)"""
+        component_usage = self.component_stocks.aggregate(
+            usage=Sum(F('quantity') * F('component__component_type__storage_space_per_unit'))
+        )['usage'] or 0
+
+        # storage_space_per_unit of bike types includes the game parameter multiplier
+        bike_counts = self.stored_bikes.values('bike__bike_type').annotate(count=Count('id')).order_by()
+        bike_types = BikeType.objects.in_bulk([group['bike__bike_type'] for group in bike_counts])
+        bike_usage = sum(
+            group['count'] * bike_types[group['bike__bike_type']].storage_space_per_unit
+            for group in bike_counts
+        )
+        return component_usage + bike_usage
+
+    @classmethod
+    def update_usage(cls, deltas):
+        """Verändert die Lagernutzung um die Deltas {warehouse_id: m²} (ein UPDATE pro Lager)"""
+        for warehouse_id, delta in deltas.items():
+            if warehouse_id is not None and delta:
+                cls.objects.filter(pk=warehouse_id).update(used_space=F('used_space') + delta)
+
     def can_store_components(self, component, quantity):
         """Check if warehouse has capacity to store additional components"""
         required_space = component.component_type.storage_space_per_unit * quantity
@@ -70,6 +89,38 @@ class ComponentStock(models.Model):
     class Meta:
         unique_together = ['session', 'warehouse', 'component', 'supplier']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._booked_usage = (instance.__dict__.get('warehouse_id'), instance.__dict__.get('quantity'))
+        return instance
+
+    @classmethod
+    def book_usage(cls, stocks):
+        """
+        Überträgt Mengenänderungen von Lagerbeständen auf die Lagernutzung.
+
+        Compares each stock with the quantity it had when it was loaded (or last
+        booked) and updates Warehouse.used_space with one UPDATE per warehouse.
+        Bulk writes (bulk_create/bulk_update) must call this themselves, single
+        saves and deletes are handled by warehouse.signals.
+        """
+        stocks = list(stocks)
+        space_per_unit = dict(Component.objects.filter(
+            id__in={stock.component_id for stock in stocks}
+        ).values_list('id', 'component_type__storage_space_per_unit'))
+
+        deltas = defaultdict(float)
+        for stock in stocks:
+            # New stocks have not been booked yet
+            booked_warehouse_id, booked_quantity = getattr(stock, '_booked_usage', (None, 0))
+            space = space_per_unit.get(stock.component_id) or 0
+            deltas[booked_warehouse_id] -= (booked_quantity or 0) * space
+            deltas[stock.warehouse_id] += stock.quantity * space
+            stock._booked_usage = (stock.warehouse_id, stock.quantity)
+
+        Warehouse.update_usage(deltas)
+
     def get_quality(self):
         """Get the quality of this component stock based on its supplier"""
         if self.supplier:
@@ -0,0 +1,42 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bikeshop.models import Component
+from production.models import ProducedBike
+from .models import BikeStock, ComponentStock, Warehouse
+
+
+def _bike_space(bike_id):
+    bike = ProducedBike.objects.filter(pk=bike_id).select_related('bike_type').first()
+    return bike.bike_type.storage_space_per_unit if bike else 0
+
+
+@receiver(post_save, sender=ComponentStock)
+def book_component_stock_usage(sender, instance, **kwargs):
+    """Mengenänderung eines Lagerbestands in der Lagernutzung verbuchen"""
+    ComponentStock.book_usage([instance])
+
+
+@receiver(post_delete, sender=ComponentStock)
+def release_component_stock_usage(sender, instance, **kwargs):
+    warehouse_id, quantity = getattr(instance, '_booked_usage', (instance.warehouse_id, instance.quantity))
+    space = Component.objects.filter(pk=instance.component_id).values_list(
+        'component_type__storage_space_per_unit', flat=True
+    ).first() or 0
+    Warehouse.update_usage({warehouse_id: -(quantity or 0) * space})
+
+
+@receiver(post_save, sender=BikeStock)
+def book_bike_stock_usage(sender, instance, created, **kwargs):
+    if created:
+        if sender.bike.is_cached(instance):
+            space = instance.bike.bike_type.storage_space_per_unit
+        else:
+            space = _bike_space(instance.bike_id)
+        Warehouse.update_usage({instance.warehouse_id: space})
+
+
+@receiver(post_delete, sender=BikeStock)
+def release_bike_stock_usage(sender, instance, **kwargs):
+    # Cascaded deletes remove the bike stock before the bike itself
+    Warehouse.update_usage({instance.warehouse_id: -_bike_space(instance.bike_id)})
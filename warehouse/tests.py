@@ -1,3 +1,169 @@
 from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from bikeshop.models import GameSession, BikeType, Component, ComponentType
+from production.models import ProducedBike
+from .models import Warehouse, ComponentStock, BikeStock
+from .allocation import WarehouseAllocator, place_procurement_order
+
+
+class WarehouseUsageCounterTests(TestCase):
+    """Lagernutzung wird als Zähler mitgeführt"""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='warehouseuser', password='testpass123')
+        self.session = GameSession.objects.create(user=user, name='Warehouse Session')
+        self.warehouse = Warehouse.objects.create(
+            session=self.session, name='Lager', location='Hamburg', capacity_m2=100.0,
+            rent_per_month=Decimal('1000.00')
+        )
+        component_type = ComponentType.objects.create(
+            session=self.session, name='Rahmen', storage_space_per_unit=2.0
+        )
+        self.component = Component.objects.create(
+            session=self.session, component_type=component_type, name='Frame'
+        )
+        self.bike_type = BikeType.objects.create(
+            session=self.session, name='City Bike', base_storage_space_per_unit=3.0
+        )
+
+    def _usage(self):
+        self.warehouse.refresh_from_db()
+        return self.warehouse.current_usage
+
+    def test_component_stock_changes_update_counter(self):
+        stock = ComponentStock.objects.create(
+            session=self.session, warehouse=self.warehouse, component=self.component, quantity=10
+        )
+        self.assertEqual(self._usage(), 20.0)
+
+        stock.quantity += 5
+        stock.save()
+        self.assertEqual(self._usage(), 30.0)
+
+        stock = ComponentStock.objects.get(pk=stock.pk)
+        stock.quantity = 2
+        stock.save()
+        self.assertEqual(self._usage(), 4.0)
+
+        stock.delete()
+        self.assertEqual(self._usage(), 0.0)
+
+    def test_bulk_writes_booked_explicitly(self):
+        stock = ComponentStock.objects.create(
+            session=self.session, warehouse=self.warehouse, component=self.component, quantity=10
+        )
+        stocks = list(ComponentStock.objects.filter(pk=stock.pk))
+        stocks[0].quantity = 4
+        ComponentStock.objects.bulk_update(stocks, ['quantity'])
+        ComponentStock.book_usage(stocks)
+
+        self.assertEqual(self._usage(), 8.0)
+
+    def test_bikes_moving_in_and_out(self):
+        bike = ProducedBike.objects.create(
+            session=self.session, bike_type=self.bike_type, price_segment='standard',
+            production_month=1, production_year=2024, warehouse=self.warehouse
+        )
+        BikeStock.objects.create(session=self.session, warehouse=self.warehouse, bike=bike)
+        self.assertEqual(self._usage(), 3.0)
+
+        bike.delete()
+        self.assertEqual(self._usage(), 0.0)
+
+    def test_capacity_checks_need_no_queries(self):
+        ComponentStock.objects.create(
+            session=self.session, warehouse=self.warehouse, component=self.component, quantity=10
+        )
+        self.warehouse.refresh_from_db()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.warehouse.remaining_capacity, 80.0)
+            self.assertEqual(self.warehouse.usage_percentage, 20.0)
+            self.assertTrue(self.warehouse.can_store_bikes(self.bike_type, 20))
+            self.assertFalse(self.warehouse.can_store_bikes(self.bike_type, 30))
+
+    def test_reconcile_command_rebuilds_counter(self):
+        ComponentStock.objects.create(
+            session=self.session, warehouse=self.warehouse, component=self.component, quantity=10
+        )
+        Warehouse.objects.filter(pk=self.warehouse.pk).update(used_space=999.0)
+
+        out = StringIO()
+        call_command('reconcile_warehouse_usage', '--dry-run', stdout=out)
+        self.assertEqual(self._usage(), 999.0)
+
+        call_command('reconcile_warehouse_usage', stdout=out)
+        self.assertEqual(self._usage(), 20.0)
+        self.assertIn('Corrected 1 of 1', out.getvalue())
+
+
+class WarehouseAllocatorTests(TestCase):
+    """Einlagerungsplanung ganzer Bestellungen"""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='allocuser', password='testpass123')
+        self.session = GameSession.objects.create(user=user, name='Allocation Session')
+        self.small = Warehouse.objects.create(
+            session=self.session, name='Klein', location='A', capacity_m2=10.0,
+            rent_per_month=Decimal('100.00'), used_space=4.0
+        )
+        self.large = Warehouse.objects.create(
+            session=self.session, name='Groß', location='B', capacity_m2=20.0,
+            rent_per_month=Decimal('200.00')
+        )
+
+    def test_lines_placed_first_fit_and_split(self):
+        allocator = WarehouseAllocator.for_session(self.session)
+
+        with self.assertNumQueries(0):
+            plan = allocator.plan([('a', 1.0, 5), ('b', 2.0, 8), ('c', 1.0, 5)])
+
+        self.assertTrue(plan.feasible)
+        self.assertEqual(plan.placements['a'], [(self.small, 5)])
+        self.assertEqual(plan.placements['b'], [(self.large, 8)])
+        # 1m² left in the small, 4m² in the large warehouse
+        self.assertEqual(plan.placements['c'], [(self.small, 1), (self.large, 4)])
+        self.assertEqual(plan.required_space, 26.0)
+
+    def test_order_exceeding_capacity_is_infeasible(self):
+        plan = WarehouseAllocator.for_session(self.session).plan([('a', 3.0, 9)])
+
+        self.assertFalse(plan.feasible)
+        self.assertEqual(plan.unplaced, ['a'])
+        self.assertEqual(plan.remaining_capacity, 26.0)
+        current_percentage, new_percentage = plan.usage_percentages()
+        self.assertAlmostEqual(current_percentage, 4 / 30 * 100)
+        self.assertAlmostEqual(new_percentage, 31 / 30 * 100)
+
+    def test_procurement_order_booked_into_warehouses(self):
+        from bikeshop.models import Supplier, SupplierPrice
+        from procurement.models import ProcurementOrder
+
+        supplier = Supplier.objects.create(
+            session=self.session, name='Lieferant', quality='basic', complaint_probability=0, complaint_quantity=0
+        )
+        component_type = ComponentType.objects.create(session=self.session, name='Rahmen', storage_space_per_unit=2.0)
+        component = Component.objects.create(session=self.session, component_type=component_type, name='Frame')
+        SupplierPrice.objects.create(
+            session=self.session, supplier=supplier, component=component, base_price=Decimal('10.00')
+        )
+
+        total_cost, error = place_procurement_order(
+            self.session, {str(supplier.id): [{'component_id': component.id, 'quantity': 5}]}
+        )
+
+        self.assertIsNone(error)
+        self.assertEqual(total_cost, Decimal('50.00'))
+        self.assertEqual(ProcurementOrder.objects.get(session=self.session).total_cost, Decimal('50.00'))
+        stock = ComponentStock.objects.get(session=self.session, component=component)
+        self.assertEqual((stock.warehouse, stock.quantity), (self.large, 5))
+
+        total_cost, error = place_procurement_order(
+            self.session, {str(supplier.id): [{'component_id': component.id, 'quantity': 50}]}
+        )
+        self.assertIsNone(total_cost)
+        self.assertIn('Lagerkapazität überschritten', error)